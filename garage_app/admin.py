@@ -1,10 +1,13 @@
 from django.contrib import admin
-from django.utils.html import format_html
+from django.utils.html import format_html, format_html_join
+from .forms import AppointmentAdminForm
 from .models import (
     CompanyProfile, Client, Vehicle, VehicleType, Service, ServiceConsumption,
     InventoryItem, StockAlert, Invoice, InvoiceItem, Expense, FiscalYearArchive,
     Supplier, RecurringExpense, Appointment, StockReceipt, StockReceiptItem,
-    Material, LaborRate, OverheadConfiguration, LetteringQuote
+    CostLayer, StockMovement, StockCount, StockCountLine, Material, LaborRate, OverheadConfiguration, LetteringQuote,
+    VehiclePanelArea, LaborHourModel, IdempotencyKey, Quote, QuoteItem, Resource,
+    OutboxMessage, AppointmentReminder, CalendarFeedToken
 )
 
 
@@ -225,14 +228,14 @@ class ServiceConsumptionAdmin(admin.ModelAdmin):
 
 @admin.register(Service)
 class ServiceAdmin(admin.ModelAdmin):
-    list_display = ['name', 'category', 'default_price', 'is_active', 'created_at']
+    list_display = ['name', 'category', 'default_price', 'standard_duration', 'is_active', 'created_at']
     list_filter = ['category', 'is_active', 'created_at']
     search_fields = ['name', 'description']
     readonly_fields = ['created_at', 'updated_at']
 
     fieldsets = (
         ('Informations du service', {
-            'fields': ('name', 'description', 'category')
+            'fields': ('name', 'description', 'category', 'standard_duration')
         }),
         ('Prix et statut', {
             'fields': ('default_price', 'is_active')
@@ -247,14 +250,15 @@ class ServiceAdmin(admin.ModelAdmin):
 @admin.register(InventoryItem)
 class InventoryItemAdmin(admin.ModelAdmin):
     list_display = ['name', 'sku', 'supplier', 'category', 'quality_tier', 'quantity_in_stock', 'stock_status', 'alert_status', 'unit_cost', 'unit_price', 'is_active']
-    list_filter = ['supplier', 'category', 'quality_tier', 'is_active', 'created_at']
-    search_fields = ['name', 'sku', 'description', 'supplier__name']
-    readonly_fields = ['created_at', 'updated_at', 'total_value']
+    list_filter = ['supplier', 'category', 'quality_tier', 'costing_method', 'is_active', 'created_at']
+    search_fields = ['name', 'sku', 'barcode', 'description', 'supplier__name']
+    # unit_cost est tenu par le moteur d'évaluation du stock
+    readonly_fields = ['unit_cost', 'created_at', 'updated_at', 'total_value']
     actions = ['check_stock_alerts', 'bulk_update_reorder_levels']
 
     fieldsets = (
         ('Informations de base', {
-            'fields': ('name', 'description', 'sku', 'supplier', 'category')
+            'fields': ('name', 'description', 'sku', 'barcode', 'location', 'supplier', 'category')
         }),
         ('Qualité et tarification', {
             'fields': ('quality_tier',),
@@ -264,7 +268,7 @@ class InventoryItemAdmin(admin.ModelAdmin):
             'fields': ('quantity_in_stock', 'minimum_stock_level', 'reorder_level')
         }),
         ('Prix', {
-            'fields': ('unit_cost', 'unit_price', 'total_value')
+            'fields': ('unit_cost', 'supplier_price', 'unit_price', 'costing_method', 'total_value')
         }),
         ('Statut', {
             'fields': ('is_active',)
@@ -464,6 +468,33 @@ class InvoiceItemAdmin(admin.ModelAdmin):
     )
 
 
+class QuoteItemInline(admin.TabularInline):
+    model = QuoteItem
+    extra = 0
+    fields = ['item_type', 'service', 'inventory_item', 'description', 'price']
+
+
+@admin.register(Quote)
+class QuoteAdmin(admin.ModelAdmin):
+    list_display = ['quote_number', 'client', 'date', 'valid_until', 'total_amount', 'status', 'converted_invoice']
+    list_filter = ['status', 'date']
+    search_fields = ['quote_number', 'client__first_name', 'client__last_name']
+    readonly_fields = ['quote_number', 'subtotal', 'discount_amount', 'gst_amount', 'qst_amount', 'total_amount',
+                       'converted_invoice', 'created_at', 'updated_at']
+    inlines = [QuoteItemInline]
+    actions = ['convert_to_invoices']
+
+    def convert_to_invoices(self, request, queryset):
+        """Action pour convertir plusieurs soumissions en factures (une seule transaction)"""
+        converted = Quote.convert_many(queryset)
+        skipped = queryset.count() - len(converted)
+        message = f'{len(converted)} soumission(s) convertie(s) en facture.'
+        if skipped:
+            message += f' {skipped} soumission(s) ignorée(s) (statut non convertible ou déjà convertie).'
+        self.message_user(request, message)
+    convert_to_invoices.short_description = "Convertir en factures"
+
+
 @admin.register(Expense)
 class ExpenseAdmin(admin.ModelAdmin):
     list_display = ['description', 'supplier', 'amount', 'category', 'expense_date', 'has_receipt', 'total_with_taxes']
@@ -573,30 +604,67 @@ class RecurringExpenseAdmin(admin.ModelAdmin):
     actions = ['create_expenses_for_due_items']
 
     def create_expenses_for_due_items(self, request, queryset):
-        """Action pour créer des dépenses pour les éléments dus"""
-        created_count = 0
-        for recurring_expense in queryset:
-            if recurring_expense.is_due():
-                recurring_expense.create_expense()
-                created_count += 1
-
+        """Action pour créer des dépenses pour les éléments dus (toutes les échéances manquées)"""
+        created_count = len(RecurringExpense.materialize_due(queryset=queryset))
         self.message_user(request, f'{created_count} dépense(s) créée(s) avec succès.')
     create_expenses_for_due_items.short_description = "Créer les dépenses pour les éléments dus"
 
 
+@admin.register(Resource)
+class ResourceAdmin(admin.ModelAdmin):
+    list_display = ['name', 'resource_type', 'user', 'is_active']
+    list_filter = ['resource_type', 'is_active']
+    search_fields = ['name']
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'channel', 'recipient', 'subject', 'status', 'sent_at']
+    list_filter = ['status', 'channel', 'created_at']
+    search_fields = ['recipient', 'subject', 'body']
+    readonly_fields = ['created_at', 'updated_at', 'sent_at', 'error']
+    actions = ['mark_as_sent']
+
+    def mark_as_sent(self, request, queryset):
+        """Action pour marquer les appels de rappel comme faits"""
+        from django.utils import timezone
+
+        count = queryset.filter(status='pending').update(status='sent', sent_at=timezone.now(), updated_at=timezone.now())
+        self.message_user(request, f'{count} message(s) marqué(s) comme envoyé(s).')
+    mark_as_sent.short_description = "Marquer comme envoyés / appels faits"
+
+
+@admin.register(AppointmentReminder)
+class AppointmentReminderAdmin(admin.ModelAdmin):
+    list_display = ['appointment', 'kind', 'message', 'created_at']
+    list_filter = ['kind', 'created_at']
+    list_select_related = ['appointment__client', 'message']
+    readonly_fields = ['appointment', 'kind', 'message', 'created_at']
+
+
+@admin.register(CalendarFeedToken)
+class CalendarFeedTokenAdmin(admin.ModelAdmin):
+    list_display = ['user', 'created_at']
+    search_fields = ['user__username']
+    readonly_fields = ['token', 'created_at']
+
+
 @admin.register(Appointment)
 class AppointmentAdmin(admin.ModelAdmin):
     list_display = ['title', 'client', 'vehicle', 'start_datetime', 'end_datetime', 'status', 'has_invoice']
-    list_filter = ['status', 'start_datetime', 'created_at']
+    list_filter = ['status', 'resources', 'start_datetime', 'created_at']
     search_fields = ['title', 'client__first_name', 'client__last_name', 'description']
     readonly_fields = ['duration', 'is_past', 'is_today', 'created_at', 'updated_at']
+    filter_horizontal = ['resources', 'estimated_services']
+    # Vérifier qu'aucune baie ni aucun technicien n'est réservé deux fois
+    form = AppointmentAdminForm
 
     fieldsets = (
         ('Informations de base', {
             'fields': ('title', 'description', 'client', 'vehicle')
         }),
         ('Planification', {
-            'fields': ('start_datetime', 'end_datetime', 'duration', 'status')
+            'fields': ('start_datetime', 'end_datetime', 'duration', 'status', 'resources')
         }),
         ('Services et prix', {
             'fields': ('estimated_services', 'estimated_price')
@@ -616,8 +684,6 @@ class AppointmentAdmin(admin.ModelAdmin):
         }),
     )
 
-    filter_horizontal = ['estimated_services']
-
     def has_invoice(self, obj):
         """Afficher si le rendez-vous a une facture"""
         if obj.invoice:
@@ -629,12 +695,7 @@ class AppointmentAdmin(admin.ModelAdmin):
 
     def create_invoices_for_completed(self, request, queryset):
         """Action pour créer des factures pour les rendez-vous terminés"""
-        created_count = 0
-        for appointment in queryset:
-            if appointment.can_create_invoice():
-                appointment.create_invoice_from_appointment()
-                created_count += 1
-
+        created_count = len(Appointment.invoice_many(queryset))
         self.message_user(request, f'{created_count} facture(s) créée(s) avec succès.')
     create_invoices_for_completed.short_description = "Créer des factures pour les rendez-vous terminés"
 
@@ -674,6 +735,18 @@ class StockReceiptAdmin(admin.ModelAdmin):
 
     inlines = [StockReceiptItemInline]
 
+    def save_formset(self, request, form, formset, change):
+        """Enregistrer les lignes en lot avec un seul calcul des totaux"""
+        if formset.model is not StockReceiptItem:
+            return super().save_formset(request, form, formset, change)
+
+        formset.save(commit=False)
+        form.instance.save_items(
+            new_items=formset.new_objects,
+            changed_items=[item for item, _ in formset.changed_objects],
+            deleted_items=formset.deleted_objects,
+        )
+
     def has_expense(self, obj):
         """Afficher si le bon de réception a une dépense associée"""
         if obj.expense:
@@ -702,6 +775,75 @@ class StockReceiptItemAdmin(admin.ModelAdmin):
     readonly_fields = ['total_price', 'created_at', 'updated_at']
 
 
+@admin.register(CostLayer)
+class CostLayerAdmin(admin.ModelAdmin):
+    list_display = ['inventory_item', 'received_date', 'unit_cost', 'quantity_received', 'quantity_remaining']
+    list_filter = ['received_date', 'inventory_item__costing_method']
+    search_fields = ['inventory_item__name', 'inventory_item__sku']
+    list_select_related = ['inventory_item']
+    readonly_fields = [
+        'inventory_item', 'stock_receipt_item', 'received_date', 'unit_cost',
+        'quantity_received', 'quantity_remaining', 'created_at', 'updated_at'
+    ]
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = [
+        'movement_date', 'inventory_item', 'movement_type', 'quantity', 'unit_cost',
+        'total_cost', 'balance_quantity', 'balance_value', 'reference'
+    ]
+    list_filter = ['movement_type', 'movement_date']
+    search_fields = ['inventory_item__name', 'inventory_item__sku', 'reference']
+    list_select_related = ['inventory_item']
+    date_hierarchy = 'movement_date'
+    readonly_fields = [
+        'inventory_item', 'movement_type', 'movement_date', 'quantity', 'unit_cost', 'total_cost',
+        'balance_quantity', 'balance_value', 'stock_receipt_item', 'invoice_item', 'reference', 'created_at'
+    ]
+
+    def has_add_permission(self, request):
+        # Les mouvements sont créés par le moteur d'évaluation pour garder les soldes cohérents
+        return False
+
+
+class StockCountLineInline(admin.TabularInline):
+    model = StockCountLine
+    extra = 0
+    fields = ['inventory_item', 'counted_quantity', 'expected_quantity', 'variance']
+    readonly_fields = ['expected_quantity', 'variance']
+    raw_id_fields = ['inventory_item']
+
+
+@admin.register(StockCount)
+class StockCountAdmin(admin.ModelAdmin):
+    list_display = ['reference', 'count_date', 'status', 'posted_at']
+    list_filter = ['status', 'count_date']
+    search_fields = ['reference', 'notes']
+    readonly_fields = ['reference', 'status', 'posted_at', 'created_at', 'updated_at']
+    inlines = [StockCountLineInline]
+    actions = ['post_counts', 'cancel_counts']
+
+    def post_counts(self, request, queryset):
+        """Action pour comptabiliser les écarts des inventaires sélectionnés"""
+        posted_count = 0
+        adjusted_count = 0
+        for stock_count in queryset.filter(status='open'):
+            adjusted = stock_count.post_adjustments()
+            if adjusted is not None:
+                posted_count += 1
+                adjusted_count += adjusted
+
+        self.message_user(request, f'{posted_count} inventaire(s) comptabilisé(s), {adjusted_count} article(s) ajusté(s).')
+    post_counts.short_description = "Comptabiliser les écarts des inventaires sélectionnés"
+
+    def cancel_counts(self, request, queryset):
+        """Action pour annuler les inventaires sélectionnés encore en cours"""
+        cancelled_count = sum(1 for stock_count in queryset.filter(status='open') if stock_count.cancel())
+        self.message_user(request, f'{cancelled_count} inventaire(s) annulé(s).')
+    cancel_counts.short_description = "Annuler les inventaires en cours sélectionnés"
+
+
 # ==================== CALCULATEUR DE LETTRAGE ====================
 
 @admin.register(Material)
@@ -714,7 +856,7 @@ class MaterialAdmin(admin.ModelAdmin):
 
     fieldsets = (
         ('Informations de base', {
-            'fields': ('name', 'type', 'cost_per_sqm')
+            'fields': ('name', 'type', 'cost_per_sqm', 'roll_width')
         }),
         ('Détails', {
             'fields': ('supplier', 'notes', 'is_active')
@@ -780,6 +922,12 @@ class OverheadConfigurationAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 
+class VehiclePanelAreaInline(admin.TabularInline):
+    model = VehiclePanelArea
+    extra = 0
+    fields = ['panel', 'make', 'model', 'area']
+
+
 # Mise à jour de VehicleTypeAdmin pour inclure le nouveau champ
 @admin.register(VehicleType)
 class VehicleTypeAdmin(admin.ModelAdmin):
@@ -807,6 +955,39 @@ class VehicleTypeAdmin(admin.ModelAdmin):
         }),
     )
     readonly_fields = ['created_at', 'updated_at']
+    inlines = [VehiclePanelAreaInline]
+
+
+@admin.register(VehiclePanelArea)
+class VehiclePanelAreaAdmin(admin.ModelAdmin):
+    list_display = ['vehicle_type', 'make', 'model', 'panel', 'area']
+    list_filter = ['vehicle_type', 'panel']
+    search_fields = ['vehicle_type__name', 'make', 'model']
+    list_editable = ['area']
+    list_select_related = ['vehicle_type']
+
+
+@admin.register(LaborHourModel)
+class LaborHourModelAdmin(admin.ModelAdmin):
+    list_display = ['task', 'sample_count', 'r_squared', 'residual_std', 'fitted_at']
+    readonly_fields = ['task', 'feature_names', 'coefficients', 'covariance', 'residual_std', 'r_squared',
+                       'sample_count', 'fitted_at']
+
+    def has_add_permission(self, request):
+        # Les modèles sont ajustés par la commande fit_labor_hours
+        return False
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ['scope', 'key', 'user', 'status_code', 'created_at']
+    list_filter = ['scope', 'created_at']
+    search_fields = ['key']
+    readonly_fields = ['scope', 'key', 'user', 'request_hash', 'status_code', 'response', 'created_at']
+
+    def has_add_permission(self, request):
+        # Les clés sont enregistrées par les vues idempotentes
+        return False
 
 
 @admin.register(LetteringQuote)
@@ -814,7 +995,13 @@ class LetteringQuoteAdmin(admin.ModelAdmin):
     list_display = ['__str__', 'client', 'vehicle', 'surface_area', 'final_price_with_taxes', 'is_converted_to_quote', 'created_at']
     list_filter = ['is_converted_to_quote', 'vinyl_material__type', 'created_at']
     search_fields = ['client__first_name', 'client__last_name', 'vehicle__make', 'vehicle__model']
-    readonly_fields = ['material_cost', 'labor_cost', 'overhead_cost', 'total_cost', 'final_price', 'gst_amount', 'qst_amount', 'final_price_with_taxes', 'created_at', 'updated_at']
+    readonly_fields = ['material_cost', 'labor_cost', 'overhead_cost', 'total_cost', 'final_price', 'gst_amount', 'qst_amount', 'final_price_with_taxes', 'cost_breakdown_display', 'created_at', 'updated_at']
+
+    # Champs dont la modification relance le calcul avec les tarifs courants
+    PRICING_FIELDS = {
+        'vehicle', 'surface_area', 'waste_percentage', 'vinyl_material', 'lamination_material',
+        'design_hours', 'installation_hours', 'overhead_config', 'profit_margin',
+    }
 
     fieldsets = (
         ('Informations de base', {
@@ -833,9 +1020,9 @@ class LetteringQuoteAdmin(admin.ModelAdmin):
             'fields': ('overhead_config', 'profit_margin')
         }),
         ('Coûts calculés', {
-            'fields': ('material_cost', 'labor_cost', 'overhead_cost', 'total_cost', 'final_price', 'gst_amount', 'qst_amount', 'final_price_with_taxes'),
+            'fields': ('material_cost', 'labor_cost', 'overhead_cost', 'total_cost', 'final_price', 'gst_amount', 'qst_amount', 'final_price_with_taxes', 'cost_breakdown_display'),
             'classes': ('collapse',),
-            'description': 'Ces coûts sont calculés automatiquement'
+            'description': 'Ces coûts sont calculés automatiquement et figés avec les tarifs utilisés'
         }),
         ('Conversion', {
             'fields': ('is_converted_to_quote', 'related_quote'),
@@ -847,9 +1034,37 @@ class LetteringQuoteAdmin(admin.ModelAdmin):
         }),
     )
 
+    def cost_breakdown_display(self, obj):
+        snapshot = obj.cost_breakdown
+        if not snapshot:
+            return 'Aucun détail enregistré'
+        breakdown = snapshot['breakdown']
+        rows = [
+            ('Calculé le', snapshot['priced_at'][:16].replace('T', ' ')),
+            ('Vinyle', f"{snapshot['vinyl_material']['name']} ({snapshot['vinyl_material']['cost_per_sqm']}$/m²)"),
+        ]
+        if snapshot['lamination_material']:
+            lamination = snapshot['lamination_material']
+            rows.append(('Lamination', f"{lamination['name']} ({lamination['cost_per_sqm']}$/m²)"))
+        rows += [
+            ('Frais généraux', snapshot['overhead_config']['name']),
+            ('Surface avec perte', f"{float(breakdown['surface_with_waste']):.2f} m²"),
+            ('Conception', f"{float(breakdown['design_cost']):.2f}$ ({float(breakdown['design_rate']):.2f}$/h)"),
+            ('Installation', f"{float(breakdown['installation_cost']):.2f}$ ({float(breakdown['installation_rate']):.2f}$/h × {breakdown['complexity_multiplier']})"),
+            ('Frais horaires', f"{float(breakdown['hourly_overhead']):.2f}$"),
+            ('Frais fixes', f"{float(breakdown['fixed_overhead']):.2f}$"),
+            ('Frais en pourcentage', f"{float(breakdown['percentage_overhead']):.2f}$"),
+        ]
+        return format_html(
+            '<table>{}</table>',
+            format_html_join('', '<tr><th>{}</th><td>{}</td></tr>', rows)
+        )
+    cost_breakdown_display.short_description = 'Détail figé du calcul'
+
     def save_model(self, request, obj, form, change):
-        # Recalculer les coûts avant la sauvegarde
-        obj.calculate_costs()
+        # Recalculer les coûts seulement si un paramètre du calcul a changé
+        if not change or self.PRICING_FIELDS.intersection(form.changed_data):
+            obj.calculate_costs()
         super().save_model(request, obj, form, change)
 
 
@@ -1,10 +1,14 @@
 from django import forms
 from django.forms import inlineformset_factory
+from django.utils import timezone
 from .models import (
     CompanyProfile, Client, Vehicle, Service, Invoice, InvoiceItem, Expense,
     Supplier, RecurringExpense, Appointment, InventoryItem, StockReceipt, StockReceiptItem,
-    Quote, QuoteItem
+    StockCount, Quote, QuoteItem, Resource
 )
+from .utils.scheduling import BLOCKING_STATUSES, check_booking, invalidate_busy_intervals
+from .utils.stock_count import COUNT_ENTRY_MODE_CHOICES
+from .utils.supplier_import import IMPORT_MODE_CHOICES
 from datetime import date, timedelta, datetime
 
 
@@ -148,12 +152,13 @@ class ServiceForm(forms.ModelForm):
 
     class Meta:
         model = Service
-        fields = ['name', 'description', 'default_price', 'category', 'is_active']
+        fields = ['name', 'description', 'default_price', 'category', 'standard_duration', 'is_active']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Nom du service'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Description détaillée'}),
             'default_price': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '0.01'}),
             'category': forms.Select(attrs={'class': 'form-select'}),
+            'standard_duration': forms.NumberInput(attrs={'class': 'form-control', 'step': '15', 'min': '0', 'placeholder': 'Ex: 240'}),
             'is_active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
 
@@ -452,14 +457,56 @@ class RecurringExpenseForm(forms.ModelForm):
             self.fields['next_due_date'].initial = date.today()
 
 
-class AppointmentForm(forms.ModelForm):
+class BookingFormMixin:
+    """Validation commune des rendez-vous : fin après le début, aucune ressource réservée deux fois"""
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start = cleaned_data.get('start_datetime')
+        end = cleaned_data.get('end_datetime')
+        if not start or not end:
+            return cleaned_data
+        if end <= start:
+            self.add_error('end_datetime', "La fin doit être après le début du rendez-vous.")
+            return cleaned_data
+
+        # Une baie ou un technicien ne peut pas être réservé deux fois en même temps
+        resources = cleaned_data.get('resources') or []
+        if resources and cleaned_data.get('status') in BLOCKING_STATUSES:
+            conflicts = check_booking(
+                [resource.id for resource in resources], start, end, exclude_appointment_id=self.instance.pk
+            )
+            if conflicts:
+                busy = {
+                    appointment.id: appointment
+                    for appointment in Appointment.objects.filter(
+                        id__in={appointment_id for ids in conflicts.values() for appointment_id in ids}
+                    )
+                }
+                for resource in resources:
+                    for appointment_id in conflicts.get(resource.id, []):
+                        other = busy[appointment_id]
+                        self.add_error('resources', (
+                            f"{resource.name} est déjà réservé(e) pour « {other.title} » "
+                            f"({timezone.localtime(other.start_datetime):%d/%m %H:%M}"
+                            f" - {timezone.localtime(other.end_datetime):%H:%M})."
+                        ))
+        return cleaned_data
+
+    def _save_m2m(self):
+        super()._save_m2m()
+        # Les ressources sont enregistrées après le rendez-vous : invalider à nouveau les plages occupées
+        invalidate_busy_intervals()
+
+
+class AppointmentForm(BookingFormMixin, forms.ModelForm):
     """Formulaire pour les rendez-vous"""
 
     class Meta:
         model = Appointment
         fields = [
             'title', 'description', 'client', 'vehicle', 'start_datetime', 'end_datetime',
-            'status', 'estimated_services', 'estimated_price', 'notes'
+            'status', 'estimated_services', 'estimated_price', 'resources', 'notes'
         ]
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Titre du rendez-vous'}),
@@ -478,14 +525,16 @@ class AppointmentForm(forms.ModelForm):
             }),
             'status': forms.Select(attrs={'class': 'form-select'}),
             'estimated_services': forms.CheckboxSelectMultiple(),
+            'resources': forms.SelectMultiple(attrs={'class': 'form-select', 'size': '4'}),
             'estimated_price': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '0.00'}),
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Notes additionnelles'}),
         }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Filtrer les services actifs
+        # Filtrer les services et ressources actifs
         self.fields['estimated_services'].queryset = Service.objects.filter(is_active=True)
+        self.fields['resources'].queryset = Resource.objects.filter(is_active=True)
 
         # Définir des valeurs par défaut
         if not self.instance.pk:
@@ -501,6 +550,14 @@ class AppointmentForm(forms.ModelForm):
             self.fields['end_datetime'].initial = start_time + timedelta(hours=1)
 
 
+class AppointmentAdminForm(BookingFormMixin, forms.ModelForm):
+    """Formulaire de l'admin des rendez-vous, avec la même vérification des réservations"""
+
+    class Meta:
+        model = Appointment
+        fields = '__all__'
+
+
 class StockReceiptForm(forms.ModelForm):
     """Formulaire pour les bons de réception"""
 
@@ -543,6 +600,81 @@ class StockReceiptItemForm(forms.ModelForm):
         }
 
 
+class SupplierCsvImportForm(forms.Form):
+    """Formulaire d'importation d'un fichier CSV fournisseur (bordereau ou liste de prix)"""
+
+    supplier = forms.ModelChoiceField(
+        queryset=Supplier.objects.none(),
+        label='Fournisseur',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    mode = forms.ChoiceField(
+        choices=IMPORT_MODE_CHOICES,
+        label='Type de fichier',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    csv_file = forms.FileField(
+        label='Fichier CSV',
+        help_text='Colonnes reconnues: SKU, quantité, prix (séparateur virgule ou point-virgule)',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv'})
+    )
+    supplier_invoice_number = forms.CharField(
+        max_length=100,
+        required=False,
+        label='Numéro de facture fournisseur',
+        widget=forms.TextInput(attrs={'class': 'form-control'})
+    )
+    update_prices = forms.BooleanField(
+        required=False,
+        label='Mettre à jour les prix fournisseur des articles',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['supplier'].queryset = Supplier.objects.filter(is_active=True).order_by('name')
+
+
+class StockCountForm(forms.ModelForm):
+    """Formulaire pour ouvrir une session d'inventaire physique"""
+
+    class Meta:
+        model = StockCount
+        fields = ['count_date', 'notes']
+        widgets = {
+            'count_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+            'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 2, 'placeholder': 'Zone comptée, équipe...'}),
+        }
+
+
+class StockCountEntryForm(forms.Form):
+    """Saisie en lot des quantités comptées (lecteur de codes-barres ou fichier CSV)"""
+
+    scans = forms.CharField(
+        required=False,
+        label='Lectures du lecteur',
+        help_text='Un code par ligne (une unité par lecture) ou « code,quantité »',
+        widget=forms.Textarea(attrs={'class': 'form-control font-monospace', 'rows': 8, 'autofocus': True})
+    )
+    csv_file = forms.FileField(
+        required=False,
+        label='Fichier CSV',
+        help_text='Colonnes reconnues: SKU (ou code) et quantité',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv'})
+    )
+    mode = forms.ChoiceField(
+        choices=COUNT_ENTRY_MODE_CHOICES,
+        label='Mode de saisie',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('scans', '').strip() and not cleaned_data.get('csv_file'):
+            raise forms.ValidationError('Saisissez des lectures ou choisissez un fichier CSV.')
+        return cleaned_data
+
+
 # ==================== FORMULAIRES SOUMISSIONS ====================
 
 class QuoteForm(forms.ModelForm):
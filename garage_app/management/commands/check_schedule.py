@@ -0,0 +1,50 @@
+"""
+Commande pour détecter les doubles réservations de baies et de techniciens
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from garage_app.models import Resource
+from garage_app.utils.scheduling import validate_week
+
+
+class Command(BaseCommand):
+    help = 'Vérifie en une passe les collisions de réservation des ressources sur une semaine'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--week',
+            type=date.fromisoformat,
+            help='Un jour de la semaine à vérifier AAAA-MM-JJ (défaut: semaine courante)'
+        )
+        parser.add_argument(
+            '--weeks',
+            type=int,
+            default=1,
+            help='Nombre de semaines consécutives à vérifier (défaut: 1)'
+        )
+
+    def handle(self, *args, **options):
+        day = options['week'] or timezone.localdate()
+        week_start = day - timedelta(days=day.weekday())
+        resources = dict(Resource.objects.values_list('id', 'name'))
+
+        total_conflicts = 0
+        for offset in range(max(options['weeks'], 1)):
+            start = week_start + timedelta(weeks=offset)
+            result = validate_week(start)
+            self.stdout.write(f"📅 Semaine du {start:%Y-%m-%d}: {result['total']} réservation(s) vérifiée(s)")
+            for conflict in result['conflicts']:
+                self.stdout.write(self.style.WARNING(
+                    f"   ⚠️  {resources.get(conflict['resource_id'], conflict['resource_id'])}: "
+                    f"rendez-vous #{conflict['appointment_id']} chevauche #{conflict['conflicts_with']} "
+                    f"({timezone.localtime(conflict['start']):%d/%m %H:%M} - "
+                    f"{timezone.localtime(conflict['end']):%H:%M})"
+                ))
+            total_conflicts += len(result['conflicts'])
+
+        if total_conflicts:
+            self.stdout.write(self.style.ERROR(f'❌ {total_conflicts} collision(s) détectée(s)'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ Aucune collision'))
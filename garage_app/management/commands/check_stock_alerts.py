@@ -39,6 +39,16 @@ class Command(BaseCommand):
             action='store_true',
             help='Affichage détaillé'
         )
+        parser.add_argument(
+            '--suggest-orders',
+            action='store_true',
+            help='Afficher un aperçu des suggestions de commande par fournisseur après la vérification (sans rien créer)'
+        )
+        parser.add_argument(
+            '--create-orders',
+            action='store_true',
+            help='Créer les bons de commande brouillons suggérés après la vérification'
+        )
 
     def handle(self, *args, **options):
         self.dry_run = options['dry_run']
@@ -46,6 +56,8 @@ class Command(BaseCommand):
         self.cleanup_days = options['cleanup_days']
         self.summary_only = options['summary_only']
         self.verbose = options['verbose']
+        self.suggest_orders = options['suggest_orders']
+        self.create_orders = options['create_orders']
 
         self.stdout.write('🔍 Vérification des niveaux de stock...\n')
 
@@ -61,6 +73,12 @@ class Command(BaseCommand):
                 # Nettoyer les anciennes alertes
                 self.cleanup_old_alerts()
 
+            if self.suggest_orders or self.create_orders:
+                # Préparer les commandes fournisseurs à partir des articles à réapprovisionner
+                from django.core.management import call_command
+                self.stdout.write('')
+                call_command('suggest_purchase_orders', create=self.create_orders and not self.dry_run, stdout=self.stdout)
+
             self.stdout.write('\n✅ Vérification terminée avec succès!')
 
         except Exception as e:
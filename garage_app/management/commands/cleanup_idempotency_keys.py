@@ -0,0 +1,35 @@
+"""
+Commande pour supprimer les clés d'idempotence expirées
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from garage_app.utils.idempotency import IDEMPOTENCY_KEY_TTL, cleanup_expired_keys, expired_keys
+
+
+class Command(BaseCommand):
+    help = 'Supprime les clés d\'idempotence plus anciennes que leur durée de validité (à planifier chaque jour)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=int(IDEMPOTENCY_KEY_TTL.total_seconds() // 3600),
+            help='Durée de validité des clés en heures (défaut: %(default)s)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Compter les clés à supprimer sans les supprimer'
+        )
+
+    def handle(self, *args, **options):
+        ttl = timedelta(hours=options['hours'])
+
+        if options['dry_run']:
+            count = expired_keys(ttl=ttl).count()
+            self.stdout.write(self.style.WARNING(f'🔍 Simulation: {count} clé(s) d\'idempotence à supprimer'))
+            return
+
+        count = cleanup_expired_keys(ttl=ttl)
+        self.stdout.write(self.style.SUCCESS(f'✅ {count} clé(s) d\'idempotence expirée(s) supprimée(s)'))
@@ -0,0 +1,37 @@
+"""
+Commande pour fermer la journée : facturer les rendez-vous terminés
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from garage_app.models import Appointment
+
+
+class Command(BaseCommand):
+    help = 'Crée en une transaction les factures de tous les rendez-vous terminés et non facturés'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=date.fromisoformat,
+            help='Jour à fermer AAAA-MM-JJ; les jours précédents sont inclus (défaut: aujourd\'hui)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Compter les rendez-vous à facturer sans rien créer'
+        )
+
+    def handle(self, *args, **options):
+        day = options['date'] or timezone.localdate()
+
+        if options['dry_run']:
+            count = Appointment.uninvoiced_until(day).count()
+            self.stdout.write(self.style.WARNING(f'🔍 Simulation: {count} rendez-vous à facturer au {day:%Y-%m-%d}'))
+            return
+
+        appointments = Appointment.close_day(day)
+        for appointment in appointments:
+            self.stdout.write(f'   🧾 {appointment.invoice.invoice_number} - {appointment.title} ({appointment.client.full_name})')
+        self.stdout.write(self.style.SUCCESS(f'✅ {len(appointments)} facture(s) créée(s) au {day:%Y-%m-%d}'))
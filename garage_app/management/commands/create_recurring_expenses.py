@@ -70,15 +70,18 @@ class Command(BaseCommand):
             return RecurringExpense.objects.filter(is_active=True)
         
         # Dépenses dues aujourd'hui ou dans les X jours
+        return RecurringExpense.objects.filter(
+            is_active=True,
+            next_due_date__lte=self.get_target_date()
+        )
+
+    def get_target_date(self):
+        """Date limite des échéances à créer"""
         target_date = date.today()
         if self.days_ahead > 0:
             from datetime import timedelta
             target_date = date.today() + timedelta(days=self.days_ahead)
-        
-        return RecurringExpense.objects.filter(
-            is_active=True,
-            next_due_date__lte=target_date
-        )
+        return target_date
 
     def display_summary(self, recurring_expenses):
         """Afficher le résumé des dépenses à créer"""
@@ -86,25 +89,41 @@ class Command(BaseCommand):
         self.stdout.write('📋 RÉSUMÉ DES DÉPENSES RÉCURRENTES À CRÉER')
         self.stdout.write('='*60)
         
+        target_date = self.get_target_date()
         total_amount = 0
-        for expense in recurring_expenses:
+        total_count = 0
+        for expense in recurring_expenses.select_related('supplier'):
+            # Avec --force-all, une seule occurrence est créée par dépense récurrente
+            occurrences = 1 if self.force_all else len(expense.due_dates(target_date))
             self.stdout.write(
                 f'💰 {expense.name} - {expense.supplier or "Aucun fournisseur"}'
             )
             self.stdout.write(
                 f'   Montant: {expense.total_with_taxes:.2f}$ - '
                 f'Échéance: {expense.next_due_date.strftime("%d/%m/%Y")} - '
-                f'Fréquence: {expense.get_frequency_display()}'
+                f'Fréquence: {expense.get_frequency_display()} - '
+                f'Occurrences: {occurrences}'
             )
-            total_amount += expense.total_with_taxes
+            total_amount += expense.total_with_taxes * occurrences
+            total_count += occurrences
         
         self.stdout.write(f'\n💵 TOTAL: {total_amount:.2f}$')
-        self.stdout.write(f'📊 NOMBRE: {recurring_expenses.count()} dépense(s)')
+        self.stdout.write(f'📊 NOMBRE: {total_count} dépense(s)')
         self.stdout.write('='*60 + '\n')
 
     @transaction.atomic
     def create_expenses(self, recurring_expenses):
         """Créer les dépenses à partir des dépenses récurrentes"""
+        if not self.force_all:
+            # Rattrapage : toutes les échéances manquées, en lot
+            expenses = RecurringExpense.materialize_due(self.get_target_date(), recurring_expenses)
+            for expense in expenses:
+                self.stdout.write(
+                    f'✓ Créé: {expense.description} - {expense.total_with_taxes:.2f}$ '
+                    f'(Échéance: {expense.expense_date.strftime("%d/%m/%Y")})'
+                )
+            return len(expenses)
+
         created_count = 0
         
         for recurring_expense in recurring_expenses:
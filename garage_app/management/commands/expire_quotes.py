@@ -0,0 +1,36 @@
+"""
+Commande pour expirer les soumissions dont la date de validité est dépassée
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from garage_app.models import Quote
+
+
+class Command(BaseCommand):
+    help = 'Passe au statut « expirée » les soumissions brouillon ou envoyées dont la validité est dépassée'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Compter les soumissions à expirer sans les modifier'
+        )
+        parser.add_argument(
+            '--date',
+            type=date.fromisoformat,
+            help='Date de référence AAAA-MM-JJ (défaut: aujourd\'hui)'
+        )
+
+    def handle(self, *args, **options):
+        today = options['date'] or date.today()
+
+        if options['dry_run']:
+            count = Quote.objects.filter(
+                status__in=Quote.EXPIRABLE_STATUSES, valid_until__lt=today
+            ).count()
+            self.stdout.write(self.style.WARNING(f'🔍 Simulation: {count} soumission(s) à expirer au {today:%Y-%m-%d}'))
+            return
+
+        count = Quote.expire_overdue(today)
+        self.stdout.write(self.style.SUCCESS(f'✅ {count} soumission(s) expirée(s) au {today:%Y-%m-%d}'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from garage_app.models import LaborHourModel
+from garage_app.utils.labor_estimation import fit_labor_models, training_queryset
+
+
+class Command(BaseCommand):
+    help = 'Ajuster le modèle d\'estimation des heures de lettrage sur l\'historique des travaux'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all-quotes',
+            action='store_true',
+            help='Utiliser tous les calculs de lettrage, pas seulement ceux convertis en facture'
+        )
+
+    def handle(self, *args, **options):
+        queryset = training_queryset(converted_only=not options['all_quotes'])
+        self.stdout.write('🧮 Ajustement du modèle d\'heures de lettrage...')
+
+        try:
+            results = fit_labor_models(queryset)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        labels = dict(LaborHourModel.TASK_CHOICES)
+        for task, result in results.items():
+            self.stdout.write(
+                f'\n📐 {labels[task]} : {result["sample_count"]} travaux, R² {result["r_squared"]:.3f}, '
+                f'écart-type {result["residual_std"]:.2f} h'
+            )
+            for name, coefficient in result['coefficients'].items():
+                self.stdout.write(f'   {name:<28} {coefficient:>10.4f}')
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Coefficients enregistrés'))
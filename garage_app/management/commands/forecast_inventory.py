@@ -0,0 +1,121 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from garage_app.models import InventoryItem
+from garage_app.utils.inventory_forecast import (
+    compute_inventory_forecast,
+    DEFAULT_LOOKBACK_DAYS,
+    DEFAULT_HORIZON_DAYS,
+    DEFAULT_LEAD_TIME_DAYS,
+    DEFAULT_SERVICE_LEVEL_Z,
+)
+
+
+class Command(BaseCommand):
+    help = 'Prévoir la consommation d\'inventaire (jours de couverture et point de réapprovisionnement suggéré)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lookback-days',
+            type=int,
+            default=DEFAULT_LOOKBACK_DAYS,
+            help=f'Fenêtre d\'historique de consommation en jours (défaut: {DEFAULT_LOOKBACK_DAYS})'
+        )
+        parser.add_argument(
+            '--horizon-days',
+            type=int,
+            default=DEFAULT_HORIZON_DAYS,
+            help=f'Horizon des rendez-vous à venir en jours (défaut: {DEFAULT_HORIZON_DAYS})'
+        )
+        parser.add_argument(
+            '--lead-time-days',
+            type=float,
+            default=DEFAULT_LEAD_TIME_DAYS,
+            help=f'Délai de livraison fournisseur en jours (défaut: {DEFAULT_LEAD_TIME_DAYS})'
+        )
+        parser.add_argument(
+            '--service-level-z',
+            type=float,
+            default=DEFAULT_SERVICE_LEVEL_Z,
+            help=f'Facteur z du stock de sécurité (défaut: {DEFAULT_SERVICE_LEVEL_Z})'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Nombre d\'articles à afficher, triés par jours de couverture (défaut: 20)'
+        )
+        parser.add_argument(
+            '--apply',
+            action='store_true',
+            help='Remplacer les niveaux de réapprovisionnement par les points suggérés'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('📈 Prévision de la consommation d\'inventaire...\n')
+
+        forecast = compute_inventory_forecast(
+            lookback_days=options['lookback_days'],
+            horizon_days=options['horizon_days'],
+            lead_time_days=options['lead_time_days'],
+            service_level_z=options['service_level_z'],
+        )
+
+        if not forecast:
+            self.stdout.write('ℹ️ Aucun article actif à prévoir')
+            return
+
+        items = InventoryItem.objects.in_bulk(forecast.keys())
+        self.display_forecast(items, forecast, options['limit'])
+
+        if options['apply']:
+            updated = self.apply_reorder_points(items, forecast)
+            self.stdout.write(
+                self.style.SUCCESS(f'\n✅ {updated} niveau(x) de réapprovisionnement mis à jour.')
+            )
+            self.stdout.write('   Lancez check_stock_alerts pour réévaluer les alertes.')
+
+    def display_forecast(self, items, forecast, limit):
+        """Afficher les articles dont la couverture est la plus courte"""
+        def cover_key(item_id):
+            days = forecast[item_id]['days_of_cover']
+            return float('inf') if days is None else days
+
+        ordered = sorted(forecast, key=cover_key)[:limit]
+
+        self.stdout.write('=' * 80)
+        self.stdout.write(f'{"Article":<35} {"Stock":>10} {"Conso/j":>9} {"Couverture":>11} {"Réappro sugg.":>13}')
+        self.stdout.write('=' * 80)
+        for item_id in ordered:
+            item = items[item_id]
+            data = forecast[item_id]
+            cover = '∞' if data['days_of_cover'] is None else f'{data["days_of_cover"]:.1f} j'
+            line = (
+                f'{item.name[:35]:<35} {item.quantity_in_stock:>10.2f} '
+                f'{data["burn_rate"]:>9.3f} {cover:>11} {data["suggested_reorder_point"]:>13.2f}'
+            )
+            if data['days_of_cover'] is not None and data['days_of_cover'] <= 7:
+                line = self.style.WARNING(line)
+            self.stdout.write(line)
+
+    @transaction.atomic
+    def apply_reorder_points(self, items, forecast):
+        """Mettre à jour reorder_level en une seule requête groupée"""
+        to_update = []
+        for item_id, data in forecast.items():
+            item = items[item_id]
+            suggested = Decimal(str(data['suggested_reorder_point'])).quantize(Decimal('0.0001'))
+            if item.reorder_level != suggested:
+                item.reorder_level = suggested
+                to_update.append(item)
+
+        InventoryItem.objects.bulk_update(to_update, ['reorder_level'], batch_size=500)
+        return len(to_update)
+
+
+# Exemple d'utilisation dans une tâche cron
+"""
+# Recalculer chaque lundi les points de réapprovisionnement suggérés:
+# 0 7 * * 1 cd /path/to/your/project && python manage.py forecast_inventory --apply
+"""
@@ -0,0 +1,122 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from garage_app.models import Supplier, StockReceipt
+from garage_app.utils.supplier_import import (
+    import_supplier_csv,
+    IMPORT_MODE_CHOICES,
+    DEFAULT_CHUNK_SIZE,
+)
+
+
+class Command(BaseCommand):
+    help = 'Importer un fichier CSV fournisseur (bordereau de livraison ou liste de prix)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Chemin du fichier CSV')
+        parser.add_argument(
+            '--supplier',
+            required=True,
+            help='ID ou nom exact du fournisseur'
+        )
+        parser.add_argument(
+            '--mode',
+            choices=[value for value, _ in IMPORT_MODE_CHOICES],
+            default='delivery',
+            help='delivery (crée un bon de réception) ou price_list (met à jour les prix fournisseur) (défaut: delivery)'
+        )
+        parser.add_argument(
+            '--update-prices',
+            action='store_true',
+            help='Mettre à jour les prix fournisseur aussi en mode delivery'
+        )
+        parser.add_argument(
+            '--status',
+            choices=[value for value, _ in StockReceipt.STATUS_CHOICES if value != 'processed'],
+            default='draft',
+            help='Statut du bon de réception créé (défaut: draft)'
+        )
+        parser.add_argument(
+            '--date',
+            help='Date du bon de réception (format: YYYY-MM-DD, défaut: aujourd\'hui)'
+        )
+        parser.add_argument(
+            '--invoice-number',
+            help='Numéro de facture fournisseur'
+        )
+        parser.add_argument(
+            '--encoding',
+            default='utf-8-sig',
+            help='Encodage du fichier (défaut: utf-8-sig, ex.: cp1252 pour Excel)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Nombre de lignes validées par bloc (défaut: {DEFAULT_CHUNK_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        supplier = self.get_supplier(options['supplier'])
+
+        receipt_date = None
+        if options['date']:
+            try:
+                receipt_date = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Format de date invalide. Utilisez YYYY-MM-DD')
+
+        self.stdout.write(f'📥 Importation de {options["path"]} ({supplier.name})...\n')
+
+        try:
+            with open(options['path'], encoding=options['encoding'], errors='replace', newline='') as stream:
+                report = import_supplier_csv(
+                    stream,
+                    supplier=supplier,
+                    mode=options['mode'],
+                    update_prices=True if options['update_prices'] else None,
+                    receipt_date=receipt_date,
+                    supplier_invoice_number=options['invoice_number'],
+                    status=options['status'],
+                    chunk_size=options['chunk_size'],
+                )
+        except OSError as e:
+            raise CommandError(f'Impossible de lire le fichier: {e}')
+
+        self.display_report(report)
+
+    def get_supplier(self, value):
+        """Retrouver le fournisseur par ID ou par nom"""
+        suppliers = Supplier.objects.filter(pk=value) if value.isdigit() else Supplier.objects.filter(name=value)
+        supplier = suppliers.first()
+        if supplier is None:
+            raise CommandError(f'Fournisseur introuvable: {value}')
+        return supplier
+
+    def display_report(self, report):
+        """Afficher le rapport d'importation"""
+        self.stdout.write(f'   • Lignes lues: {report["rows"]}')
+        self.stdout.write(f'   • Lignes associées: {report["matched"]}')
+        self.stdout.write(f'   • Coûts mis à jour: {report["prices_updated"]}')
+
+        if report['receipt']:
+            receipt = report['receipt']
+            self.stdout.write(
+                f'   • Bon de réception {receipt.receipt_number}: {report["receipt_lines"]} ligne(s), '
+                f'{receipt.total_amount:.2f}$'
+            )
+
+        if report['unmatched_count']:
+            self.stdout.write(
+                self.style.WARNING(f'\n⚠️  {report["unmatched_count"]} ligne(s) avec SKU inconnu:')
+            )
+            self.stdout.write(f'   {", ".join(report["unmatched_skus"])}')
+
+        if report['invalid_count']:
+            self.stdout.write(
+                self.style.WARNING(f'\n⚠️  {report["invalid_count"]} ligne(s) invalide(s):')
+            )
+            for line_number, reason in report['invalid_rows']:
+                self.stdout.write(f'   • Ligne {line_number}: {reason}')
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Importation terminée'))
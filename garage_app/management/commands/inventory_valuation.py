@@ -0,0 +1,64 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from garage_app.models import InventoryItem
+from garage_app.utils.inventory_valuation import inventory_valuation_as_of, post_stock_movements
+
+
+class Command(BaseCommand):
+    help = 'Afficher la valeur du stock à une date donnée (coût moyen pondéré ou PEPS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            help='Date d\'évaluation (format: YYYY-MM-DD, défaut: aujourd\'hui)'
+        )
+        parser.add_argument(
+            '--category',
+            choices=[value for value, _ in InventoryItem.INVENTORY_CATEGORY_CHOICES],
+            help='Limiter l\'évaluation à une catégorie'
+        )
+        parser.add_argument(
+            '--no-sync',
+            action='store_true',
+            help='Ne pas rapprocher les soldes avec les quantités en stock avant l\'évaluation'
+        )
+        parser.add_argument(
+            '--details',
+            action='store_true',
+            help='Afficher la valeur de chaque article'
+        )
+
+    def handle(self, *args, **options):
+        as_of = date.today()
+        if options['date']:
+            try:
+                as_of = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Format de date invalide. Utilisez YYYY-MM-DD')
+
+        items = InventoryItem.objects.all()
+        if options['category']:
+            items = items.filter(category=options['category'])
+
+        if not options['no_sync'] and as_of >= date.today():
+            post_stock_movements(items=items)
+
+        valuation = inventory_valuation_as_of(as_of, items=items)
+        self.stdout.write(f'📦 Évaluation du stock au {as_of.strftime("%d/%m/%Y")}\n')
+
+        if options['details']:
+            for row in valuation['rows']:
+                self.stdout.write(
+                    f'   • {row["name"][:35]:<35} {row["sku"]:<15} {row["balance_quantity"]:>10.2f} x '
+                    f'{row["unit_cost"]:>8.2f}$ = {row["balance_value"]:>10.2f}$'
+                )
+            self.stdout.write('')
+
+        labels = dict(InventoryItem.INVENTORY_CATEGORY_CHOICES)
+        for category, value in sorted(valuation['by_category'].items()):
+            self.stdout.write(f'   {labels.get(category, category):<25} {value:>12.2f}$')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'\n✅ Valeur totale: {valuation["total_value"]:.2f}$ ({len(valuation["rows"])} article(s))')
+        )
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from garage_app.utils.benchmarks import BENCHMARKS, run_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Exécuter les bancs d\'essai de performance (données synthétiques, transaction annulée)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names',
+            nargs='*',
+            help=f'Bancs d\'essai à exécuter (défaut: tous). Disponibles: {", ".join(sorted(BENCHMARKS))}'
+        )
+        parser.add_argument(
+            '--size',
+            type=int,
+            help='Taille des données synthétiques (défaut: propre à chaque banc d\'essai)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Nombre de répétitions, le meilleur temps est retenu (défaut: 3)'
+        )
+
+    def handle(self, *args, **options):
+        names = options['names'] or sorted(BENCHMARKS)
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            raise CommandError(f'Banc(s) d\'essai inconnu(s): {", ".join(unknown)}')
+
+        for name in names:
+            func, default_size = BENCHMARKS[name]
+            size = options['size'] or default_size
+            self.stdout.write(f'\n⏱️  {name} (taille: {size}) - {func.__doc__ or ""}'.rstrip())
+            self.stdout.write('-' * 80)
+
+            for label, elapsed_ms, queries in run_benchmark(name, size, options['repeat']):
+                self.stdout.write(f'   {label:<55} {elapsed_ms:>9.2f} ms {queries:>5} req.')
+
+        self.stdout.write('\n✅ Bancs d\'essai terminés')
@@ -0,0 +1,119 @@
+"""
+Commande pour initialiser la bibliothèque des surfaces de panneaux par type de véhicule
+"""
+import csv
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from garage_app.models import VehiclePanelArea, VehicleType
+from garage_app.utils.lettering_pricing import invalidate_pricing_snapshot
+
+
+PANELS = ['hood', 'roof', 'left_doors', 'right_doors', 'left_side', 'right_side', 'rear', 'front_bumper', 'rear_bumper']
+
+# Surfaces moyennes (m²) dans l'ordre de PANELS; None = panneau sans objet
+DEFAULT_PANEL_AREAS = {
+    'Berline': ('1.60', '1.80', '2.20', '2.20', '1.20', '1.20', '1.10', '0.60', '0.60'),
+    'Coupé': ('1.60', '1.50', '1.60', '1.60', '1.60', '1.60', '1.00', '0.60', '0.60'),
+    'Hatchback': ('1.40', '1.60', '2.00', '2.00', '1.00', '1.00', '1.20', '0.55', '0.55'),
+    'Familiale': ('1.60', '2.20', '2.30', '2.30', '1.60', '1.60', '1.30', '0.60', '0.60'),
+    'VUS': ('1.90', '2.40', '2.80', '2.80', '1.60', '1.60', '1.60', '0.80', '0.80'),
+    'Pickup': ('2.20', '1.60', '2.90', '2.90', '2.40', '2.40', '1.20', '0.80', '0.80'),
+    'Fourgonnette': ('1.50', '5.50', '1.80', '1.80', '6.50', '6.50', '3.20', '0.80', '0.80'),
+    'Cabriolet': ('1.50', None, '1.60', '1.60', '1.40', '1.40', '1.00', '0.60', '0.60'),
+    'Camion': ('2.50', '2.00', '2.40', '2.40', '14.00', '14.00', '5.00', '1.00', '1.00'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Initialise en lot la bibliothèque des surfaces de panneaux (par type de véhicule ou marque/modèle)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            help='Fichier CSV (colonnes: vehicle_type, make, model, panel, area) à la place des surfaces par défaut'
+        )
+        parser.add_argument(
+            '--overwrite',
+            action='store_true',
+            help='Remplacer les surfaces déjà enregistrées'
+        )
+
+    def handle(self, *args, **options):
+        rows = self.read_file(options['file']) if options['file'] else self.default_rows()
+
+        vehicle_types = {
+            name.lower(): vehicle_type_id
+            for name, vehicle_type_id in VehicleType.objects.values_list('name', 'id')
+        }
+        unknown_types = sorted({row['vehicle_type'] for row in rows if row['vehicle_type'].lower() not in vehicle_types})
+        for name in unknown_types:
+            self.stdout.write(self.style.WARNING(f'⚠️  Type de véhicule introuvable: {name}'))
+
+        panel_areas = [
+            VehiclePanelArea(
+                vehicle_type_id=vehicle_types[row['vehicle_type'].lower()],
+                make=row['make'],
+                model=row['model'],
+                panel=row['panel'],
+                area=row['area'],
+            )
+            for row in rows
+            if row['vehicle_type'].lower() in vehicle_types
+        ]
+
+        with transaction.atomic():
+            existing = VehiclePanelArea.objects.count()
+            if options['overwrite']:
+                VehiclePanelArea.objects.bulk_create(
+                    panel_areas,
+                    update_conflicts=True,
+                    unique_fields=['vehicle_type', 'make', 'model', 'panel'],
+                    update_fields=['area', 'updated_at'],
+                )
+            else:
+                VehiclePanelArea.objects.bulk_create(panel_areas, ignore_conflicts=True)
+            created = VehiclePanelArea.objects.count() - existing
+            # bulk_create ne passe pas par save() : invalider la bibliothèque en mémoire
+            invalidate_pricing_snapshot()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {created} surface(s) créée(s)'
+            + (f', {len(panel_areas) - created} mise(s) à jour' if options['overwrite'] else
+               f', {len(panel_areas) - created} existante(s) conservée(s)')
+        ))
+
+    def default_rows(self):
+        return [
+            {'vehicle_type': name, 'make': '', 'model': '', 'panel': panel, 'area': Decimal(area)}
+            for name, areas in DEFAULT_PANEL_AREAS.items()
+            for panel, area in zip(PANELS, areas)
+            if area is not None
+        ]
+
+    def read_file(self, path):
+        valid_panels = {panel for panel, _ in VehiclePanelArea.PANEL_CHOICES}
+        rows = []
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as csv_file:
+                for line_number, row in enumerate(csv.DictReader(csv_file), start=2):
+                    panel = (row.get('panel') or '').strip()
+                    if panel not in valid_panels:
+                        raise CommandError(f'Ligne {line_number}: panneau inconnu « {panel} »')
+                    try:
+                        area = Decimal((row.get('area') or '').replace(',', '.'))
+                    except InvalidOperation:
+                        raise CommandError(f'Ligne {line_number}: surface invalide')
+                    if area <= 0:
+                        raise CommandError(f'Ligne {line_number}: surface invalide')
+                    rows.append({
+                        'vehicle_type': (row.get('vehicle_type') or '').strip(),
+                        'make': (row.get('make') or '').strip(),
+                        'model': (row.get('model') or '').strip(),
+                        'panel': panel,
+                        'area': area,
+                    })
+        except OSError as e:
+            raise CommandError(f'Impossible de lire le fichier: {e}')
+        return rows
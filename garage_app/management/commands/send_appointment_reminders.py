@@ -0,0 +1,52 @@
+"""
+Commande pour préparer (et envoyer) les rappels de rendez-vous
+"""
+from django.core.management.base import BaseCommand
+from garage_app.utils.reminders import dispatch_reminders, reminder_window, send_pending_emails
+
+
+class Command(BaseCommand):
+    help = 'Dépose dans la boîte d\'envoi les rappels des rendez-vous à venir (par défaut : ceux du lendemain)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days-ahead',
+            type=int,
+            default=1,
+            help='Jours entre aujourd\'hui et le début de la fenêtre (défaut: 1 = demain)'
+        )
+        parser.add_argument(
+            '--window-hours',
+            type=int,
+            default=24,
+            help='Durée de la fenêtre en heures (défaut: 24)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Compter les rappels sans rien enregistrer'
+        )
+        parser.add_argument(
+            '--send',
+            action='store_true',
+            help='Envoyer ensuite les courriels en attente de la boîte d\'envoi'
+        )
+
+    def handle(self, *args, **options):
+        window_start, window_end = reminder_window(options['days_ahead'], options['window_hours'])
+        self.stdout.write(f'🔔 Rappels pour les rendez-vous du {window_start:%Y-%m-%d %H:%M} au {window_end:%Y-%m-%d %H:%M}')
+
+        summary = dispatch_reminders(window_start, window_end, dry_run=options['dry_run'])
+        prefix = '🔍 Simulation: ' if options['dry_run'] else '✅ '
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{summary['selected']} rendez-vous, {summary['email']} courriel(s), "
+            f"{summary['phone']} appel(s) à faire"
+        ))
+        if summary['skipped']:
+            self.stdout.write(self.style.WARNING(f"⚠️  {summary['skipped']} client(s) sans courriel ni téléphone"))
+
+        if options['send'] and not options['dry_run']:
+            result = send_pending_emails()
+            self.stdout.write(self.style.SUCCESS(f"📧 {result['sent']} courriel(s) envoyé(s)"))
+            if result['failed']:
+                self.stdout.write(self.style.ERROR(f"❌ {result['failed']} échec(s) d'envoi"))
@@ -0,0 +1,97 @@
+from django.core.management.base import BaseCommand
+from garage_app.utils.purchase_suggestions import (
+    build_purchase_suggestions,
+    create_draft_purchase_orders,
+    ORDER_METHOD_CHOICES,
+    DEFAULT_REVIEW_DAYS,
+    DEFAULT_ORDERING_COST,
+    DEFAULT_HOLDING_RATE,
+)
+
+
+class Command(BaseCommand):
+    help = 'Suggérer des commandes fournisseurs pour les articles sous leur point de réapprovisionnement'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--method',
+            choices=[value for value, _ in ORDER_METHOD_CHOICES],
+            default='fill',
+            help='Calcul des quantités: fill (niveau cible) ou eoq (quantité économique) (défaut: fill)'
+        )
+        parser.add_argument(
+            '--review-days',
+            type=int,
+            default=DEFAULT_REVIEW_DAYS,
+            help=f'Jours de consommation à couvrir au-delà du point de réappro (défaut: {DEFAULT_REVIEW_DAYS})'
+        )
+        parser.add_argument(
+            '--ordering-cost',
+            type=float,
+            default=DEFAULT_ORDERING_COST,
+            help=f'Coût fixe d\'une commande pour l\'EOQ (défaut: {DEFAULT_ORDERING_COST})'
+        )
+        parser.add_argument(
+            '--holding-rate',
+            type=float,
+            default=DEFAULT_HOLDING_RATE,
+            help=f'Taux annuel de possession du stock pour l\'EOQ (défaut: {DEFAULT_HOLDING_RATE})'
+        )
+        parser.add_argument(
+            '--no-forecast',
+            action='store_true',
+            help='Utiliser uniquement les niveaux de réapprovisionnement saisis'
+        )
+        parser.add_argument(
+            '--create',
+            action='store_true',
+            help='Créer les bons de commande brouillons (sinon simple aperçu)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('🛒 Calcul des suggestions de commande...\n')
+
+        suggestions = build_purchase_suggestions(
+            method=options['method'],
+            use_forecast=not options['no_forecast'],
+            review_days=options['review_days'],
+            ordering_cost=options['ordering_cost'],
+            holding_rate=options['holding_rate'],
+        )
+
+        if not suggestions['orders'] and not suggestions['unassigned']:
+            self.stdout.write('ℹ️ Aucun article sous son point de réapprovisionnement')
+            return
+
+        self.display_suggestions(suggestions)
+
+        if options['create']:
+            receipts = create_draft_purchase_orders(suggestions)
+            self.stdout.write(
+                self.style.SUCCESS(f'\n✅ {len(receipts)} bon(s) de commande brouillon(s) créé(s): '
+                                   f'{", ".join(receipt.receipt_number for receipt in receipts)}')
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS('\n✅ Aperçu terminé. Ajoutez --create pour créer les bons brouillons.')
+            )
+
+    def display_suggestions(self, suggestions):
+        """Afficher les suggestions groupées par fournisseur"""
+        for order in suggestions['orders']:
+            self.stdout.write('\n' + '=' * 70)
+            self.stdout.write(f'🏢 {order["supplier"].name} - {len(order["lines"])} ligne(s) - {order["subtotal"]:.2f}$')
+            self.stdout.write('=' * 70)
+            for line in order['lines']:
+                self.stdout.write(
+                    f'   • {line["item"].name} ({line["item"].sku}): {line["quantity"]} x '
+                    f'{line["unit_cost"]:.2f}$ = {line["total"]:.2f}$ '
+                    f'(position: {line["position"]:.2f}, point de réappro: {line["reorder_point"]:.2f})'
+                )
+
+        if suggestions['unassigned']:
+            self.stdout.write(
+                self.style.WARNING(f'\n⚠️  {len(suggestions["unassigned"])} article(s) sans fournisseur:')
+            )
+            for line in suggestions['unassigned']:
+                self.stdout.write(f'   • {line["item"].name} ({line["item"].sku}): {line["quantity"]} à commander')
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garage_app', '0026_remove_quote_work_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='costing_method',
+            field=models.CharField(choices=[('average', 'Coût moyen pondéré'), ('fifo', 'Premier entré, premier sorti (PEPS)')], default='average', help_text='Coût moyen pondéré ou PEPS (FIFO) pour le coût des sorties et la valeur du stock', max_length=10, verbose_name="Méthode d'évaluation"),
+        ),
+        migrations.CreateModel(
+            name='CostLayer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('received_date', models.DateField(verbose_name="Date d'entrée")),
+                ('unit_cost', models.DecimalField(decimal_places=4, max_digits=12, verbose_name='Coût unitaire')),
+                ('quantity_received', models.DecimalField(decimal_places=4, max_digits=12, verbose_name='Quantité reçue')),
+                ('quantity_remaining', models.DecimalField(decimal_places=4, max_digits=12, verbose_name='Quantité restante')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('inventory_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_layers', to='garage_app.inventoryitem', verbose_name='Article')),
+                ('stock_receipt_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cost_layers', to='garage_app.stockreceiptitem', verbose_name='Ligne de réception')),
+            ],
+            options={
+                'verbose_name': 'Couche de coût',
+                'verbose_name_plural': 'Couches de coût',
+                'ordering': ['inventory_item', 'received_date', 'id'],
+                'indexes': [models.Index(fields=['inventory_item', 'quantity_remaining'], name='costlayer_item_remaining_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movement_type', models.CharField(choices=[('opening', "Solde d'ouverture"), ('receipt', 'Réception'), ('sale', 'Vente'), ('consumption', 'Consommation de service'), ('adjustment', 'Ajustement')], max_length=20, verbose_name='Type de mouvement')),
+                ('movement_date', models.DateField(verbose_name='Date du mouvement')),
+                ('quantity', models.DecimalField(decimal_places=4, max_digits=12, verbose_name='Quantité')),
+                ('unit_cost', models.DecimalField(decimal_places=4, max_digits=12, verbose_name='Coût unitaire')),
+                ('total_cost', models.DecimalField(decimal_places=4, max_digits=14, verbose_name='Coût total')),
+                ('balance_quantity', models.DecimalField(decimal_places=4, max_digits=12, verbose_name='Quantité en solde')),
+                ('balance_value', models.DecimalField(decimal_places=4, max_digits=14, verbose_name='Valeur en solde')),
+                ('reference', models.CharField(blank=True, default='', max_length=100, verbose_name='Référence')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('inventory_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='garage_app.inventoryitem', verbose_name='Article')),
+                ('invoice_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='garage_app.invoiceitem', verbose_name='Ligne de facture')),
+                ('stock_receipt_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='garage_app.stockreceiptitem', verbose_name='Ligne de réception')),
+            ],
+            options={
+                'verbose_name': 'Mouvement de stock',
+                'verbose_name_plural': 'Mouvements de stock',
+                'ordering': ['inventory_item', 'movement_date', 'id'],
+                'indexes': [models.Index(fields=['inventory_item', 'movement_date', 'id'], name='movement_item_date_idx')],
+            },
+        ),
+    ]
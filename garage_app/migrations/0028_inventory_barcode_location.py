@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garage_app', '0027_inventory_cost_layers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='barcode',
+            field=models.CharField(blank=True, help_text='Code-barres du fabricant (UPC/EAN) lu par le lecteur au comptoir', max_length=64, null=True, unique=True, verbose_name='Code-barres'),
+        ),
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='location',
+            field=models.CharField(blank=True, default='', help_text="Emplacement dans l'entrepôt (ex: Étagère B3)", max_length=100, verbose_name='Emplacement'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:06
+
+import datetime
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garage_app', '0028_inventory_barcode_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reference', models.CharField(max_length=50, unique=True, verbose_name="Numéro d'inventaire")),
+                ('count_date', models.DateField(default=datetime.date.today, verbose_name='Date du compte')),
+                ('status', models.CharField(choices=[('open', 'En cours'), ('posted', 'Ajustements comptabilisés'), ('cancelled', 'Annulé')], default='open', max_length=20, verbose_name='Statut')),
+                ('notes', models.TextField(blank=True, null=True, verbose_name='Notes')),
+                ('posted_at', models.DateTimeField(blank=True, null=True, verbose_name='Comptabilisé le')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Inventaire physique',
+                'verbose_name_plural': 'Inventaires physiques',
+                'ordering': ['-count_date', '-created_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='movement_type',
+            field=models.CharField(choices=[('opening', "Solde d'ouverture"), ('receipt', 'Réception'), ('sale', 'Vente'), ('consumption', 'Consommation de service'), ('adjustment', 'Ajustement'), ('count', 'Inventaire physique')], max_length=20, verbose_name='Type de mouvement'),
+        ),
+        migrations.CreateModel(
+            name='StockCountLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counted_quantity', models.DecimalField(decimal_places=4, max_digits=12, validators=[django.core.validators.MinValueValidator(Decimal('0.0000'))], verbose_name='Quantité comptée')),
+                ('expected_quantity', models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True, verbose_name='Quantité théorique')),
+                ('variance', models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True, verbose_name='Écart')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('inventory_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='count_lines', to='garage_app.inventoryitem', verbose_name='Article')),
+                ('stock_count', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='count_lines', to='garage_app.stockcount', verbose_name='Inventaire physique')),
+            ],
+            options={
+                'verbose_name': "Ligne d'inventaire physique",
+                'verbose_name_plural': "Lignes d'inventaire physique",
+                'unique_together': {('stock_count', 'inventory_item')},
+            },
+        ),
+    ]
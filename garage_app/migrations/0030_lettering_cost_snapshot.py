@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garage_app', '0029_stock_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='letteringquote',
+            name='cost_breakdown',
+            field=models.JSONField(blank=True, default=dict, help_text='Instantané du calcul (montants intermédiaires et tarifs utilisés)', verbose_name='Détail des coûts'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garage_app', '0030_lettering_cost_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='material',
+            name='roll_width',
+            field=models.DecimalField(blank=True, decimal_places=3, help_text="Largeur utile du rouleau pour l'imbrication des pièces (ex: 1.370 pour 54 po)", max_digits=5, null=True, verbose_name='Largeur du rouleau (m)'),
+        ),
+    ]
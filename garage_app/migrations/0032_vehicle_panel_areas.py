@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:17
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garage_app', '0031_material_roll_width'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehiclePanelArea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('make', models.CharField(blank=True, max_length=50, verbose_name='Marque')),
+                ('model', models.CharField(blank=True, max_length=50, verbose_name='Modèle')),
+                ('panel', models.CharField(choices=[('hood', 'Capot'), ('roof', 'Toit'), ('left_doors', 'Portières côté conducteur'), ('right_doors', 'Portières côté passager'), ('left_side', 'Côté conducteur (hors portières)'), ('right_side', 'Côté passager (hors portières)'), ('rear', 'Arrière / hayon'), ('front_bumper', 'Pare-chocs avant'), ('rear_bumper', 'Pare-chocs arrière')], max_length=20, verbose_name='Panneau')),
+                ('area', models.DecimalField(decimal_places=2, max_digits=6, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))], verbose_name='Surface (m²)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('vehicle_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='panel_areas', to='garage_app.vehicletype', verbose_name='Type de véhicule')),
+            ],
+            options={
+                'verbose_name': 'Surface de panneau',
+                'verbose_name_plural': 'Surfaces de panneaux',
+                'ordering': ['vehicle_type__name', 'make', 'model', 'panel'],
+                'unique_together': {('vehicle_type', 'make', 'model', 'panel')},
+            },
+        ),
+    ]
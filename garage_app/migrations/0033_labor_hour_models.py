@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garage_app', '0032_vehicle_panel_areas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LaborHourModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(choices=[('design', 'Conception'), ('installation', 'Installation')], max_length=20, unique=True, verbose_name='Tâche')),
+                ('feature_names', models.JSONField(default=list, verbose_name='Variables')),
+                ('coefficients', models.JSONField(default=list, verbose_name='Coefficients')),
+                ('covariance', models.JSONField(default=list, help_text='Utilisée pour la bande de confiance des heures suggérées', verbose_name='Covariance des coefficients')),
+                ('residual_std', models.FloatField(default=0, verbose_name='Écart-type résiduel (h)')),
+                ('r_squared', models.FloatField(default=0, verbose_name='R²')),
+                ('sample_count', models.PositiveIntegerField(default=0, verbose_name='Nombre de travaux')),
+                ('fitted_at', models.DateTimeField(auto_now=True, verbose_name='Ajusté le')),
+            ],
+            options={
+                'verbose_name': "Modèle d'heures de lettrage",
+                'verbose_name_plural': "Modèles d'heures de lettrage",
+                'ordering': ['task'],
+            },
+        ),
+    ]
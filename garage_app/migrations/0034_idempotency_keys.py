@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garage_app', '0033_labor_hour_models'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=50, verbose_name="Point d'accès")),
+                ('key', models.CharField(max_length=100, verbose_name='Clé')),
+                ('request_hash', models.CharField(max_length=64, verbose_name='Empreinte de la requête')),
+                ('status_code', models.PositiveSmallIntegerField(default=200, verbose_name='Code de réponse')),
+                ('response', models.JSONField(blank=True, default=dict, verbose_name='Réponse')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': "Clé d'idempotence",
+                'verbose_name_plural': "Clés d'idempotence",
+                'ordering': ['-created_at'],
+                'unique_together': {('scope', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garage_app', '0034_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(fields=['status', 'valid_until'], name='quote_status_valid_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garage_app', '0035_quote_status_valid_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['start_datetime', 'end_datetime'], name='appointment_start_end_idx'),
+        ),
+    ]
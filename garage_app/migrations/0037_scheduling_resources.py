@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garage_app', '0036_appointment_start_end_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Resource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nom')),
+                ('resource_type', models.CharField(choices=[('bay', 'Baie'), ('technician', 'Technicien')], max_length=20, verbose_name='Type de ressource')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(blank=True, help_text="Compte de l'installateur (techniciens seulement)", null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scheduling_resources', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Ressource',
+                'verbose_name_plural': 'Ressources',
+                'ordering': ['resource_type', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='resources',
+            field=models.ManyToManyField(blank=True, related_name='appointments', to='garage_app.resource', verbose_name='Ressources'),
+        ),
+    ]
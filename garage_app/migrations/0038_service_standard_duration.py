@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garage_app', '0037_scheduling_resources'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='standard_duration',
+            field=models.PositiveIntegerField(blank=True, help_text='Durée habituelle du service, utilisée pour chercher des plages libres', null=True, verbose_name='Durée standard (minutes)'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garage_app', '0038_service_standard_duration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('day_before', 'Veille du rendez-vous')], default='day_before', max_length=20, verbose_name='Type de rappel')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Rappel de rendez-vous',
+                'verbose_name_plural': 'Rappels de rendez-vous',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('email', 'Courriel'), ('phone', 'Appel téléphonique')], max_length=10, verbose_name='Canal')),
+                ('recipient', models.CharField(max_length=254, verbose_name='Destinataire')),
+                ('subject', models.CharField(blank=True, max_length=200, verbose_name='Objet')),
+                ('body', models.TextField(verbose_name='Message')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('sent', 'Envoyé'), ('failed', 'Échec')], default='pending', max_length=10, verbose_name='Statut')),
+                ('error', models.TextField(blank=True, verbose_name='Erreur')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Envoyé le')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Message sortant',
+                'verbose_name_plural': 'Messages sortants',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'start_datetime'], name='appointment_status_start_idx'),
+        ),
+        migrations.AddField(
+            model_name='appointmentreminder',
+            name='appointment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='garage_app.appointment', verbose_name='Rendez-vous'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(fields=['status', 'channel', 'created_at'], name='outbox_status_channel_idx'),
+        ),
+        migrations.AddField(
+            model_name='appointmentreminder',
+            name='message',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reminder', to='garage_app.outboxmessage', verbose_name='Message'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='appointmentreminder',
+            unique_together={('appointment', 'kind')},
+        ),
+    ]
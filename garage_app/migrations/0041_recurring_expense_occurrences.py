@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garage_app', '0040_calendar_feed_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='recurring_expense',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='generated_expenses', to='garage_app.recurringexpense', verbose_name="Dépense récurrente d'origine"),
+        ),
+        migrations.AlterUniqueTogether(
+            name='expense',
+            unique_together={('recurring_expense', 'expense_date')},
+        ),
+    ]
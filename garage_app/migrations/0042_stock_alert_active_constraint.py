@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-19 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garage_app', '0041_recurring_expense_occurrences'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='stockalert',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='stockalert',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'active')), fields=('inventory_item', 'alert_type'), name='stockalert_one_active_per_type'),
+        ),
+    ]
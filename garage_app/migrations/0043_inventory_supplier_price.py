@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:02
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garage_app', '0042_stock_alert_active_constraint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='supplier_price',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Dernier prix de la liste de prix du fournisseur (le coût unitaire reste le coût moyen du stock)', max_digits=10, null=True, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))], verbose_name='Prix fournisseur'),
+        ),
+    ]
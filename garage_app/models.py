@@ -172,6 +172,19 @@ class VehicleType(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        from .utils.lettering_pricing import invalidate_pricing_snapshot
+
+        super().save(*args, **kwargs)
+        invalidate_pricing_snapshot()
+
+    def delete(self, *args, **kwargs):
+        from .utils.lettering_pricing import invalidate_pricing_snapshot
+
+        result = super().delete(*args, **kwargs)
+        invalidate_pricing_snapshot()
+        return result
+
 
 class Vehicle(models.Model):
     """Modèle pour les véhicules des clients"""
@@ -215,6 +228,65 @@ class Vehicle(models.Model):
         return f"{self.year} {self.make} {self.model} - {self.client.full_name}"
 
 
+class VehiclePanelArea(models.Model):
+    """Surface d'un panneau de carrosserie par type de véhicule (ou marque/modèle)"""
+
+    PANEL_CHOICES = [
+        ('hood', 'Capot'),
+        ('roof', 'Toit'),
+        ('left_doors', 'Portières côté conducteur'),
+        ('right_doors', 'Portières côté passager'),
+        ('left_side', 'Côté conducteur (hors portières)'),
+        ('right_side', 'Côté passager (hors portières)'),
+        ('rear', 'Arrière / hayon'),
+        ('front_bumper', 'Pare-chocs avant'),
+        ('rear_bumper', 'Pare-chocs arrière'),
+    ]
+
+    vehicle_type = models.ForeignKey(
+        VehicleType,
+        on_delete=models.CASCADE,
+        related_name='panel_areas',
+        verbose_name="Type de véhicule"
+    )
+    # Marque et modèle facultatifs : une surface propre à un modèle remplace celle du type
+    make = models.CharField(max_length=50, blank=True, verbose_name="Marque")
+    model = models.CharField(max_length=50, blank=True, verbose_name="Modèle")
+    panel = models.CharField(max_length=20, choices=PANEL_CHOICES, verbose_name="Panneau")
+    area = models.DecimalField(
+        max_digits=6,
+        decimal_places=2,
+        validators=[MinValueValidator(Decimal('0.01'))],
+        verbose_name="Surface (m²)"
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Surface de panneau"
+        verbose_name_plural = "Surfaces de panneaux"
+        ordering = ['vehicle_type__name', 'make', 'model', 'panel']
+        unique_together = ['vehicle_type', 'make', 'model', 'panel']
+
+    def __str__(self):
+        target = f"{self.make} {self.model}".strip() or self.vehicle_type.name
+        return f"{target} - {self.get_panel_display()} ({self.area} m²)"
+
+    def save(self, *args, **kwargs):
+        from .utils.lettering_pricing import invalidate_pricing_snapshot
+
+        super().save(*args, **kwargs)
+        invalidate_pricing_snapshot()
+
+    def delete(self, *args, **kwargs):
+        from .utils.lettering_pricing import invalidate_pricing_snapshot
+
+        result = super().delete(*args, **kwargs)
+        invalidate_pricing_snapshot()
+        return result
+
+
 class Supplier(models.Model):
     """Modèle pour les fournisseurs"""
     name = models.CharField(max_length=200, verbose_name="Nom du fournisseur")
@@ -291,6 +363,13 @@ class Service(models.Model):
     ]
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default='other', verbose_name="Catégorie")
 
+    standard_duration = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        verbose_name="Durée standard (minutes)",
+        help_text="Durée habituelle du service, utilisée pour chercher des plages libres"
+    )
+
     is_active = models.BooleanField(default=True, verbose_name="Service actif")
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -372,6 +451,21 @@ class InventoryItem(models.Model):
     name = models.CharField(max_length=200, verbose_name="Nom de l'article")
     description = models.TextField(blank=True, null=True, verbose_name="Description")
     sku = models.CharField(max_length=50, unique=True, verbose_name="Code SKU")
+    barcode = models.CharField(
+        max_length=64,
+        unique=True,
+        blank=True,
+        null=True,
+        verbose_name="Code-barres",
+        help_text="Code-barres du fabricant (UPC/EAN) lu par le lecteur au comptoir"
+    )
+    location = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        verbose_name="Emplacement",
+        help_text="Emplacement dans l'entrepôt (ex: Étagère B3)"
+    )
 
     # Relation avec le fournisseur
     supplier = models.ForeignKey(
@@ -411,6 +505,15 @@ class InventoryItem(models.Model):
         validators=[MinValueValidator(Decimal('0.00'))],
         verbose_name="Coût unitaire"
     )
+    supplier_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(Decimal('0.01'))],
+        verbose_name="Prix fournisseur",
+        help_text="Dernier prix de la liste de prix du fournisseur (le coût unitaire reste le coût moyen du stock)"
+    )
     unit_price = models.DecimalField(
         max_digits=10,
         decimal_places=2,
@@ -444,6 +547,19 @@ class InventoryItem(models.Model):
         help_text="Niveau de qualité du matériau pour la tarification dynamique"
     )
 
+    # Méthode d'évaluation du coût des sorties de stock
+    COSTING_METHOD_CHOICES = [
+        ('average', 'Coût moyen pondéré'),
+        ('fifo', 'Premier entré, premier sorti (PEPS)'),
+    ]
+    costing_method = models.CharField(
+        max_length=10,
+        choices=COSTING_METHOD_CHOICES,
+        default='average',
+        verbose_name="Méthode d'évaluation",
+        help_text="Coût moyen pondéré ou PEPS (FIFO) pour le coût des sorties et la valeur du stock"
+    )
+
     is_active = models.BooleanField(default=True, verbose_name="Article actif")
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -559,12 +675,26 @@ class InventoryItem(models.Model):
 
     def save(self, *args, **kwargs):
         """Override save pour vérifier automatiquement les alertes de stock"""
+        from .utils.sku_index import invalidate_sku_index
+        from .utils.stock_monitoring import evaluate_stock_alerts
+
+        # Un code-barres vide est enregistré NULL pour respecter l'unicité
+        if not self.barcode:
+            self.barcode = None
+
         # Sauvegarder d'abord l'objet
         super().save(*args, **kwargs)
 
-        # Puis vérifier les alertes de stock
-        self.resolve_alerts_if_stock_sufficient()
-        self.check_stock_alerts()
+        # Puis résoudre et créer les alertes de stock (même logique que l'évaluation en lot)
+        evaluate_stock_alerts([self])
+        invalidate_sku_index()
+
+    def delete(self, *args, **kwargs):
+        from .utils.sku_index import invalidate_sku_index
+
+        result = super().delete(*args, **kwargs)
+        invalidate_sku_index()
+        return result
 
 
 class StockAlert(models.Model):
@@ -624,7 +754,14 @@ class StockAlert(models.Model):
         verbose_name = "Alerte de stock"
         verbose_name_plural = "Alertes de stock"
         ordering = ['-alert_date']
-        unique_together = ['inventory_item', 'alert_type', 'status']
+        constraints = [
+            # Une seule alerte active par type et par article; l'historique des alertes résolues est conservé
+            models.UniqueConstraint(
+                fields=['inventory_item', 'alert_type'],
+                condition=models.Q(status='active'),
+                name='stockalert_one_active_per_type',
+            ),
+        ]
 
     def __str__(self):
         return f"Alerte {self.get_alert_type_display()} - {self.inventory_item.name} ({self.get_status_display()})"
@@ -772,21 +909,11 @@ class Invoice(models.Model):
         return f"Facture {self.invoice_number} - {self.client.full_name}"
 
     def save(self, *args, **kwargs):
+        from .utils.cashflow import invalidate_cashflow
+
         # Générer le numéro de facture automatiquement
         if not self.invoice_number:
-            from datetime import datetime
-            year = datetime.now().year
-            last_invoice = Invoice.objects.filter(
-                invoice_number__startswith=f"INV-{year}"
-            ).order_by('-invoice_number').first()
-
-            if last_invoice:
-                last_number = int(last_invoice.invoice_number.split('-')[-1])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-
-            self.invoice_number = f"INV-{year}-{new_number:04d}"
+            self.invoice_number = Invoice.allocate_invoice_numbers(1)[0]
 
         # Appliquer le rabais par défaut du client lors de la création
         if not self.pk and self.client:  # Nouvelle facture
@@ -807,11 +934,34 @@ class Invoice(models.Model):
                 pass
 
         super().save(*args, **kwargs)
+        invalidate_cashflow()
 
         # Déclencher la consommation d'inventaire si la facture est finalisée
         if (is_new and self.status == 'finalized') or (old_status != 'finalized' and self.status == 'finalized'):
             self._consume_inventory_for_services()
 
+    def delete(self, *args, **kwargs):
+        from .utils.cashflow import invalidate_cashflow
+
+        result = super().delete(*args, **kwargs)
+        invalidate_cashflow()
+        return result
+
+    @classmethod
+    def allocate_invoice_numbers(cls, count):
+        """Réserver un bloc de numéros de facture consécutifs (une seule requête)"""
+        from datetime import datetime
+        year = datetime.now().year
+        last_invoice = cls.objects.filter(
+            invoice_number__startswith=f"INV-{year}"
+        ).order_by('-invoice_number').first()
+
+        new_number = 1
+        if last_invoice:
+            new_number = int(last_invoice.invoice_number.split('-')[-1]) + 1
+
+        return [f"INV-{year}-{number:04d}" for number in range(new_number, new_number + count)]
+
     def _consume_inventory_for_services(self):
         """Consomme automatiquement l'inventaire pour les services de cette facture"""
         from .services import InventoryConsumptionService
@@ -825,7 +975,12 @@ class Invoice(models.Model):
 
     def calculate_totals(self):
         """Calculer les totaux de la facture"""
-        self.subtotal = sum(item.total_price for item in self.invoice_items.all())
+        self.apply_totals(sum(item.total_price for item in self.invoice_items.all()))
+        self.save()
+
+    def apply_totals(self, subtotal):
+        """Calculer rabais, taxes et total à partir du sous-total (sans enregistrer)"""
+        self.subtotal = subtotal
 
         # Calculer le rabais selon la logique simplifiée
         if self.is_dealer_discount:
@@ -849,7 +1004,6 @@ class Invoice(models.Model):
         self.qst_amount = subtotal_after_discount * Decimal('0.09975')  # TVQ 9.975%
 
         self.total_amount = subtotal_after_discount + self.gst_amount + self.qst_amount
-        self.save()
 
     @property
     def subtotal_after_discount(self):
@@ -970,11 +1124,18 @@ class InvoiceItem(models.Model):
         super().save(*args, **kwargs)
 
         # Décrémenter le stock si c'est un article d'inventaire et que la facture est finalisée
-        # Note: Plus de quantité, donc on décrémente de 1
+        # Note: Plus de quantité, donc on décrémente de 1 (sortie valorisée selon la méthode de l'article)
         if (self.item_type == 'inventory' and self.inventory_item and
             self.invoice.status in ['sent', 'paid']):
-            self.inventory_item.quantity_in_stock -= 1
-            self.inventory_item.save()
+            from .utils.inventory_valuation import post_stock_movements, stock_entry
+
+            updated = post_stock_movements([stock_entry(
+                self.inventory_item_id, 'sale', -1,
+                movement_date=self.invoice.invoice_date,
+                invoice_item_id=self.pk,
+                reference=self.invoice.invoice_number,
+            )])
+            self.inventory_item = updated[self.inventory_item_id]
 
         # Recalculer les totaux de la facture
         self.invoice.calculate_totals()
@@ -1059,6 +1220,16 @@ class Expense(models.Model):
         help_text="Si défini, cette dépense fait partie d'une année fiscale archivée"
     )
 
+    # Dépense récurrente qui a généré cette occurrence (le cas échéant)
+    recurring_expense = models.ForeignKey(
+        'RecurringExpense',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='generated_expenses',
+        verbose_name="Dépense récurrente d'origine"
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -1066,6 +1237,8 @@ class Expense(models.Model):
         verbose_name = "Dépense"
         verbose_name_plural = "Dépenses"
         ordering = ['-expense_date', '-created_at']
+        # Une seule occurrence par dépense récurrente et par échéance
+        unique_together = [('recurring_expense', 'expense_date')]
 
     def __str__(self):
         return f"{self.description} - {self.amount}$ ({self.expense_date})"
@@ -1118,7 +1291,10 @@ class Payment(models.Model):
         return f"Paiement {self.amount}$ - {self.invoice.invoice_number} ({self.payment_date})"
 
     def save(self, *args, **kwargs):
+        from .utils.cashflow import invalidate_cashflow
+
         super().save(*args, **kwargs)
+        invalidate_cashflow()
 
         # Vérifier si la facture est entièrement payée
         total_payments = sum(payment.amount for payment in self.invoice.payments.all())
@@ -1126,6 +1302,13 @@ class Payment(models.Model):
             self.invoice.status = 'paid'
             self.invoice.save()
 
+    def delete(self, *args, **kwargs):
+        from .utils.cashflow import invalidate_cashflow
+
+        result = super().delete(*args, **kwargs)
+        invalidate_cashflow()
+        return result
+
 
 class FiscalYearArchive(models.Model):
     """Modèle pour gérer les archives des années fiscales"""
@@ -1302,39 +1485,120 @@ class RecurringExpense(models.Model):
     def __str__(self):
         return f"{self.name} - {self.get_frequency_display()}"
 
-    def calculate_next_due_date(self):
-        """Calculer la prochaine date d'échéance"""
+    def save(self, *args, **kwargs):
+        from .utils.cashflow import invalidate_cashflow
+
+        super().save(*args, **kwargs)
+        invalidate_cashflow()
+
+    def delete(self, *args, **kwargs):
+        from .utils.cashflow import invalidate_cashflow
+
+        result = super().delete(*args, **kwargs)
+        invalidate_cashflow()
+        return result
+
+    def calculate_next_due_date(self, from_date=None):
+        """Calculer l'échéance qui suit ``from_date`` (par défaut : la prochaine échéance)"""
+        current = from_date or self.next_due_date
         if self.frequency == 'daily':
-            return self.next_due_date + timedelta(days=1)
+            return current + timedelta(days=1)
         elif self.frequency == 'weekly':
-            return self.next_due_date + timedelta(weeks=1)
+            return current + timedelta(weeks=1)
         elif self.frequency == 'monthly':
-            return self.next_due_date + relativedelta(months=1)
+            return current + relativedelta(months=1)
         elif self.frequency == 'quarterly':
-            return self.next_due_date + relativedelta(months=3)
+            return current + relativedelta(months=3)
         elif self.frequency == 'yearly':
-            return self.next_due_date + relativedelta(years=1)
-        return self.next_due_date
-
-    def create_expense(self):
-        """Créer une dépense basée sur cette dépense récurrente"""
-        expense = Expense.objects.create(
+            return current + relativedelta(years=1)
+        return current
+
+    def due_dates(self, target_date):
+        """Échéances non encore créées jusqu'à ``target_date`` inclus, sans dépasser la date de fin"""
+        last_date = min(target_date, self.end_date) if self.end_date else target_date
+        dates = []
+        current = self.next_due_date
+        while current <= last_date:
+            dates.append(current)
+            following = self.calculate_next_due_date(current)
+            if following <= current:
+                break
+            current = following
+        return dates
+
+    def build_expense(self, expense_date):
+        """Occurrence non enregistrée de cette dépense récurrente"""
+        return Expense(
             description=self.description,
             amount=self.amount,
-            expense_date=self.next_due_date,
-            supplier=self.supplier,
+            expense_date=expense_date,
+            supplier_id=self.supplier_id,
             category=self.category,
             gst_amount=self.gst_amount,
             qst_amount=self.qst_amount,
-            notes=f"Dépense récurrente: {self.name}"
+            notes=f"Dépense récurrente: {self.name}",
+            recurring_expense=self,
         )
 
+    def create_expense(self):
+        """Créer une dépense basée sur cette dépense récurrente"""
+        expense = self.build_expense(self.next_due_date)
+        expense.save()
+
         # Mettre à jour la prochaine échéance
         self.next_due_date = self.calculate_next_due_date()
         self.save()
 
         return expense
 
+    @classmethod
+    def materialize_due(cls, target_date=None, queryset=None):
+        """
+        Créer toutes les occurrences manquées jusqu'à ``target_date`` inclus
+
+        Les échéances de chaque dépense récurrente active sont calculées en
+        mémoire (en respectant ``end_date``), les dépenses sont écrites avec
+        un seul ``bulk_create`` et les prochaines échéances avancées avec un
+        seul ``bulk_update``, dans une transaction. Les dépenses récurrentes
+        sont verrouillées : une seconde exécution, même concurrente, ne
+        trouve plus rien à créer.
+
+        Returns:
+            list: Les dépenses créées, par dépense récurrente puis par date
+        """
+        from django.db import transaction
+        from django.utils import timezone
+        from .utils.cashflow import invalidate_cashflow
+
+        target_date = target_date or date.today()
+        queryset = cls.objects.all() if queryset is None else queryset
+
+        with transaction.atomic():
+            recurring_expenses = list(
+                queryset.select_for_update()
+                .filter(is_active=True, next_due_date__lte=target_date)
+                .order_by('pk')
+            )
+            expenses = []
+            advanced = []
+            for recurring_expense in recurring_expenses:
+                dates = recurring_expense.due_dates(target_date)
+                if not dates:
+                    continue
+                expenses.extend(recurring_expense.build_expense(expense_date) for expense_date in dates)
+                recurring_expense.next_due_date = recurring_expense.calculate_next_due_date(dates[-1])
+                advanced.append(recurring_expense)
+
+            if expenses:
+                Expense.objects.bulk_create(expenses)
+                now = timezone.now()
+                for recurring_expense in advanced:
+                    recurring_expense.updated_at = now
+                cls.objects.bulk_update(advanced, ['next_due_date', 'updated_at'])
+                invalidate_cashflow()
+
+        return expenses
+
     def is_due(self):
         """Vérifier si la dépense est due"""
         return date.today() >= self.next_due_date and self.is_active
@@ -1439,29 +1703,35 @@ class StockReceipt(models.Model):
     def save(self, *args, **kwargs):
         # Générer un numéro de bon de réception si pas défini
         if not self.receipt_number:
-            from datetime import date
-            today = date.today()
-            last_receipt = StockReceipt.objects.filter(
-                receipt_date__year=today.year
-            ).order_by('-receipt_number').first()
+            self.receipt_number = StockReceipt.allocate_receipt_numbers(1)[0]
 
-            if last_receipt and last_receipt.receipt_number.startswith(f'BR-{today.year}-'):
-                try:
-                    last_num = int(last_receipt.receipt_number.split('-')[-1])
-                    new_num = last_num + 1
-                except (ValueError, IndexError):
-                    new_num = 1
-            else:
-                new_num = 1
+        super().save(*args, **kwargs)
 
-            self.receipt_number = f'BR-{today.year}-{new_num:04d}'
+    @classmethod
+    def allocate_receipt_numbers(cls, count):
+        """Réserver un bloc de numéros de bon de réception consécutifs (une seule requête)"""
+        year = date.today().year
+        last_receipt = cls.objects.filter(
+            receipt_number__startswith=f'BR-{year}-'
+        ).order_by('-receipt_number').first()
 
-        super().save(*args, **kwargs)
+        new_num = 1
+        if last_receipt:
+            try:
+                new_num = int(last_receipt.receipt_number.split('-')[-1]) + 1
+            except (ValueError, IndexError):
+                new_num = 1
+
+        return [f'BR-{year}-{num:04d}' for num in range(new_num, new_num + count)]
 
     def calculate_totals(self):
         """Calculer les totaux basés sur les éléments"""
-        items = self.receipt_items.all()
-        self.subtotal = sum(item.total_price for item in items)
+        self.subtotal = self.receipt_items.aggregate(
+            total=models.Sum(
+                models.F('quantity') * models.F('purchase_price'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2)
+            )
+        )['total'] or Decimal('0.00')
 
         # Calculer les taxes (si applicable)
         # Pour simplifier, on peut utiliser les taux standards
@@ -1469,38 +1739,90 @@ class StockReceipt(models.Model):
             # Logique de calcul des taxes selon le fournisseur
             pass
 
-        self.total_amount = self.subtotal + self.gst_amount + self.qst_amount
+        self.apply_totals(self.subtotal)
         self.save()
 
+    def apply_totals(self, subtotal):
+        """Appliquer le sous-total et recalculer le total avec les taxes du bon (sans enregistrer)"""
+        self.subtotal = subtotal
+        self.total_amount = self.subtotal + self.gst_amount + self.qst_amount
+
+    def save_items(self, new_items=(), changed_items=(), deleted_items=()):
+        """
+        Enregistrer les lignes du bon en lot avec un seul calcul des totaux
+
+        Contrairement à ``StockReceiptItem.save``, les lignes sont écrites avec
+        ``bulk_create``/``bulk_update`` sans recalculer les totaux à chaque ligne.
+        """
+        from django.db import transaction
+        from django.utils import timezone
+
+        with transaction.atomic():
+            deleted_ids = [item.pk for item in deleted_items if item.pk]
+            if deleted_ids:
+                self.receipt_items.filter(pk__in=deleted_ids).delete()
+
+            if changed_items:
+                now = timezone.now()
+                for item in changed_items:
+                    item.updated_at = now
+                StockReceiptItem.objects.bulk_update(
+                    changed_items, ['inventory_item', 'quantity', 'purchase_price', 'updated_at']
+                )
+
+            if new_items:
+                for item in new_items:
+                    item.stock_receipt = self
+                StockReceiptItem.objects.bulk_create(new_items)
+
+            self.calculate_totals()
+
     def process_receipt(self):
         """Traiter le bon de réception : mettre à jour l'inventaire et créer la dépense"""
+        from django.db import transaction
+        from .utils.inventory_valuation import post_stock_movements, stock_entry
+
         if self.status != 'received':
             return False
 
-        # Mettre à jour l'inventaire
-        for item in self.receipt_items.all():
-            inventory_item = item.inventory_item
-            inventory_item.quantity_in_stock += item.quantity
-            inventory_item.unit_cost = item.purchase_price  # Mettre à jour le prix d'achat
-            inventory_item.save()
-
-        # Créer la dépense associée
-        if not self.expense:
-            expense = Expense.objects.create(
-                description=f"Réception de marchandises - {self.receipt_number}",
-                supplier=self.supplier,
-                amount=self.subtotal,
-                expense_date=self.receipt_date,
-                category='inventory',
-                gst_amount=self.gst_amount,
-                qst_amount=self.qst_amount,
-                notes=f"Dépense créée automatiquement depuis le bon de réception {self.receipt_number}"
+        with transaction.atomic():
+            # Verrouiller le bon pour éviter un double traitement concurrent
+            if not StockReceipt.objects.select_for_update().filter(pk=self.pk, status='received').exists():
+                return False
+
+            # Chaque ligne crée une couche de coût; le coût unitaire des articles devient
+            # le coût moyen du stock restant au lieu du dernier prix d'achat. Les quantités
+            # sont mises à jour et les alertes réévaluées en lot.
+            post_stock_movements(
+                stock_entry(
+                    item_id, 'receipt', quantity,
+                    unit_cost=purchase_price,
+                    movement_date=self.receipt_date,
+                    stock_receipt_item_id=line_id,
+                    reference=self.receipt_number,
+                )
+                for line_id, item_id, quantity, purchase_price in self.receipt_items.values_list(
+                    'id', 'inventory_item_id', 'quantity', 'purchase_price'
+                )
             )
-            self.expense = expense
 
-        # Marquer comme traité
-        self.status = 'processed'
-        self.save()
+            # Créer la dépense associée
+            if not self.expense:
+                expense = Expense.objects.create(
+                    description=f"Réception de marchandises - {self.receipt_number}",
+                    supplier=self.supplier,
+                    amount=self.subtotal,
+                    expense_date=self.receipt_date,
+                    category='inventory',
+                    gst_amount=self.gst_amount,
+                    qst_amount=self.qst_amount,
+                    notes=f"Dépense créée automatiquement depuis le bon de réception {self.receipt_number}"
+                )
+                self.expense = expense
+
+            # Marquer comme traité
+            self.status = 'processed'
+            self.save()
 
         return True
 
@@ -1551,6 +1873,336 @@ class StockReceiptItem(models.Model):
         self.stock_receipt.calculate_totals()
 
 
+class CostLayer(models.Model):
+    """Couche de coût créée à chaque entrée en stock (consommée en PEPS par les sorties)"""
+    inventory_item = models.ForeignKey(
+        InventoryItem,
+        on_delete=models.CASCADE,
+        related_name='cost_layers',
+        verbose_name="Article"
+    )
+    stock_receipt_item = models.ForeignKey(
+        StockReceiptItem,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='cost_layers',
+        verbose_name="Ligne de réception"
+    )
+    received_date = models.DateField(verbose_name="Date d'entrée")
+    unit_cost = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        verbose_name="Coût unitaire"
+    )
+    quantity_received = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        verbose_name="Quantité reçue"
+    )
+    quantity_remaining = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        verbose_name="Quantité restante"
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Couche de coût"
+        verbose_name_plural = "Couches de coût"
+        ordering = ['inventory_item', 'received_date', 'id']
+        indexes = [
+            models.Index(fields=['inventory_item', 'quantity_remaining'], name='costlayer_item_remaining_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.inventory_item.name} - {self.quantity_remaining}/{self.quantity_received} à {self.unit_cost}$"
+
+
+class StockMovement(models.Model):
+    """
+    Mouvement de stock valorisé
+
+    Chaque mouvement conserve le solde (quantité et valeur) de l'article après
+    son passage : la valeur à une date donnée se lit sur le dernier mouvement,
+    sans rejouer l'historique.
+    """
+    MOVEMENT_TYPE_CHOICES = [
+        ('opening', 'Solde d\'ouverture'),
+        ('receipt', 'Réception'),
+        ('sale', 'Vente'),
+        ('consumption', 'Consommation de service'),
+        ('adjustment', 'Ajustement'),
+        ('count', 'Inventaire physique'),
+    ]
+
+    inventory_item = models.ForeignKey(
+        InventoryItem,
+        on_delete=models.CASCADE,
+        related_name='stock_movements',
+        verbose_name="Article"
+    )
+    movement_type = models.CharField(
+        max_length=20,
+        choices=MOVEMENT_TYPE_CHOICES,
+        verbose_name="Type de mouvement"
+    )
+    movement_date = models.DateField(verbose_name="Date du mouvement")
+
+    # Quantité signée (positive en entrée, négative en sortie) et coût associé
+    quantity = models.DecimalField(max_digits=12, decimal_places=4, verbose_name="Quantité")
+    unit_cost = models.DecimalField(max_digits=12, decimal_places=4, verbose_name="Coût unitaire")
+    total_cost = models.DecimalField(max_digits=14, decimal_places=4, verbose_name="Coût total")
+
+    # Solde de l'article après le mouvement
+    balance_quantity = models.DecimalField(max_digits=12, decimal_places=4, verbose_name="Quantité en solde")
+    balance_value = models.DecimalField(max_digits=14, decimal_places=4, verbose_name="Valeur en solde")
+
+    stock_receipt_item = models.ForeignKey(
+        StockReceiptItem,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stock_movements',
+        verbose_name="Ligne de réception"
+    )
+    invoice_item = models.ForeignKey(
+        InvoiceItem,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stock_movements',
+        verbose_name="Ligne de facture"
+    )
+    reference = models.CharField(max_length=100, blank=True, default='', verbose_name="Référence")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Mouvement de stock"
+        verbose_name_plural = "Mouvements de stock"
+        ordering = ['inventory_item', 'movement_date', 'id']
+        indexes = [
+            models.Index(fields=['inventory_item', 'movement_date', 'id'], name='movement_item_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_movement_type_display()} - {self.inventory_item.name} ({self.quantity})"
+
+
+class StockCount(models.Model):
+    """Session d'inventaire physique (compte des étagères)"""
+    reference = models.CharField(
+        max_length=50,
+        unique=True,
+        verbose_name="Numéro d'inventaire"
+    )
+    count_date = models.DateField(default=date.today, verbose_name="Date du compte")
+
+    STATUS_CHOICES = [
+        ('open', 'En cours'),
+        ('posted', 'Ajustements comptabilisés'),
+        ('cancelled', 'Annulé'),
+    ]
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='open',
+        verbose_name="Statut"
+    )
+    notes = models.TextField(blank=True, null=True, verbose_name="Notes")
+    posted_at = models.DateTimeField(null=True, blank=True, verbose_name="Comptabilisé le")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Inventaire physique"
+        verbose_name_plural = "Inventaires physiques"
+        ordering = ['-count_date', '-created_at']
+
+    def __str__(self):
+        return f"{self.reference} - {self.count_date}"
+
+    def save(self, *args, **kwargs):
+        # Générer un numéro d'inventaire si pas défini
+        if not self.reference:
+            year = date.today().year
+            last_count = StockCount.objects.filter(
+                reference__startswith=f'INVPH-{year}-'
+            ).order_by('-reference').first()
+
+            new_num = 1
+            if last_count:
+                try:
+                    new_num = int(last_count.reference.split('-')[-1]) + 1
+                except (ValueError, IndexError):
+                    new_num = 1
+
+            self.reference = f'INVPH-{year}-{new_num:04d}'
+
+        super().save(*args, **kwargs)
+
+    def lines_with_variance(self):
+        """Lignes du compte avec l'écart courant par rapport au stock (une seule requête)"""
+        return self.count_lines.select_related('inventory_item').annotate(
+            current_quantity=models.F('inventory_item__quantity_in_stock'),
+            current_variance=models.ExpressionWrapper(
+                models.F('counted_quantity') - models.F('inventory_item__quantity_in_stock'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=4)
+            ),
+        ).order_by('inventory_item__category', 'inventory_item__name')
+
+    def post_adjustments(self):
+        """
+        Comptabiliser les écarts du compte dans une seule transaction
+
+        Les ajustements passent par le moteur d'évaluation (mouvements valorisés,
+        quantités mises à jour en lot) avec une seule évaluation groupée des
+        alertes de stock.
+
+        Returns:
+            int: Nombre d'articles ajustés, ou None si le compte n'est pas ouvert
+        """
+        from django.db import transaction
+        from django.utils import timezone
+        from .utils.inventory_valuation import post_stock_movements, stock_entry
+
+        with transaction.atomic():
+            # Verrouiller la session pour éviter une double comptabilisation
+            if not StockCount.objects.select_for_update().filter(pk=self.pk, status='open').exists():
+                return None
+
+            # Verrouiller les articles comptés avant de lire les écarts
+            list(InventoryItem.objects.select_for_update().filter(
+                pk__in=self.count_lines.values('inventory_item_id')
+            ).values_list('pk', flat=True))
+
+            lines = list(self.lines_with_variance())
+            post_stock_movements(
+                stock_entry(
+                    line.inventory_item_id, 'count', line.current_variance,
+                    movement_date=self.count_date,
+                    reference=self.reference,
+                )
+                for line in lines if line.current_variance
+            )
+
+            now = timezone.now()
+            for line in lines:
+                line.expected_quantity = line.current_quantity
+                line.variance = line.current_variance
+                line.updated_at = now
+            StockCountLine.objects.bulk_update(lines, ['expected_quantity', 'variance', 'updated_at'])
+
+            self.status = 'posted'
+            self.posted_at = now
+            self.save()
+
+        return sum(1 for line in lines if line.variance)
+
+    def cancel(self):
+        """
+        Annuler un compte encore ouvert (aucun ajustement n'est comptabilisé)
+
+        Returns:
+            bool: True si le compte a été annulé, False s'il était déjà comptabilisé ou annulé
+        """
+        from django.db import transaction
+
+        with transaction.atomic():
+            # Verrouiller la session : une comptabilisation concurrente l'emporte
+            if not StockCount.objects.select_for_update().filter(pk=self.pk, status='open').exists():
+                return False
+            self.status = 'cancelled'
+            self.save()
+        return True
+
+
+class StockCountLine(models.Model):
+    """Quantité comptée d'un article lors d'un inventaire physique"""
+    stock_count = models.ForeignKey(
+        StockCount,
+        on_delete=models.CASCADE,
+        related_name='count_lines',
+        verbose_name="Inventaire physique"
+    )
+    inventory_item = models.ForeignKey(
+        InventoryItem,
+        on_delete=models.CASCADE,
+        related_name='count_lines',
+        verbose_name="Article"
+    )
+    counted_quantity = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        validators=[MinValueValidator(Decimal('0.0000'))],
+        verbose_name="Quantité comptée"
+    )
+
+    # Renseignés lors de la comptabilisation
+    expected_quantity = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        null=True,
+        blank=True,
+        verbose_name="Quantité théorique"
+    )
+    variance = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        null=True,
+        blank=True,
+        verbose_name="Écart"
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Ligne d'inventaire physique"
+        verbose_name_plural = "Lignes d'inventaire physique"
+        unique_together = ['stock_count', 'inventory_item']
+
+    def __str__(self):
+        return f"{self.inventory_item.name} - {self.counted_quantity}"
+
+
+class Resource(models.Model):
+    """Ressource réservable pour les rendez-vous (baie de travail ou technicien)"""
+
+    RESOURCE_TYPES = [
+        ('bay', 'Baie'),
+        ('technician', 'Technicien'),
+    ]
+
+    name = models.CharField(max_length=100, verbose_name="Nom")
+    resource_type = models.CharField(max_length=20, choices=RESOURCE_TYPES, verbose_name="Type de ressource")
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='scheduling_resources',
+        verbose_name="Utilisateur",
+        help_text="Compte de l'installateur (techniciens seulement)"
+    )
+    is_active = models.BooleanField(default=True, verbose_name="Active")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Ressource"
+        verbose_name_plural = "Ressources"
+        ordering = ['resource_type', 'name']
+
+    def __str__(self):
+        return f"{self.name} ({self.get_resource_type_display()})"
+
+
 class Appointment(models.Model):
     """Modèle pour les rendez-vous"""
     title = models.CharField(max_length=200, verbose_name="Titre")
@@ -1610,6 +2262,14 @@ class Appointment(models.Model):
         verbose_name="Prix estimé"
     )
 
+    # Baies et techniciens réservés
+    resources = models.ManyToManyField(
+        Resource,
+        blank=True,
+        related_name='appointments',
+        verbose_name="Ressources"
+    )
+
     # Facture liée (si créée)
     invoice = models.OneToOneField(
         'Invoice',
@@ -1630,10 +2290,33 @@ class Appointment(models.Model):
         verbose_name = "Rendez-vous"
         verbose_name_plural = "Rendez-vous"
         ordering = ['start_datetime']
+        indexes = [
+            # Requêtes de chevauchement : début < fin de la plage ET fin > début de la plage
+            models.Index(fields=['start_datetime', 'end_datetime'], name='appointment_start_end_idx'),
+            # Sélection des rendez-vous à rappeler par statut et heure de début
+            models.Index(fields=['status', 'start_datetime'], name='appointment_status_start_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.client.full_name} ({self.start_datetime.strftime('%d/%m/%Y %H:%M')})"
 
+    def save(self, *args, **kwargs):
+        from .utils.cashflow import invalidate_cashflow
+        from .utils.scheduling import invalidate_busy_intervals
+
+        super().save(*args, **kwargs)
+        invalidate_busy_intervals()
+        invalidate_cashflow()
+
+    def delete(self, *args, **kwargs):
+        from .utils.cashflow import invalidate_cashflow
+        from .utils.scheduling import invalidate_busy_intervals
+
+        result = super().delete(*args, **kwargs)
+        invalidate_busy_intervals()
+        invalidate_cashflow()
+        return result
+
     @property
     def duration(self):
         """Calculer la durée du rendez-vous"""
@@ -1658,30 +2341,138 @@ class Appointment(models.Model):
         if not self.can_create_invoice():
             return None
 
-        # Créer la facture
-        invoice = Invoice.objects.create(
-            client=self.client,
-            vehicle=self.vehicle,
-            invoice_date=date.today(),
-            notes=f"Facture créée depuis le rendez-vous: {self.title}"
-        )
-
-        # Ajouter les services estimés comme éléments de facture
-        for service in self.estimated_services.all():
-            InvoiceItem.objects.create(
-                invoice=invoice,
-                service=service,
-                quantity=Decimal('1.00'),
-                unit_price=service.default_price,
-                description=f"Service du rendez-vous: {self.title}"
+        appointments = Appointment.invoice_many(Appointment.objects.filter(pk=self.pk))
+        if not appointments:
+            return None
+        self.invoice = appointments[0].invoice
+        self.updated_at = appointments[0].updated_at
+        return self.invoice
+
+    @classmethod
+    def invoice_many(cls, queryset):
+        """
+        Créer les factures de plusieurs rendez-vous terminés dans une seule transaction
+
+        Les rendez-vous non terminés ou déjà facturés sont ignorés. Chaque
+        service estimé devient un élément de facture au prix par défaut du
+        service. Comme pour ``Quote.convert_many``, les numéros sont réservés
+        en bloc, factures et éléments sont écrits avec ``bulk_create`` et les
+        totaux sont calculés une seule fois par facture en mémoire.
+
+        Returns:
+            list: Les rendez-vous facturés, avec ``invoice`` renseignée
+        """
+        from django.db import transaction
+        from django.db.models import prefetch_related_objects
+        from django.utils import timezone
+        from .utils.cashflow import invalidate_cashflow
+
+        with transaction.atomic():
+            # Verrouiller les rendez-vous pour éviter une double facturation concurrente
+            appointments = list(
+                queryset.select_for_update(of=('self',))
+                .select_related('client')
+                .filter(status='completed', invoice__isnull=True)
+                .order_by('start_datetime', 'pk')
             )
+            if not appointments:
+                return []
+            prefetch_related_objects(appointments, 'estimated_services')
 
-        # Calculer les totaux
-        invoice.calculate_totals()
+            today = date.today()
+            numbers = Invoice.allocate_invoice_numbers(len(appointments))
+            invoices = []
+            items = []
+            for appointment, number in zip(appointments, numbers):
+                invoice = Invoice(
+                    invoice_number=number,
+                    client=appointment.client,
+                    vehicle_id=appointment.vehicle_id,
+                    invoice_date=today,
+                    notes=f"Facture créée depuis le rendez-vous: {appointment.title}",
+                )
+                lines = [
+                    InvoiceItem(
+                        invoice=invoice,
+                        item_type='service',
+                        service=service,
+                        description=f"Service du rendez-vous: {appointment.title}",
+                        price=service.default_price,
+                    )
+                    for service in appointment.estimated_services.all()
+                ]
+                invoice.apply_totals(sum(line.price for line in lines))
+                invoices.append(invoice)
+                items.extend(lines)
+            Invoice.objects.bulk_create(invoices)
+            InvoiceItem.objects.bulk_create(items)
+
+            now = timezone.now()
+            for appointment, invoice in zip(appointments, invoices):
+                appointment.invoice = invoice
+                appointment.updated_at = now
+            cls.objects.filter(pk__in=[appointment.pk for appointment in appointments]).update(updated_at=now)
+            cls.objects.bulk_update(appointments, ['invoice'])
+            invalidate_cashflow()
+
+        return appointments
+
+    @classmethod
+    def uninvoiced_until(cls, day=None):
+        """Rendez-vous terminés et non facturés ayant commencé au plus tard ce jour-là (heure locale)"""
+        from datetime import time
+        from django.utils import timezone
+
+        day = day or timezone.localdate()
+        end_of_day = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+        return cls.objects.filter(status='completed', invoice__isnull=True, start_datetime__lt=end_of_day)
+
+    @classmethod
+    def close_day(cls, day=None):
+        """
+        Fermer la journée : facturer en lot tous les rendez-vous terminés et
+        non facturés jusqu'à ce jour inclus
+
+        Returns:
+            list: Les rendez-vous facturés
+        """
+        return cls.invoice_many(cls.uninvoiced_until(day))
+
+
+def appointment_resources_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Marquer comme modifiés les rendez-vous dont les ressources changent
+
+    Le flux .ics suit ``updated_at`` : changer de technicien sans toucher au
+    rendez-vous doit aussi le faire avancer.
+    """
+    from django.utils import timezone
+    from .utils.scheduling import invalidate_busy_intervals
+
+    if action == 'pre_clear' and reverse:
+        # Ressource vidée de ses rendez-vous : les retenir avant la suppression
+        instance._cleared_appointment_ids = list(instance.appointments.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        appointment_ids = [instance.pk]
+    elif action == 'post_clear':
+        appointment_ids = instance.__dict__.pop('_cleared_appointment_ids', [])
+    else:
+        appointment_ids = list(pk_set or [])
+    if not appointment_ids:
+        return
+
+    now = timezone.now()
+    Appointment.objects.filter(pk__in=appointment_ids).update(updated_at=now)
+    if not reverse:
+        instance.updated_at = now
+    invalidate_busy_intervals()
 
-        # Lier la facture au rendez-vous
-        self.invoice = invoice
-        self.save()
+
+models.signals.m2m_changed.connect(appointment_resources_changed, sender=Appointment.resources.through)
 
 
 # ==================== GESTION DES SOUMISSIONS ====================
@@ -1730,13 +2521,19 @@ class Quote(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifié le")
 
+    # Statuts qui passent à « expirée » une fois la date de validité dépassée
+    EXPIRABLE_STATUSES = ['draft', 'sent']
+
     class Meta:
         verbose_name = "Soumission"
         verbose_name_plural = "Soumissions"
         ordering = ['-date', '-quote_number']
+        indexes = [
+            models.Index(fields=['status', 'valid_until'], name='quote_status_valid_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.quote_number} - {self.client.name}"
+        return f"{self.quote_number} - {self.client.full_name}"
 
     def save(self, *args, **kwargs):
         if not self.quote_number:
@@ -1799,45 +2596,129 @@ class Quote(models.Model):
         """Vérifier si la soumission est expirée"""
         return date.today() > self.valid_until and self.status not in ['accepted', 'converted', 'rejected']
 
+    @classmethod
+    def expire_overdue(cls, today=None):
+        """
+        Passer au statut « expirée » les soumissions dont la validité est dépassée
+
+        Une seule requête ``UPDATE`` sur l'index ``(status, valid_until)``.
+
+        Returns:
+            int: Nombre de soumissions expirées
+        """
+        from django.utils import timezone
+
+        today = today or date.today()
+        return cls.objects.filter(
+            status__in=cls.EXPIRABLE_STATUSES, valid_until__lt=today
+        ).update(status='expired', updated_at=timezone.now())
+
+    @classmethod
+    def displayed_status(cls, today=None):
+        """
+        Statut affiché : « expirée » dès que la validité est dépassée
+
+        Expression à annoter pour afficher et filtrer les soumissions échues
+        sans attendre la commande ``expire_quotes`` ni écrire en base.
+        """
+        from django.db.models import Case, CharField, F, Value, When
+
+        return Case(
+            When(status__in=cls.EXPIRABLE_STATUSES, valid_until__lt=today or date.today(), then=Value('expired')),
+            default=F('status'),
+            output_field=CharField(),
+        )
+
     def can_be_converted(self):
         """Vérifier si la soumission peut être convertie en facture"""
-        return self.status in ['sent', 'accepted'] and not self.converted_invoice
+        return self.status in ['sent', 'accepted'] and not self.converted_invoice_id
 
     def convert_to_invoice(self):
         """Convertir la soumission en facture"""
         if not self.can_be_converted():
             raise ValueError("Cette soumission ne peut pas être convertie en facture")
 
-        # Créer la facture
-        invoice = Invoice.objects.create(
-            client=self.client,
-            vehicle=self.vehicle,
-            discount_percentage=self.discount_percentage,
-            is_dealer_discount=self.is_dealer_discount,
-            notes=self.notes
-        )
-
-        # Copier tous les éléments de la soumission vers la facture
-        for quote_item in self.quote_items.all():
-            InvoiceItem.objects.create(
-                invoice=invoice,
-                item_type=quote_item.item_type,
-                service=quote_item.service,
-                inventory_item=quote_item.inventory_item,
-                description=quote_item.description,
-                price=quote_item.price
-            )
-
-        # Calculer les totaux de la facture
-        invoice.calculate_totals()
+        converted = Quote.convert_many(Quote.objects.filter(pk=self.pk))
+        if not converted:
+            raise ValueError("Cette soumission ne peut pas être convertie en facture")
 
-        # Marquer la soumission comme convertie
+        invoice = converted[0].converted_invoice
         self.status = 'converted'
         self.converted_invoice = invoice
-        self.save()
-
+        self.updated_at = converted[0].updated_at
         return invoice
 
+    @classmethod
+    def convert_many(cls, queryset):
+        """
+        Convertir plusieurs soumissions en factures dans une seule transaction
+
+        Les soumissions non convertibles sont ignorées. Les numéros de facture
+        sont réservés en bloc, les factures et leurs éléments sont écrits avec
+        ``bulk_create`` et les totaux sont calculés une seule fois par facture
+        en mémoire : le nombre de requêtes ne dépend pas du nombre de
+        soumissions.
+
+        Returns:
+            list: Les soumissions converties, avec ``converted_invoice`` renseignée
+        """
+        from django.db import transaction
+        from django.db.models import prefetch_related_objects
+        from django.utils import timezone
+
+        with transaction.atomic():
+            # Verrouiller les soumissions pour éviter une double conversion concurrente
+            quotes = list(
+                queryset.select_for_update(of=('self',))
+                .select_related('client')
+                .filter(status__in=['sent', 'accepted'], converted_invoice__isnull=True)
+                .order_by('date', 'quote_number')
+            )
+            if not quotes:
+                return []
+            prefetch_related_objects(quotes, 'quote_items')
+
+            today = date.today()
+            numbers = Invoice.allocate_invoice_numbers(len(quotes))
+            invoices = []
+            for quote, number in zip(quotes, numbers):
+                invoice = Invoice(
+                    invoice_number=number,
+                    client=quote.client,
+                    vehicle_id=quote.vehicle_id,
+                    invoice_date=today,
+                    discount_percentage=quote.discount_percentage,
+                    is_dealer_discount=quote.is_dealer_discount,
+                    notes=quote.notes,
+                )
+                invoice.apply_totals(sum(item.total_price for item in quote.quote_items.all()))
+                invoices.append(invoice)
+            Invoice.objects.bulk_create(invoices)
+
+            InvoiceItem.objects.bulk_create([
+                InvoiceItem(
+                    invoice=invoice,
+                    item_type=quote_item.item_type,
+                    service_id=quote_item.service_id,
+                    inventory_item_id=quote_item.inventory_item_id,
+                    description=quote_item.description,
+                    price=quote_item.price,
+                )
+                for quote, invoice in zip(quotes, invoices)
+                for quote_item in quote.quote_items.all()
+            ])
+
+            # Seul le lien vers la facture diffère d'une soumission à l'autre
+            now = timezone.now()
+            for quote, invoice in zip(quotes, invoices):
+                quote.status = 'converted'
+                quote.converted_invoice = invoice
+                quote.updated_at = now
+            Quote.objects.filter(pk__in=[quote.pk for quote in quotes]).update(status='converted', updated_at=now)
+            Quote.objects.bulk_update(quotes, ['converted_invoice'])
+
+        return quotes
+
 
 class QuoteItem(models.Model):
     """Modèle pour les éléments d'une soumission"""
@@ -1929,6 +2810,14 @@ class Material(models.Model):
         verbose_name="Coût par m²",
         help_text="Coût par mètre carré en CAD"
     )
+    roll_width = models.DecimalField(
+        max_digits=5,
+        decimal_places=3,
+        blank=True,
+        null=True,
+        verbose_name="Largeur du rouleau (m)",
+        help_text="Largeur utile du rouleau pour l'imbrication des pièces (ex: 1.370 pour 54 po)"
+    )
     supplier = models.CharField(
         max_length=100,
         blank=True,
@@ -1955,6 +2844,19 @@ class Material(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_type_display()}) - {self.cost_per_sqm}$/m²"
 
+    def save(self, *args, **kwargs):
+        from .utils.lettering_pricing import invalidate_pricing_snapshot
+
+        super().save(*args, **kwargs)
+        invalidate_pricing_snapshot()
+
+    def delete(self, *args, **kwargs):
+        from .utils.lettering_pricing import invalidate_pricing_snapshot
+
+        result = super().delete(*args, **kwargs)
+        invalidate_pricing_snapshot()
+        return result
+
 
 class LaborRate(models.Model):
     """Taux horaires pour différents types de tâches"""
@@ -2000,6 +2902,19 @@ class LaborRate(models.Model):
     def __str__(self):
         return f"{self.get_task_type_display()} - {self.hourly_rate}$/h"
 
+    def save(self, *args, **kwargs):
+        from .utils.lettering_pricing import invalidate_pricing_snapshot
+
+        super().save(*args, **kwargs)
+        invalidate_pricing_snapshot()
+
+    def delete(self, *args, **kwargs):
+        from .utils.lettering_pricing import invalidate_pricing_snapshot
+
+        result = super().delete(*args, **kwargs)
+        invalidate_pricing_snapshot()
+        return result
+
 
 class OverheadConfiguration(models.Model):
     """Configuration des frais généraux pour le lettrage"""
@@ -2052,9 +2967,19 @@ class OverheadConfiguration(models.Model):
 
     def save(self, *args, **kwargs):
         # S'assurer qu'il n'y a qu'une seule configuration par défaut
+        from .utils.lettering_pricing import invalidate_pricing_snapshot
+
         if self.is_default:
             OverheadConfiguration.objects.filter(is_default=True).update(is_default=False)
         super().save(*args, **kwargs)
+        invalidate_pricing_snapshot()
+
+    def delete(self, *args, **kwargs):
+        from .utils.lettering_pricing import invalidate_pricing_snapshot
+
+        result = super().delete(*args, **kwargs)
+        invalidate_pricing_snapshot()
+        return result
 
 
 class LetteringQuote(models.Model):
@@ -2185,6 +3110,12 @@ class LetteringQuote(models.Model):
         verbose_name="Prix final avec taxes",
         help_text="Prix final incluant toutes les taxes"
     )
+    cost_breakdown = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Détail des coûts",
+        help_text="Instantané du calcul (montants intermédiaires et tarifs utilisés)"
+    )
 
     # Métadonnées
     notes = models.TextField(
@@ -2217,87 +3148,244 @@ class LetteringQuote(models.Model):
     def __str__(self):
         return f"Lettrage {self.vehicle} - {self.final_price_with_taxes}$ taxes incl. ({self.created_at.strftime('%Y-%m-%d')})"
 
+    def _price(self):
+        """Détail des coûts et références utilisées, calculés par le noyau de prix"""
+        from .utils.lettering_pricing import quote_lettering, resolve_references
+
+        references = resolve_references(
+            vehicle_id=self.vehicle_id,
+            vinyl_material_id=self.vinyl_material_id,
+            overhead_config_id=self.overhead_config_id,
+            lamination_material_id=self.lamination_material_id,
+        )
+        breakdown = quote_lettering(
+            vehicle_id=self.vehicle_id,
+            vinyl_material_id=self.vinyl_material_id,
+            overhead_config_id=self.overhead_config_id,
+            surface_area=self.surface_area,
+            waste_percentage=self.waste_percentage,
+            lamination_material_id=self.lamination_material_id,
+            design_hours=self.design_hours,
+            installation_hours=self.installation_hours,
+            profit_margin=self.profit_margin,
+            references=references,
+        )
+        return breakdown, references
+
     def calculate_costs(self):
-        """Calcule tous les coûts automatiquement"""
-        from decimal import Decimal
+        """Calcule tous les coûts avec les tarifs courants et fige leur détail"""
+        from .utils.lettering_pricing import build_cost_snapshot
 
-        # 1. Coût des matériaux
-        surface_with_waste = self.surface_area * (1 + self.waste_percentage / 100)
+        breakdown, references = self._price()
 
-        # Coût du vinyle
-        vinyl_cost = surface_with_waste * self.vinyl_material.cost_per_sqm
+        self.material_cost = breakdown['material_cost']
+        self.labor_cost = breakdown['labor_cost']
+        self.overhead_cost = breakdown['overhead_cost']
+        self.total_cost = breakdown['total_cost']
+        self.final_price = breakdown['subtotal_with_margin']
+        self.gst_amount = breakdown['gst_amount']
+        self.qst_amount = breakdown['qst_amount']
+        self.final_price_with_taxes = breakdown['final_price_with_taxes']
+        self.cost_breakdown = build_cost_snapshot(breakdown, references)
 
-        # Coût de la lamination (si applicable)
-        lamination_cost = Decimal('0')
-        if self.lamination_material:
-            lamination_cost = surface_with_waste * self.lamination_material.cost_per_sqm
+        return {
+            'material_cost': self.material_cost,
+            'labor_cost': self.labor_cost,
+            'overhead_cost': self.overhead_cost,
+            'total_cost': self.total_cost,
+            'final_price': self.final_price,
+            'gst_amount': self.gst_amount,
+            'qst_amount': self.qst_amount,
+            'final_price_with_taxes': self.final_price_with_taxes
+        }
 
-        self.material_cost = vinyl_cost + lamination_cost
+    def save(self, *args, **kwargs):
+        # Calculer les coûts à la création; un calcul enregistré garde son détail
+        # même si les tarifs changent (recalcul explicite avec calculate_costs)
+        if not self.cost_breakdown:
+            self.calculate_costs()
+        super().save(*args, **kwargs)
 
-        # 2. Coût de la main-d'œuvre
-        design_rate = LaborRate.objects.filter(task_type='conception', is_active=True).first()
-        installation_rate = LaborRate.objects.filter(task_type='installation', is_active=True).first()
+    def get_cost_breakdown(self):
+        """Retourne le détail des coûts enregistré lors du calcul"""
+        from .utils.lettering_pricing import load_breakdown
 
-        design_cost = Decimal('0')
-        if design_rate and self.design_hours:
-            design_cost = self.design_hours * design_rate.hourly_rate
+        if self.cost_breakdown:
+            return load_breakdown(self.cost_breakdown)
+        # Calcul antérieur aux instantanés : détail reconstitué avec les tarifs courants
+        return self._price()[0]
 
-        installation_cost = Decimal('0')
-        if installation_rate and self.installation_hours:
-            # Appliquer le multiplicateur de complexité du véhicule
-            complexity_multiplier = self.vehicle.vehicle_type.complexity_multiplier if self.vehicle.vehicle_type else Decimal('1.0')
-            installation_cost = self.installation_hours * installation_rate.hourly_rate * complexity_multiplier
 
-        self.labor_cost = design_cost + installation_cost
+class LaborHourModel(models.Model):
+    """Coefficients du modèle d'estimation des heures de lettrage (ajusté par fit_labor_hours)"""
 
-        # 3. Frais généraux
-        total_hours = self.design_hours + self.installation_hours
-        hourly_overhead = total_hours * self.overhead_config.hourly_overhead_cost
-        fixed_overhead = self.overhead_config.fixed_overhead_cost
+    TASK_CHOICES = [
+        ('design', 'Conception'),
+        ('installation', 'Installation'),
+    ]
+
+    task = models.CharField(max_length=20, choices=TASK_CHOICES, unique=True, verbose_name="Tâche")
+    feature_names = models.JSONField(default=list, verbose_name="Variables")
+    coefficients = models.JSONField(default=list, verbose_name="Coefficients")
+    covariance = models.JSONField(
+        default=list,
+        verbose_name="Covariance des coefficients",
+        help_text="Utilisée pour la bande de confiance des heures suggérées"
+    )
+    residual_std = models.FloatField(default=0, verbose_name="Écart-type résiduel (h)")
+    r_squared = models.FloatField(default=0, verbose_name="R²")
+    sample_count = models.PositiveIntegerField(default=0, verbose_name="Nombre de travaux")
+    fitted_at = models.DateTimeField(auto_now=True, verbose_name="Ajusté le")
+
+    class Meta:
+        verbose_name = "Modèle d'heures de lettrage"
+        verbose_name_plural = "Modèles d'heures de lettrage"
+        ordering = ['task']
 
-        # Coût de base pour le calcul du pourcentage
-        base_cost = self.material_cost + self.labor_cost
-        percentage_overhead = base_cost * (self.overhead_config.percentage_overhead / 100)
+    def __str__(self):
+        return f"{self.get_task_display()} - {self.sample_count} travaux (R² {self.r_squared:.2f})"
 
-        self.overhead_cost = hourly_overhead + fixed_overhead + percentage_overhead
+    def save(self, *args, **kwargs):
+        from .utils.lettering_pricing import invalidate_pricing_snapshot
 
-        # 4. Coût total
-        self.total_cost = self.material_cost + self.labor_cost + self.overhead_cost
+        super().save(*args, **kwargs)
+        invalidate_pricing_snapshot()
 
-        # 5. Prix avec marge (avant taxes)
-        self.final_price = self.total_cost * (1 + self.profit_margin / 100)
+    def delete(self, *args, **kwargs):
+        from .utils.lettering_pricing import invalidate_pricing_snapshot
 
-        # 6. Calcul des taxes (Québec)
-        gst_rate = Decimal('0.05')  # TPS 5%
-        qst_rate = Decimal('0.09975')  # TVQ 9.975%
+        result = super().delete(*args, **kwargs)
+        invalidate_pricing_snapshot()
+        return result
 
-        self.gst_amount = self.final_price * gst_rate
-        self.qst_amount = self.final_price * qst_rate
-        self.final_price_with_taxes = self.final_price + self.gst_amount + self.qst_amount
 
-        return {
-            'material_cost': self.material_cost,
-            'labor_cost': self.labor_cost,
-            'overhead_cost': self.overhead_cost,
-            'total_cost': self.total_cost,
-            'final_price': self.final_price,
-            'gst_amount': self.gst_amount,
-            'qst_amount': self.qst_amount,
-            'final_price_with_taxes': self.final_price_with_taxes
-        }
+class IdempotencyKey(models.Model):
+    """Clé d'idempotence d'une requête d'écriture : une requête rejouée renvoie le résultat original"""
+
+    scope = models.CharField(max_length=50, verbose_name="Point d'accès")
+    key = models.CharField(max_length=100, verbose_name="Clé")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, verbose_name="Utilisateur")
+    request_hash = models.CharField(max_length=64, verbose_name="Empreinte de la requête")
+    status_code = models.PositiveSmallIntegerField(default=200, verbose_name="Code de réponse")
+    response = models.JSONField(default=dict, blank=True, verbose_name="Réponse")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Clé d'idempotence"
+        verbose_name_plural = "Clés d'idempotence"
+        ordering = ['-created_at']
+        # Une clé n'est rejouée que pour l'utilisateur qui l'a envoyée
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'user', 'key'], name='idempotency_scope_user_key_uniq'),
+            models.UniqueConstraint(
+                fields=['scope', 'key'], condition=models.Q(user__isnull=True),
+                name='idempotency_scope_anonymous_key_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} - {self.key}"
+
+
+class OutboxMessage(models.Model):
+    """Message à envoyer au client (courriel) ou à traiter par l'équipe (appel)"""
+
+    CHANNEL_CHOICES = [
+        ('email', 'Courriel'),
+        ('phone', 'Appel téléphonique'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('sent', 'Envoyé'),
+        ('failed', 'Échec'),
+    ]
+
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES, verbose_name="Canal")
+    recipient = models.CharField(max_length=254, verbose_name="Destinataire")
+    subject = models.CharField(max_length=200, blank=True, verbose_name="Objet")
+    body = models.TextField(verbose_name="Message")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="Statut")
+    error = models.TextField(blank=True, verbose_name="Erreur")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Envoyé le")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Message sortant"
+        verbose_name_plural = "Messages sortants"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'channel', 'created_at'], name='outbox_status_channel_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_channel_display()} - {self.recipient} ({self.get_status_display()})"
+
+
+class AppointmentReminder(models.Model):
+    """Rappel émis pour un rendez-vous (un seul par type de rappel)"""
+
+    KIND_CHOICES = [
+        ('day_before', 'Veille du rendez-vous'),
+    ]
+
+    appointment = models.ForeignKey(
+        Appointment,
+        on_delete=models.CASCADE,
+        related_name='reminders',
+        verbose_name="Rendez-vous"
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='day_before', verbose_name="Type de rappel")
+    message = models.OneToOneField(
+        OutboxMessage,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reminder',
+        verbose_name="Message"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Rappel de rendez-vous"
+        verbose_name_plural = "Rappels de rendez-vous"
+        ordering = ['-created_at']
+        unique_together = ['appointment', 'kind']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.appointment}"
+
+
+class CalendarFeedToken(models.Model):
+    """Jeton secret d'un abonnement iCalendar (.ics) aux rendez-vous"""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='calendar_feed_token', verbose_name="Utilisateur")
+    token = models.CharField(max_length=64, unique=True, verbose_name="Jeton")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Jeton de calendrier"
+        verbose_name_plural = "Jetons de calendrier"
+
+    def __str__(self):
+        return f"Calendrier de {self.user.get_username()}"
 
     def save(self, *args, **kwargs):
-        # Calculer automatiquement les coûts avant la sauvegarde
-        self.calculate_costs()
+        if not self.token:
+            self.token = CalendarFeedToken.generate_token()
         super().save(*args, **kwargs)
 
-    def get_cost_breakdown(self):
-        """Retourne un détail des coûts pour l'affichage"""
-        return {
-            'surface_with_waste': self.surface_area * (1 + self.waste_percentage / 100),
-            'vinyl_cost': self.surface_area * (1 + self.waste_percentage / 100) * self.vinyl_material.cost_per_sqm,
-            'lamination_cost': (self.surface_area * (1 + self.waste_percentage / 100) * self.lamination_material.cost_per_sqm) if self.lamination_material else 0,
-            'design_cost': self.design_hours * LaborRate.objects.filter(task_type='conception', is_active=True).first().hourly_rate if LaborRate.objects.filter(task_type='conception', is_active=True).exists() else 0,
-            'installation_cost': self.installation_hours * LaborRate.objects.filter(task_type='installation', is_active=True).first().hourly_rate * (self.vehicle.vehicle_type.complexity_multiplier if self.vehicle.vehicle_type else 1) if LaborRate.objects.filter(task_type='installation', is_active=True).exists() else 0,
-            'complexity_multiplier': self.vehicle.vehicle_type.complexity_multiplier if self.vehicle.vehicle_type else 1,
-        }
+    @staticmethod
+    def generate_token():
+        import secrets
+        return secrets.token_urlsafe(32)
+
+    def regenerate(self):
+        """Remplacer le jeton (l'ancienne adresse d'abonnement cesse de fonctionner)"""
+        self.token = CalendarFeedToken.generate_token()
+        self.save(update_fields=['token'])
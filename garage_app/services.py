@@ -286,49 +286,74 @@ class InventoryConsumptionService:
     def consume_inventory_for_invoice(cls, invoice):
         """
         Consomme automatiquement l'inventaire pour une facture
-        
+
+        Les règles de tous les services sont chargées en une requête et les
+        sorties sont comptabilisées en un seul lot valorisé (coût moyen ou PEPS).
+
         Args:
             invoice: Instance de la facture
         """
-        from .models import ServiceConsumption, InventoryItem
-        
+        from .models import ServiceConsumption
+        from .utils.inventory_valuation import post_stock_movements
+
         if not invoice.vehicle or not invoice.vehicle.vehicle_type:
             logger.warning(f"Impossible de consommer l'inventaire pour la facture {invoice.invoice_number}: véhicule ou type manquant")
             return
-        
+
         vehicle_type = invoice.vehicle.vehicle_type
-        
-        # Parcourir tous les services de la facture
-        for invoice_item in invoice.invoice_items.filter(item_type='service'):
-            if not invoice_item.service:
-                continue
-            
-            # Chercher les règles de consommation pour ce service et type de véhicule
-            consumption_rules = ServiceConsumption.objects.filter(
-                service=invoice_item.service,
-                vehicle_type=vehicle_type,
-                is_active=True
-            )
-            
-            for rule in consumption_rules:
-                cls._apply_consumption_rule(rule, 1)  # Une seule unité par ligne de facture
-    
+
+        # Services de la facture (une seule unité par ligne de facture)
+        invoice_items = list(invoice.invoice_items.filter(item_type='service', service__isnull=False))
+        if not invoice_items:
+            return
+
+        rules_by_service = {}
+        consumption_rules = ServiceConsumption.objects.filter(
+            service_id__in={invoice_item.service_id for invoice_item in invoice_items},
+            vehicle_type=vehicle_type,
+            is_active=True
+        ).select_related('inventory_item')
+        for rule in consumption_rules:
+            rules_by_service.setdefault(rule.service_id, []).append(rule)
+
+        entries = []
+        available = {}
+        for invoice_item in invoice_items:
+            for rule in rules_by_service.get(invoice_item.service_id, ()):
+                entry = cls._apply_consumption_rule(rule, 1, available, invoice_item, invoice)
+                if entry:
+                    entries.append(entry)
+
+        try:
+            post_stock_movements(entries)
+        except Exception as e:
+            logger.error(f"Erreur lors de la consommation d'inventaire pour la facture {invoice.invoice_number}: {e}")
+
     @classmethod
-    def _apply_consumption_rule(cls, rule, service_quantity: int = 1):
+    def _apply_consumption_rule(cls, rule, service_quantity: int = 1, available=None, invoice_item=None, invoice=None):
         """
-        Applique une règle de consommation à l'inventaire
+        Prépare la sortie de stock d'une règle de consommation
+
+        Returns:
+            dict: Écriture de mouvement, ou None si le stock est insuffisant
         """
-        try:
-            inventory_item = rule.inventory_item
-            consumption_amount = rule.consumption_rate * service_quantity
-            
-            if inventory_item.quantity_in_stock >= consumption_amount:
-                inventory_item.quantity_in_stock -= consumption_amount
-                inventory_item.save()
-                
-                logger.info(f"Inventaire consommé: {inventory_item.name} - {consumption_amount} {rule.unit}")
-            else:
-                logger.warning(f"Stock insuffisant pour {inventory_item.name}: {inventory_item.quantity_in_stock} < {consumption_amount}")
-                
-        except Exception as e:
-            logger.error(f"Erreur lors de l'application de la règle de consommation {rule}: {e}")
+        from .utils.inventory_valuation import stock_entry
+
+        inventory_item = rule.inventory_item
+        consumption_amount = rule.consumption_rate * service_quantity
+        if available is None:
+            available = {}
+        in_stock = available.get(inventory_item.pk, inventory_item.quantity_in_stock)
+
+        if in_stock < consumption_amount:
+            logger.warning(f"Stock insuffisant pour {inventory_item.name}: {in_stock} < {consumption_amount}")
+            return None
+
+        available[inventory_item.pk] = in_stock - consumption_amount
+        logger.info(f"Inventaire consommé: {inventory_item.name} - {consumption_amount} {rule.unit}")
+        return stock_entry(
+            inventory_item.pk, 'consumption', -consumption_amount,
+            movement_date=invoice.invoice_date if invoice else None,
+            invoice_item_id=invoice_item.pk if invoice_item else None,
+            reference=invoice.invoice_number if invoice else '',
+        )
@@ -1,3 +1,1635 @@
+import json
+from io import StringIO
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    Appointment, AppointmentReminder, CalendarFeedToken, Client, CostLayer, Expense, IdempotencyKey,
+    InventoryItem, Invoice, InvoiceItem, LaborRate, LetteringQuote, Material, OutboxMessage,
+    OverheadConfiguration, Payment, Quote, QuoteItem, RecurringExpense, Resource, Service, StockAlert,
+    StockCount, StockCountLine, StockMovement, StockReceipt, StockReceiptItem, Supplier, Vehicle,
+    VehiclePanelArea, VehicleType,
+)
+from .forms import AppointmentAdminForm, AppointmentForm
+from .utils.cashflow import compute_cashflow_forecast, expand_month_schedules
+from .utils.inventory_forecast import compute_inventory_forecast, forecast_kernel
+from .utils.inventory_valuation import inventory_valuation_as_of, post_stock_movements, stock_entry
+from .utils.purchase_suggestions import build_purchase_suggestions, create_draft_purchase_orders
+from .utils.lettering_pricing import panel_surface, pricing_snapshot, quote_lettering, vehicle_panel_areas
+from .utils.labor_estimation import fit_labor_models, suggest_hours, training_queryset
+from .utils.reminders import dispatch_reminders, reminder_window
+from .utils.scheduling import ResourceSchedule, find_free_slots, validate_week
+from .utils.sku_index import sku_index
+from .utils.supplier_import import import_supplier_csv
+from .utils.vinyl_nesting import nest_pieces
+
+
+class LetteringPricingTests(TestCase):
+    """Le calculateur AJAX et LetteringQuote utilisent le même noyau de prix"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('lettrage', password='test')
+        cls.client_record = Client.objects.create(first_name='Marie', last_name='Tremblay', phone='514-555-0101')
+        cls.vehicle_type = VehicleType.objects.create(name='Fourgon', complexity_multiplier=Decimal('1.60'))
+        cls.vehicle = Vehicle.objects.create(
+            client=cls.client_record, make='Mercedes', model='Sprinter', year=2022, vehicle_type=cls.vehicle_type
+        )
+        cls.untyped_vehicle = Vehicle.objects.create(
+            client=cls.client_record, make='Honda', model='Civic', year=2019
+        )
+        cls.vinyl = Material.objects.create(name='Vinyle coulé', type='vinyle', cost_per_sqm=Decimal('24.50'))
+        cls.lamination = Material.objects.create(name='Lamination lustrée', type='lamination', cost_per_sqm=Decimal('11.25'))
+        cls.overhead = OverheadConfiguration.objects.create(
+            name='Standard', hourly_overhead_cost=Decimal('12.00'), fixed_overhead_cost=Decimal('35.00'),
+            percentage_overhead=Decimal('7.50'), is_default=True
+        )
+        LaborRate.objects.create(task_type='conception', hourly_rate=Decimal('85.00'))
+        LaborRate.objects.create(task_type='installation', hourly_rate=Decimal('65.00'))
+
+    def setUp(self):
+        # Les rappels on_commit ne s'exécutent pas dans TestCase : repartir d'un instantané neuf
+        pricing_snapshot.reset()
+        self.client.force_login(self.user)
+
+    def payload(self, **overrides):
+        data = {
+            'vehicle_id': self.vehicle.id,
+            'surface_area': '18.75',
+            'waste_percentage': '12.5',
+            'vinyl_material_id': self.vinyl.id,
+            'lamination_material_id': self.lamination.id,
+            'design_hours': '3.5',
+            'installation_hours': '6.25',
+            'overhead_config_id': self.overhead.id,
+            'profit_margin': '32',
+        }
+        data.update(overrides)
+        return data
+
+    def lettering_quote(self, data):
+        return LetteringQuote(
+            client=self.client_record,
+            vehicle_id=data['vehicle_id'],
+            surface_area=Decimal(data['surface_area']),
+            waste_percentage=Decimal(data['waste_percentage']),
+            vinyl_material_id=data['vinyl_material_id'],
+            lamination_material_id=data['lamination_material_id'],
+            design_hours=Decimal(data['design_hours']),
+            installation_hours=Decimal(data['installation_hours']),
+            overhead_config_id=data['overhead_config_id'],
+            profit_margin=Decimal(data['profit_margin']),
+        )
+
+    def calculate_ajax(self, data):
+        response = self.client.post(
+            reverse('garage_app:lettering_calculate_ajax'), json.dumps(data), content_type='application/json'
+        )
+        result = response.json()
+        self.assertTrue(result['success'], result.get('message'))
+        return result['breakdown']
+
+    def assert_equivalent(self, data):
+        breakdown = self.calculate_ajax(data)
+        costs = self.lettering_quote(data).calculate_costs()
+        for key in ('material_cost', 'labor_cost', 'overhead_cost', 'total_cost', 'gst_amount',
+                    'qst_amount', 'final_price_with_taxes'):
+            self.assertEqual(breakdown[key], float(costs[key]), key)
+        self.assertEqual(breakdown['subtotal_with_margin'], float(costs['final_price']))
+
+    def test_ajax_matches_calculate_costs(self):
+        self.assert_equivalent(self.payload())
+
+    def test_ajax_matches_calculate_costs_without_lamination_or_vehicle_type(self):
+        self.assert_equivalent(self.payload(
+            vehicle_id=self.untyped_vehicle.id, lamination_material_id=None, design_hours='0'
+        ))
+
+    def test_reference_formula(self):
+        data = self.payload()
+        costs = self.lettering_quote(data).calculate_costs()
+
+        surface = Decimal('18.75') * (1 + Decimal('12.5') / 100)
+        material = surface * Decimal('24.50') + surface * Decimal('11.25')
+        labor = Decimal('3.5') * Decimal('85.00') + Decimal('6.25') * Decimal('65.00') * Decimal('1.60')
+        overhead = (Decimal('9.75') * Decimal('12.00') + Decimal('35.00')
+                    + (material + labor) * (Decimal('7.50') / 100))
+        price = (material + labor + overhead) * (1 + Decimal('32') / 100)
+        self.assertEqual(costs['final_price'], price)
+        self.assertEqual(costs['final_price_with_taxes'], price + price * Decimal('0.05') + price * Decimal('0.09975'))
+
+    def test_only_the_vehicle_is_queried_after_warm_up(self):
+        data = self.payload()
+        quote = self.lettering_quote(data)
+        quote_lettering(vehicle_id=self.vehicle.id, vinyl_material_id=self.vinyl.id,
+                        overhead_config_id=self.overhead.id, surface_area=Decimal('1'))
+
+        # Les véhicules ne sont pas dans l'instantané : un ajout ne le reconstruit pas
+        version = pricing_snapshot.current_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Vehicle.objects.create(client=self.client_record, make='Ram', model='ProMaster', year=2025)
+        self.assertEqual(pricing_snapshot.current_version(), version)
+
+        with self.assertNumQueries(1):
+            quote.calculate_costs()
+            quote.get_cost_breakdown()
+
+        with CaptureQueriesContext(connection) as context:
+            self.calculate_ajax(data)
+        # Hors session et authentification, seul le véhicule est lu
+        app_queries = [query['sql'] for query in context.captured_queries if 'garage_app_' in query['sql']]
+        self.assertEqual(len(app_queries), 1)
+        self.assertIn('FROM "garage_app_vehicle"', app_queries[0])
+
+    def test_snapshot_refreshed_after_rate_change(self):
+        data = self.payload()
+        before = self.calculate_ajax(data)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rate = LaborRate.objects.get(task_type='installation')
+            rate.hourly_rate = Decimal('75.00')
+            rate.save()
+
+        after = self.calculate_ajax(data)
+        self.assertEqual(after['installation_rate'], 75.0)
+        self.assertGreater(after['final_price_with_taxes'], before['final_price_with_taxes'])
+        self.assert_equivalent(data)
+
+    def test_matrix_matches_kernel(self):
+        response = self.client.post(reverse('garage_app:lettering_matrix_api'), json.dumps({
+            'vehicle_id': self.vehicle.id,
+            'overhead_config_id': self.overhead.id,
+            'surface_area': 18.75,
+            'design_hours': 3.5,
+            'installation_hours': 6.25,
+            'vinyl_material_ids': [self.vinyl.id],
+            'lamination_material_ids': [None, self.lamination.id],
+            'profit_margins': {'start': 20, 'stop': 40, 'step': 10},
+            'waste_percentages': [10, 12.5],
+        }), content_type='application/json')
+        matrix = response.json()
+        self.assertTrue(matrix['success'])
+        self.assertEqual(matrix['cells'], 12)
+        self.assertEqual(matrix['axes']['profit_margin'], [20.0, 30.0, 40.0])
+
+        columns = matrix['columns']
+        for row in matrix['rows']:
+            cell = dict(zip(columns, row))
+            # Les indices d'axes restent des entiers dans le JSON
+            self.assertTrue(all(type(value) is int for value in row[:4]), row)
+            lamination = matrix['axes']['lamination'][cell['lamination']]
+            expected = self.lettering_quote(self.payload(
+                lamination_material_id=lamination['id'] if lamination else None,
+                profit_margin=str(matrix['axes']['profit_margin'][cell['profit_margin']]),
+                waste_percentage=str(matrix['axes']['waste_percentage'][cell['waste_percentage']]),
+            )).calculate_costs()
+            self.assertAlmostEqual(cell['final_price'], float(expected['final_price']), delta=0.006)
+            self.assertAlmostEqual(cell['final_price_with_taxes'], float(expected['final_price_with_taxes']), delta=0.006)
+
+    def test_saved_breakdown_is_frozen(self):
+        quote = self.lettering_quote(self.payload())
+        quote.save()
+        breakdown = quote.get_cost_breakdown()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rate = LaborRate.objects.get(task_type='installation')
+            rate.hourly_rate = Decimal('99.00')
+            rate.save()
+
+        quote = LetteringQuote.objects.get(id=quote.id)
+        quote.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(quote.get_cost_breakdown(), breakdown)
+        self.assertEqual(quote.cost_breakdown['breakdown']['installation_rate'], '65.00')
+        self.assertEqual(quote.final_price_with_taxes, breakdown['final_price_with_taxes'].quantize(Decimal('0.01')))
+
+        response = self.client.get(reverse('garage_app:lettering_quote_detail_api', args=[quote.id]))
+        self.assertEqual(response.json()['breakdown']['installation_rate'], 65.0)
+
+    def test_save_quote_creates_quote_with_snapshot(self):
+        data = self.payload(client_id=self.client_record.id, notes='Flotte')
+        response = self.client.post(
+            reverse('garage_app:lettering_save_quote'), json.dumps(data), content_type='application/json'
+        )
+        result = response.json()
+        self.assertTrue(result['success'], result.get('message'))
+
+        lettering_quote = LetteringQuote.objects.get()
+        self.assertEqual(lettering_quote.related_quote_id, result['quote_id'])
+        self.assertTrue(lettering_quote.is_converted_to_quote)
+        details = lettering_quote.related_quote.quote_items.get().lettering_details
+        self.assertEqual(details['lettering_quote_id'], lettering_quote.id)
+        self.assertEqual(details['breakdown'], lettering_quote.cost_breakdown)
+
+    def test_save_quote_is_idempotent(self):
+        url = reverse('garage_app:lettering_save_quote')
+        body = json.dumps(self.payload(client_id=self.client_record.id))
+        first = self.client.post(url, body, content_type='application/json', HTTP_IDEMPOTENCY_KEY='cle-1')
+        replay = self.client.post(url, body, content_type='application/json', HTTP_IDEMPOTENCY_KEY='cle-1')
+
+        self.assertTrue(first.json()['success'])
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(Quote.objects.count(), 1)
+        self.assertEqual(LetteringQuote.objects.count(), 1)
+
+        other = json.dumps(self.payload(client_id=self.client_record.id, profit_margin='40'))
+        response = self.client.post(url, other, content_type='application/json', HTTP_IDEMPOTENCY_KEY='cle-1')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Quote.objects.count(), 1)
+
+    def test_idempotency_keys_are_scoped_to_the_user(self):
+        url = reverse('garage_app:lettering_save_quote')
+        body = json.dumps(self.payload(client_id=self.client_record.id))
+        first = self.client.post(url, body, content_type='application/json', HTTP_IDEMPOTENCY_KEY='cle-partagee')
+
+        self.client.force_login(User.objects.create_user('second-lettrage', password='test'))
+        second = self.client.post(url, body, content_type='application/json', HTTP_IDEMPOTENCY_KEY='cle-partagee')
+        self.assertTrue(second.json()['success'])
+        self.assertFalse(second.has_header('Idempotent-Replayed'))
+        self.assertNotEqual(second.json()['quote_id'], first.json()['quote_id'])
+        self.assertEqual(Quote.objects.count(), 2)
+
+    def test_expired_idempotency_keys_are_cleaned_up(self):
+        url = reverse('garage_app:lettering_save_quote')
+        body = json.dumps(self.payload(client_id=self.client_record.id))
+        self.client.post(url, body, content_type='application/json', HTTP_IDEMPOTENCY_KEY='cle-ancienne')
+        self.client.post(url, body, content_type='application/json', HTTP_IDEMPOTENCY_KEY='cle-recente')
+        IdempotencyKey.objects.filter(key='cle-ancienne').update(created_at=timezone.now() - timedelta(hours=25))
+
+        out = StringIO()
+        call_command('cleanup_idempotency_keys', '--dry-run', stdout=out)
+        self.assertIn('1 clé(s)', out.getvalue())
+        self.assertEqual(IdempotencyKey.objects.count(), 2)
+
+        call_command('cleanup_idempotency_keys', stdout=out)
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['cle-recente'])
+
+    def test_failed_save_releases_idempotency_key(self):
+        url = reverse('garage_app:lettering_save_quote')
+        body = json.dumps(self.payload(client_id=0))
+        response = self.client.post(url, body, content_type='application/json', HTTP_IDEMPOTENCY_KEY='cle-2')
+        self.assertFalse(response.json()['success'])
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertFalse(LetteringQuote.objects.exists())
+
+    def test_ajax_prices_nested_pieces(self):
+        data = self.payload(surface_area=None, roll_width='1.37', pieces=[
+            {'label': 'Côté', 'width': 1.2, 'height': 0.5, 'quantity': 2},
+            {'label': 'Logo', 'width': 0.3, 'height': 0.3, 'quantity': 4},
+        ])
+        response = self.client.post(
+            reverse('garage_app:lettering_calculate_ajax'), json.dumps(data), content_type='application/json'
+        )
+        result = response.json()
+        self.assertTrue(result['success'], result.get('message'))
+        self.assertEqual(result['nesting']['pieces_count'], 6)
+        self.assertAlmostEqual(result['breakdown']['surface_with_waste'], result['nesting']['roll_area'], delta=0.02)
+
+
+    def test_panel_surface_prefers_model_specific_areas(self):
+        VehiclePanelArea.objects.bulk_create([
+            VehiclePanelArea(vehicle_type=self.vehicle_type, panel='hood', area=Decimal('1.50')),
+            VehiclePanelArea(vehicle_type=self.vehicle_type, panel='left_side', area=Decimal('6.00')),
+            VehiclePanelArea(vehicle_type=self.vehicle_type, make='Mercedes', model='Sprinter',
+                             panel='left_side', area=Decimal('6.75')),
+        ])
+        pricing_snapshot.reset()
+        vehicle_panel_areas(self.vehicle.id)
+
+        # Une requête par véhicule, les surfaces viennent de l'instantané
+        with self.assertNumQueries(2):
+            self.assertEqual(panel_surface(self.vehicle.id, ['hood', 'left_side']), Decimal('8.25'))
+            self.assertEqual(vehicle_panel_areas(self.untyped_vehicle.id), {})
+        with self.assertRaises(ValueError):
+            panel_surface(self.vehicle.id, ['roof'])
+
+        breakdown = self.calculate_ajax(self.payload(surface_area=None, panels=['hood', 'left_side']))
+        self.assertAlmostEqual(breakdown['surface_with_waste'], 8.25 * 1.125)
+
+
+    def test_labor_hour_model_suggests_hours_with_one_query(self):
+        # Historique synthétique : installation = 0.5 + 0.4 × surface × complexité
+        quotes = []
+        for index in range(30):
+            vehicle = self.vehicle if index % 2 else self.untyped_vehicle
+            surface = Decimal(5 + index)
+            complexity = Decimal('1.60') if index % 2 else Decimal('1')
+            quotes.append(LetteringQuote(
+                client=self.client_record, vehicle=vehicle, vinyl_material=self.vinyl,
+                lamination_material=self.lamination if index % 3 else None, overhead_config=self.overhead,
+                surface_area=surface, design_hours=Decimal('1.5') + surface / 10,
+                installation_hours=(Decimal('0.5') + Decimal('0.4') * surface * complexity).quantize(Decimal('0.01')),
+            ))
+        LetteringQuote.objects.bulk_create(quotes)
+
+        results = fit_labor_models(training_queryset(converted_only=False))
+        self.assertGreater(results['installation']['r_squared'], 0.99)
+
+        pricing_snapshot.reset()
+        suggest_hours(self.vehicle.id, self.vinyl.id, Decimal('12'))
+        with self.assertNumQueries(1):
+            suggestion = suggest_hours(self.vehicle.id, self.vinyl.id, Decimal('12'), self.lamination.id)
+        self.assertAlmostEqual(suggestion['installation']['hours'], 0.5 + 0.4 * 12 * 1.6, delta=0.05)
+        self.assertLessEqual(suggestion['installation']['low'], suggestion['installation']['hours'])
+        self.assertGreaterEqual(suggestion['installation']['high'], suggestion['installation']['hours'])
+        self.assertAlmostEqual(suggestion['design']['hours'], 2.7, delta=0.05)
+
+
+class VinylNestingTests(TestCase):
+    """Imbrication des pièces sur le rouleau"""
+
+    def test_pieces_share_the_roll_width(self):
+        nesting = nest_pieces([{'width': 0.6, 'height': 0.5, 'quantity': 2}], roll_width=Decimal('1.37'), spacing=0)
+        self.assertEqual(nesting['length_used'], 0.5)
+        self.assertEqual(nesting['pieces_area'], 0.6)
+        self.assertEqual({placement['x'] for placement in nesting['placements']}, {0.0, 0.6})
+
+    def test_rotation_fits_wide_piece(self):
+        nesting = nest_pieces([{'width': 2.0, 'height': 1.0}], roll_width=Decimal('1.37'), spacing=0)
+        self.assertTrue(nesting['placements'][0]['rotated'])
+        self.assertEqual(nesting['length_used'], 2.0)
+
+        with self.assertRaises(ValueError):
+            nest_pieces([{'width': 2.0, 'height': 1.5}], roll_width=Decimal('1.37'))
+
+    def test_placements_do_not_overlap(self):
+        pieces = [{'width': 0.05 + (index * 37 % 120) / 100, 'height': 0.05 + (index * 53 % 80) / 100}
+                  for index in range(300)]
+        placements = nest_pieces(pieces, roll_width=Decimal('1.37'), spacing=0)['placements']
+        for index, first in enumerate(placements):
+            self.assertLessEqual(first['x'] + first['width'], 1.37 + 1e-6)
+            for second in placements[index + 1:]:
+                overlaps = (first['x'] < second['x'] + second['width'] - 1e-6
+                            and second['x'] < first['x'] + first['width'] - 1e-6
+                            and first['y'] < second['y'] + second['height'] - 1e-6
+                            and second['y'] < first['y'] + first['height'] - 1e-6)
+                self.assertFalse(overlaps)
+
+
+class QuoteConversionTests(TestCase):
+    """Conversion en lot des soumissions en factures"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('facturation', password='test')
+        cls.client_record = Client.objects.create(
+            first_name='Luc', last_name='Gagnon', phone='514-555-0199', default_discount_percentage=Decimal('10.00')
+        )
+        cls.service = Service.objects.create(name='Lettrage portière', default_price=Decimal('250.00'))
+
+    def make_quotes(self, count, status='accepted'):
+        quotes = []
+        for index in range(count):
+            quote = Quote.objects.create(client=self.client_record, status=status, notes=f'Unité {index}')
+            QuoteItem.objects.create(quote=quote, service=self.service, price=Decimal('250.00'))
+            QuoteItem.objects.create(quote=quote, description='Logo arrière', price=Decimal('99.99'))
+            quotes.append(quote)
+        return quotes
+
+    def test_bulk_conversion_matches_single_conversion(self):
+        single, *batch = self.make_quotes(3)
+        reference = single.convert_to_invoice()
+        reference.refresh_from_db()
+        reference.calculate_totals()
+        reference.refresh_from_db()
+
+        converted = Quote.convert_many(Quote.objects.filter(id__in=[quote.id for quote in batch]))
+        self.assertEqual(len(converted), 2)
+        for quote in converted:
+            invoice = Invoice.objects.get(id=quote.converted_invoice_id)
+            self.assertEqual(invoice.invoice_items.count(), 2)
+            self.assertEqual(invoice.discount_percentage, Decimal('10.00'))
+            for field in ['subtotal', 'discount_amount', 'gst_amount', 'qst_amount', 'total_amount']:
+                self.assertEqual(getattr(invoice, field), getattr(reference, field), field)
+
+        numbers = sorted(Invoice.objects.values_list('invoice_number', flat=True))
+        self.assertEqual(len(set(numbers)), 3)
+        self.assertEqual(int(numbers[-1].split('-')[-1]) - int(numbers[0].split('-')[-1]), 2)
+        self.assertEqual(Quote.objects.filter(status='converted').count(), 3)
+
+    def test_conversion_queries_do_not_grow_with_quotes(self):
+        small = self.make_quotes(2)
+        large = self.make_quotes(8)
+        with CaptureQueriesContext(connection) as small_queries:
+            Quote.convert_many(Quote.objects.filter(id__in=[quote.id for quote in small]))
+        with CaptureQueriesContext(connection) as large_queries:
+            Quote.convert_many(Quote.objects.filter(id__in=[quote.id for quote in large]))
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertEqual(InvoiceItem.objects.count(), 20)
+
+    def test_api_skips_quotes_that_cannot_be_converted(self):
+        accepted = self.make_quotes(1)[0]
+        draft = self.make_quotes(1, status='draft')[0]
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('garage_app:quote_bulk_convert_api'),
+            json.dumps({'quote_ids': [accepted.id, draft.id]}), content_type='application/json'
+        )
+        result = response.json()
+        self.assertTrue(result['success'])
+        self.assertEqual([row['quote_id'] for row in result['converted']], [accepted.id])
+        self.assertEqual(result['skipped'], [draft.id])
+        self.assertEqual(Invoice.objects.count(), 1)
+
+    def test_expire_overdue_quotes_in_one_update(self):
+        past = date.today() - timedelta(days=1)
+        overdue_sent, overdue_draft, accepted = [
+            Quote.objects.create(client=self.client_record, status=status, valid_until=past)
+            for status in ['sent', 'draft', 'accepted']
+        ]
+        current = Quote.objects.create(client=self.client_record, status='sent')
+
+        with self.assertNumQueries(1):
+            self.assertEqual(Quote.expire_overdue(), 2)
+        statuses = dict(Quote.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[overdue_sent.id], 'expired')
+        self.assertEqual(statuses[overdue_draft.id], 'expired')
+        self.assertEqual(statuses[accepted.id], 'accepted')
+        self.assertEqual(statuses[current.id], 'sent')
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('garage_app:quote_list'), {'status': 'expired'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_count'], 4)
+        self.assertIn(('expired', 'Expirée', 2), response.context['status_choices'])
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+
+    def test_quote_list_shows_overdue_quotes_as_expired_without_writing(self):
+        overdue = Quote.objects.create(
+            client=self.client_record, status='sent', valid_until=date.today() - timedelta(days=3)
+        )
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('garage_app:quote_list'), {'status': 'expired'})
+
+        # Sans attendre la commande expire_quotes, et sans écriture pendant le GET
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE "garage_app_quote"')])
+        self.assertEqual(Quote.objects.get(pk=overdue.pk).status, 'sent')
+        self.assertIn(('expired', 'Expirée', 1), response.context['status_choices'])
+        self.assertEqual(list(response.context['page_obj'].object_list), [overdue])
+        self.assertContains(response, '<span class="badge bg-warning">Expirée</span>', html=True)
+        self.assertContains(response, '<small class="text-danger">Expirée</small>', html=True)
+
+
+class AppointmentCalendarTests(TestCase):
+    """API du calendrier des rendez-vous"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('calendrier', password='test')
+        cls.client_record = Client.objects.create(first_name='Julie', last_name='Roy', phone='514-555-0142')
+        cls.vehicle = Vehicle.objects.create(client=cls.client_record, make='Ford', model='Transit', year=2021)
+        cls.day = timezone.make_aware(datetime(2025, 3, 10))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def book(self, start_hour, end_hour, **fields):
+        return Appointment.objects.create(
+            title='Lettrage', client=self.client_record, vehicle=self.vehicle,
+            start_datetime=self.day + timedelta(hours=start_hour),
+            end_datetime=self.day + timedelta(hours=end_hour), **fields
+        )
+
+    def fetch(self, **headers):
+        return self.client.get(reverse('garage_app:appointment_calendar_api'), {
+            'start': (self.day + timedelta(hours=8)).isoformat(),
+            'end': (self.day + timedelta(hours=12)).isoformat(),
+        }, **headers)
+
+    def test_returns_appointments_overlapping_the_range(self):
+        before = self.book(6, 9, status='confirmed')
+        inside = self.book(9, 10)
+        after = self.book(11, 14)
+        self.book(12, 13)
+        self.book(5, 8)
+
+        events = self.fetch().json()
+        self.assertEqual([event['id'] for event in events], [before.id, inside.id, after.id])
+        self.assertEqual(events[0]['backgroundColor'], '#0d6efd')
+        self.assertEqual(events[0]['extendedProps']['status'], 'Confirmé')
+        self.assertEqual(events[0]['extendedProps']['vehicle'], '2021 Ford Transit')
+
+    def test_query_count_does_not_grow_with_appointments(self):
+        self.book(9, 10)
+        with CaptureQueriesContext(connection) as few:
+            self.fetch()
+        for hour in range(8, 12):
+            self.book(hour, hour + 1)
+        with CaptureQueriesContext(connection) as many:
+            self.fetch()
+        self.assertEqual(len(few), len(many))
+
+    def test_unchanged_range_returns_not_modified(self):
+        appointment = self.book(9, 10)
+        response = self.fetch()
+        self.assertEqual(self.fetch(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        appointment.status = 'completed'
+        appointment.save()
+        self.assertEqual(self.fetch(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_client_and_vehicle_changes_refresh_the_range(self):
+        self.book(9, 10)
+        etag = self.fetch()['ETag']
+        self.client_record.last_name = 'Roy-Gagnon'
+        self.client_record.save()
+        response = self.fetch(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['extendedProps']['client'], 'Julie Roy-Gagnon')
+
+        etag = response['ETag']
+        self.vehicle.model = 'Transit Connect'
+        self.vehicle.save()
+        response = self.fetch(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()[0]['extendedProps']['vehicle'], '2021 Ford Transit Connect')
+
+
+class SchedulingTests(TestCase):
+    """Réservation des baies et techniciens sans collision"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_record = Client.objects.create(first_name='Paul', last_name='Côté', phone='514-555-0177')
+        cls.bays = [Resource.objects.create(name=f'Baie {number}', resource_type='bay') for number in range(1, 11)]
+        cls.monday = timezone.make_aware(datetime(2025, 3, 10))
+
+    def form(self, start_hour, end_hour, resources, status='scheduled'):
+        return AppointmentForm(data={
+            'title': 'Installation PPF',
+            'client': self.client_record.id,
+            'start_datetime': (self.monday + timedelta(hours=start_hour)).strftime('%Y-%m-%dT%H:%M'),
+            'end_datetime': (self.monday + timedelta(hours=end_hour)).strftime('%Y-%m-%dT%H:%M'),
+            'status': status,
+            'resources': [resource.id for resource in resources],
+        })
+
+    def test_form_rejects_double_booking(self):
+        first = self.form(9, 13, [self.bays[0]])
+        self.assertTrue(first.is_valid(), first.errors)
+        first.save()
+
+        overlapping = self.form(12, 15, [self.bays[0], self.bays[1]])
+        self.assertFalse(overlapping.is_valid())
+        self.assertIn('Baie 1', str(overlapping.errors['resources']))
+        self.assertNotIn('Baie 2', str(overlapping.errors['resources']))
+
+        self.assertTrue(self.form(13, 15, [self.bays[0]]).is_valid())
+        self.assertTrue(self.form(10, 12, [self.bays[1]]).is_valid())
+        self.assertTrue(self.form(10, 12, [self.bays[0]], status='cancelled').is_valid())
+
+    def test_admin_form_rejects_double_booking(self):
+        from django.contrib import admin
+        self.assertIs(admin.site._registry[Appointment].form, AppointmentAdminForm)
+        first = self.form(9, 13, [self.bays[0]])
+        self.assertTrue(first.is_valid(), first.errors)
+        first.save()
+
+        overlapping = AppointmentAdminForm(data={
+            'title': 'Pose de film',
+            'client': self.client_record.id,
+            'start_datetime': (self.monday + timedelta(hours=12)).strftime('%Y-%m-%d %H:%M'),
+            'end_datetime': (self.monday + timedelta(hours=15)).strftime('%Y-%m-%d %H:%M'),
+            'status': 'confirmed',
+            'resources': [self.bays[0].id],
+        })
+        self.assertFalse(overlapping.is_valid())
+        self.assertIn('Baie 1', str(overlapping.errors['resources']))
+
+    def test_week_validation_stress(self):
+        # 10 baies x 6 jours x 50 créneaux de 12 minutes = 3000 rendez-vous sans collision
+        slots = [
+            (bay, self.monday + timedelta(days=day, hours=7, minutes=12 * slot))
+            for day in range(6) for slot in range(50) for bay in self.bays
+        ]
+        # 3 doubles réservations injectées sur des créneaux existants
+        overlaps = [(self.bays[3], self.monday + timedelta(hours=7)) for _ in range(2)]
+        overlaps.append((self.bays[7], self.monday + timedelta(days=2, hours=9, minutes=24)))
+        bookings = slots + overlaps
+        appointments = Appointment.objects.bulk_create([
+            Appointment(title='Esthétique', client=self.client_record, start_datetime=start,
+                        end_datetime=start + timedelta(minutes=12))
+            for _, start in bookings
+        ])
+        Appointment.resources.through.objects.bulk_create([
+            Appointment.resources.through(appointment=appointment, resource=bay)
+            for appointment, (bay, _) in zip(appointments, bookings)
+        ])
+
+        with self.assertNumQueries(1):
+            result = validate_week(self.monday.date())
+        self.assertEqual(result['total'], len(bookings))
+        self.assertEqual(len(result['conflicts']), 3)
+
+        with self.assertNumQueries(1):
+            schedule = ResourceSchedule.load(self.monday, self.monday + timedelta(days=7))
+        for appointment, (bay, start) in zip(appointments[::97], bookings[::97]):
+            expected = sorted(
+                other.id for other, (other_bay, other_start) in zip(appointments, bookings)
+                if other_bay == bay and other.id != appointment.id
+                and other_start < start + timedelta(minutes=12) and start < other_start + timedelta(minutes=12)
+            )
+            self.assertEqual(
+                schedule.conflicts(bay.id, start, start + timedelta(minutes=12), exclude=appointment.id), expected
+            )
+
+
+class FreeSlotTests(TestCase):
+    """Recherche des premières plages libres"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('accueil', password='test')
+        cls.client_record = Client.objects.create(first_name='Anne', last_name='Morin', phone='514-555-0133')
+        cls.bay_1 = Resource.objects.create(name='Baie 1', resource_type='bay')
+        cls.bay_2 = Resource.objects.create(name='Baie 2', resource_type='bay')
+        cls.installer = Resource.objects.create(name='Marc', resource_type='technician')
+        cls.monday = timezone.make_aware(datetime(2025, 3, 10))
+
+    def book(self, resources, start_hour, end_hour, day=0):
+        start = self.monday + timedelta(days=day, hours=start_hour)
+        appointment = Appointment.objects.create(
+            title='PPF', client=self.client_record, start_datetime=start,
+            end_datetime=start + timedelta(hours=end_hour - start_hour)
+        )
+        appointment.resources.set(resources)
+        return appointment
+
+    def slots(self, hours, **kwargs):
+        kwargs.setdefault('resource_type', 'bay')
+        return find_free_slots(
+            timedelta(hours=hours), self.monday.date(), self.monday.date() + timedelta(days=6),
+            now=self.monday, limit=2, **kwargs
+        )
+
+    def test_earliest_slot_on_any_bay(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book([self.bay_1], 8, 12)
+            self.book([self.bay_2], 8, 10)
+            self.book([self.bay_2], 13, 17.5)
+
+        slots = self.slots(4)
+        self.assertEqual([slot['start'] for slot in slots], [
+            self.monday + timedelta(hours=12), self.monday + timedelta(days=1, hours=8)
+        ])
+        self.assertEqual(slots[0]['resource_ids'], [self.bay_1.id])
+
+        # L'installateur est occupé de 12 h à 16 h : seule la baie 2 convient, de 10 h à 12 h
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book([self.installer], 12, 16)
+        slots = self.slots(2, resource_ids=[self.installer.id])
+        self.assertEqual(slots[0]['start'], self.monday + timedelta(hours=10))
+        self.assertEqual(slots[0]['resource_ids'], [self.installer.id, self.bay_2.id])
+        self.assertEqual(self.slots(3, resource_ids=[self.installer.id])[0]['start'],
+                         self.monday + timedelta(days=1, hours=8))
+
+    def test_busy_intervals_are_cached_until_an_appointment_changes(self):
+        self.slots(4, resource_ids=[self.bay_1.id], resource_type=None)
+        with self.assertNumQueries(0):
+            first = self.slots(4, resource_ids=[self.bay_1.id], resource_type=None)
+        self.assertEqual(first[0]['start'], self.monday + timedelta(hours=8))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book([self.bay_1], 8, 11)
+        self.assertEqual(
+            self.slots(4, resource_ids=[self.bay_1.id], resource_type=None)[0]['start'],
+            self.monday + timedelta(hours=11)
+        )
+
+    def test_api_uses_service_durations(self):
+        service = Service.objects.create(name='PPF complet', default_price=Decimal('1800.00'), standard_duration=240)
+        self.client.force_login(self.user)
+        monday = timezone.localdate() + timedelta(days=7 - timezone.localdate().weekday())
+        response = self.client.get(reverse('garage_app:appointment_slots_api'), {
+            'services': str(service.id), 'start': monday.isoformat(), 'end': monday.isoformat(), 'limit': 1,
+        })
+        result = response.json()
+        self.assertTrue(result['success'], result.get('message'))
+        self.assertEqual(result['duration_minutes'], 240)
+        self.assertEqual(result['slots'][0]['resources'], [{'id': self.bay_1.id, 'name': 'Baie 1'}])
+        self.assertTrue(result['slots'][0]['start'].startswith(f'{monday.isoformat()}T08:00'))
+
+
+class AppointmentReminderTests(TestCase):
+    """Rappels de la veille déposés en lot dans la boîte d'envoi"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.with_email = Client.objects.create(
+            first_name='Sophie', last_name='Lavoie', phone='514-555-0111', email='sophie@example.com'
+        )
+        cls.phone_only = Client.objects.create(first_name='Marc', last_name='Bouchard', phone='514-555-0122')
+        cls.window = reminder_window(today=date(2025, 3, 9))
+
+    def book(self, count, hour=9, **fields):
+        fields.setdefault('client', self.with_email)
+        return Appointment.objects.bulk_create([
+            Appointment(title='Teintage', start_datetime=self.window[0] + timedelta(hours=hour, minutes=index),
+                        end_datetime=self.window[0] + timedelta(hours=hour + 1, minutes=index), **fields)
+            for index in range(count)
+        ])
+
+    def test_dispatch_is_constant_in_queries_and_idempotent(self):
+        self.book(2)
+        self.book(1, client=self.phone_only)
+        self.book(1, status='cancelled')
+        self.book(1, hour=30)  # Surlendemain : hors fenêtre
+
+        with CaptureQueriesContext(connection) as few:
+            summary = dispatch_reminders(*self.window)
+        self.assertEqual(summary, {'selected': 3, 'email': 2, 'phone': 1, 'skipped': 0})
+        message = OutboxMessage.objects.get(channel='phone')
+        self.assertEqual(message.recipient, '514-555-0122')
+        self.assertIn('Bonjour Marc', message.body)
+        self.assertIn('10/03/2025 à 09:00', message.subject)
+
+        self.assertEqual(dispatch_reminders(*self.window)['selected'], 0)
+        self.assertEqual(AppointmentReminder.objects.count(), 3)
+
+        # 100 rendez-vous : sous la limite de paramètres d'un lot SQLite
+        self.book(100, hour=12)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(dispatch_reminders(*self.window)['email'], 100)
+        self.assertEqual(len(few), len(many))
+
+
+class CalendarFeedTests(TestCase):
+    """Abonnement iCalendar des techniciens"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.technician = User.objects.create_user('installateur', password='test')
+        cls.resource = Resource.objects.create(name='Marc', resource_type='technician', user=cls.technician)
+        cls.client_record = Client.objects.create(first_name='Éric', last_name='Fortin', phone='514-555-0155')
+        cls.vehicle = Vehicle.objects.create(client=cls.client_record, make='Tesla', model='Model Y', year=2024)
+        start = timezone.now().replace(microsecond=0) + timedelta(days=2)
+        cls.mine = Appointment.objects.create(
+            title='PPF capot; ailes, pare-chocs', client=cls.client_record, vehicle=cls.vehicle,
+            start_datetime=start, end_datetime=start + timedelta(hours=4), description='Ligne 1\nLigne 2 ' + 'x' * 120,
+        )
+        cls.mine.resources.add(cls.resource)
+        cls.other = Appointment.objects.create(
+            title='Teintage', client=cls.client_record, start_datetime=start, end_datetime=start + timedelta(hours=1)
+        )
+        cls.feed = CalendarFeedToken.objects.create(user=cls.technician)
+
+    def url(self, token=None):
+        return reverse('garage_app:appointment_ics_feed', args=[token or self.feed.token])
+
+    def test_feed_streams_the_technician_appointments(self):
+        response = self.client.get(self.url())
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = b''.join(response.streaming_content).decode('utf-8')
+
+        self.assertIn(f'UID:appointment-{self.mine.id}@', body)
+        self.assertNotIn(f'UID:appointment-{self.other.id}@', body)
+        self.assertIn('SUMMARY:PPF capot\\; ailes\\, pare-chocs - Éric Fortin', body)
+        self.assertTrue(all(len(line.encode('utf-8')) <= 75 for line in body.split('\r\n')))
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+
+        self.assertEqual(self.client.get(self.url('inconnu')).status_code, 404)
+
+    def test_unchanged_feed_returns_not_modified(self):
+        response = self.client.get(self.url())
+        b''.join(response.streaming_content)
+        self.assertEqual(
+            self.client.get(self.url(), HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304
+        )
+
+        self.mine.updated_at = self.mine.updated_at + timedelta(seconds=5)
+        Appointment.objects.filter(id=self.mine.id).update(updated_at=self.mine.updated_at)
+        self.assertEqual(
+            self.client.get(self.url(), HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 200
+        )
+
+
+    def test_client_vehicle_and_resource_changes_refresh_the_feed(self):
+        def etag():
+            response = self.client.get(self.url())
+            b''.join(response.streaming_content)
+            return response['ETag']
+
+        current = etag()
+        self.assertEqual(self.client.get(self.url(), HTTP_IF_NONE_MATCH=current).status_code, 304)
+
+        self.client_record.last_name = 'Fortin-Lavoie'
+        self.client_record.save()
+        self.assertEqual(self.client.get(self.url(), HTTP_IF_NONE_MATCH=current).status_code, 200)
+
+        current = etag()
+        self.vehicle.model = 'Model 3'
+        self.vehicle.save()
+        self.assertEqual(self.client.get(self.url(), HTTP_IF_NONE_MATCH=current).status_code, 200)
+
+        # Ajouter un second technicien : le nombre de rendez-vous du flux ne change pas
+        current = etag()
+        helper = Resource.objects.create(name='Julie', resource_type='technician')
+        before = Appointment.objects.get(id=self.mine.id).updated_at
+        self.mine.resources.add(helper)
+        self.assertGreater(Appointment.objects.get(id=self.mine.id).updated_at, before)
+        self.assertEqual(self.client.get(self.url(), HTTP_IF_NONE_MATCH=current).status_code, 200)
+
+        before = Appointment.objects.get(id=self.mine.id).updated_at
+        helper.appointments.clear()
+        self.assertGreater(Appointment.objects.get(id=self.mine.id).updated_at, before)
+
+class AppointmentInvoicingTests(TestCase):
+    """Facturation en lot des rendez-vous terminés (fermeture de journée)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('fermeture', password='test')
+        cls.client_record = Client.objects.create(
+            first_name='Nadia', last_name='Roy', phone='514-555-0177', default_discount_percentage=Decimal('10.00')
+        )
+        cls.wash = Service.objects.create(name='Lavage', default_price=Decimal('80.00'))
+        cls.wax = Service.objects.create(name='Cirage', default_price=Decimal('120.00'))
+        cls.day = timezone.localdate()
+        cls.morning = timezone.make_aware(datetime.combine(cls.day, datetime.min.time())) + timedelta(hours=9)
+
+    def make_appointments(self, count, status='completed', start=None):
+        start = start or self.morning
+        appointments = []
+        for index in range(count):
+            appointment = Appointment.objects.create(
+                title=f'Entretien {index}', client=self.client_record, status=status,
+                start_datetime=start, end_datetime=start + timedelta(hours=1),
+            )
+            appointment.estimated_services.set([self.wash, self.wax])
+            appointments.append(appointment)
+        return appointments
+
+    def test_single_invoice_uses_service_prices(self):
+        appointment = self.make_appointments(1)[0]
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('garage_app:appointment_create_invoice', args=[appointment.id]))
+
+        appointment.refresh_from_db()
+        invoice = appointment.invoice
+        self.assertRedirects(response, reverse('garage_app:invoice_detail', args=[invoice.id]), fetch_redirect_response=False)
+        self.assertEqual(sorted(invoice.invoice_items.values_list('price', flat=True)), [Decimal('80.00'), Decimal('120.00')])
+        self.assertEqual(invoice.subtotal, Decimal('200.00'))
+        self.assertEqual(invoice.discount_percentage, Decimal('10.00'))
+        self.assertEqual(invoice.total_amount, Decimal('206.96'))
+        self.assertIsNone(appointment.create_invoice_from_appointment())
+
+    def test_close_day_invoices_only_completed_uninvoiced_appointments(self):
+        completed = self.make_appointments(2)
+        earlier = self.make_appointments(1, start=self.morning - timedelta(days=3))
+        self.make_appointments(1, status='confirmed')
+        self.make_appointments(1, start=self.morning + timedelta(days=1))
+
+        closed = Appointment.close_day(self.day)
+        self.assertEqual(sorted(a.id for a in closed), sorted(a.id for a in earlier + completed))
+        self.assertEqual(Invoice.objects.count(), 3)
+        self.assertEqual(InvoiceItem.objects.count(), 6)
+        self.assertEqual(Appointment.objects.filter(invoice__isnull=False).count(), 3)
+        self.assertEqual(Appointment.close_day(self.day), [])
+
+    def test_close_day_queries_do_not_grow_with_appointments(self):
+        self.make_appointments(2)
+        with CaptureQueriesContext(connection) as small_queries:
+            Appointment.close_day(self.day)
+        self.make_appointments(8)
+        with CaptureQueriesContext(connection) as large_queries:
+            Appointment.close_day(self.day)
+        self.assertEqual(len(small_queries), len(large_queries))
+        self.assertEqual(Invoice.objects.count(), 10)
+
+
+class ExpenseListTotalsTests(TestCase):
+    """Totaux et sous-totaux de la liste des dépenses calculés par la base"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('comptable', password='test')
+        today = date.today()
+        for amount, category in [('100.00', 'fuel'), ('50.00', 'fuel'), ('200.00', 'rent')]:
+            amount = Decimal(amount)
+            Expense.objects.create(
+                description=f'Dépense {category}', amount=amount, expense_date=today, category=category,
+                gst_amount=amount * Decimal('0.05'), qst_amount=(amount * Decimal('0.09975')).quantize(Decimal('0.01')),
+            )
+        Expense.objects.create(description='Archivée', amount=Decimal('999.00'), expense_date=today, archived_fiscal_year=2020)
+
+    def test_totals_and_category_subtotals(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('garage_app:expense_list'))
+        self.assertEqual(response.context['total_expenses'], 3)
+        self.assertEqual(response.context['total_amount'], Decimal('350.00'))
+        self.assertEqual(response.context['total_gst'], Decimal('17.50'))
+        self.assertEqual(
+            response.context['total_with_taxes'],
+            sum(expense.total_with_taxes for expense in Expense.objects.filter(archived_fiscal_year__isnull=True)),
+        )
+        self.assertEqual(
+            [(row['category'], row['count'], row['amount']) for row in response.context['category_totals']],
+            [('rent', 1, Decimal('200.00')), ('fuel', 2, Decimal('150.00'))],
+        )
+
+        filtered = self.client.get(reverse('garage_app:expense_list'), {'category': 'fuel'})
+        self.assertEqual(filtered.context['total_amount'], Decimal('150.00'))
+        self.assertEqual(len(filtered.context['category_totals']), 1)
+
+    def test_queries_do_not_grow_with_expenses(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(reverse('garage_app:expense_list'))
+        Expense.objects.bulk_create([
+            Expense(description=f'Lot {index}', amount=Decimal('10.00'), expense_date=date.today())
+            for index in range(40)
+        ])
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(reverse('garage_app:expense_list'))
+        self.assertEqual(len(before), len(after))
+
+
+class RecurringExpenseCatchUpTests(TestCase):
+    """Rattrapage en lot des échéances manquées des dépenses récurrentes"""
+
+    def make_recurring(self, name, frequency, next_due_date, end_date=None):
+        return RecurringExpense.objects.create(
+            name=name, description=name, amount=Decimal('1200.00'), frequency=frequency,
+            start_date=next_due_date, next_due_date=next_due_date, end_date=end_date,
+            gst_amount=Decimal('60.00'), qst_amount=Decimal('119.70'),
+        )
+
+    def test_creates_every_missed_occurrence_up_to_target(self):
+        rent = self.make_recurring('Loyer', 'monthly', date(2026, 1, 1))
+        insurance = self.make_recurring('Assurance', 'weekly', date(2026, 3, 1), end_date=date(2026, 3, 20))
+        self.make_recurring('Taxes foncières', 'yearly', date(2026, 6, 1))
+
+        created = RecurringExpense.materialize_due(date(2026, 4, 15))
+        self.assertEqual(
+            list(rent.generated_expenses.order_by('expense_date').values_list('expense_date', flat=True)),
+            [date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1), date(2026, 4, 1)],
+        )
+        self.assertEqual(insurance.generated_expenses.count(), 3)
+        self.assertEqual(len(created), 7)
+
+        rent.refresh_from_db()
+        insurance.refresh_from_db()
+        self.assertEqual(rent.next_due_date, date(2026, 5, 1))
+        self.assertEqual(insurance.next_due_date, date(2026, 3, 22))
+
+        # Une seconde exécution ne crée rien
+        self.assertEqual(RecurringExpense.materialize_due(date(2026, 4, 15)), [])
+        self.assertEqual(Expense.objects.count(), 7)
+
+    def test_queries_do_not_grow_with_missed_occurrences(self):
+        self.make_recurring('Café', 'daily', date(2026, 1, 1))
+        with CaptureQueriesContext(connection) as few:
+            RecurringExpense.materialize_due(date(2026, 1, 5))
+        self.make_recurring('Journal', 'daily', date(2026, 1, 6))
+        with CaptureQueriesContext(connection) as many:
+            RecurringExpense.materialize_due(date(2026, 1, 25))
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(Expense.objects.count(), 5 + 20 + 20)
+
+
+class CashflowForecastTests(TestCase):
+    """Prévision de trésorerie vectorisée et mise en cache"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tresorerie', password='test')
+        cls.client_record = Client.objects.create(first_name='Hugo', last_name='Bélanger', phone='514-555-0144')
+        cls.today = date(2026, 3, 2)
+
+    def make_recurring(self, frequency, next_due_date, amount='100.00', end_date=None):
+        return RecurringExpense.objects.create(
+            name=f'Dépense {frequency}', description=frequency, amount=Decimal(amount), frequency=frequency,
+            start_date=next_due_date, next_due_date=next_due_date, end_date=end_date,
+        )
+
+    def test_month_schedules_match_materialized_due_dates(self):
+        recurring = self.make_recurring('monthly', date(2026, 1, 31), end_date=date(2026, 11, 15))
+        _, dates = expand_month_schedules(
+            np.array([recurring.next_due_date], dtype='datetime64[D]'), np.array([1]),
+            np.array([recurring.end_date], dtype='datetime64[D]'),
+        )
+        self.assertEqual(dates.astype(object).tolist(), recurring.due_dates(date(2026, 12, 31)))
+
+    def test_daily_buckets(self):
+        start = timezone.make_aware(datetime.combine(self.today, datetime.min.time()))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_recurring('weekly', self.today + timedelta(days=2), amount='50.00', end_date=self.today + timedelta(days=10))
+            self.make_recurring('quarterly', self.today - timedelta(days=3), amount='1000.00')
+            overdue = Invoice.objects.create(
+                client=self.client_record, status='sent', invoice_date=self.today - timedelta(days=40),
+                total_amount=Decimal('500.00'),
+            )
+            Payment.objects.create(invoice=overdue, amount=Decimal('100.00'), payment_date=self.today)
+            Invoice.objects.create(
+                client=self.client_record, status='sent', invoice_date=self.today - timedelta(days=10),
+                total_amount=Decimal('250.00'),
+            )
+            Invoice.objects.create(
+                client=self.client_record, status='draft', invoice_date=self.today, total_amount=Decimal('999.00'),
+            )
+            Appointment.objects.create(
+                title='Teintage', client=self.client_record, estimated_price=Decimal('300.00'),
+                start_datetime=start + timedelta(days=1, hours=23, minutes=30),
+                end_datetime=start + timedelta(days=2, hours=1),
+            )
+
+        forecast = compute_cashflow_forecast(30, today=self.today)
+        self.assertEqual(len(forecast['dates']), 30)
+        self.assertEqual(forecast['inflows'][0], 400.0)
+        self.assertEqual(forecast['invoice_inflows'][20], 250.0)
+        self.assertEqual(forecast['appointment_inflows'][1], 300.0)
+        # Échéance trimestrielle manquée ramenée à aujourd'hui, hebdomadaire jusqu'à la date de fin
+        self.assertEqual(forecast['outflows'][0], 1000.0)
+        self.assertEqual([day for day, amount in enumerate(forecast['outflows']) if amount == 50.0], [2, 9])
+        self.assertEqual(forecast['totals']['net'], 400.0 + 250.0 + 300.0 - 1000.0 - 100.0)
+        self.assertEqual(forecast['cumulative'][-1], forecast['totals']['net'])
+
+    def test_forecast_is_cached_until_data_changes(self):
+        compute_cashflow_forecast(365, today=self.today)
+        with self.assertNumQueries(0):
+            compute_cashflow_forecast(365, today=self.today)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_recurring('yearly', self.today + timedelta(days=100), amount='2000.00')
+        self.assertEqual(compute_cashflow_forecast(365, today=self.today)['outflows'][100], 2000.0)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('garage_app:cashflow_forecast_api'), {'days': 45})
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(len(response.json()['net']), 45)
+        self.assertEqual(self.client.get(reverse('garage_app:reports_cashflow')).status_code, 200)
+
+    def test_benchmark_leaves_the_application_cache_untouched(self):
+        from django.core.cache import cache
+        from .utils.benchmarks import run_benchmark
+        from .utils.cashflow import cashflow_version
+
+        version = cashflow_version.current_version()
+        before = compute_cashflow_forecast(365)
+        run_benchmark('cashflow', size=20, repeat=1)
+
+        self.assertEqual(cache.get(cashflow_version.version_key), version)
+        with self.assertNumQueries(0):
+            self.assertEqual(compute_cashflow_forecast(365), before)
+
+
+class InventoryForecastTests(TestCase):
+    """Taux d'écoulement, jours de couverture et point de réapprovisionnement suggéré"""
+
+    def test_kernel(self):
+        result = forecast_kernel(
+            stock=[30, 10, 5],
+            history=[[2, 2, 2, 2], [1, 3, 1, 3], [0, 0, 0, 0]],
+            upcoming=[0, 90, 0],
+            horizon_days=30,
+            lead_time_days=4,
+        )
+        # Le rythme retenu est le plus élevé entre l'historique et les rendez-vous à venir
+        np.testing.assert_allclose(result['burn_rate'], [2, 3, 0])
+        np.testing.assert_allclose(result['days_of_cover'][:2], [15, 10 / 3])
+        self.assertTrue(np.isinf(result['days_of_cover'][2]))
+        np.testing.assert_allclose(result['safety_stock'], [0, 1.65 * 1 * 2, 0])
+        np.testing.assert_allclose(result['reorder_point'], [8, 12 + 3.3, 0])
+
+    def test_command_applies_suggested_reorder_points(self):
+        today = timezone.localdate()
+        client = Client.objects.create(first_name='Paul', last_name='Côté', phone='514-555-0155')
+        item = InventoryItem.objects.create(
+            name='Film teinté 35 %', sku='FILM-35', quantity_in_stock=Decimal('12'),
+            unit_cost=Decimal('40.00'), unit_price=Decimal('90.00'),
+        )
+        idle = InventoryItem.objects.create(
+            name='Raclette', sku='RACL-01', quantity_in_stock=Decimal('4'),
+            unit_cost=Decimal('3.00'), unit_price=Decimal('8.00'),
+        )
+        invoices = Invoice.objects.bulk_create([
+            Invoice(invoice_number=f'INV-T-{day:03d}', client=client, status='paid',
+                    invoice_date=today - timedelta(days=day))
+            for day in range(1, 19)
+        ])
+        # Lignes écrites en lot : pas de mouvement de stock, seul l'historique compte
+        InvoiceItem.objects.bulk_create([
+            InvoiceItem(invoice=invoice, item_type='inventory', inventory_item=item, price=Decimal('90.00'))
+            for invoice in invoices
+        ])
+
+        forecast = compute_inventory_forecast(today=today)
+        self.assertAlmostEqual(forecast[item.id]['burn_rate'], 18 / 90, places=4)
+        self.assertAlmostEqual(forecast[item.id]['days_of_cover'], 60.0)
+        self.assertIsNone(forecast[idle.id]['days_of_cover'])
+
+        out = StringIO()
+        call_command('forecast_inventory', '--apply', stdout=out)
+        self.assertIn('Film teinté 35 %', out.getvalue())
+        self.assertIn('1 niveau(x)', out.getvalue())
+        item.refresh_from_db()
+        self.assertEqual(
+            item.reorder_level,
+            Decimal(str(forecast[item.id]['suggested_reorder_point'])).quantize(Decimal('0.0001')),
+        )
+
+
+class PurchaseSuggestionTests(TestCase):
+    """Bons de commande brouillons suggérés à partir des points de réapprovisionnement"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.supplier = Supplier.objects.create(name='Avery Dennison', category='materials')
+        cls.low = cls.make_item('Vinyle noir mat', 'VIN-NM', stock='2', reorder='5', supplier=cls.supplier)
+        cls.pending = cls.make_item('Vinyle blanc', 'VIN-BL', stock='1', reorder='5', supplier=cls.supplier)
+        cls.orphan = cls.make_item('Lame 30°', 'LAME-30', stock='0', reorder='2')
+        cls.make_item('Apprêt', 'APPR-01', stock='20', reorder='5', supplier=cls.supplier)
+
+        draft = StockReceipt.objects.create(
+            receipt_number='REC-EN-COURS', supplier=cls.supplier, receipt_date=date.today(), status='draft'
+        )
+        StockReceiptItem.objects.bulk_create([
+            StockReceiptItem(stock_receipt=draft, inventory_item=cls.pending, quantity=10, purchase_price=Decimal('8.00'))
+        ])
+
+    @classmethod
+    def make_item(cls, name, sku, stock, reorder, supplier=None):
+        return InventoryItem.objects.create(
+            name=name, sku=sku, supplier=supplier, quantity_in_stock=Decimal(stock), reorder_level=Decimal(reorder),
+            unit_cost=Decimal('10.00'), unit_price=Decimal('20.00'),
+        )
+
+    def test_suggestions_deduct_pending_quantities(self):
+        suggestions = build_purchase_suggestions(use_forecast=False)
+        self.assertEqual(len(suggestions['orders']), 1)
+        lines = suggestions['orders'][0]['lines']
+        self.assertEqual([(line['item'].id, line['quantity']) for line in lines], [(self.low.id, 4)])
+        self.assertEqual([line['item'].id for line in suggestions['unassigned']], [self.orphan.id])
+
+    def test_draft_orders_carry_taxes(self):
+        receipts = create_draft_purchase_orders(build_purchase_suggestions(use_forecast=False))
+        receipt = StockReceipt.objects.get(pk=receipts[0].pk)
+        self.assertEqual(receipt.subtotal, Decimal('40.00'))
+        self.assertEqual(receipt.gst_amount, Decimal('2.00'))
+        self.assertEqual(receipt.qst_amount, Decimal('3.99'))
+        self.assertEqual(receipt.total_amount, Decimal('45.99'))
+
+        # Le recalcul du modèle donne le même total
+        receipt.calculate_totals()
+        self.assertEqual(receipt.total_amount, Decimal('45.99'))
+
+    def test_check_stock_alerts_can_create_orders(self):
+        out = StringIO()
+        call_command('check_stock_alerts', '--suggest-orders', stdout=out)
+        self.assertEqual(StockReceipt.objects.filter(status='draft').count(), 1)
+
+        call_command('check_stock_alerts', '--create-orders', stdout=out)
+        self.assertEqual(StockReceipt.objects.filter(status='draft').count(), 2)
+        self.assertIn('bon(s) de commande brouillon(s) créé(s)', out.getvalue())
+
+
+class StockReceiptProcessingTests(TestCase):
+    """Lignes de bon de réception en lot, traitement du bon et transitions des alertes de stock"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.supplier = Supplier.objects.create(name='3M Canada', category='materials')
+
+    def setUp(self):
+        self.item = InventoryItem.objects.create(
+            name='Vinyle coulé noir', sku='3M-1080-BK', supplier=self.supplier,
+            quantity_in_stock=Decimal('1'), minimum_stock_level=Decimal('2'), reorder_level=Decimal('5'),
+            unit_cost=Decimal('10.00'), unit_price=Decimal('25.00'),
+        )
+        self.other = InventoryItem.objects.create(
+            name='Laminé lustré', sku='3M-8518', supplier=self.supplier,
+            quantity_in_stock=Decimal('20'), minimum_stock_level=Decimal('2'), reorder_level=Decimal('5'),
+            unit_cost=Decimal('4.00'), unit_price=Decimal('9.00'),
+        )
+        self.receipt = StockReceipt.objects.create(
+            receipt_number='REC-3M-001', supplier=self.supplier, receipt_date=date(2026, 3, 2), status='received'
+        )
+
+    def active_alerts(self, item):
+        return set(StockAlert.objects.filter(inventory_item=item, status='active').values_list('alert_type', flat=True))
+
+    def test_save_items_writes_lines_and_totals_once(self):
+        kept = StockReceiptItem(inventory_item=self.item, quantity=10, purchase_price=Decimal('8.00'))
+        dropped = StockReceiptItem(inventory_item=self.other, quantity=5, purchase_price=Decimal('3.00'))
+        self.receipt.save_items(new_items=[kept, dropped])
+        self.assertEqual(self.receipt.receipt_items.count(), 2)
+        self.assertEqual(self.receipt.subtotal, Decimal('95.00'))
+
+        kept.quantity = 12
+        added = StockReceiptItem(inventory_item=self.other, quantity=2, purchase_price=Decimal('3.50'))
+        self.receipt.save_items(new_items=[added], changed_items=[kept], deleted_items=[dropped])
+
+        receipt = StockReceipt.objects.get(pk=self.receipt.pk)
+        self.assertEqual(
+            sorted(receipt.receipt_items.values_list('quantity', 'purchase_price')),
+            [(2, Decimal('3.50')), (12, Decimal('8.00'))],
+        )
+        self.assertEqual(receipt.subtotal, Decimal('103.00'))
+        self.assertEqual(receipt.total_amount, receipt.subtotal + receipt.gst_amount + receipt.qst_amount)
+
+    def test_process_receipt_posts_stock_and_expense(self):
+        self.assertEqual(self.active_alerts(self.item), {'reorder', 'low_stock'})
+        self.receipt.save_items(new_items=[
+            StockReceiptItem(inventory_item=self.item, quantity=10, purchase_price=Decimal('8.00')),
+            StockReceiptItem(inventory_item=self.other, quantity=4, purchase_price=Decimal('4.00')),
+        ])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(self.receipt.process_receipt())
+
+        self.item.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.item.quantity_in_stock, Decimal('11'))
+        self.assertEqual(self.other.quantity_in_stock, Decimal('24'))
+        self.assertEqual(
+            StockMovement.objects.filter(stock_receipt_item__stock_receipt=self.receipt, movement_type='receipt').count(), 2
+        )
+
+        receipt = StockReceipt.objects.get(pk=self.receipt.pk)
+        self.assertEqual(receipt.status, 'processed')
+        self.assertEqual(receipt.expense.amount, receipt.subtotal)
+        self.assertEqual(receipt.expense.category, 'inventory')
+
+        # Les alertes du réapprovisionnement sont résolues, et un second traitement est refusé
+        self.assertEqual(self.active_alerts(self.item), set())
+        self.assertFalse(receipt.process_receipt())
+        self.assertEqual(Expense.objects.filter(supplier=self.supplier).count(), 1)
+
+    def test_alert_history_is_kept_across_transitions(self):
+        for quantity in ('10', '1', '10'):
+            self.item.quantity_in_stock = Decimal(quantity)
+            self.item.save()
+
+        alerts = StockAlert.objects.filter(inventory_item=self.item)
+        self.assertEqual(self.active_alerts(self.item), set())
+        self.assertEqual(
+            sorted(alerts.filter(status='resolved').values_list('alert_type', flat=True)),
+            ['low_stock', 'low_stock', 'reorder', 'reorder'],
+        )
+
+        # Une nouvelle baisse ouvre une seule alerte active par type, à côté de l'historique
+        self.item.quantity_in_stock = Decimal('0')
+        self.item.save()
+        self.assertEqual(self.active_alerts(self.item), {'reorder', 'low_stock', 'out_of_stock'})
+        self.assertEqual(alerts.filter(status='resolved').count(), 4)
+
+
+class SupplierImportTests(TestCase):
+    """Importation en continu des bordereaux fournisseurs"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.supplier = Supplier.objects.create(name='Oracal', category='materials')
+        cls.black = InventoryItem.objects.create(
+            name='Vinyle 751 noir', sku='ORA-751-070', barcode='4011234567890', supplier=cls.supplier,
+            quantity_in_stock=Decimal('0'), unit_cost=Decimal('6.00'), unit_price=Decimal('14.00'),
+        )
+        cls.white = InventoryItem.objects.create(
+            name='Vinyle 751 blanc', sku='ORA-751-010', supplier=cls.supplier,
+            quantity_in_stock=Decimal('0'), unit_cost=Decimal('5.50'), unit_price=Decimal('13.00'),
+        )
+
+    CSV = (
+        'SKU;Quantité;Prix\n'
+        ' ora-751-070 ;2;6,25\n'
+        'ORA-751-010;3;\n'
+        'INCONNU-1;1;4,00\n'
+        '4011234567890;1;6,40\n'
+        'ORA-751-010;1,5;5,00\n'
+        ';1;1,00\n'
+        'INCONNU-2;2;4,00\n'
+    )
+
+    def setUp(self):
+        # L'index des codes est partagé par le processus : repartir des articles de ce test
+        sku_index.reset()
+
+    def run_import(self, chunk_size):
+        return import_supplier_csv(StringIO(self.CSV), self.supplier, mode='delivery', chunk_size=chunk_size)
+
+    def test_delivery_creates_one_aggregated_receipt(self):
+        report = self.run_import(chunk_size=1000)
+        receipt = report['receipt']
+        self.assertEqual(report['receipt_lines'], 2)
+        self.assertEqual(receipt.status, 'draft')
+        lines = dict(receipt.receipt_items.values_list('inventory_item_id', 'quantity'))
+        # Le code-barres et le SKU en minuscules désignent le même article
+        self.assertEqual(lines, {self.black.id: 3, self.white.id: 3})
+        prices = dict(receipt.receipt_items.values_list('inventory_item_id', 'purchase_price'))
+        # Prix pondéré par les quantités; sans prix, le coût actuel de l'article sert de prix d'achat
+        self.assertEqual(prices, {self.black.id: Decimal('6.30'), self.white.id: Decimal('5.50')})
+        self.assertEqual(receipt.subtotal, Decimal('35.40'))
+
+    def test_rows_with_and_without_price_are_weighted(self):
+        csv = 'SKU;Quantité;Prix\nORA-751-010;2;\nORA-751-010;2;6,50\n'
+        receipt = import_supplier_csv(StringIO(csv), self.supplier, mode='delivery')['receipt']
+        line = receipt.receipt_items.get()
+        self.assertEqual((line.quantity, line.purchase_price), (4, Decimal('6.00')))
+
+    def test_unmatched_and_invalid_rows_are_reported(self):
+        report = self.run_import(chunk_size=1000)
+        self.assertEqual(report['rows'], 7)
+        self.assertEqual(report['matched'], 3)
+        self.assertEqual(report['unmatched_skus'], ['INCONNU-1', 'INCONNU-2'])
+        self.assertEqual(report['unmatched_count'], 2)
+        self.assertEqual([line for line, _ in report['invalid_rows']], [6, 7])
+        self.assertEqual(report['prices_updated'], 0)
+
+    def test_chunk_size_does_not_change_the_result(self):
+        whole = self.run_import(chunk_size=1000)
+        chunked = self.run_import(chunk_size=2)
+        for key in ('rows', 'matched', 'unmatched_skus', 'invalid_rows', 'receipt_lines'):
+            self.assertEqual(whole[key], chunked[key])
+        self.assertEqual(
+            sorted(whole['receipt'].receipt_items.values_list('inventory_item_id', 'quantity', 'purchase_price')),
+            sorted(chunked['receipt'].receipt_items.values_list('inventory_item_id', 'quantity', 'purchase_price')),
+        )
+
+
+class InventoryValuationTests(TestCase):
+    """Coût moyen pondéré et PEPS, soldes d'ouverture et évaluation du stock à une date"""
+
+    def make_item(self, sku, costing_method='average', quantity='0', unit_cost='0.00'):
+        return InventoryItem.objects.create(
+            name=f'Article {sku}', sku=sku, costing_method=costing_method, quantity_in_stock=Decimal(quantity),
+            unit_cost=Decimal(unit_cost), unit_price=Decimal('30.00'), category='materials',
+        )
+
+    def post(self, *entries, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return post_stock_movements(entries, **kwargs)
+
+    def sales_costs(self, item):
+        return list(
+            StockMovement.objects.filter(inventory_item=item, movement_type='sale')
+            .order_by('movement_date', 'id').values_list('total_cost', flat=True)
+        )
+
+    def test_fifo_and_average_cost_of_goods_sold(self):
+        average = self.make_item('MOY-01')
+        fifo = self.make_item('PEPS-01', costing_method='fifo')
+        for item in (average, fifo):
+            self.post(
+                stock_entry(item.pk, 'receipt', 10, unit_cost=Decimal('2.00'), movement_date=date(2026, 1, 5)),
+                stock_entry(item.pk, 'sale', -4, movement_date=date(2026, 1, 6)),
+                stock_entry(item.pk, 'receipt', 10, unit_cost=Decimal('5.00'), movement_date=date(2026, 1, 7)),
+                stock_entry(item.pk, 'sale', -8, movement_date=date(2026, 1, 8)),
+            )
+
+        # Coût moyen : 16 unités pour 62 $ au moment de la seconde vente
+        self.assertEqual(self.sales_costs(average), [Decimal('-8.0000'), Decimal('-31.0000')])
+        # PEPS : 6 unités à 2 $ puis 2 unités à 5 $
+        self.assertEqual(self.sales_costs(fifo), [Decimal('-8.0000'), Decimal('-22.0000')])
+
+        average.refresh_from_db()
+        fifo.refresh_from_db()
+        self.assertEqual((average.quantity_in_stock, average.unit_cost), (Decimal('8'), Decimal('3.88')))
+        self.assertEqual((fifo.quantity_in_stock, fifo.unit_cost), (Decimal('8'), Decimal('5.00')))
+        self.assertEqual(
+            list(CostLayer.objects.filter(inventory_item=fifo).values_list('quantity_remaining', flat=True)),
+            [Decimal('0'), Decimal('8')],
+        )
+
+    def test_consumption_into_negative_stock(self):
+        item = self.make_item('PEPS-NEG', costing_method='fifo')
+        self.post(
+            stock_entry(item.pk, 'receipt', 5, unit_cost=Decimal('4.00'), movement_date=date(2026, 2, 2)),
+            stock_entry(item.pk, 'consumption', -8, movement_date=date(2026, 2, 3)),
+        )
+        consumption = StockMovement.objects.get(inventory_item=item, movement_type='consumption')
+        # Les 3 unités non couvertes par les couches sortent au coût courant
+        self.assertEqual(consumption.total_cost, Decimal('-32.0000'))
+        self.assertEqual((consumption.balance_quantity, consumption.balance_value), (Decimal('-3'), Decimal('-12')))
+
+        # La réception suivante régularise le stock négatif à son coût
+        self.post(stock_entry(item.pk, 'receipt', 10, unit_cost=Decimal('6.00'), movement_date=date(2026, 2, 4)))
+        receipt = StockMovement.objects.filter(inventory_item=item, movement_type='receipt').latest('id')
+        self.assertEqual((receipt.balance_quantity, receipt.balance_value), (Decimal('7'), Decimal('42')))
+        self.assertEqual(CostLayer.objects.get(stock_receipt_item=None, unit_cost=Decimal('6.00')).quantity_remaining, 7)
+        item.refresh_from_db()
+        self.assertEqual((item.quantity_in_stock, item.unit_cost), (Decimal('7'), Decimal('6.00')))
+
+    def test_opening_balance_and_adjustment_from_reconcile(self):
+        item = self.make_item('OUV-01', quantity='12', unit_cost='3.00')
+        self.post(items=InventoryItem.objects.filter(pk=item.pk))
+        opening = StockMovement.objects.get(inventory_item=item)
+        self.assertEqual(opening.movement_type, 'opening')
+        self.assertEqual((opening.quantity, opening.balance_value), (Decimal('12'), Decimal('36')))
+        self.assertEqual(CostLayer.objects.get(inventory_item=item).quantity_remaining, 12)
+
+        # Une quantité modifiée hors du moteur donne un ajustement au coût courant
+        InventoryItem.objects.filter(pk=item.pk).update(quantity_in_stock=Decimal('10'))
+        self.post(items=InventoryItem.objects.filter(pk=item.pk))
+        adjustment = StockMovement.objects.filter(inventory_item=item).latest('id')
+        self.assertEqual(adjustment.movement_type, 'adjustment')
+        self.assertEqual((adjustment.quantity, adjustment.total_cost), (Decimal('-2'), Decimal('-6')))
+        self.assertEqual(adjustment.balance_value, Decimal('30'))
+
+    def test_valuation_as_of_several_dates(self):
+        item = self.make_item('EVAL-01')
+        other = self.make_item('EVAL-02', costing_method='fifo')
+        self.post(
+            stock_entry(item.pk, 'receipt', 10, unit_cost=Decimal('2.00'), movement_date=date(2026, 3, 2)),
+            stock_entry(other.pk, 'receipt', 4, unit_cost=Decimal('10.00'), movement_date=date(2026, 3, 3)),
+            stock_entry(item.pk, 'receipt', 10, unit_cost=Decimal('4.00'), movement_date=date(2026, 3, 9)),
+            stock_entry(item.pk, 'sale', -5, movement_date=date(2026, 3, 10)),
+        )
+
+        expected = {
+            date(2026, 3, 1): Decimal('0'),
+            date(2026, 3, 2): Decimal('20'),
+            date(2026, 3, 5): Decimal('60'),
+            date(2026, 3, 9): Decimal('100'),
+            date(2026, 3, 31): Decimal('85'),
+        }
+        for as_of, total in expected.items():
+            with self.assertNumQueries(1):
+                valuation = inventory_valuation_as_of(as_of)
+            self.assertEqual(valuation['total_value'], total, as_of)
+
+        valuation = inventory_valuation_as_of(date(2026, 3, 31))
+        rows = {row['sku']: row for row in valuation['rows']}
+        self.assertEqual(rows['EVAL-01']['balance_quantity'], Decimal('15'))
+        self.assertEqual(rows['EVAL-01']['unit_cost'], Decimal('3.0000'))
+        self.assertEqual(valuation['by_category'], {'materials': Decimal('85')})
+
+    def test_backdated_receipt_keeps_its_date_and_rebases_later_balances(self):
+        item = self.make_item('RETARD-01')
+        self.post(
+            stock_entry(item.pk, 'receipt', 10, unit_cost=Decimal('2.00'), movement_date=date(2026, 4, 1)),
+            stock_entry(item.pk, 'sale', -4, movement_date=date(2026, 4, 10)),
+        )
+        # Réception du 5 avril saisie après la vente du 10
+        self.post(stock_entry(item.pk, 'receipt', 5, unit_cost=Decimal('3.20'), movement_date=date(2026, 4, 5)))
+
+        late = StockMovement.objects.filter(inventory_item=item, movement_type='receipt').latest('id')
+        self.assertEqual(late.movement_date, date(2026, 4, 5))
+        self.assertEqual((late.balance_quantity, late.balance_value), (Decimal('15'), Decimal('36')))
+        sale = StockMovement.objects.get(inventory_item=item, movement_type='sale')
+        self.assertEqual((sale.balance_quantity, sale.balance_value), (Decimal('11'), Decimal('28')))
+
+        self.assertEqual(inventory_valuation_as_of(date(2026, 4, 4))['total_value'], Decimal('20'))
+        self.assertEqual(inventory_valuation_as_of(date(2026, 4, 7))['total_value'], Decimal('36'))
+        self.assertEqual(inventory_valuation_as_of(date(2026, 4, 30))['total_value'], Decimal('28'))
+        item.refresh_from_db()
+        self.assertEqual(item.quantity_in_stock, Decimal('11'))
+
+        # Les soldes restent cumulables : un nouveau mouvement part du dernier solde par date
+        self.post(stock_entry(item.pk, 'sale', -1, movement_date=date(2026, 4, 12)))
+        last = StockMovement.objects.filter(inventory_item=item).latest('id')
+        self.assertEqual(last.balance_quantity, Decimal('10'))
+
+    def test_valuation_report_is_read_only_until_sync_is_posted(self):
+        item = self.make_item('RAPPR-01', quantity='8', unit_cost='2.50')
+        self.client.force_login(User.objects.create_user('evaluation', password='test'))
+
+        response = self.client.get(reverse('garage_app:inventory_valuation'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(StockMovement.objects.filter(inventory_item=item).exists())
+        self.assertEqual(self.client.get(reverse('garage_app:inventory_valuation_sync')).status_code, 302)
+        self.assertFalse(StockMovement.objects.filter(inventory_item=item).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('garage_app:inventory_valuation_sync'), {'category': 'materials'})
+        self.assertRedirects(response, reverse('garage_app:inventory_valuation') + '?category=materials')
+        opening = StockMovement.objects.get(inventory_item=item)
+        self.assertEqual((opening.balance_quantity, opening.balance_value), (Decimal('8'), Decimal('20')))
+
+    def test_admin_cannot_edit_the_engine_owned_unit_cost(self):
+        from django.contrib import admin
+        self.assertIn('unit_cost', admin.site._registry[InventoryItem].readonly_fields)
+
+
+
+class InventoryLookupApiTests(TestCase):
+    """API de recherche d'articles par SKU ou code-barres"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('comptoir', password='test')
+        cls.item = InventoryItem.objects.create(
+            name='Raclette feutrée', sku='RAC-FEU', barcode='0628451234567', quantity_in_stock=Decimal('12'),
+            unit_cost=Decimal('1.50'), unit_price=Decimal('4.00'),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        sku_index.reset()
+        self.url = reverse('garage_app:inventory_lookup_api')
+
+    def post_json(self, payload):
+        return self.client.post(self.url, data=json.dumps(payload), content_type='application/json')
+
+    def test_single_code_by_sku_or_barcode(self):
+        response = self.client.get(self.url, {'code': ' rac-feu '})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['item']['id'], self.item.id)
+
+        response = self.client.get(self.url, {'code': '0628451234567'})
+        self.assertEqual(response.json()['item']['sku'], 'RAC-FEU')
+
+        self.assertEqual(self.client.get(self.url, {'code': 'INCONNU'}).status_code, 404)
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+    def test_batch_lookup(self):
+        response = self.client.get(self.url, {'codes': 'RAC-FEU,INCONNU'})
+        self.assertEqual(list(response.json()['items']), ['RAC-FEU'])
+        self.assertEqual(response.json()['not_found'], ['INCONNU'])
+
+        response = self.post_json({'codes': ['0628451234567', 'X-1']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['items']['0628451234567']['id'], self.item.id)
+        self.assertEqual(response.json()['not_found'], ['X-1'])
+
+    def test_invalid_payloads_are_rejected(self):
+        for payload in ({'codes': [['a']]}, {'codes': [1, 'RAC-FEU']}, {'codes': 'RAC-FEU'}, ['RAC-FEU'], 'RAC-FEU'):
+            response = self.post_json(payload)
+            self.assertEqual(response.status_code, 400, payload)
+            self.assertFalse(response.json()['success'])
+
+        response = self.client.post(self.url, data='{codes', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class StockCountTests(TestCase):
+    """Comptabilisation et annulation des inventaires physiques"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('magasin', password='test')
+
+    def setUp(self):
+        self.items = [
+            InventoryItem.objects.create(
+                name=f'Article compté {sku}', sku=sku, quantity_in_stock=Decimal(stock),
+                unit_cost=Decimal('2.00'), unit_price=Decimal('5.00'),
+            )
+            for sku, stock in (('CPT-A', '10'), ('CPT-B', '5'), ('CPT-C', '3'))
+        ]
+        self.stock_count = self.make_count(['8', '5', '6'])
+
+    def make_count(self, counted):
+        stock_count = StockCount.objects.create(count_date=date(2026, 5, 4))
+        StockCountLine.objects.bulk_create([
+            StockCountLine(stock_count=stock_count, inventory_item=item, counted_quantity=Decimal(quantity))
+            for item, quantity in zip(self.items, counted)
+        ])
+        return stock_count
+
+    def quantities(self):
+        return list(
+            InventoryItem.objects.filter(pk__in=[item.pk for item in self.items])
+            .order_by('sku').values_list('quantity_in_stock', flat=True)
+        )
+
+    def test_post_adjustments_creates_count_movements(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.stock_count.post_adjustments(), 2)
+
+        self.assertEqual(self.quantities(), [Decimal('8'), Decimal('5'), Decimal('6')])
+        movements = StockMovement.objects.filter(movement_type='count', reference=self.stock_count.reference)
+        self.assertEqual(
+            sorted(movements.values_list('inventory_item__sku', 'quantity', 'total_cost')),
+            [('CPT-A', Decimal('-2'), Decimal('-4')), ('CPT-C', Decimal('3'), Decimal('6'))],
+        )
+        self.assertEqual(
+            sorted(self.stock_count.count_lines.values_list('inventory_item__sku', 'expected_quantity', 'variance')),
+            [('CPT-A', Decimal('10'), Decimal('-2')), ('CPT-B', Decimal('5'), Decimal('0')),
+             ('CPT-C', Decimal('3'), Decimal('3'))],
+        )
+
+        self.stock_count.refresh_from_db()
+        self.assertEqual(self.stock_count.status, 'posted')
+        self.assertIsNone(self.stock_count.post_adjustments())
+        # Un compte comptabilisé ne peut plus être annulé
+        self.assertFalse(self.stock_count.cancel())
+        self.assertEqual(StockCount.objects.get(pk=self.stock_count.pk).status, 'posted')
+
+    def test_cancelled_count_is_never_posted(self):
+        self.assertTrue(self.stock_count.cancel())
+        self.assertEqual(StockCount.objects.get(pk=self.stock_count.pk).status, 'cancelled')
+        self.assertIsNone(self.stock_count.post_adjustments())
+        self.assertFalse(StockMovement.objects.exists())
+        self.assertEqual(self.quantities(), [Decimal('10'), Decimal('5'), Decimal('3')])
+
+    def test_cancel_view(self):
+        self.client.force_login(self.user)
+        url = reverse('garage_app:stock_count_cancel', args=[self.stock_count.id])
+        response = self.client.post(url)
+        self.assertRedirects(response, reverse('garage_app:stock_count_detail', args=[self.stock_count.id]))
+        self.assertEqual(StockCount.objects.get(pk=self.stock_count.pk).status, 'cancelled')
 
-# Create your tests here.
+        # Une seconde annulation est refusée sans changer le statut
+        self.client.post(url)
+        self.assertEqual(StockCount.objects.get(pk=self.stock_count.pk).status, 'cancelled')
@@ -30,7 +30,11 @@ urlpatterns = [
     # Calculateur de lettrage
     path('lettering/calculator/', views.lettering_calculator, name='lettering_calculator'),
     path('api/lettering/calculate/', views.lettering_calculate_ajax, name='lettering_calculate_ajax'),
+    path('api/lettering/matrix/', views.lettering_matrix_api, name='lettering_matrix_api'),
+    path('api/lettering/suggest-hours/', views.lettering_suggest_hours_api, name='lettering_suggest_hours_api'),
     path('api/lettering/save-quote/', views.lettering_save_quote, name='lettering_save_quote'),
+    path('api/lettering/quotes/<int:lettering_quote_id>/', views.lettering_quote_detail_api, name='lettering_quote_detail_api'),
+    path('api/lettering/vehicles/<int:vehicle_id>/panels/', views.lettering_vehicle_panels_api, name='lettering_vehicle_panels_api'),
 
     # Gestion des services
     path('services/', views.service_list, name='service_list'),
@@ -57,6 +61,7 @@ urlpatterns = [
     path('quotes/<int:quote_id>/edit/', views.quote_update, name='quote_update'),
     path('quotes/<int:quote_id>/delete/', views.quote_delete, name='quote_delete'),
     path('quotes/<int:quote_id>/convert/', views.quote_convert_to_invoice, name='quote_convert_to_invoice'),
+    path('api/quotes/convert/', views.quote_bulk_convert_api, name='quote_bulk_convert_api'),
 
     # Gestion des dépenses
     path('expenses/', views.expense_list, name='expense_list'),
@@ -67,6 +72,8 @@ urlpatterns = [
 
     # Rapports financiers
     path('reports/', views.financial_reports, name='financial_reports'),
+    path('reports/cashflow/', views.cashflow_forecast, name='reports_cashflow'),
+    path('api/cashflow/forecast/', views.cashflow_forecast_api, name='cashflow_forecast_api'),
 
     # AJAX endpoints
     path('ajax/get-vehicles/<int:client_id>/', views.get_client_vehicles, name='get_client_vehicles'),
@@ -97,20 +104,33 @@ urlpatterns = [
     path('appointments/<int:appointment_id>/create-invoice/', views.appointment_create_invoice, name='appointment_create_invoice'),
     path('appointments/calendar/', views.appointment_calendar, name='appointment_calendar'),
     path('api/appointments/', views.appointment_calendar_api, name='appointment_calendar_api'),
+    path('api/appointments/slots/', views.appointment_slots_api, name='appointment_slots_api'),
+    path('api/appointments/feed-link/', views.appointment_feed_link_api, name='appointment_feed_link_api'),
+    path('calendar/<str:token>.ics', views.appointment_ics_feed, name='appointment_ics_feed'),
     path('appointments/api/date/<str:date>/', views.appointment_date_api, name='appointment_date_api'),
     path('ajax/get-services/', views.get_services_ajax, name='get_services_ajax'),
 
     # URLs pour l'inventaire
     path('inventory/', views.inventory_list, name='inventory_list'),
+    path('inventory/valuation/', views.inventory_valuation, name='inventory_valuation'),
+    path('inventory/valuation/sync/', views.inventory_valuation_sync, name='inventory_valuation_sync'),
+    path('api/inventory/lookup/', views.inventory_lookup_api, name='inventory_lookup_api'),
+    path('inventory/counts/', views.stock_count_list, name='stock_count_list'),
+    path('inventory/counts/create/', views.stock_count_create, name='stock_count_create'),
+    path('inventory/counts/<int:stock_count_id>/', views.stock_count_detail, name='stock_count_detail'),
+    path('inventory/counts/<int:stock_count_id>/post/', views.stock_count_post, name='stock_count_post'),
+    path('inventory/counts/<int:stock_count_id>/cancel/', views.stock_count_cancel, name='stock_count_cancel'),
 
     # URLs pour les alertes de stock
     path('stock-alerts/', views.stock_alerts_dashboard, name='stock_alerts_dashboard'),
     path('stock-alerts/<int:alert_id>/', views.stock_alert_detail, name='stock_alert_detail'),
     path('stock-alerts/run-check/', views.run_stock_check, name='run_stock_check'),
+    path('stock-alerts/purchase-suggestions/', views.create_purchase_suggestions, name='create_purchase_suggestions'),
 
     # URLs pour les bons de réception
     path('stock-receipts/', views.stock_receipt_list, name='stock_receipt_list'),
     path('stock-receipts/create/', views.stock_receipt_create, name='stock_receipt_create'),
+    path('stock-receipts/import/', views.stock_receipt_import, name='stock_receipt_import'),
     path('stock-receipts/<int:stock_receipt_id>/', views.stock_receipt_detail, name='stock_receipt_detail'),
     path('stock-receipts/<int:stock_receipt_id>/edit/', views.stock_receipt_edit, name='stock_receipt_edit'),
     path('stock-receipts/<int:stock_receipt_id>/delete/', views.stock_receipt_delete, name='stock_receipt_delete'),
@@ -0,0 +1,642 @@
+"""
+Bancs d'essai de performance exécutés par la commande ``run_benchmarks``
+
+Chaque banc d'essai génère ses propres données synthétiques dans une transaction
+qui est annulée à la fin : la base de données n'est jamais modifiée.
+"""
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from ..models import InventoryItem, StockMovement, Supplier
+
+
+BENCHMARKS = {}
+
+# Cache propre aux bancs d'essai, séparé du cache de l'application
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'garage-benchmarks',
+    },
+}
+
+
+def benchmark(name, default_size):
+    """Enregistrer un banc d'essai sous un nom avec sa taille par défaut"""
+    def decorator(func):
+        BENCHMARKS[name] = (func, default_size)
+        return func
+    return decorator
+
+
+class _Rollback(Exception):
+    """Exception interne utilisée pour annuler la transaction d'un banc d'essai"""
+
+
+def run_benchmark(name, size=None, repeat=3):
+    """
+    Exécuter un banc d'essai dans une transaction annulée
+
+    Le banc d'essai utilise aussi un cache isolé, vidé à la fin : les versions
+    et les résultats calculés sur les données synthétiques ne doivent pas être
+    servis par l'application une fois la transaction annulée.
+
+    Returns:
+        list: Lignes de résultats ``(libellé, millisecondes, requêtes)``
+    """
+    func, default_size = BENCHMARKS[name]
+    results = []
+    with override_settings(CACHES=BENCHMARK_CACHES):
+        try:
+            try:
+                with transaction.atomic():
+                    results = func(size or default_size, repeat)
+                    raise _Rollback()
+            except _Rollback:
+                pass
+        finally:
+            cache.clear()
+    return results
+
+
+class QueryCounter:
+    """Compteur de requêtes branché avec ``connection.execute_wrapper``
+
+    Contrairement à ``CaptureQueriesContext``, il ne dépend pas du journal des
+    requêtes de Django, plafonné à 9000 entrées.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(label, func, repeat=3):
+    """Mesurer le meilleur temps d'exécution (ms) et le nombre de requêtes d'un appel"""
+    best = None
+    queries = 0
+    for _ in range(max(repeat, 1)):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            func()
+            elapsed = (time.perf_counter() - start) * 1000
+        queries = counter.count
+        best = elapsed if best is None else min(best, elapsed)
+    return (label, best, queries)
+
+
+def seed_inventory(size, prefix='BENCH'):
+    """Créer ``size`` articles d'inventaire synthétiques sans déclencher les alertes"""
+    supplier = Supplier.objects.create(name=f'{prefix} Fournisseur', category='materials')
+    rng = np.random.default_rng(42)
+    quantities = rng.integers(0, 50, size)
+    items = [
+        InventoryItem(
+            name=f'{prefix} article {index}',
+            sku=f'{prefix}-{index:06d}',
+            supplier=supplier,
+            quantity_in_stock=Decimal(int(quantities[index])),
+            minimum_stock_level=Decimal('2'),
+            reorder_level=Decimal('5'),
+            unit_cost=Decimal('10.00'),
+            unit_price=Decimal('20.00'),
+            category='materials',
+        )
+        for index in range(size)
+    ]
+    InventoryItem.objects.bulk_create(items, batch_size=1000)
+    return supplier, list(InventoryItem.objects.filter(sku__startswith=f'{prefix}-').order_by('id'))
+
+
+@benchmark('forecast', default_size=5000)
+def bench_forecast(size, repeat):
+    """Prévision de consommation vectorisée (noyau NumPy et calcul complet)"""
+    from ..models import Client, Invoice, InvoiceItem
+    from .inventory_forecast import compute_inventory_forecast, forecast_kernel
+
+    _, items = seed_inventory(size)
+
+    # Historique synthétique : une facture par jour sur 90 jours, lignes réparties sur les articles
+    client = Client.objects.create(first_name='Bench', last_name='Forecast', phone='000')
+    today = date.today()
+    invoices = [
+        Invoice(
+            invoice_number=f'BENCH-{day:04d}',
+            client=client,
+            invoice_date=today - timedelta(days=day + 1),
+            status='paid',
+        )
+        for day in range(90)
+    ]
+    Invoice.objects.bulk_create(invoices)
+    invoices = list(Invoice.objects.filter(invoice_number__startswith='BENCH-'))
+    rng = np.random.default_rng(7)
+    lines = [
+        InvoiceItem(
+            invoice=invoices[int(rng.integers(0, len(invoices)))],
+            item_type='inventory',
+            inventory_item=items[int(rng.integers(0, len(items)))],
+            price=Decimal('20.00'),
+        )
+        for _ in range(size * 2)
+    ]
+    InvoiceItem.objects.bulk_create(lines, batch_size=1000)
+
+    stock = rng.uniform(0, 50, size)
+    history = rng.poisson(0.3, (size, 90)).astype(np.float64)
+    upcoming = rng.uniform(0, 5, size)
+
+    return [
+        measure(f'Noyau NumPy ({size} articles x 90 jours)',
+                lambda: forecast_kernel(stock, history, upcoming, 30, 7), repeat),
+        measure(f'compute_inventory_forecast ({size} articles)',
+                lambda: compute_inventory_forecast(), repeat),
+    ]
+
+
+@benchmark('purchase_suggestions', default_size=5000)
+def bench_purchase_suggestions(size, repeat):
+    """Suggestions de commande et bons brouillons (requêtes constantes)"""
+    from .purchase_suggestions import build_purchase_suggestions, create_draft_purchase_orders
+
+    seed_inventory(size)
+    suggestions = build_purchase_suggestions()
+    lines = sum(len(order['lines']) for order in suggestions['orders'])
+
+    results = [
+        measure(f'build_purchase_suggestions ({size} articles)', build_purchase_suggestions, repeat),
+        measure(f'build_purchase_suggestions sans prévision ({size} articles)',
+                lambda: build_purchase_suggestions(use_forecast=False), repeat),
+    ]
+    results.append(measure(f'create_draft_purchase_orders ({lines} lignes)',
+                           lambda: create_draft_purchase_orders(suggestions), 1))
+    return results
+
+
+@benchmark('stock_receipt', default_size=500)
+def bench_stock_receipt(size, repeat):
+    """Création et traitement d'un bon de réception (une ligne par article)"""
+    from ..models import StockReceipt, StockReceiptItem
+
+    supplier, items = seed_inventory(size)
+    today = date.today()
+
+    def new_receipt():
+        return StockReceipt.objects.create(supplier=supplier, receipt_date=today, status='received')
+
+    def lines_for(receipt):
+        return [
+            StockReceiptItem(stock_receipt=receipt, inventory_item=item, quantity=3, purchase_price=Decimal('12.50'))
+            for item in items
+        ]
+
+    def create_line_by_line():
+        # Chemin historique : chaque ligne recalcule et sauvegarde les totaux du bon
+        receipt = new_receipt()
+        for line in lines_for(receipt):
+            line.save()
+
+    def create_in_bulk():
+        receipt = new_receipt()
+        receipt.save_items(new_items=lines_for(receipt))
+
+    results = [
+        measure(f'Création ligne par ligne ({size} lignes)', create_line_by_line, 1),
+        measure(f'Création en lot save_items ({size} lignes)', create_in_bulk, repeat),
+    ]
+
+    def process_item_by_item():
+        # Chemin historique : chaque article est sauvegardé et réévalue ses alertes
+        for item in InventoryItem.objects.filter(pk__in=[item.pk for item in items]):
+            item.quantity_in_stock += 3
+            item.unit_cost = Decimal('12.50')
+            item.save()
+
+    receipt = new_receipt()
+    receipt.save_items(new_items=lines_for(receipt))
+    results.append(measure(f'Traitement article par article ({size} lignes)', process_item_by_item, 1))
+    results.append(measure(f'process_receipt en lot ({size} lignes)', receipt.process_receipt, 1))
+
+    # Second bon : les articles ont déjà un solde évalué (pas de solde d'ouverture)
+    receipt = new_receipt()
+    receipt.save_items(new_items=lines_for(receipt))
+    results.append(measure(f'process_receipt, articles déjà évalués ({size} lignes)', receipt.process_receipt, 1))
+    return results
+
+
+@benchmark('quote_conversion', default_size=200)
+def bench_quote_conversion(size, repeat):
+    """Conversion de soumissions acceptées en factures (3 éléments par soumission)"""
+    from ..models import Client, Invoice, InvoiceItem, Quote, QuoteItem
+
+    client = Client.objects.create(first_name='Flotte', last_name='Banc d\'essai', phone='000-000-0000')
+    today = date.today()
+    batches = []
+
+    def seed_quotes():
+        batch = len(batches)
+        quotes = Quote.objects.bulk_create([
+            Quote(quote_number=f'BENCH-{batch}-{index:05d}', client=client, status='accepted',
+                  valid_until=today + timedelta(days=30), subtotal=Decimal('300.00'))
+            for index in range(size)
+        ])
+        QuoteItem.objects.bulk_create([
+            QuoteItem(quote=quote, description=f'Élément {line}', price=Decimal('100.00'))
+            for quote in quotes
+            for line in range(3)
+        ])
+        batches.append(quotes)
+        return Quote.objects.filter(pk__in=[quote.pk for quote in quotes])
+
+    def convert_one_by_one(queryset):
+        # Chemin historique : chaque élément est créé avec save() puis les totaux sont recalculés
+        def run():
+            for quote in queryset.select_related('client'):
+                invoice = Invoice.objects.create(client=quote.client, invoice_date=today, notes=quote.notes)
+                for quote_item in quote.quote_items.all():
+                    InvoiceItem.objects.create(invoice=invoice, description=quote_item.description, price=quote_item.price)
+                invoice.calculate_totals()
+                quote.status = 'converted'
+                quote.converted_invoice = invoice
+                quote.save()
+        return run
+
+    serial = convert_one_by_one(seed_quotes())
+    bulk = seed_quotes()
+    return [
+        measure(f'Conversion une à une ({size} soumissions)', serial, 1),
+        measure(f'Conversion en lot convert_many ({size} soumissions)', lambda: Quote.convert_many(bulk), 1),
+    ]
+
+
+@benchmark('close_day', default_size=200)
+def bench_close_day(size, repeat):
+    """Facturation des rendez-vous terminés de la journée (3 services par rendez-vous)"""
+    from django.utils import timezone
+    from ..models import Appointment, Client, Invoice, InvoiceItem, Service
+
+    client = Client.objects.create(first_name='Journée', last_name='Banc d\'essai', phone='000-000-0000')
+    services = Service.objects.bulk_create([
+        Service(name=f'BENCH-{number}', default_price=Decimal('100.00')) for number in range(3)
+    ])
+    start = timezone.now().replace(hour=8, minute=0, second=0, microsecond=0)
+    batches = []
+
+    def seed_appointments():
+        batch = len(batches)
+        appointments = Appointment.objects.bulk_create([
+            Appointment(title=f'BENCH-{batch}-{index:05d}', client=client, status='completed',
+                        start_datetime=start, end_datetime=start + timedelta(hours=1))
+            for index in range(size)
+        ])
+        Appointment.estimated_services.through.objects.bulk_create([
+            Appointment.estimated_services.through(appointment_id=appointment.pk, service_id=service.pk)
+            for appointment in appointments
+            for service in services
+        ])
+        batches.append(appointments)
+        return Appointment.objects.filter(pk__in=[appointment.pk for appointment in appointments])
+
+    def invoice_one_by_one(queryset):
+        # Chemin historique : une facture, puis un save() par élément qui recalcule les totaux
+        def run():
+            for appointment in queryset.select_related('client'):
+                invoice = Invoice.objects.create(client=appointment.client, invoice_date=date.today())
+                for service in appointment.estimated_services.all():
+                    InvoiceItem.objects.create(invoice=invoice, service=service, price=service.default_price)
+                invoice.calculate_totals()
+                appointment.invoice = invoice
+                appointment.save()
+        return run
+
+    serial = invoice_one_by_one(seed_appointments())
+    bulk = seed_appointments()
+    return [
+        measure(f'Facturation une à une ({size} rendez-vous)', serial, 1),
+        measure(f'Facturation en lot invoice_many ({size} rendez-vous)', lambda: Appointment.invoice_many(bulk), 1),
+    ]
+
+
+@benchmark('cashflow', default_size=1000)
+def bench_cashflow(size, repeat):
+    """Prévision de trésorerie sur 365 jours (dépenses récurrentes, factures et rendez-vous)"""
+    from django.utils import timezone
+    from ..models import Appointment, Client, Invoice, RecurringExpense
+    from .cashflow import cashflow_version, compute_cashflow_forecast
+
+    client = Client.objects.create(first_name='Trésorerie', last_name='Banc d\'essai', phone='000-000-0000')
+    today = timezone.localdate()
+    rng = np.random.default_rng(11)
+    frequencies = [choice for choice, _ in RecurringExpense.FREQUENCY_CHOICES]
+    RecurringExpense.objects.bulk_create([
+        RecurringExpense(
+            name=f'BENCH-{index}', description=f'BENCH-{index}', amount=Decimal('100.00'),
+            frequency=frequencies[index % len(frequencies)],
+            start_date=today, next_due_date=today + timedelta(days=int(rng.integers(-10, 60))),
+        )
+        for index in range(size)
+    ], batch_size=500)
+    Invoice.objects.bulk_create([
+        Invoice(invoice_number=f'BENCH-CF-{index:06d}', client=client, status='sent',
+                invoice_date=today - timedelta(days=int(rng.integers(0, 60))), total_amount=Decimal('250.00'))
+        for index in range(size)
+    ], batch_size=500)
+    start = timezone.now()
+    Appointment.objects.bulk_create([
+        Appointment(title=f'BENCH-{index}', client=client, estimated_price=Decimal('400.00'),
+                    start_datetime=start + timedelta(hours=int(rng.integers(0, 365 * 24))),
+                    end_datetime=start + timedelta(hours=int(rng.integers(0, 365 * 24)) + 1))
+        for index in range(size)
+    ], batch_size=500)
+
+    def loop_forecast():
+        # Chemin naïf : chaque échéance avancée une à une, sommes dans un dictionnaire
+        horizon_end = today + timedelta(days=364)
+        buckets = {}
+        for recurring_expense in RecurringExpense.objects.filter(is_active=True):
+            for due_date in recurring_expense.due_dates(horizon_end):
+                day = max(due_date, today)
+                buckets[day] = buckets.get(day, 0) - recurring_expense.total_with_taxes
+        for invoice in Invoice.objects.filter(status__in=['sent', 'overdue']):
+            balance = invoice.total_amount - sum(payment.amount for payment in invoice.payments.all())
+            day = max(invoice.invoice_date + timedelta(days=30), today)
+            if balance > 0 and day <= horizon_end:
+                buckets[day] = buckets.get(day, 0) + balance
+        for appointment in Appointment.objects.filter(invoice__isnull=True, estimated_price__isnull=False):
+            day = timezone.localtime(appointment.start_datetime).date()
+            if today <= day <= horizon_end:
+                buckets[day] = buckets.get(day, 0) + appointment.estimated_price
+        return buckets
+
+    def cold_forecast():
+        cashflow_version._bump_version()
+        return compute_cashflow_forecast(365)
+
+    return [
+        measure(f'Boucle Python ({size} éléments de chaque type, 365 jours)', loop_forecast, 1),
+        measure(f'compute_cashflow_forecast sans cache ({size} éléments, 365 jours)', cold_forecast, repeat),
+        measure('compute_cashflow_forecast en cache (365 jours)', lambda: compute_cashflow_forecast(365), repeat),
+    ]
+
+
+@benchmark('scheduling', default_size=5000)
+def bench_scheduling(size, repeat):
+    """Vérification des collisions de réservation (10 baies, rendez-vous de 30 min)"""
+    from django.utils import timezone
+    from ..models import Appointment, Client, Resource
+    from .scheduling import ResourceSchedule, validate_week
+
+    client = Client.objects.create(first_name='Planif', last_name='Banc d\'essai', phone='000-000-0000')
+    bays = Resource.objects.bulk_create([Resource(name=f'BENCH-{number}', resource_type='bay') for number in range(10)])
+    week_start = date.today() - timedelta(days=date.today().weekday())
+    monday = timezone.make_aware(datetime.combine(week_start, datetime.min.time()))
+    per_bay_day = max(size // (10 * 7), 1)
+    minutes = max((24 * 60) // per_bay_day, 1)
+    bookings = [
+        (bays[index % 10], monday + timedelta(days=(index // 10) // per_bay_day % 7,
+                                              minutes=minutes * ((index // 10) % per_bay_day)))
+        for index in range(size)
+    ]
+    appointments = Appointment.objects.bulk_create([
+        Appointment(title='Banc d\'essai', client=client, start_datetime=start, end_datetime=start + timedelta(minutes=30))
+        for _, start in bookings
+    ])
+    Appointment.resources.through.objects.bulk_create([
+        Appointment.resources.through(appointment=appointment, resource=bay)
+        for appointment, (bay, _) in zip(appointments, bookings)
+    ])
+    checks = bookings[::max(size // 200, 1)]
+
+    def check_with_queries():
+        # Une requête de chevauchement par réservation vérifiée
+        for bay, start in checks:
+            list(Appointment.objects.filter(
+                resources=bay, start_datetime__lt=start + timedelta(minutes=30), end_datetime__gt=start
+            ).values_list('id', flat=True))
+
+    def check_in_memory():
+        schedule = ResourceSchedule.load(monday, monday + timedelta(days=7))
+        for bay, start in checks:
+            schedule.conflicts(bay.id, start, start + timedelta(minutes=30))
+
+    return [
+        measure(f'Requête par vérification ({len(checks)} vérif., {size} rdv)', check_with_queries, repeat),
+        measure(f'ResourceSchedule chargé une fois ({len(checks)} vérif., {size} rdv)', check_in_memory, repeat),
+        measure(f'validate_week en une passe ({size} rdv)', lambda: validate_week(monday.date()), repeat),
+    ]
+
+
+@benchmark('supplier_import', default_size=100000)
+def bench_supplier_import(size, repeat):
+    """Importation CSV en continu : temps, requêtes et pic mémoire selon la taille du fichier"""
+    import os
+    import tempfile
+    import tracemalloc
+
+    from .supplier_import import import_supplier_csv
+
+    catalog_size = 2000
+    supplier, _ = seed_inventory(catalog_size)
+    rng = np.random.default_rng(11)
+
+    def write_csv(lines):
+        handle = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, newline='')
+        with handle:
+            handle.write('SKU;Quantité;Prix\n')
+            skus = rng.integers(0, catalog_size + catalog_size // 20, lines)
+            for sku in skus:
+                handle.write(f'BENCH-{int(sku):06d};{int(sku) % 5 + 1};{10 + int(sku) % 7},50\n')
+        return handle.name
+
+    results = []
+    for lines in (max(size // 10, 1), size):
+        path = write_csv(lines)
+        try:
+            def run():
+                with open(path, encoding='utf-8', newline='') as stream:
+                    import_supplier_csv(stream, supplier, mode='delivery', update_prices=True)
+
+            label, elapsed, queries = measure(f'Importation bordereau ({lines} lignes)', run, 1)
+            tracemalloc.start()
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append((f'{label}, pic mémoire {peak / 1024 / 1024:.1f} Mo', elapsed, queries))
+        finally:
+            os.unlink(path)
+    return results
+
+
+@benchmark('valuation', default_size=1000)
+def bench_valuation(size, repeat):
+    """Évaluation du stock : comptabilisation en lot et valeur à date sur trois ans de mouvements"""
+    from .inventory_valuation import inventory_valuation_as_of, post_stock_movements, stock_entry
+
+    _, items = seed_inventory(size)
+    for item in items[::2]:
+        item.costing_method = 'fifo'
+    InventoryItem.objects.bulk_update(items[::2], ['costing_method'], batch_size=1000)
+
+    rng = np.random.default_rng(3)
+    start = date.today() - timedelta(days=36 * 30)
+
+    def month_entries(month):
+        movement_date = start + timedelta(days=month * 30)
+        costs = rng.uniform(8, 14, size)
+        entries = [
+            stock_entry(item.pk, 'receipt', 10, unit_cost=Decimal(f'{costs[index]:.2f}'), movement_date=movement_date)
+            for index, item in enumerate(items)
+        ]
+        entries += [
+            stock_entry(item.pk, 'sale', -2, movement_date=movement_date + timedelta(days=day))
+            for day in (7, 14, 21, 28)
+            for item in items
+        ]
+        return entries
+
+    for month in range(35):
+        post_stock_movements(month_entries(month), evaluate_alerts=False)
+
+    movements = StockMovement.objects.count()
+    last_batch = month_entries(35)
+    results = [
+        measure(f'post_stock_movements ({len(last_batch)} écritures)',
+                lambda: post_stock_movements(last_batch, evaluate_alerts=False), 1),
+        measure(f'Valeur à date, mi-historique ({movements} mouvements)',
+                lambda: inventory_valuation_as_of(start + timedelta(days=18 * 30)), repeat),
+        measure(f'Valeur à date, aujourd\'hui ({movements} mouvements)',
+                lambda: inventory_valuation_as_of(), repeat),
+    ]
+    return results
+
+
+@benchmark('sku_lookup', default_size=5000)
+def bench_sku_lookup(size, repeat):
+    """Recherche par SKU / code-barres : index en mémoire contre requête par code"""
+    from .sku_index import build_sku_index, get_sku_index, lookup_codes, sku_index
+
+    _, items = seed_inventory(size)
+    codes = [item.sku for item in items[::max(size // 1000, 1)]]
+    # Forcer la reconstruction pour inclure les articles synthétiques
+    sku_index.reset()
+    get_sku_index()
+
+    def query_per_code():
+        for code in codes:
+            InventoryItem.objects.filter(sku=code).values('id', 'quantity_in_stock', 'unit_price').first()
+
+    label, elapsed, queries = measure(f'lookup_codes en lot ({len(codes)} codes)', lambda: lookup_codes(codes), repeat)
+    results = [
+        measure(f'Reconstruction de l\'index ({size} articles)', build_sku_index, repeat),
+        measure(f'Requête par code ({len(codes)} codes)', query_per_code, 1),
+        (f'{label}, {elapsed / len(codes) * 1000:.2f} µs/code', elapsed, queries),
+    ]
+    # Invalider l'index local : les articles synthétiques sont annulés avec la transaction
+    sku_index.reset()
+    return results
+
+
+@benchmark('lettering_matrix', default_size=10000)
+def bench_lettering_matrix(size, repeat):
+    """Grille de prix du lettrage : passage vectorisé contre un calcul par cellule"""
+    from ..models import Client, LaborRate, Material, OverheadConfiguration, Vehicle, VehicleType
+    from .lettering_pricing import pricing_snapshot, price_matrix, quote_lettering
+
+    # Grille vinyles × laminations × marges × pertes d'environ ``size`` cellules
+    vinyl_count, lamination_count, margin_count = 10, 5, 20
+    waste_count = max(size // (vinyl_count * lamination_count * margin_count), 1)
+
+    vehicle_type = VehicleType.objects.create(name='BENCH Fourgon', complexity_multiplier=Decimal('1.60'))
+    client = Client.objects.create(first_name='BENCH', last_name='Client', phone='000-000-0000')
+    vehicle = Vehicle.objects.create(client=client, make='BENCH', model='Fourgon', year=2024, vehicle_type=vehicle_type)
+    overhead = OverheadConfiguration.objects.create(
+        name='BENCH Frais', hourly_overhead_cost=Decimal('12.00'), fixed_overhead_cost=Decimal('35.00'),
+        percentage_overhead=Decimal('7.50')
+    )
+    for task_type, rate in (('conception', '85.00'), ('installation', '65.00')):
+        LaborRate.objects.update_or_create(task_type=task_type, defaults={'hourly_rate': Decimal(rate), 'is_active': True})
+    vinyls = Material.objects.bulk_create([
+        Material(name=f'BENCH Vinyle {index}', type='vinyle', cost_per_sqm=Decimal(18 + index))
+        for index in range(vinyl_count)
+    ])
+    laminations = Material.objects.bulk_create([
+        Material(name=f'BENCH Lamination {index}', type='lamination', cost_per_sqm=Decimal(8 + index))
+        for index in range(lamination_count)
+    ])
+    pricing_snapshot.reset()
+    pricing_snapshot.get()
+
+    margins = [float(15 + index * 2.5) for index in range(margin_count)]
+    wastes = [float(5 + index) for index in range(waste_count)]
+    params = {
+        'vehicle_id': vehicle.id,
+        'overhead_config_id': overhead.id,
+        'surface_area': 22.5,
+        'design_hours': 4,
+        'installation_hours': 9.5,
+    }
+    cells = vinyl_count * lamination_count * margin_count * waste_count
+
+    def vectorized():
+        price_matrix(
+            vinyl_material_ids=[vinyl.id for vinyl in vinyls],
+            lamination_material_ids=[lamination.id for lamination in laminations],
+            profit_margins=margins, waste_percentages=wastes, **params
+        )
+
+    def per_cell():
+        for vinyl in vinyls:
+            for lamination in laminations:
+                for margin in margins:
+                    for waste in wastes:
+                        quote_lettering(
+                            vehicle_id=vehicle.id, vinyl_material_id=vinyl.id, overhead_config_id=overhead.id,
+                            surface_area=Decimal('22.5'), waste_percentage=Decimal(str(waste)),
+                            lamination_material_id=lamination.id, design_hours=Decimal('4'),
+                            installation_hours=Decimal('9.5'), profit_margin=Decimal(str(margin)),
+                        )
+
+    results = [
+        measure(f'Matrice vectorisée ({cells} cellules)', vectorized, repeat),
+        measure(f'Noyau Decimal cellule par cellule ({cells} cellules)', per_cell, 1),
+    ]
+    # Les données synthétiques sont annulées avec la transaction
+    pricing_snapshot.reset()
+    return results
+
+
+@benchmark('vinyl_nesting', default_size=500)
+def bench_vinyl_nesting(size, repeat):
+    """Imbrication sur rouleau : travaux synthétiques de ``size`` pièces"""
+    from .vinyl_nesting import nest_pieces
+
+    rng = np.random.default_rng(42)
+
+    def pieces(widths, heights):
+        return [{'width': float(width), 'height': float(height)} for width, height in zip(widths, heights)]
+
+    jobs = {
+        'Petits autocollants': pieces(rng.uniform(0.05, 0.3, size), rng.uniform(0.05, 0.3, size)),
+        'Panneaux mixtes': pieces(rng.uniform(0.1, 1.3, size), rng.uniform(0.1, 0.9, size)),
+        'Bandes longues': pieces(rng.uniform(1.0, 3.0, size), rng.uniform(0.05, 0.25, size)),
+    }
+
+    results = []
+    for name, job in jobs.items():
+        nesting = nest_pieces(job, roll_width=Decimal('1.37'))
+        label, elapsed, queries = measure(f'{name} ({size} pièces)', lambda job=job: nest_pieces(job), repeat)
+        results.append((
+            f'{label}, {nesting["length_used"]:.2f} m, perte {nesting["waste_percentage"]:.1f}%',
+            elapsed, queries
+        ))
+    return results
@@ -0,0 +1,274 @@
+"""
+Prévision de trésorerie : entrées et sorties d'argent jour par jour
+
+Entrées : soldes des factures envoyées ou en retard (attendus à l'échéance de
+paiement) et prix estimés des rendez-vous réservés non facturés (attendus le
+jour du rendez-vous). Sorties : échéances des dépenses récurrentes actives.
+
+Trois requêtes chargent les données; les calendriers des dépenses récurrentes
+sont déployés et additionnés par jour avec NumPy. Le résultat est gardé dans
+le cache pour la journée sous une version qui change à chaque écriture d'une
+facture, d'un paiement, d'un rendez-vous ou d'une dépense récurrente.
+"""
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import DecimalField, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import Appointment, Invoice, RecurringExpense
+from .local_cache import CacheVersion
+
+
+DEFAULT_HORIZON_DAYS = 90
+MAX_HORIZON_DAYS = 730
+# Délai de paiement supposé après la date de facture
+DEFAULT_PAYMENT_TERM_DAYS = 30
+CASHFLOW_CACHE_TIMEOUT = 60 * 60
+
+# Factures dont le solde reste à encaisser
+OPEN_INVOICE_STATUSES = ['sent', 'overdue']
+# Rendez-vous réservés dont le prix estimé sera encaissé
+BOOKED_APPOINTMENT_STATUSES = ['scheduled', 'confirmed', 'in_progress', 'completed']
+
+# Pas de chaque fréquence : en jours ou en mois
+DAY_STEPS = {'daily': 1, 'weekly': 7}
+MONTH_STEPS = {'monthly': 1, 'quarterly': 3, 'yearly': 12}
+
+cashflow_version = CacheVersion('cashflow:version')
+
+
+def invalidate_cashflow():
+    """Signaler un changement des factures, paiements, rendez-vous ou dépenses récurrentes"""
+    cashflow_version.invalidate()
+
+
+def _day_buckets(days_from_today, amounts, days):
+    """Additionner des montants par jour; les dates passées tombent aujourd'hui"""
+    days_from_today = np.asarray(days_from_today, dtype=np.int64)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    inside = days_from_today < days
+    return np.bincount(
+        np.maximum(days_from_today[inside], 0), weights=amounts[inside], minlength=days
+    )[:days]
+
+
+def expand_day_schedules(first_days, steps, last_days):
+    """
+    Déployer des calendriers à pas fixe en jours
+
+    Args:
+        first_days (ndarray): Première échéance de chaque calendrier (jours depuis aujourd'hui)
+        steps (ndarray): Pas en jours
+        last_days (ndarray): Dernier jour admis (inclus) pour chaque calendrier
+
+    Returns:
+        tuple: ``(calendrier, jour)`` de chaque occurrence, tableaux à plat
+    """
+    first_days = np.asarray(first_days, dtype=np.int64)
+    steps = np.asarray(steps, dtype=np.int64)
+    counts = np.maximum((np.asarray(last_days, dtype=np.int64) - first_days) // steps + 1, 0)
+    owners = np.repeat(np.arange(len(first_days)), counts)
+    # Rang de chaque occurrence dans son calendrier
+    ranks = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owners, first_days[owners] + ranks * steps[owners]
+
+
+def expand_month_schedules(first_dates, steps, last_dates):
+    """
+    Déployer des calendriers à pas fixe en mois
+
+    Comme ``RecurringExpense.calculate_next_due_date`` appliqué de proche en
+    proche, un jour ramené à la fin d'un mois court le reste ensuite
+    (31 janvier, 28 février, 28 mars...) : c'est un minimum cumulatif.
+
+    Args:
+        first_dates (ndarray): Première échéance, ``datetime64[D]``
+        steps (ndarray): Pas en mois
+        last_dates (ndarray): Dernière date admise (incluse), ``datetime64[D]``
+
+    Returns:
+        tuple: ``(calendrier, date)`` de chaque occurrence, tableaux à plat
+    """
+    first_dates = np.asarray(first_dates, dtype='datetime64[D]')
+    last_dates = np.asarray(last_dates, dtype='datetime64[D]')
+    steps = np.asarray(steps, dtype=np.int64)
+    if not len(first_dates):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype='datetime64[D]')
+
+    first_months = first_dates.astype('datetime64[M]')
+    span = (last_dates.astype('datetime64[M]') - first_months).astype(np.int64)
+    width = int(max((span // steps).max(), 0)) + 1
+
+    months = first_months[:, None] + steps[:, None] * np.arange(width)[None, :]
+    month_starts = months.astype('datetime64[D]')
+    month_lengths = ((months + 1).astype('datetime64[D]') - month_starts).astype(np.int64)
+    first_day = (first_dates - first_months.astype('datetime64[D]')).astype(np.int64) + 1
+    day_of_month = np.minimum.accumulate(np.minimum(first_day[:, None], month_lengths), axis=1)
+    dates = month_starts + (day_of_month - 1)
+
+    valid = dates <= last_dates[:, None]
+    owners = np.broadcast_to(np.arange(len(first_dates))[:, None], dates.shape)
+    return owners[valid], dates[valid]
+
+
+def _recurring_outflows(today, days):
+    """Sorties par jour d'après les échéances des dépenses récurrentes actives"""
+    horizon_end = today + timedelta(days=days - 1)
+    rows = list(
+        RecurringExpense.objects.filter(is_active=True, next_due_date__lte=horizon_end)
+        .values_list('frequency', 'next_due_date', 'end_date', 'amount', 'gst_amount', 'qst_amount')
+    )
+    outflows = np.zeros(days, dtype=np.float64)
+    if not rows:
+        return outflows
+
+    frequencies = np.array([row[0] for row in rows])
+    first_dates = np.array([row[1] for row in rows], dtype='datetime64[D]')
+    last_dates = np.array([min(row[2], horizon_end) if row[2] else horizon_end for row in rows], dtype='datetime64[D]')
+    amounts = np.array([float(row[3] + row[4] + row[5]) for row in rows], dtype=np.float64)
+    origin = np.datetime64(today, 'D')
+
+    for step_map, expand in ((DAY_STEPS, 'days'), (MONTH_STEPS, 'months')):
+        selected = np.flatnonzero(np.isin(frequencies, list(step_map)))
+        if not len(selected):
+            continue
+        steps = np.array([step_map[frequency] for frequency in frequencies[selected]], dtype=np.int64)
+        if expand == 'days':
+            owners, occurrence_days = expand_day_schedules(
+                (first_dates[selected] - origin).astype(np.int64), steps,
+                (last_dates[selected] - origin).astype(np.int64),
+            )
+        else:
+            owners, occurrence_dates = expand_month_schedules(first_dates[selected], steps, last_dates[selected])
+            occurrence_days = (occurrence_dates - origin).astype(np.int64)
+        outflows += _day_buckets(occurrence_days, amounts[selected][owners], days)
+    return outflows
+
+
+def _invoice_inflows(today, days, payment_term_days):
+    """Entrées par jour : solde des factures ouvertes à l'échéance de paiement"""
+    rows = list(
+        Invoice.objects.filter(status__in=OPEN_INVOICE_STATUSES, archived_fiscal_year__isnull=True)
+        .annotate(paid=Coalesce(Sum('payments__amount'), Value(0), output_field=DecimalField()))
+        .values_list('invoice_date', 'total_amount', 'paid')
+    )
+    if not rows:
+        return np.zeros(days, dtype=np.float64)
+
+    due_dates = np.array([row[0] for row in rows], dtype='datetime64[D]') + payment_term_days
+    balances = np.array([float(row[1] - row[2]) for row in rows], dtype=np.float64)
+    owing = balances > 0
+    return _day_buckets((due_dates - np.datetime64(today, 'D')).astype(np.int64)[owing], balances[owing], days)
+
+
+def _appointment_inflows(today, days):
+    """Entrées par jour : prix estimé des rendez-vous réservés et non facturés"""
+    tz = timezone.get_current_timezone()
+    # Bornes locales de chaque jour (exactes aux changements d'heure)
+    boundaries = np.array([
+        timezone.make_aware(datetime.combine(today + timedelta(days=offset), time.min), tz).timestamp()
+        for offset in range(days + 1)
+    ])
+    rows = list(
+        Appointment.objects.filter(
+            status__in=BOOKED_APPOINTMENT_STATUSES,
+            invoice__isnull=True,
+            estimated_price__isnull=False,
+            start_datetime__gte=datetime.fromtimestamp(boundaries[0], tz),
+            start_datetime__lt=datetime.fromtimestamp(boundaries[-1], tz),
+        ).values_list('start_datetime', 'estimated_price')
+    )
+    if not rows:
+        return np.zeros(days, dtype=np.float64)
+
+    starts = np.array([row[0].timestamp() for row in rows])
+    prices = np.array([float(row[1]) for row in rows], dtype=np.float64)
+    return _day_buckets(np.searchsorted(boundaries, starts, side='right') - 1, prices, days)
+
+
+def compute_cashflow_forecast(days=DEFAULT_HORIZON_DAYS, today=None,
+                              payment_term_days=DEFAULT_PAYMENT_TERM_DAYS):
+    """
+    Projeter les entrées et sorties d'argent des ``days`` prochains jours
+
+    Le nombre de requêtes est constant; le résultat est mis en cache pour la
+    journée et invalidé par ``invalidate_cashflow``.
+
+    Args:
+        days (int): Horizon en jours, aujourd'hui compris (max. ``MAX_HORIZON_DAYS``)
+        today (date, optional): Premier jour de la projection (défaut: aujourd'hui)
+        payment_term_days (int): Délai de paiement supposé des factures
+
+    Returns:
+        dict: ``dates`` (ISO), ``invoice_inflows``, ``appointment_inflows``,
+        ``inflows``, ``outflows``, ``net`` et ``cumulative`` (listes d'un
+        montant par jour) et ``totals``
+    """
+    days = min(max(int(days), 1), MAX_HORIZON_DAYS)
+    today = today or timezone.localdate()
+    key = f'cashflow:{cashflow_version.current_version()}:{today:%Y%m%d}:{days}:{payment_term_days}'
+    forecast = cache.get(key)
+    if forecast is not None:
+        return forecast
+
+    invoice_inflows = _invoice_inflows(today, days, payment_term_days)
+    appointment_inflows = _appointment_inflows(today, days)
+    outflows = _recurring_outflows(today, days)
+    inflows = invoice_inflows + appointment_inflows
+    net = inflows - outflows
+
+    def rounded(values):
+        return np.round(values, 2).tolist()
+
+    forecast = {
+        'start_date': today.isoformat(),
+        'days': days,
+        'dates': (np.datetime64(today, 'D') + np.arange(days)).astype(str).tolist(),
+        'invoice_inflows': rounded(invoice_inflows),
+        'appointment_inflows': rounded(appointment_inflows),
+        'inflows': rounded(inflows),
+        'outflows': rounded(outflows),
+        'net': rounded(net),
+        'cumulative': rounded(np.cumsum(net)),
+        'totals': {
+            'invoice_inflows': round(float(invoice_inflows.sum()), 2),
+            'appointment_inflows': round(float(appointment_inflows.sum()), 2),
+            'inflows': round(float(inflows.sum()), 2),
+            'outflows': round(float(outflows.sum()), 2),
+            'net': round(float(net.sum()), 2),
+            'lowest_cumulative': round(float(np.cumsum(net).min()), 2),
+        },
+    }
+    cache.set(key, forecast, CASHFLOW_CACHE_TIMEOUT)
+    return forecast
+
+
+def summarize_by_week(forecast):
+    """
+    Regrouper une prévision par semaines de sept jours à partir du premier jour
+
+    Returns:
+        list: ``[{'start', 'end', 'inflows', 'outflows', 'net', 'cumulative'}, ...]``
+    """
+    days = forecast['days']
+    starts = np.arange(0, days, 7)
+    sums = {
+        name: np.add.reduceat(np.asarray(forecast[name], dtype=np.float64), starts)
+        for name in ('inflows', 'outflows', 'net')
+    }
+    cumulative = np.asarray(forecast['cumulative'], dtype=np.float64)
+    ends = np.minimum(starts + 6, days - 1)
+    return [
+        {
+            'start': date.fromisoformat(forecast['dates'][start]),
+            'end': date.fromisoformat(forecast['dates'][end]),
+            'inflows': round(float(sums['inflows'][index]), 2),
+            'outflows': round(float(sums['outflows'][index]), 2),
+            'net': round(float(sums['net'][index]), 2),
+            'cumulative': round(float(cumulative[end]), 2),
+        }
+        for index, (start, end) in enumerate(zip(starts, ends))
+    ]
@@ -0,0 +1,105 @@
+"""
+Flux iCalendar (RFC 5545) des rendez-vous
+
+Le flux est produit ligne par ligne par un générateur : les rendez-vous sont
+lus par lots avec ``iterator()`` et aucune liste complète n'est gardée en
+mémoire.
+"""
+from datetime import timezone as dt_timezone
+
+from django.utils import timezone
+
+
+PRODUCT_ID = '-//Garage MarKev//Rendez-vous//FR'
+UID_DOMAIN = 'garage-markev'
+STATUS_MAP = {
+    'scheduled': 'TENTATIVE',
+    'confirmed': 'CONFIRMED',
+    'in_progress': 'CONFIRMED',
+    'completed': 'CONFIRMED',
+    'cancelled': 'CANCELLED',
+    'no_show': 'CANCELLED',
+}
+ITERATOR_CHUNK_SIZE = 500
+
+
+def escape_text(value):
+    """Échapper une valeur TEXT (barre oblique inverse, virgule, point-virgule, fin de ligne)"""
+    return (
+        str(value or '')
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def fold_line(line):
+    """Plier une ligne de contenu à 75 octets, terminée par CRLF"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Ne pas couper au milieu d'un caractère UTF-8
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74  # Les lignes de continuation commencent par une espace
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def event_lines(row, stamp):
+    """Lignes VEVENT d'un rendez-vous (``client`` et ``vehicle`` déjà chargés)"""
+    client = row.client
+    vehicle = row.vehicle
+    description = [f'Client : {client.first_name} {client.last_name}']
+    if client.phone:
+        description.append(f'Téléphone : {client.phone}')
+    if vehicle:
+        description.append(f'Véhicule : {vehicle.year} {vehicle.make} {vehicle.model}')
+    if row.description:
+        description.append(row.description)
+
+    yield 'BEGIN:VEVENT'
+    yield f'UID:appointment-{row.id}@{UID_DOMAIN}'
+    yield f'DTSTAMP:{stamp}'
+    yield f'LAST-MODIFIED:{format_utc(row.updated_at)}'
+    yield f'DTSTART:{format_utc(row.start_datetime)}'
+    yield f'DTEND:{format_utc(row.end_datetime)}'
+    yield f'SUMMARY:{escape_text(f"{row.title} - {client.first_name} {client.last_name}")}'
+    yield f'DESCRIPTION:{escape_text(chr(10).join(description))}'
+    yield f'STATUS:{STATUS_MAP.get(row.status, "TENTATIVE")}'
+    yield 'END:VEVENT'
+
+
+def ical_stream(queryset, calendar_name):
+    """
+    Générateur du calendrier complet, un morceau par rendez-vous
+
+    Args:
+        queryset: Rendez-vous avec ``select_related('client', 'vehicle')``
+        calendar_name (str): Nom affiché par l'application de calendrier
+    """
+    stamp = format_utc(timezone.now())
+    yield ''.join(fold_line(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODUCT_ID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(calendar_name)}',
+        'X-PUBLISHED-TTL:PT15M',
+    ))
+    for row in queryset.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+        yield ''.join(fold_line(line) for line in event_lines(row, stamp))
+    yield fold_line('END:VCALENDAR')
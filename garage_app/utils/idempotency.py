@@ -0,0 +1,103 @@
+"""
+Requêtes d'écriture idempotentes
+
+Le client envoie un en-tête ``Idempotency-Key`` (un UUID par action de
+l'utilisateur). La clé est insérée dans ``IdempotencyKey`` dans la même
+transaction que le travail de la vue : un double clic ou une reprise après une
+coupure réseau renvoie la réponse enregistrée sans refaire les calculs ni les
+insertions. Deux requêtes simultanées sont départagées par l'index unique.
+Une clé est propre à l'utilisateur qui l'envoie.
+
+Une clé sert à rejouer une réponse pendant ``IDEMPOTENCY_KEY_TTL`` : la
+commande ``cleanup_idempotency_keys`` supprime ensuite les clés expirées.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+
+from ..models import IdempotencyKey
+
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 100
+# Durée pendant laquelle une requête rejouée renvoie la réponse enregistrée
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+
+
+def expired_keys(now=None, ttl=IDEMPOTENCY_KEY_TTL):
+    """Clés créées avant ``now - ttl``"""
+    return IdempotencyKey.objects.filter(created_at__lt=(now or timezone.now()) - ttl)
+
+
+def cleanup_expired_keys(now=None, ttl=IDEMPOTENCY_KEY_TTL):
+    """
+    Supprimer les clés d'idempotence expirées
+
+    Returns:
+        int: Nombre de clés supprimées
+    """
+    deleted, _ = expired_keys(now, ttl).delete()
+    return deleted
+
+
+def _replay(record, request_hash):
+    if record.request_hash != request_hash:
+        return JsonResponse({
+            'success': False,
+            'message': 'Cette clé d\'idempotence a déjà servi pour une autre requête'
+        }, status=422)
+    response = JsonResponse(record.response, status=record.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(scope):
+    """
+    Rendre une vue JSON POST idempotente selon l'en-tête ``Idempotency-Key``
+
+    Seules les réponses réussies sont enregistrées : après une erreur, la
+    transaction est annulée (clé comprise) et la même clé peut être réessayée.
+    Sans clé, la vue s'exécute normalement.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER, '').strip()
+            if request.method != 'POST' or not key:
+                return view(request, *args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return JsonResponse({'success': False, 'message': 'Clé d\'idempotence invalide'}, status=400)
+
+            request_hash = hashlib.sha256(request.body).hexdigest()
+            # Les clés sont propres à chaque utilisateur : jamais la réponse d'un autre
+            user = request.user if request.user.is_authenticated else None
+            with transaction.atomic():
+                try:
+                    with transaction.atomic():
+                        record = IdempotencyKey.objects.create(
+                            scope=scope,
+                            key=key,
+                            user=user,
+                            request_hash=request_hash,
+                        )
+                except IntegrityError:
+                    # Requête déjà traitée (ou traitée en parallèle et validée entre-temps)
+                    return _replay(IdempotencyKey.objects.get(scope=scope, key=key, user=user), request_hash)
+
+                response = view(request, *args, **kwargs)
+                payload = json.loads(response.content)
+                if response.status_code >= 400 or not payload.get('success', True):
+                    transaction.set_rollback(True)
+                    return response
+
+                record.response = payload
+                record.status_code = response.status_code
+                record.save(update_fields=['response', 'status_code'])
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,212 @@
+"""
+Prévision de consommation d'inventaire : taux d'écoulement quotidien,
+jours de couverture et point de réapprovisionnement suggéré.
+
+La consommation historique provient des factures (articles vendus et règles
+ServiceConsumption appliquées aux services facturés) et la demande à venir des
+services estimés des rendez-vous planifiés. Les requêtes sont groupées une fois
+pour toutes, puis le calcul est vectorisé avec NumPy sur l'ensemble des articles.
+"""
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.db.models import Count
+from django.utils import timezone
+
+from ..models import Appointment, InventoryItem, InvoiceItem, ServiceConsumption
+
+
+# Paramètres par défaut de la prévision
+DEFAULT_LOOKBACK_DAYS = 90
+DEFAULT_HORIZON_DAYS = 30
+DEFAULT_LEAD_TIME_DAYS = 7
+# Facteur z du stock de sécurité (1.65 ≈ niveau de service de 95 %)
+DEFAULT_SERVICE_LEVEL_Z = 1.65
+
+# Statuts de facture qui représentent une consommation réelle
+CONSUMING_INVOICE_STATUSES = ['sent', 'paid']
+# Statuts de rendez-vous qui représentent une demande à venir
+UPCOMING_APPOINTMENT_STATUSES = ['scheduled', 'confirmed']
+
+
+def forecast_kernel(stock, history, upcoming, horizon_days, lead_time_days,
+                    service_level_z=DEFAULT_SERVICE_LEVEL_Z):
+    """
+    Calcul vectorisé de la prévision pour tous les articles
+
+    Args:
+        stock (ndarray): Quantités en stock, forme (n,)
+        history (ndarray): Consommation quotidienne historique, forme (n, jours)
+        upcoming (ndarray): Demande prévue sur l'horizon, forme (n,)
+        horizon_days (int): Nombre de jours couverts par ``upcoming``
+        lead_time_days (float): Délai de livraison du fournisseur en jours
+        service_level_z (float): Facteur z du stock de sécurité
+
+    Returns:
+        dict: Tableaux ``burn_rate``, ``days_of_cover``, ``safety_stock`` et
+        ``reorder_point`` de forme (n,). ``days_of_cover`` vaut ``inf`` pour
+        les articles sans consommation.
+    """
+    stock = np.asarray(stock, dtype=np.float64)
+    history = np.asarray(history, dtype=np.float64)
+    upcoming = np.asarray(upcoming, dtype=np.float64)
+
+    historical_rate = history.mean(axis=1) if history.shape[1] else np.zeros_like(stock)
+    daily_std = history.std(axis=1) if history.shape[1] else np.zeros_like(stock)
+    upcoming_rate = upcoming / max(horizon_days, 1)
+
+    # On retient le rythme le plus élevé pour ne pas manquer de matériel en cours de travail
+    burn_rate = np.maximum(historical_rate, upcoming_rate)
+
+    days_of_cover = np.full_like(stock, np.inf)
+    consuming = burn_rate > 0
+    days_of_cover[consuming] = stock[consuming] / burn_rate[consuming]
+
+    safety_stock = service_level_z * daily_std * np.sqrt(lead_time_days)
+    reorder_point = burn_rate * lead_time_days + safety_stock
+
+    return {
+        'burn_rate': burn_rate,
+        'days_of_cover': days_of_cover,
+        'safety_stock': safety_stock,
+        'reorder_point': reorder_point,
+    }
+
+
+def _consumption_rules(items, item_index):
+    """Règles actives groupées par (service, type de véhicule) -> [(index article, taux)]"""
+    rules = {}
+    rows = ServiceConsumption.objects.filter(
+        is_active=True,
+        inventory_item_id__in=items.values('id')
+    ).values_list('service_id', 'vehicle_type_id', 'inventory_item_id', 'consumption_rate')
+
+    for service_id, vehicle_type_id, item_id, rate in rows:
+        rules.setdefault((service_id, vehicle_type_id), []).append((item_index[item_id], float(rate)))
+    return rules
+
+
+def _load_history(items, item_index, rules, start_date, lookback_days):
+    """Construire la matrice (articles x jours) de consommation historique"""
+    history = np.zeros((len(item_index), lookback_days), dtype=np.float64)
+    end_date = start_date + timedelta(days=lookback_days - 1)
+    rows_idx, cols_idx, quantities = [], [], []
+
+    # Articles vendus directement (une unité par ligne de facture)
+    sold = InvoiceItem.objects.filter(
+        item_type='inventory',
+        inventory_item_id__in=items.values('id'),
+        invoice__status__in=CONSUMING_INVOICE_STATUSES,
+        invoice__invoice_date__range=(start_date, end_date),
+    ).values('inventory_item_id', 'invoice__invoice_date').annotate(count=Count('id'))
+
+    for row in sold:
+        rows_idx.append(item_index[row['inventory_item_id']])
+        cols_idx.append((row['invoice__invoice_date'] - start_date).days)
+        quantities.append(float(row['count']))
+
+    # Matériaux consommés par les services facturés
+    if rules:
+        serviced = InvoiceItem.objects.filter(
+            item_type='service',
+            service_id__in={service_id for service_id, _ in rules},
+            invoice__status__in=CONSUMING_INVOICE_STATUSES,
+            invoice__invoice_date__range=(start_date, end_date),
+            invoice__vehicle__vehicle_type__isnull=False,
+        ).values(
+            'service_id', 'invoice__vehicle__vehicle_type_id', 'invoice__invoice_date'
+        ).annotate(count=Count('id'))
+
+        for row in serviced:
+            key = (row['service_id'], row['invoice__vehicle__vehicle_type_id'])
+            day = (row['invoice__invoice_date'] - start_date).days
+            for index, rate in rules.get(key, ()):
+                rows_idx.append(index)
+                cols_idx.append(day)
+                quantities.append(rate * row['count'])
+
+    if quantities:
+        np.add.at(history, (np.array(rows_idx), np.array(cols_idx)), np.array(quantities))
+    return history
+
+
+def _load_upcoming(item_index, rules, horizon_days, now):
+    """Demande prévue par article d'après les services estimés des rendez-vous à venir"""
+    upcoming = np.zeros(len(item_index), dtype=np.float64)
+    if not rules:
+        return upcoming
+
+    through = Appointment.estimated_services.through
+    planned = through.objects.filter(
+        service_id__in={service_id for service_id, _ in rules},
+        appointment__status__in=UPCOMING_APPOINTMENT_STATUSES,
+        appointment__start_datetime__gte=now,
+        appointment__start_datetime__lt=now + timedelta(days=horizon_days),
+        appointment__vehicle__vehicle_type__isnull=False,
+    ).values('service_id', 'appointment__vehicle__vehicle_type_id').annotate(count=Count('id'))
+
+    indexes, quantities = [], []
+    for row in planned:
+        key = (row['service_id'], row['appointment__vehicle__vehicle_type_id'])
+        for index, rate in rules.get(key, ()):
+            indexes.append(index)
+            quantities.append(rate * row['count'])
+
+    if quantities:
+        np.add.at(upcoming, np.array(indexes), np.array(quantities))
+    return upcoming
+
+
+def compute_inventory_forecast(items=None, lookback_days=DEFAULT_LOOKBACK_DAYS,
+                               horizon_days=DEFAULT_HORIZON_DAYS,
+                               lead_time_days=DEFAULT_LEAD_TIME_DAYS,
+                               service_level_z=DEFAULT_SERVICE_LEVEL_Z, today=None):
+    """
+    Calculer la prévision de consommation pour des articles d'inventaire
+
+    Le nombre de requêtes est constant, quel que soit le nombre d'articles.
+
+    Args:
+        items (QuerySet, optional): Articles à prévoir (défaut: articles actifs)
+        lookback_days (int): Fenêtre d'historique en jours
+        horizon_days (int): Horizon des rendez-vous à venir en jours
+        lead_time_days (float): Délai de livraison en jours
+        service_level_z (float): Facteur z du stock de sécurité
+        today (date, optional): Date de référence (défaut: aujourd'hui)
+
+    Returns:
+        dict: ``{item_id: {...}}`` avec ``burn_rate``, ``days_of_cover``
+        (None si aucune consommation), ``safety_stock`` et
+        ``suggested_reorder_point``
+    """
+    if items is None:
+        items = InventoryItem.objects.filter(is_active=True)
+    today = today or timezone.localdate()
+
+    rows = list(items.values_list('id', 'quantity_in_stock'))
+    if not rows:
+        return {}
+
+    item_ids = [item_id for item_id, _ in rows]
+    item_index = {item_id: index for index, item_id in enumerate(item_ids)}
+    stock = np.array([float(quantity) for _, quantity in rows], dtype=np.float64)
+
+    rules = _consumption_rules(items, item_index)
+    start_date = today - timedelta(days=lookback_days)
+    history = _load_history(items, item_index, rules, start_date, lookback_days)
+
+    now = timezone.make_aware(datetime.combine(today, time.min))
+    upcoming = _load_upcoming(item_index, rules, horizon_days, now)
+
+    result = forecast_kernel(stock, history, upcoming, horizon_days, lead_time_days, service_level_z)
+
+    forecast = {}
+    for index, item_id in enumerate(item_ids):
+        days_of_cover = result['days_of_cover'][index]
+        forecast[item_id] = {
+            'burn_rate': round(float(result['burn_rate'][index]), 4),
+            'days_of_cover': None if np.isinf(days_of_cover) else round(float(days_of_cover), 1),
+            'safety_stock': round(float(result['safety_stock'][index]), 4),
+            'suggested_reorder_point': round(float(result['reorder_point'][index]), 4),
+        }
+    return forecast
@@ -0,0 +1,462 @@
+"""
+Évaluation du coût des stocks : coût moyen pondéré ou PEPS (FIFO)
+
+Chaque entrée en stock crée une couche de coût; les ventes et la consommation
+des services consomment les couches de la plus ancienne à la plus récente.
+Chaque mouvement enregistre le solde de l'article après son passage, calculé
+à partir du solde précédent : rien n'est rejoué depuis le début de l'historique.
+
+Les mouvements sont comptabilisés en lot (``post_stock_movements``) avec un
+nombre fixe de requêtes, quel que soit le nombre de lignes. Un mouvement daté
+avant le dernier mouvement d'un article (réception saisie en retard) garde sa
+date : les soldes des mouvements suivants sont décalés de sa variation.
+"""
+from collections import deque
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Q, Subquery, Value, When
+from django.utils import timezone
+
+from ..models import CostLayer, InventoryItem, StockMovement
+from .sku_index import invalidate_sku_index
+
+
+QUANTITY_PRECISION = Decimal('0.0001')
+UNIT_COST_PRECISION = Decimal('0.01')
+ZERO = Decimal('0')
+
+
+def stock_entry(inventory_item_id, movement_type, quantity, unit_cost=None, movement_date=None,
+                stock_receipt_item_id=None, invoice_item_id=None, reference=''):
+    """
+    Construire une écriture de mouvement pour ``post_stock_movements``
+
+    Args:
+        inventory_item_id (int): Article concerné
+        movement_type (str): Type de mouvement (voir ``StockMovement.MOVEMENT_TYPE_CHOICES``)
+        quantity (Decimal): Quantité signée (positive en entrée, négative en sortie)
+        unit_cost (Decimal, optional): Coût unitaire d'une entrée (défaut: coût courant)
+        movement_date (date, optional): Date du mouvement (défaut: aujourd'hui)
+    """
+    return {
+        'inventory_item_id': inventory_item_id,
+        'movement_type': movement_type,
+        'quantity': Decimal(quantity),
+        'unit_cost': unit_cost,
+        'movement_date': movement_date,
+        'stock_receipt_item_id': stock_receipt_item_id,
+        'invoice_item_id': invoice_item_id,
+        'reference': reference,
+    }
+
+
+class _ItemBalance:
+    """Solde courant d'un article pendant la comptabilisation d'un lot"""
+
+    def __init__(self, item, quantity=ZERO, value=ZERO, last_date=None):
+        self.item = item
+        self.quantity = quantity
+        self.value = value
+        self.last_date = last_date
+        self.layers = deque()
+        # Dernier solde enregistré, et soldes enregistrés aux dates antérieures utiles au lot
+        self.stored_quantity = quantity
+        self.stored_value = value
+        self.stored_last_date = last_date
+        self.stored_as_of = {}
+        # Mouvements du lot avec leur variation : [(mouvement, quantité, valeur)]
+        self.posted = []
+        # Variations à reporter sur les mouvements enregistrés postérieurs : [(date, quantité, valeur)]
+        self.shifts = []
+
+    def is_backdated(self, movement_date):
+        """La date précède-t-elle un mouvement enregistré de l'article?"""
+        return self.stored_last_date is not None and movement_date < self.stored_last_date
+
+    def balance_at(self, movement_date):
+        """Solde à la fin d'une date : mouvements enregistrés, puis mouvements du lot"""
+        if self.is_backdated(movement_date):
+            quantity, value = self.stored_as_of[movement_date]
+        else:
+            quantity, value = self.stored_quantity, self.stored_value
+        for movement, delta_quantity, delta_value in self.posted:
+            if movement.movement_date <= movement_date:
+                quantity += delta_quantity
+                value += delta_value
+        return quantity, value
+
+    def insert_backdated(self, movement, delta_quantity, delta_value):
+        """
+        Placer un mouvement antérieur au dernier mouvement de l'article
+
+        Son solde est celui de sa date; les mouvements postérieurs (du lot ou
+        déjà enregistrés) sont décalés de sa variation. Le coût des sorties
+        déjà comptabilisées n'est pas recalculé.
+        """
+        quantity, value = self.balance_at(movement.movement_date)
+        movement.balance_quantity = quantity + delta_quantity
+        movement.balance_value = value + delta_value
+        for later, _, _ in self.posted:
+            if later.movement_date > movement.movement_date:
+                later.balance_quantity += delta_quantity
+                later.balance_value += delta_value
+        if self.is_backdated(movement.movement_date):
+            self.shifts.append((movement.movement_date, delta_quantity, delta_value))
+
+    @property
+    def unit_cost(self):
+        """Coût unitaire courant (moyen pondéré), ou dernier coût connu si le stock est vide"""
+        if self.quantity > 0:
+            return self.value / self.quantity
+        if self.layers:
+            return self.layers[-1].unit_cost
+        return self.item.unit_cost or ZERO
+
+    def receive(self, quantity, unit_cost, movement_date, stock_receipt_item_id=None):
+        """Entrée en stock : nouvelle couche de coût"""
+        layer = CostLayer(
+            inventory_item_id=self.item.pk,
+            stock_receipt_item_id=stock_receipt_item_id,
+            received_date=movement_date,
+            unit_cost=unit_cost,
+            quantity_received=quantity,
+            quantity_remaining=quantity,
+        )
+        # Les couches restent dans l'ordre des dates d'entrée (réception saisie en retard)
+        position = len(self.layers)
+        while position and self.layers[position - 1].received_date > movement_date:
+            position -= 1
+        self.layers.insert(position, layer)
+        if self.quantity < 0:
+            # Stock négatif : les unités déjà sorties sont régularisées au coût de cette entrée
+            layer.quantity_remaining = max(self.quantity + quantity, ZERO)
+            self.quantity += quantity
+            self.value = self.quantity * unit_cost
+        else:
+            self.quantity += quantity
+            self.value += quantity * unit_cost
+        return layer, quantity * unit_cost
+
+    def issue(self, quantity, consumed_layers):
+        """
+        Sortie de stock : consommer les couches de la plus ancienne à la plus récente
+
+        Returns:
+            Decimal: Coût de la sortie selon la méthode d'évaluation de l'article
+        """
+        average_cost = self.unit_cost
+        remaining = quantity
+        fifo_cost = ZERO
+        while remaining > 0 and self.layers:
+            layer = self.layers[0]
+            taken = min(layer.quantity_remaining, remaining)
+            layer.quantity_remaining -= taken
+            remaining -= taken
+            fifo_cost += taken * layer.unit_cost
+            consumed_layers[id(layer)] = layer
+            if layer.quantity_remaining <= 0:
+                self.layers.popleft()
+
+        if self.item.costing_method == 'fifo':
+            # Quantité non couverte par les couches (stock négatif) : coût courant
+            cost = fifo_cost + remaining * average_cost
+        else:
+            cost = quantity * average_cost
+
+        self.quantity -= quantity
+        if self.quantity <= 0:
+            self.value = self.quantity * average_cost
+        else:
+            self.value -= cost
+        return cost
+
+
+def _last_movement(as_of=None):
+    """Dernier mouvement de l'article courant (ordre des dates, puis des id)"""
+    movements = StockMovement.objects.filter(inventory_item=OuterRef('pk'))
+    if as_of is not None:
+        movements = movements.filter(movement_date__lte=as_of)
+    return movements.order_by('-movement_date', '-id')
+
+
+def _lock_items(item_ids):
+    """Verrouiller les articles et lire leur dernier solde enregistré (une requête)"""
+    last_movement = _last_movement()
+    return InventoryItem.objects.select_for_update().annotate(
+        last_balance_quantity=Subquery(last_movement.values('balance_quantity')[:1]),
+        last_balance_value=Subquery(last_movement.values('balance_value')[:1]),
+        last_movement_date=Subquery(last_movement.values('movement_date')[:1]),
+    ).in_bulk(item_ids)
+
+
+def _load_balances(items):
+    """Soldes des articles verrouillés et leurs couches ouvertes (une requête)"""
+    balances = {}
+    tracked = set()
+    for item_id, item in items.items():
+        if item.last_movement_date is None:
+            balances[item_id] = _ItemBalance(item)
+        else:
+            balances[item_id] = _ItemBalance(
+                item, item.last_balance_quantity, item.last_balance_value, item.last_movement_date
+            )
+            tracked.add(item_id)
+
+    open_layers = CostLayer.objects.filter(
+        inventory_item_id__in=items.keys(), quantity_remaining__gt=0
+    ).order_by('received_date', 'id')
+    for layer in open_layers:
+        balances[layer.inventory_item_id].layers.append(layer)
+
+    return balances, tracked
+
+
+def _load_backdated_balances(balances, dated_items):
+    """
+    Soldes enregistrés aux dates des mouvements saisis en retard
+
+    Une requête par date distincte, seulement pour les articles qui ont déjà
+    un mouvement postérieur à cette date.
+    """
+    by_date = {}
+    for item_id, movement_date in dated_items:
+        if balances[item_id].is_backdated(movement_date):
+            by_date.setdefault(movement_date, set()).add(item_id)
+
+    for movement_date, item_ids in by_date.items():
+        last_movement = _last_movement(movement_date)
+        rows = InventoryItem.objects.filter(pk__in=item_ids).annotate(
+            as_of_quantity=Subquery(last_movement.values('balance_quantity')[:1]),
+            as_of_value=Subquery(last_movement.values('balance_value')[:1]),
+        ).values_list('pk', 'as_of_quantity', 'as_of_value')
+        for item_id, quantity, value in rows:
+            balances[item_id].stored_as_of[movement_date] = (quantity or ZERO, value or ZERO)
+
+
+def _shift_later_movements(balances):
+    """Décaler en une requête les soldes enregistrés postérieurs aux mouvements saisis en retard"""
+    quantity_whens, value_whens, conditions = [], [], Q()
+    for item_id, balance in balances.items():
+        if not balance.shifts:
+            continue
+        # Un mouvement enregistré reçoit la somme des variations datées avant lui :
+        # la date la plus récente est testée en premier
+        cumulative = []
+        total_quantity = total_value = ZERO
+        for movement_date, delta_quantity, delta_value in sorted(balance.shifts, key=lambda shift: shift[0]):
+            total_quantity += delta_quantity
+            total_value += delta_value
+            cumulative.append((movement_date, total_quantity, total_value))
+        for movement_date, total_quantity, total_value in reversed(cumulative):
+            condition = Q(inventory_item_id=item_id, movement_date__gt=movement_date)
+            quantity_whens.append(When(condition, then=Value(total_quantity.quantize(QUANTITY_PRECISION))))
+            value_whens.append(When(condition, then=Value(total_value.quantize(QUANTITY_PRECISION))))
+        conditions |= Q(inventory_item_id=item_id, movement_date__gt=cumulative[0][0])
+
+    if not quantity_whens:
+        return
+    output_field = DecimalField(max_digits=14, decimal_places=4)
+    StockMovement.objects.filter(conditions).update(
+        balance_quantity=F('balance_quantity') + Case(*quantity_whens, default=Value(ZERO), output_field=output_field),
+        balance_value=F('balance_value') + Case(*value_whens, default=Value(ZERO), output_field=output_field),
+    )
+
+
+def _movement(balance, movement_type, quantity, unit_cost, total_cost, movement_date, **refs):
+    return StockMovement(
+        inventory_item_id=balance.item.pk,
+        movement_type=movement_type,
+        movement_date=movement_date,
+        quantity=quantity,
+        unit_cost=unit_cost.quantize(QUANTITY_PRECISION),
+        total_cost=total_cost.quantize(QUANTITY_PRECISION),
+        # Arrondis à l'enregistrement (un mouvement saisi en retard peut encore les décaler)
+        balance_quantity=balance.quantity,
+        balance_value=balance.value,
+        **refs
+    )
+
+
+def _post(balance, movement_type, quantity, unit_cost, movement_date, movements, new_layers,
+          consumed_layers, **refs):
+    """Appliquer un mouvement au solde en mémoire et préparer son enregistrement"""
+    quantity_before, value_before = balance.quantity, balance.value
+    if quantity > 0:
+        unit_cost = balance.unit_cost if unit_cost is None else Decimal(unit_cost)
+        layer, total_cost = balance.receive(quantity, unit_cost, movement_date, refs.get('stock_receipt_item_id'))
+        new_layers.append(layer)
+    else:
+        total_cost = -balance.issue(-quantity, consumed_layers)
+        unit_cost = total_cost / quantity if quantity else balance.unit_cost
+
+    movement = _movement(balance, movement_type, quantity, unit_cost, total_cost, movement_date, **refs)
+    delta_quantity, delta_value = balance.quantity - quantity_before, balance.value - value_before
+    if balance.last_date and movement_date < balance.last_date:
+        balance.insert_backdated(movement, delta_quantity, delta_value)
+    else:
+        balance.last_date = movement_date
+    balance.posted.append((movement, delta_quantity, delta_value))
+    movements.append(movement)
+
+
+def _reconcile(balance, tracked, movement_date, movements, new_layers, consumed_layers):
+    """
+    Aligner le solde évalué sur ``quantity_in_stock``
+
+    Un article jamais évalué reçoit un solde d'ouverture à son coût unitaire;
+    une quantité modifiée hors du moteur (saisie manuelle) donne un ajustement.
+    """
+    item = balance.item
+    difference = item.quantity_in_stock - balance.quantity
+    if balance.item.pk not in tracked:
+        if difference:
+            _post(balance, 'opening', difference, item.unit_cost, movement_date, movements, new_layers,
+                  consumed_layers, reference="Solde d'ouverture")
+        else:
+            movement = _movement(balance, 'opening', ZERO, item.unit_cost or ZERO, ZERO, movement_date,
+                                 reference="Solde d'ouverture")
+            balance.last_date = movement_date
+            balance.posted.append((movement, ZERO, ZERO))
+            movements.append(movement)
+    elif difference:
+        _post(balance, 'adjustment', difference, None, movement_date, movements, new_layers, consumed_layers,
+              reference='Écart avec la quantité en stock')
+
+
+def post_stock_movements(entries=(), items=None, evaluate_alerts=True):
+    """
+    Comptabiliser en lot des mouvements de stock valorisés
+
+    Met à jour les couches de coût, enregistre les mouvements avec leur solde,
+    puis met à jour ``quantity_in_stock`` et ``unit_cost`` (coût moyen du stock
+    restant) des articles. Seul ce moteur écrit ``unit_cost`` : les prix des
+    listes fournisseur vont dans ``supplier_price``.
+
+    Args:
+        entries (iterable): Écritures construites avec ``stock_entry``
+        items (QuerySet, optional): Articles à rapprocher même sans écriture
+        evaluate_alerts (bool): Réévaluer les alertes de stock des articles touchés
+
+    Returns:
+        dict: ``{item_id: InventoryItem}`` des articles mis à jour
+    """
+    entries = list(entries)
+    item_ids = {entry['inventory_item_id'] for entry in entries}
+    if items is not None:
+        item_ids.update(items.values_list('id', flat=True))
+    if not item_ids:
+        return {}
+
+    today = date.today()
+    # Le solde d'ouverture d'un article précède sa première écriture du lot
+    first_dates = {}
+    for entry in entries:
+        movement_date = entry['movement_date'] or today
+        item_id = entry['inventory_item_id']
+        first_dates[item_id] = min(first_dates.get(item_id, movement_date), movement_date)
+
+    with transaction.atomic():
+        items = _lock_items(item_ids)
+        balances, tracked = _load_balances(items)
+        _load_backdated_balances(balances, [
+            (entry['inventory_item_id'], entry['movement_date'] or today) for entry in entries if entry['quantity']
+        ] + [
+            (item_id, first_dates.get(item_id, today)) for item_id, balance in balances.items()
+            if balance.item.quantity_in_stock != balance.quantity
+        ])
+        movements, new_layers, consumed_layers = [], [], {}
+
+        for item_id, balance in balances.items():
+            _reconcile(balance, tracked, first_dates.get(item_id, today), movements, new_layers, consumed_layers)
+
+        for entry in entries:
+            quantity = entry['quantity']
+            if not quantity:
+                continue
+            _post(
+                balances[entry['inventory_item_id']], entry['movement_type'], quantity, entry['unit_cost'],
+                entry['movement_date'] or today, movements, new_layers, consumed_layers,
+                stock_receipt_item_id=entry['stock_receipt_item_id'],
+                invoice_item_id=entry['invoice_item_id'],
+                reference=entry['reference'],
+            )
+
+        now = timezone.now()
+        existing_layers = [layer for layer in consumed_layers.values() if layer.pk]
+        for layer in existing_layers:
+            layer.updated_at = now
+        CostLayer.objects.bulk_update(existing_layers, ['quantity_remaining', 'updated_at'])
+        CostLayer.objects.bulk_create(new_layers)
+        _shift_later_movements(balances)
+        for movement in movements:
+            movement.balance_quantity = movement.balance_quantity.quantize(QUANTITY_PRECISION)
+            movement.balance_value = movement.balance_value.quantize(QUANTITY_PRECISION)
+        StockMovement.objects.bulk_create(movements)
+
+        for balance in balances.values():
+            item = balance.item
+            item.quantity_in_stock = balance.quantity.quantize(QUANTITY_PRECISION)
+            item.unit_cost = max(balance.unit_cost, ZERO).quantize(UNIT_COST_PRECISION)
+            item.updated_at = now
+        # La quantité en stock est recopiée du solde du dernier mouvement : seul le
+        # coût unitaire demande un CASE par article dans la mise à jour groupée
+        InventoryItem.objects.bulk_update(items.values(), ['unit_cost'])
+        InventoryItem.objects.filter(pk__in=items.keys()).update(
+            quantity_in_stock=Subquery(_last_movement().values('balance_quantity')[:1]),
+            updated_at=now,
+        )
+
+        invalidate_sku_index()
+
+        if evaluate_alerts:
+            from .stock_monitoring import evaluate_stock_alerts
+            evaluate_stock_alerts(items.values())
+
+    return items
+
+
+def inventory_valuation_as_of(as_of=None, items=None):
+    """
+    Valeur du stock à une date donnée
+
+    Le solde de chaque article est lu sur son dernier mouvement à la date
+    demandée : une seule requête, quelle que soit la profondeur de l'historique
+    (index sur article, date et id).
+
+    Args:
+        as_of (date, optional): Date d'évaluation (défaut: aujourd'hui)
+        items (QuerySet, optional): Articles à évaluer (défaut: tous)
+
+    Returns:
+        dict: ``as_of``, ``rows`` (une ligne par article évalué), ``total_value``
+        et ``by_category`` ({catégorie: valeur})
+    """
+    as_of = as_of or date.today()
+    if items is None:
+        items = InventoryItem.objects.all()
+
+    last_movement = _last_movement(as_of)
+
+    rows = list(items.annotate(
+        balance_quantity=Subquery(last_movement.values('balance_quantity')[:1]),
+        balance_value=Subquery(last_movement.values('balance_value')[:1]),
+    ).filter(balance_quantity__isnull=False).order_by('category', 'name').values(
+        'id', 'sku', 'name', 'category', 'costing_method', 'balance_quantity', 'balance_value'
+    ))
+
+    total_value = ZERO
+    by_category = {}
+    for row in rows:
+        quantity, value = row['balance_quantity'], row['balance_value']
+        row['unit_cost'] = (value / quantity).quantize(QUANTITY_PRECISION) if quantity > 0 else ZERO
+        total_value += value
+        by_category[row['category']] = by_category.get(row['category'], ZERO) + value
+
+    return {
+        'as_of': as_of,
+        'rows': rows,
+        'total_value': total_value,
+        'by_category': by_category,
+    }
@@ -0,0 +1,149 @@
+"""
+Estimation des heures de conception et d'installation d'un lettrage
+
+Un modèle linéaire (moindres carrés NumPy) est ajusté sur les calculs de
+lettrage des travaux facturés : surface, complexité du type de véhicule,
+type de vinyle et présence d'une lamination. Les coefficients sont enregistrés
+dans ``LaborHourModel`` par la commande ``fit_labor_hours`` puis chargés avec
+l'instantané des tarifs : une suggestion est un simple produit scalaire,
+précédé d'une requête pour lire le type du véhicule.
+"""
+import math
+
+import numpy as np
+from django.db import transaction
+
+from ..models import LaborHourModel, LetteringQuote
+from .lettering_pricing import get_complexity_multiplier, get_material, get_pricing_snapshot
+
+
+BASE_FEATURES = ['intercept', 'surface_area', 'complexity', 'surface_x_complexity', 'lamination']
+TASK_TARGETS = {'design': 'design_hours', 'installation': 'installation_hours'}
+CONFIDENCE_Z = 1.96  # Bande de confiance à 95 %
+
+
+def feature_vector(feature_names, surface_area, complexity, vinyl_type, has_lamination):
+    """Vecteur des variables explicatives dans l'ordre de ``feature_names``"""
+    surface_area = float(surface_area)
+    complexity = float(complexity)
+    values = {
+        'intercept': 1.0,
+        'surface_area': surface_area,
+        'complexity': complexity,
+        'surface_x_complexity': surface_area * complexity,
+        'lamination': 1.0 if has_lamination else 0.0,
+        f'vinyl_type:{vinyl_type}': 1.0,
+    }
+    return np.array([values.get(name, 0.0) for name in feature_names])
+
+
+def training_queryset(converted_only=True):
+    """Calculs de lettrage servant à l'ajustement (par défaut : soumissions converties en facture)"""
+    queryset = LetteringQuote.objects.all()
+    if converted_only:
+        queryset = queryset.filter(related_quote__converted_invoice__isnull=False)
+    return queryset
+
+
+def fit_labor_models(queryset=None):
+    """
+    Ajuster et enregistrer les modèles d'heures de conception et d'installation
+
+    Les variables constantes dans l'historique (ex: aucune lamination) sont
+    écartées pour garder un système bien posé.
+
+    Returns:
+        dict: ``{tâche: {sample_count, r_squared, residual_std, coefficients}}``
+
+    Raises:
+        ValueError: S'il n'y a pas assez de travaux pour ajuster le modèle
+    """
+    queryset = training_queryset() if queryset is None else queryset
+    rows = list(queryset.values(
+        'surface_area', 'vehicle__vehicle_type__complexity_multiplier', 'vinyl_material__type',
+        'lamination_material_id', *TASK_TARGETS.values(),
+    ))
+    if not rows:
+        raise ValueError('Aucun travail de lettrage pour ajuster le modèle')
+
+    # Le type de vinyle le plus fréquent sert de référence
+    type_counts = {}
+    for row in rows:
+        type_counts[row['vinyl_material__type']] = type_counts.get(row['vinyl_material__type'], 0) + 1
+    reference = max(type_counts, key=type_counts.get) if type_counts else None
+    candidates = BASE_FEATURES + [
+        f'vinyl_type:{vinyl_type}' for vinyl_type in sorted(type_counts) if vinyl_type != reference
+    ]
+
+    X = np.array([
+        feature_vector(
+            candidates, row['surface_area'], row['vehicle__vehicle_type__complexity_multiplier'] or 1,
+            row['vinyl_material__type'], row['lamination_material_id'] is not None,
+        )
+        for row in rows
+    ]).reshape(len(rows), len(candidates))
+    keep = [index for index, name in enumerate(candidates) if name == 'intercept' or np.ptp(X[:, index]) > 0]
+    feature_names = [candidates[index] for index in keep]
+    X = X[:, keep]
+
+    sample_count, feature_count = X.shape
+    if sample_count < feature_count + 2:
+        raise ValueError(
+            f'Pas assez de travaux pour ajuster le modèle ({sample_count}, minimum {feature_count + 2})'
+        )
+
+    inverse_gram = np.linalg.pinv(X.T @ X)
+    results = {}
+    with transaction.atomic():
+        for task, target in TASK_TARGETS.items():
+            y = np.array([float(row[target]) for row in rows])
+            coefficients, _, _, _ = np.linalg.lstsq(X, y, rcond=None)
+            residuals = y - X @ coefficients
+            residual_variance = float(residuals @ residuals) / (sample_count - feature_count)
+            total = float(((y - y.mean()) ** 2).sum())
+            r_squared = 1 - float(residuals @ residuals) / total if total else 0.0
+
+            LaborHourModel.objects.update_or_create(task=task, defaults={
+                'feature_names': feature_names,
+                'coefficients': coefficients.tolist(),
+                'covariance': (residual_variance * inverse_gram).tolist(),
+                'residual_std': math.sqrt(residual_variance),
+                'r_squared': r_squared,
+                'sample_count': sample_count,
+            })
+            results[task] = {
+                'sample_count': sample_count,
+                'r_squared': r_squared,
+                'residual_std': math.sqrt(residual_variance),
+                'coefficients': dict(zip(feature_names, coefficients.tolist())),
+            }
+    return results
+
+
+def suggest_hours(vehicle_id, vinyl_material_id, surface_area, lamination_material_id=None, snapshot=None):
+    """
+    Heures suggérées par tâche avec leur bande de confiance
+
+    Une requête lit le type du véhicule; les modèles viennent de l'instantané.
+
+    Returns:
+        dict: ``{tâche: {hours, low, high}}`` (vide si aucun modèle n'est ajusté)
+    """
+    snapshot = snapshot or get_pricing_snapshot()
+    models_by_task = snapshot['labor_models']
+    if not models_by_task or not surface_area:
+        return {}
+
+    complexity = get_complexity_multiplier(snapshot, vehicle_id)
+    vinyl_type = get_material(snapshot, vinyl_material_id)['type']
+    suggestions = {}
+    for task, model in models_by_task.items():
+        x = feature_vector(model['feature_names'], surface_area, complexity, vinyl_type, bool(lamination_material_id))
+        hours = float(x @ model['coefficients'])
+        band = CONFIDENCE_Z * math.sqrt(model['residual_std'] ** 2 + float(x @ model['covariance'] @ x))
+        suggestions[task] = {
+            'hours': round(max(hours, 0.0), 2),
+            'low': round(max(hours - band, 0.0), 2),
+            'high': round(max(hours + band, 0.0), 2),
+        }
+    return suggestions
@@ -0,0 +1,509 @@
+"""
+Calcul du prix d'un lettrage
+
+Un seul noyau de calcul (``price_lettering``) sert le calculateur AJAX, le
+modèle ``LetteringQuote`` et les outils qui en dérivent. Les données de
+référence (taux horaires, matériaux, frais généraux, multiplicateurs de
+complexité des types de véhicules) sont lues dans un instantané en mémoire,
+reconstruit seulement quand l'une d'elles change : une fois l'instantané
+chargé, un calcul ne fait qu'une requête, celle du véhicule (les véhicules
+changent trop souvent pour être gardés dans l'instantané).
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.utils import timezone
+
+from ..models import LaborHourModel, LaborRate, Material, OverheadConfiguration, Vehicle, VehiclePanelArea, VehicleType
+from .local_cache import VersionedSnapshot
+from .taxes import GST_RATE, QST_RATE
+from .vinyl_nesting import DEFAULT_ROLL_WIDTH, DEFAULT_SPACING, nest_pieces, nesting_pricing_inputs
+
+
+PRICING_VERSION_KEY = 'garage_app:lettering_pricing_version'
+
+DEFAULT_COMPLEXITY = Decimal('1.0')
+ZERO = Decimal('0')
+
+MAX_MATRIX_CELLS = 250000
+MAX_AXIS_VALUES = 1000
+MATRIX_COLUMNS = [
+    'vinyl', 'lamination', 'profit_margin', 'waste_percentage',
+    'material_cost', 'total_cost', 'final_price', 'final_price_with_taxes',
+]
+
+
+def build_pricing_snapshot():
+    """Charger les données de référence du lettrage (une requête par table)"""
+    return {
+        'labor_rates': dict(
+            LaborRate.objects.filter(is_active=True).values_list('task_type', 'hourly_rate')
+        ),
+        'materials': {
+            row['id']: row
+            for row in Material.objects.values('id', 'name', 'type', 'cost_per_sqm', 'roll_width', 'is_active')
+        },
+        'overheads': {
+            row['id']: row
+            for row in OverheadConfiguration.objects.values(
+                'id', 'name', 'hourly_overhead_cost', 'fixed_overhead_cost', 'percentage_overhead',
+                'is_active', 'is_default'
+            )
+        },
+        'vehicle_types': dict(VehicleType.objects.values_list('id', 'complexity_multiplier')),
+        'panel_areas': _build_panel_areas(),
+        'labor_models': _build_labor_models(),
+    }
+
+
+def _normalize(value):
+    return (value or '').strip().lower()
+
+
+def _build_labor_models():
+    """Coefficients des modèles d'heures (voir ``labor_estimation``), prêts pour la prédiction"""
+    return {
+        row['task']: {
+            'feature_names': row['feature_names'],
+            'coefficients': np.array(row['coefficients']),
+            'covariance': np.array(row['covariance']),
+            'residual_std': row['residual_std'],
+        }
+        for row in LaborHourModel.objects.values('task', 'feature_names', 'coefficients', 'covariance', 'residual_std')
+    }
+
+
+def _build_panel_areas():
+    """Surfaces par ``(type, marque, modèle)``; marque et modèle vides pour le type entier"""
+    panel_areas = {}
+    rows = VehiclePanelArea.objects.values_list('vehicle_type_id', 'make', 'model', 'panel', 'area')
+    for vehicle_type_id, make, model, panel, area in rows:
+        key = (vehicle_type_id, _normalize(make), _normalize(model))
+        panel_areas.setdefault(key, {})[panel] = area
+    return panel_areas
+
+
+pricing_snapshot = VersionedSnapshot(PRICING_VERSION_KEY, build_pricing_snapshot)
+
+
+def get_pricing_snapshot():
+    """Instantané à jour des données de référence"""
+    return pricing_snapshot.get()
+
+
+def invalidate_pricing_snapshot():
+    """Signaler un changement des données de référence (après la validation de la transaction)"""
+    pricing_snapshot.invalidate()
+
+
+def get_material(snapshot, material_id):
+    """Matériau de l'instantané (requête de secours si créé depuis son chargement)"""
+    material = snapshot['materials'].get(int(material_id))
+    if material is None:
+        material = Material.objects.values('id', 'name', 'type', 'cost_per_sqm', 'roll_width', 'is_active').get(id=material_id)
+    return material
+
+
+def get_overhead(snapshot, overhead_config_id):
+    """Configuration de frais généraux de l'instantané (requête de secours au besoin)"""
+    overhead = snapshot['overheads'].get(int(overhead_config_id))
+    if overhead is None:
+        overhead = OverheadConfiguration.objects.values(
+            'id', 'name', 'hourly_overhead_cost', 'fixed_overhead_cost', 'percentage_overhead',
+            'is_active', 'is_default'
+        ).get(id=overhead_config_id)
+    return overhead
+
+
+def get_vehicle(vehicle_id):
+    """``(type, marque, modèle)`` d'un véhicule (une requête par clé primaire)"""
+    vehicle_type_id, make, model = Vehicle.objects.values_list(
+        'vehicle_type_id', 'make', 'model'
+    ).get(id=vehicle_id)
+    return vehicle_type_id, _normalize(make), _normalize(model)
+
+
+def get_complexity_multiplier(snapshot, vehicle_id):
+    """Multiplicateur de complexité du type du véhicule (1.0 sans type)"""
+    vehicle_type_id = Vehicle.objects.values_list('vehicle_type_id', flat=True).get(id=vehicle_id)
+    if vehicle_type_id is None:
+        return DEFAULT_COMPLEXITY
+    multiplier = snapshot['vehicle_types'].get(vehicle_type_id)
+    if multiplier is None:
+        multiplier = VehicleType.objects.values_list('complexity_multiplier', flat=True).get(id=vehicle_type_id)
+    return multiplier
+
+
+def vehicle_panel_areas(vehicle_id, snapshot=None):
+    """
+    Surfaces des panneaux d'un véhicule selon la bibliothèque
+
+    Les surfaces du type de véhicule sont remplacées par celles de la marque,
+    puis par celles du modèle lorsqu'elles existent.
+
+    Returns:
+        dict: ``{panneau: surface (Decimal)}``
+    """
+    snapshot = snapshot or get_pricing_snapshot()
+    vehicle_type_id, make, model = get_vehicle(vehicle_id)
+    if vehicle_type_id is None:
+        return {}
+    areas = {}
+    for key in ((vehicle_type_id, '', ''), (vehicle_type_id, make, ''), (vehicle_type_id, make, model)):
+        areas.update(snapshot['panel_areas'].get(key, {}))
+    return areas
+
+
+def panel_surface(vehicle_id, panels, snapshot=None):
+    """
+    Surface totale des panneaux cochés
+
+    Raises:
+        ValueError: Si un panneau n'a pas de surface pour ce véhicule
+    """
+    areas = vehicle_panel_areas(vehicle_id, snapshot)
+    missing = [panel for panel in panels if panel not in areas]
+    if missing:
+        raise ValueError(f'Surface inconnue pour ce véhicule: {", ".join(missing)}')
+    return sum((areas[panel] for panel in panels), ZERO)
+
+
+def price_lettering(surface_area, waste_percentage, vinyl_cost_per_sqm, lamination_cost_per_sqm,
+                    design_hours, installation_hours, overhead, profit_margin,
+                    complexity_multiplier=DEFAULT_COMPLEXITY, design_rate=None, installation_rate=None):
+    """
+    Noyau de calcul du prix d'un lettrage (aucune requête)
+
+    Args:
+        surface_area (Decimal): Surface à couvrir (m²)
+        waste_percentage (Decimal): Taux de perte (%)
+        vinyl_cost_per_sqm (Decimal): Coût du vinyle par m²
+        lamination_cost_per_sqm (Decimal): Coût de la lamination par m² (None sans lamination)
+        design_hours (Decimal): Heures de conception
+        installation_hours (Decimal): Heures d'installation
+        overhead (dict): ``hourly_overhead_cost``, ``fixed_overhead_cost`` et ``percentage_overhead``
+        profit_margin (Decimal): Marge bénéficiaire (%)
+        complexity_multiplier (Decimal): Multiplicateur appliqué à l'installation
+        design_rate (Decimal, optional): Taux horaire de conception (None si inactif)
+        installation_rate (Decimal, optional): Taux horaire d'installation (None si inactif)
+
+    Returns:
+        dict: Détail complet des coûts (montants ``Decimal`` non arrondis)
+    """
+    # 1. Coût des matériaux
+    surface_with_waste = surface_area * (1 + waste_percentage / 100)
+    vinyl_cost = surface_with_waste * vinyl_cost_per_sqm
+    lamination_cost = ZERO
+    if lamination_cost_per_sqm is not None:
+        lamination_cost = surface_with_waste * lamination_cost_per_sqm
+    material_cost = vinyl_cost + lamination_cost
+
+    # 2. Coût de la main-d'œuvre
+    design_cost = ZERO
+    if design_rate and design_hours:
+        design_cost = design_hours * design_rate
+
+    installation_cost = ZERO
+    if installation_rate and installation_hours:
+        installation_cost = installation_hours * installation_rate * complexity_multiplier
+
+    labor_cost = design_cost + installation_cost
+
+    # 3. Frais généraux
+    total_hours = design_hours + installation_hours
+    hourly_overhead = total_hours * overhead['hourly_overhead_cost']
+    fixed_overhead = overhead['fixed_overhead_cost']
+    percentage_overhead = (material_cost + labor_cost) * (overhead['percentage_overhead'] / 100)
+    overhead_cost = hourly_overhead + fixed_overhead + percentage_overhead
+
+    # 4. Totaux
+    total_cost = material_cost + labor_cost + overhead_cost
+    subtotal_with_margin = total_cost * (1 + profit_margin / 100)
+
+    # 5. Taxes (Québec)
+    gst_amount = subtotal_with_margin * GST_RATE
+    qst_amount = subtotal_with_margin * QST_RATE
+
+    return {
+        'surface_with_waste': surface_with_waste,
+        'vinyl_cost': vinyl_cost,
+        'lamination_cost': lamination_cost,
+        'material_cost': material_cost,
+        'design_cost': design_cost,
+        'installation_cost': installation_cost,
+        'labor_cost': labor_cost,
+        'hourly_overhead': hourly_overhead,
+        'fixed_overhead': fixed_overhead,
+        'percentage_overhead': percentage_overhead,
+        'overhead_cost': overhead_cost,
+        'total_cost': total_cost,
+        'subtotal_with_margin': subtotal_with_margin,
+        'gst_amount': gst_amount,
+        'qst_amount': qst_amount,
+        'final_price_with_taxes': subtotal_with_margin + gst_amount + qst_amount,
+        'complexity_multiplier': complexity_multiplier,
+        'design_rate': design_rate or ZERO,
+        'installation_rate': installation_rate or ZERO,
+        'gst_rate': GST_RATE * 100,
+        'qst_rate': QST_RATE * 100,
+    }
+
+
+def resolve_references(vehicle_id, vinyl_material_id, overhead_config_id, lamination_material_id=None,
+                       snapshot=None):
+    """
+    Résoudre dans l'instantané les références d'un calcul (matériaux, frais
+    généraux, taux horaires et multiplicateur de complexité)
+
+    Un identifiant inconnu lève ``DoesNotExist`` comme une lecture ORM.
+    """
+    snapshot = snapshot or get_pricing_snapshot()
+    return {
+        'vinyl': get_material(snapshot, vinyl_material_id),
+        'lamination': get_material(snapshot, lamination_material_id) if lamination_material_id else None,
+        'overhead': get_overhead(snapshot, overhead_config_id),
+        'complexity_multiplier': get_complexity_multiplier(snapshot, vehicle_id),
+        'design_rate': snapshot['labor_rates'].get('conception'),
+        'installation_rate': snapshot['labor_rates'].get('installation'),
+    }
+
+
+def quote_lettering(vehicle_id, vinyl_material_id, overhead_config_id, surface_area,
+                    waste_percentage=Decimal('15'), lamination_material_id=None, design_hours=ZERO,
+                    installation_hours=ZERO, profit_margin=Decimal('30'), snapshot=None, references=None):
+    """
+    Calculer le prix d'un lettrage à partir des identifiants du formulaire
+
+    Returns:
+        dict: Détail des coûts (voir ``price_lettering``)
+    """
+    references = references or resolve_references(
+        vehicle_id, vinyl_material_id, overhead_config_id, lamination_material_id, snapshot
+    )
+    lamination = references['lamination']
+
+    return price_lettering(
+        surface_area=surface_area,
+        waste_percentage=waste_percentage,
+        vinyl_cost_per_sqm=references['vinyl']['cost_per_sqm'],
+        lamination_cost_per_sqm=lamination['cost_per_sqm'] if lamination else None,
+        design_hours=design_hours,
+        installation_hours=installation_hours,
+        overhead=references['overhead'],
+        profit_margin=profit_margin,
+        complexity_multiplier=references['complexity_multiplier'],
+        design_rate=references['design_rate'],
+        installation_rate=references['installation_rate'],
+    )
+
+
+def nest_lettering_job(pieces, vinyl_material_id, roll_width=None, spacing=DEFAULT_SPACING, snapshot=None):
+    """
+    Imbriquer les pièces d'un travail sur le rouleau du vinyle choisi
+
+    La largeur du rouleau vient de la requête, sinon du matériau, sinon du
+    rouleau standard de 54 po.
+
+    Returns:
+        dict: Résultat de ``nest_pieces`` avec ``surface_area`` et
+        ``waste_percentage`` prêts pour ``quote_lettering``
+    """
+    if not roll_width:
+        snapshot = snapshot or get_pricing_snapshot()
+        roll_width = get_material(snapshot, vinyl_material_id)['roll_width'] or DEFAULT_ROLL_WIDTH
+    nesting = nest_pieces(pieces, roll_width=roll_width, spacing=spacing)
+    nesting.update(nesting_pricing_inputs(nesting))
+    return nesting
+
+
+def resolve_job_surface(vehicle_id, vinyl_material_id, surface_area=None, waste_percentage=None,
+                        panels=None, pieces=None, roll_width=None, snapshot=None):
+    """
+    Surface et taux de perte d'un travail selon les données fournies
+
+    Par ordre de priorité : imbrication des pièces sur le rouleau, somme des
+    panneaux cochés, puis surface saisie.
+
+    Returns:
+        dict: ``surface_area``, ``waste_percentage`` et ``nesting`` (ou None)
+    """
+    nesting = None
+    if pieces:
+        nesting = nest_lettering_job(pieces, vinyl_material_id, roll_width=roll_width, snapshot=snapshot)
+        surface_area = nesting['surface_area']
+        waste_percentage = nesting['waste_percentage']
+    elif panels:
+        surface_area = panel_surface(vehicle_id, panels, snapshot)
+    return {
+        'surface_area': Decimal(str(surface_area or 0)),
+        'waste_percentage': Decimal(str(15 if waste_percentage in (None, '') else waste_percentage)),
+        'nesting': nesting,
+    }
+
+
+def nesting_summary(nesting):
+    """Résumé JSON d'une imbrication (sans le détail des positions)"""
+    return {
+        key: float(nesting[key])
+        for key in ('roll_width', 'length_used', 'roll_area', 'pieces_area', 'waste_area', 'waste_percentage')
+    } | {'pieces_count': nesting['pieces_count']}
+
+
+def _material_reference(material):
+    if material is None:
+        return None
+    return {'id': material['id'], 'name': material['name'], 'cost_per_sqm': str(material['cost_per_sqm'])}
+
+
+def build_cost_snapshot(breakdown, references):
+    """
+    Instantané immuable d'un calcul, sérialisable en JSON
+
+    Conserve les montants intermédiaires et les références utilisées (coûts
+    des matériaux, frais généraux, taux horaires) pour que le détail d'une
+    soumission ne change pas quand les tarifs changent.
+    """
+    overhead = references['overhead']
+    return {
+        'priced_at': timezone.now().isoformat(),
+        'vinyl_material': _material_reference(references['vinyl']),
+        'lamination_material': _material_reference(references['lamination']),
+        'overhead_config': {
+            'id': overhead['id'],
+            'name': overhead['name'],
+            'hourly_overhead_cost': str(overhead['hourly_overhead_cost']),
+            'fixed_overhead_cost': str(overhead['fixed_overhead_cost']),
+            'percentage_overhead': str(overhead['percentage_overhead']),
+        },
+        'breakdown': {key: str(value) for key, value in breakdown.items()},
+    }
+
+
+def load_breakdown(cost_snapshot):
+    """Montants d'un instantané enregistré (``Decimal``)"""
+    return {key: Decimal(value) for key, value in cost_snapshot['breakdown'].items()}
+
+
+def expand_axis(spec, name):
+    """
+    Valeurs d'un axe de la matrice : liste explicite ou plage
+    ``{"start": 10, "stop": 40, "step": 5}`` (bornes incluses)
+
+    Raises:
+        ValueError: Si la plage est invalide ou trop longue
+    """
+    if isinstance(spec, dict):
+        try:
+            start, stop = float(spec['start']), float(spec['stop'])
+            step = float(spec.get('step', 1))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f'Plage invalide pour {name}')
+        if step <= 0 or stop < start:
+            raise ValueError(f'Plage invalide pour {name}')
+        count = int(round((stop - start) / step)) + 1
+        if count > MAX_AXIS_VALUES:
+            raise ValueError(f'Trop de valeurs pour {name} (maximum {MAX_AXIS_VALUES})')
+        values = [round(start + index * step, 4) for index in range(count)]
+    elif isinstance(spec, (list, tuple)):
+        try:
+            values = [float(value) for value in spec]
+        except (TypeError, ValueError):
+            raise ValueError(f'Valeur invalide pour {name}')
+    else:
+        values = [float(spec)]
+
+    if not values or len(values) > MAX_AXIS_VALUES:
+        raise ValueError(f'Nombre de valeurs invalide pour {name}')
+    return values
+
+
+def price_matrix(vehicle_id, overhead_config_id, surface_area, vinyl_material_ids, lamination_material_ids,
+                 profit_margins, waste_percentages, design_hours=ZERO, installation_hours=ZERO, snapshot=None):
+    """
+    Grille de prix « et si » : vinyles × laminations × marges × taux de perte
+
+    Toute la grille est calculée en un passage vectorisé NumPy à partir de
+    l'instantané des données de référence (aucune requête une fois chargé).
+    La formule est celle de ``price_lettering``, en virgule flottante.
+
+    Args:
+        lamination_material_ids (list): Laminations comparées (``None`` = sans lamination)
+        profit_margins (list): Marges bénéficiaires (%)
+        waste_percentages (list): Taux de perte (%)
+
+    Returns:
+        dict: ``axes`` (valeurs de chaque dimension), ``columns`` et ``rows``
+        (une ligne par cellule, les dimensions données par leur indice dans ``axes``)
+
+    Raises:
+        ValueError: Si la grille dépasse ``MAX_MATRIX_CELLS`` cellules
+    """
+    snapshot = snapshot or get_pricing_snapshot()
+    vinyls = [get_material(snapshot, material_id) for material_id in vinyl_material_ids]
+    laminations = [
+        get_material(snapshot, material_id) if material_id else None
+        for material_id in lamination_material_ids
+    ]
+    shape = (len(vinyls), len(laminations), len(profit_margins), len(waste_percentages))
+    cells = int(np.prod(shape))
+    if not cells:
+        raise ValueError('Chaque dimension de la matrice doit contenir au moins une valeur')
+    if cells > MAX_MATRIX_CELLS:
+        raise ValueError(f'Matrice trop grande ({cells} cellules, maximum {MAX_MATRIX_CELLS})')
+
+    # Les termes indépendants de la grille sont calculés une seule fois par le noyau
+    overhead = get_overhead(snapshot, overhead_config_id)
+    fixed = price_lettering(
+        surface_area=Decimal(str(surface_area)),
+        waste_percentage=ZERO,
+        vinyl_cost_per_sqm=ZERO,
+        lamination_cost_per_sqm=None,
+        design_hours=Decimal(str(design_hours)),
+        installation_hours=Decimal(str(installation_hours)),
+        overhead={**overhead, 'percentage_overhead': ZERO},
+        profit_margin=ZERO,
+        complexity_multiplier=get_complexity_multiplier(snapshot, vehicle_id),
+        design_rate=snapshot['labor_rates'].get('conception'),
+        installation_rate=snapshot['labor_rates'].get('installation'),
+    )
+    labor_cost = float(fixed['labor_cost'])
+    hours_overhead = float(fixed['hourly_overhead'] + fixed['fixed_overhead'])
+    percentage = float(overhead['percentage_overhead']) / 100
+
+    # Axes diffusés : (vinyle, lamination, marge, perte)
+    vinyl_cost = np.array([float(vinyl['cost_per_sqm']) for vinyl in vinyls]).reshape(-1, 1, 1, 1)
+    lamination_cost = np.array(
+        [float(lamination['cost_per_sqm']) if lamination else 0.0 for lamination in laminations]
+    ).reshape(1, -1, 1, 1)
+    margin = np.asarray(profit_margins, dtype=float).reshape(1, 1, -1, 1)
+    surface_with_waste = float(surface_area) * (1 + np.asarray(waste_percentages, dtype=float) / 100)
+
+    material_cost = (vinyl_cost + lamination_cost) * surface_with_waste.reshape(1, 1, 1, -1)
+    base_cost = material_cost + labor_cost
+    total_cost = base_cost + base_cost * percentage + hours_overhead
+    final_price = total_cost * (1 + margin / 100)
+    final_price_with_taxes = final_price * (1 + float(GST_RATE) + float(QST_RATE))
+
+    indices = np.indices(shape).reshape(4, -1).T
+    values = np.stack([
+        np.broadcast_to(material_cost, shape).ravel(),
+        np.broadcast_to(total_cost, shape).ravel(),
+        np.broadcast_to(final_price, shape).ravel(),
+        final_price_with_taxes.ravel(),
+    ], axis=1).round(2)
+
+    return {
+        'axes': {
+            'vinyl': [{'id': vinyl['id'], 'name': vinyl['name']} for vinyl in vinyls],
+            'lamination': [
+                {'id': lamination['id'], 'name': lamination['name']} if lamination else None
+                for lamination in laminations
+            ],
+            'profit_margin': [float(value) for value in profit_margins],
+            'waste_percentage': [float(value) for value in waste_percentages],
+        },
+        'columns': MATRIX_COLUMNS,
+        # Indices d'axes entiers suivis des montants (hstack convertirait les indices en réels)
+        'rows': [index_row + value_row for index_row, value_row in zip(indices.tolist(), values.tolist())],
+        'cells': cells,
+    }
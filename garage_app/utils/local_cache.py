@@ -0,0 +1,67 @@
+"""
+Données de référence gardées en mémoire dans chaque processus
+
+Un compteur de version partagé dans le cache indique quand les données ont
+changé : le processus ne reconstruit son instantané local que si la version du
+cache diffère de la sienne. Une lecture coûte donc une consultation du cache,
+sans requête SQL.
+
+Avec plusieurs processus, le cache doit être partagé (Redis, Memcached) pour
+que l'invalidation atteigne tous les processus.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+class CacheVersion:
+    """Compteur de version partagé dans le cache, incrémenté à chaque changement des données"""
+
+    def __init__(self, version_key):
+        self.version_key = version_key
+
+    def current_version(self):
+        """Version courante dans le cache (initialisée au besoin)"""
+        version = cache.get(self.version_key)
+        if version is None:
+            # Valeur initiale unique pour ne jamais réutiliser une version après une éviction
+            cache.add(self.version_key, time.time_ns(), None)
+            version = cache.get(self.version_key)
+        return version
+
+    def _bump_version(self):
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.add(self.version_key, time.time_ns(), None)
+
+    def invalidate(self):
+        """Signaler un changement des données (après la validation de la transaction)"""
+        transaction.on_commit(self._bump_version)
+
+
+class VersionedSnapshot(CacheVersion):
+    """Instantané local reconstruit quand le compteur de version du cache change"""
+
+    def __init__(self, version_key, builder):
+        super().__init__(version_key)
+        self.builder = builder
+        self._version = None
+        self._data = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Instantané à jour (reconstruit seulement si la version du cache a changé)"""
+        version = self.current_version()
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    self._data = self.builder()
+                    self._version = version
+        return self._data
+
+    def reset(self):
+        """Oublier l'instantané local de ce processus (bancs d'essai, tests)"""
+        self._version = None
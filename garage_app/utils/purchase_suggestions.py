@@ -0,0 +1,181 @@
+"""
+Suggestions de commandes fournisseurs
+
+Les articles sous leur point de réapprovisionnement sont regroupés par
+fournisseur en bons de commande brouillons (StockReceipt au statut « draft »).
+Le nombre de requêtes est fixe, quel que soit le nombre d'articles.
+"""
+import math
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+
+from ..models import InventoryItem, StockReceipt, StockReceiptItem
+from .taxes import GST_RATE, QST_RATE
+
+
+ORDER_METHOD_CHOICES = [
+    ('fill', 'Remplir jusqu\'au niveau cible'),
+    ('eoq', 'Quantité économique de commande (EOQ)'),
+]
+
+# Jours de consommation couverts au-delà du point de réapprovisionnement
+DEFAULT_REVIEW_DAYS = 30
+# Coût fixe d'une commande (CAD) et taux annuel de possession du stock pour l'EOQ
+DEFAULT_ORDERING_COST = 25.0
+DEFAULT_HOLDING_RATE = 0.25
+
+# Statuts des bons de réception considérés comme commandes en cours
+OPEN_RECEIPT_STATUSES = ['draft', 'received']
+
+
+def economic_order_quantity(annual_demand, ordering_cost, holding_cost):
+    """Quantité économique de commande (formule de Wilson)"""
+    if annual_demand <= 0 or holding_cost <= 0:
+        return 0.0
+    return math.sqrt(2 * annual_demand * ordering_cost / holding_cost)
+
+
+def _pending_quantities():
+    """Quantités déjà commandées (bons brouillons ou reçus non traités) par article"""
+    rows = StockReceiptItem.objects.filter(
+        stock_receipt__status__in=OPEN_RECEIPT_STATUSES
+    ).values('inventory_item_id').annotate(total=Sum('quantity'))
+    return {row['inventory_item_id']: float(row['total']) for row in rows}
+
+
+def build_purchase_suggestions(method='fill', use_forecast=True, review_days=DEFAULT_REVIEW_DAYS,
+                               ordering_cost=DEFAULT_ORDERING_COST, holding_rate=DEFAULT_HOLDING_RATE):
+    """
+    Construire les suggestions de commande groupées par fournisseur
+
+    Le point de réapprovisionnement retenu est le plus élevé entre
+    ``reorder_level`` et le point suggéré par la prévision de consommation.
+    Les quantités déjà en commande sont déduites du stock disponible.
+
+    Args:
+        method (str): ``'fill'`` (remplir jusqu'au niveau cible) ou ``'eoq'``
+        use_forecast (bool): Utiliser la prévision de consommation
+        review_days (int): Jours de consommation à couvrir au-delà du point de réappro
+        ordering_cost (float): Coût fixe d'une commande pour l'EOQ
+        holding_rate (float): Taux annuel de possession (fraction du coût unitaire)
+
+    Returns:
+        dict: ``{'orders': [...], 'unassigned': [...]}``. Chaque commande contient
+        ``supplier``, ``lines`` et ``subtotal``; chaque ligne contient ``item``,
+        ``quantity``, ``unit_cost``, ``total``, ``reorder_point`` et ``position``.
+    """
+    items = InventoryItem.objects.filter(is_active=True).select_related('supplier').order_by('name')
+
+    forecast = {}
+    if use_forecast:
+        from .inventory_forecast import compute_inventory_forecast
+        forecast = compute_inventory_forecast(items=InventoryItem.objects.filter(is_active=True))
+
+    pending = _pending_quantities()
+    orders = {}
+    unassigned = []
+
+    for item in items:
+        data = forecast.get(item.id, {})
+        burn_rate = data.get('burn_rate', 0.0)
+        reorder_point = max(float(item.reorder_level), data.get('suggested_reorder_point', 0.0))
+        position = float(item.quantity_in_stock) + pending.get(item.id, 0.0)
+
+        if position > reorder_point:
+            continue
+
+        target_level = reorder_point + burn_rate * review_days
+        quantity = target_level - position
+        if method == 'eoq':
+            eoq = economic_order_quantity(burn_rate * 365, ordering_cost, holding_rate * float(item.unit_cost))
+            if eoq > 0:
+                quantity = max(eoq, reorder_point - position)
+
+        # Les lignes de réception sont en unités entières et doivent remonter
+        # la position au-dessus du point de réapprovisionnement
+        quantity = int(math.ceil(round(max(quantity, 0), 6)))
+        if position + quantity <= reorder_point:
+            quantity = int(math.floor(reorder_point - position)) + 1
+        # Prix de la dernière liste de prix du fournisseur, sinon coût moyen du stock
+        unit_cost = max(item.supplier_price or item.unit_cost, Decimal('0.01'))
+        line = {
+            'item': item,
+            'quantity': quantity,
+            'unit_cost': unit_cost,
+            'total': unit_cost * quantity,
+            'reorder_point': round(reorder_point, 4),
+            'position': round(position, 4),
+        }
+
+        if item.supplier_id is None:
+            unassigned.append(line)
+            continue
+
+        order = orders.setdefault(item.supplier_id, {
+            'supplier': item.supplier,
+            'lines': [],
+            'subtotal': Decimal('0.00'),
+        })
+        order['lines'].append(line)
+        order['subtotal'] += line['total']
+
+    return {
+        'orders': sorted(orders.values(), key=lambda order: order['supplier'].name),
+        'unassigned': unassigned,
+    }
+
+
+@transaction.atomic
+def create_draft_purchase_orders(suggestions, receipt_date=None):
+    """
+    Créer un bon de réception brouillon par fournisseur à partir des suggestions
+
+    TPS et TVQ sont estimées aux taux du Québec sur le sous-total; elles
+    peuvent être corrigées à la réception de la facture du fournisseur.
+
+    Trois requêtes au total (réservation des numéros, insertion des bons,
+    insertion des lignes), quel que soit le nombre de lignes; SQLite peut
+    toutefois découper les insertions en lots selon sa limite de paramètres.
+
+    Returns:
+        list: Bons de réception créés
+    """
+    orders = suggestions['orders']
+    if not orders:
+        return []
+
+    receipt_date = receipt_date or date.today()
+    numbers = StockReceipt.allocate_receipt_numbers(len(orders))
+
+    receipts = []
+    for number, order in zip(numbers, orders):
+        receipt = StockReceipt(
+            receipt_number=number,
+            supplier=order['supplier'],
+            receipt_date=receipt_date,
+            status='draft',
+            gst_amount=(order['subtotal'] * GST_RATE).quantize(Decimal('0.01')),
+            qst_amount=(order['subtotal'] * QST_RATE).quantize(Decimal('0.01')),
+            notes='Bon de commande suggéré automatiquement (articles sous le point de réapprovisionnement)',
+        )
+        # Même total que StockReceipt.calculate_totals : sous-total + TPS + TVQ
+        receipt.apply_totals(order['subtotal'])
+        receipts.append(receipt)
+    receipts = StockReceipt.objects.bulk_create(receipts)
+
+    receipt_items = [
+        StockReceiptItem(
+            stock_receipt=receipt,
+            inventory_item=line['item'],
+            quantity=line['quantity'],
+            purchase_price=line['unit_cost'],
+        )
+        for receipt, order in zip(receipts, orders)
+        for line in order['lines']
+    ]
+    StockReceiptItem.objects.bulk_create(receipt_items)
+
+    return receipts
@@ -0,0 +1,152 @@
+"""
+Rappels de rendez-vous
+
+Les rendez-vous d'une fenêtre (par défaut : le lendemain) sont sélectionnés en
+une requête sur l'index ``(status, start_datetime)``, en écartant ceux qui ont
+déjà un rappel du même type. Les messages sont rendus en mémoire puis écrits
+en lot dans la boîte d'envoi (``OutboxMessage``) avec les ``AppointmentReminder``
+correspondants, dans une seule transaction : le nombre de requêtes ne dépend
+pas du nombre de rendez-vous.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.template import Context, Template
+from django.utils import timezone
+
+from ..models import Appointment, AppointmentReminder, CompanyProfile, OutboxMessage
+
+
+REMINDER_STATUSES = ['scheduled', 'confirmed']
+DEFAULT_COMPANY_NAME = 'Garage MarKev'
+
+REMINDER_SUBJECT = Template('Rappel : votre rendez-vous du {{ start|date:"d/m/Y" }} à {{ start|time:"H:i" }}')
+REMINDER_BODY = Template(
+    'Bonjour {{ client_first_name }},\n\n'
+    'Nous vous rappelons votre rendez-vous « {{ title }} » le {{ start|date:"l j F Y" }} '
+    'à {{ start|time:"H:i" }} (fin prévue vers {{ end|time:"H:i" }}).\n'
+    '{% if vehicle %}Véhicule : {{ vehicle }}\n{% endif %}'
+    '\nPour modifier ou annuler, communiquez avec nous{% if company_phone %} au {{ company_phone }}{% endif %}.\n\n'
+    'Cordialement,\n'
+    "L'équipe {{ company_name }}"
+)
+
+
+def reminder_window(days_ahead=1, window_hours=24, today=None):
+    """Fenêtre de rappel : de minuit (heure locale) dans ``days_ahead`` jours, pour ``window_hours`` heures"""
+    day = (today or timezone.localdate()) + timedelta(days=days_ahead)
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(hours=window_hours)
+
+
+def due_reminders(window_start, window_end, kind='day_before'):
+    """Rendez-vous de la fenêtre sans rappel de ce type (une seule requête)"""
+    return (
+        Appointment.objects
+        .filter(status__in=REMINDER_STATUSES, start_datetime__gte=window_start, start_datetime__lt=window_end)
+        .exclude(Exists(AppointmentReminder.objects.filter(appointment=OuterRef('pk'), kind=kind)))
+        .select_related('client', 'vehicle')
+        .order_by('start_datetime')
+    )
+
+
+def render_reminder(appointment, company):
+    """Objet et texte du rappel d'un rendez-vous (aucune requête)"""
+    vehicle = appointment.vehicle
+    context = Context({
+        'client_first_name': appointment.client.first_name,
+        'title': appointment.title,
+        'start': timezone.localtime(appointment.start_datetime),
+        'end': timezone.localtime(appointment.end_datetime),
+        'vehicle': f'{vehicle.year} {vehicle.make} {vehicle.model}' if vehicle else '',
+        'company_name': company.name if company else DEFAULT_COMPANY_NAME,
+        'company_phone': company.phone if company else '',
+    })
+    return REMINDER_SUBJECT.render(context), REMINDER_BODY.render(context)
+
+
+def dispatch_reminders(window_start, window_end, kind='day_before', dry_run=False):
+    """
+    Créer les rappels de la fenêtre et les déposer dans la boîte d'envoi
+
+    Un client avec courriel reçoit un message ``email``; sinon un message
+    ``phone`` est ajouté à la liste d'appels de l'équipe.
+
+    Returns:
+        dict: ``selected`` (rendez-vous à rappeler), ``email``, ``phone``
+        (messages créés par canal) et ``skipped`` (sans courriel ni téléphone)
+    """
+    appointments = list(due_reminders(window_start, window_end, kind))
+    company = CompanyProfile.objects.first()
+
+    messages = []
+    reminders = []
+    skipped = 0
+    for appointment in appointments:
+        client = appointment.client
+        if client.email:
+            channel, recipient = 'email', client.email
+        elif client.phone:
+            channel, recipient = 'phone', client.phone
+        else:
+            skipped += 1
+            continue
+        subject, body = render_reminder(appointment, company)
+        messages.append(OutboxMessage(channel=channel, recipient=recipient, subject=subject, body=body))
+        reminders.append(AppointmentReminder(appointment=appointment, kind=kind))
+
+    summary = {
+        'selected': len(appointments),
+        'email': sum(1 for message in messages if message.channel == 'email'),
+        'phone': sum(1 for message in messages if message.channel == 'phone'),
+        'skipped': skipped,
+    }
+    if dry_run or not messages:
+        return summary
+
+    with transaction.atomic():
+        # L'index unique (rendez-vous, type) empêche un double rappel si deux envois se chevauchent
+        OutboxMessage.objects.bulk_create(messages)
+        for reminder, message in zip(reminders, messages):
+            reminder.message = message
+        AppointmentReminder.objects.bulk_create(reminders)
+    return summary
+
+
+def send_pending_emails(limit=500):
+    """
+    Envoyer les courriels en attente de la boîte d'envoi avec une seule connexion
+
+    Returns:
+        dict: ``sent`` et ``failed``
+    """
+    pending = list(OutboxMessage.objects.filter(status='pending', channel='email').order_by('created_at')[:limit])
+    if not pending:
+        return {'sent': 0, 'failed': 0}
+
+    now = timezone.now()
+    connection = get_connection()
+    connection.open()
+    try:
+        for message in pending:
+            try:
+                EmailMessage(
+                    subject=message.subject,
+                    body=message.body,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=[message.recipient],
+                    connection=connection,
+                ).send()
+                message.status, message.sent_at, message.error = 'sent', now, ''
+            except Exception as e:
+                message.status, message.error = 'failed', str(e)
+            message.updated_at = now
+    finally:
+        connection.close()
+
+    OutboxMessage.objects.bulk_update(pending, ['status', 'sent_at', 'error', 'updated_at'])
+    sent = sum(1 for message in pending if message.status == 'sent')
+    return {'sent': sent, 'failed': len(pending) - sent}
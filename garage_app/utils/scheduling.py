@@ -0,0 +1,389 @@
+"""
+Planification des ressources (baies et techniciens)
+
+Les réservations de chaque ressource sont rangées par jour dans des intervalles
+triés par heure de début, avec le maximum cumulé des heures de fin. Un conflit
+se vérifie alors par recherche binaire : il existe une réservation qui chevauche
+``[début, fin)`` si, parmi celles qui commencent avant ``fin``, la plus tardive
+des heures de fin dépasse ``début``. Les réservations sont chargées en une
+seule requête pour toute la plage étudiée.
+
+La recherche de plages libres balaie, jour par jour, l'union des périodes
+occupées des ressources demandées. Ces périodes sont chargées en une requête
+par plage de dates et gardées dans le cache jusqu'à la prochaine écriture
+d'un rendez-vous.
+"""
+import heapq
+import math
+from bisect import bisect_left
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from ..models import Appointment, Resource
+from .local_cache import CacheVersion
+
+
+# Les rendez-vous annulés ou manqués libèrent leurs ressources
+BLOCKING_STATUSES = ['scheduled', 'confirmed', 'in_progress', 'completed']
+
+# Heures d'ouverture utilisées pour proposer des plages libres
+OPENING_TIME = time(8, 0)
+CLOSING_TIME = time(17, 30)
+WORKING_WEEKDAYS = {0, 1, 2, 3, 4, 5}  # Lundi au samedi
+SLOT_STEP_MINUTES = 15
+MAX_SLOT_SEARCH_DAYS = 62
+BUSY_CACHE_TIMEOUT = 60 * 60
+
+busy_intervals_version = CacheVersion('scheduling:busy_intervals_version')
+
+
+def _days(start, end, tz):
+    """Jours locaux touchés par l'intervalle ``[start, end)``"""
+    day = start.astimezone(tz).date()
+    last = (end - timedelta(microseconds=1)).astimezone(tz).date()
+    days = [day]
+    while day < last:
+        day += timedelta(days=1)
+        days.append(day)
+    return days
+
+
+class _DayIntervals:
+    """Réservations d'une ressource pour un jour, triées par début"""
+
+    __slots__ = ('starts', 'entries', 'max_ends')
+
+    def __init__(self):
+        self.starts = []
+        self.entries = []  # (début, fin, rendez-vous)
+        self.max_ends = []  # Maximum cumulé des fins
+
+    def add(self, start, end, appointment_id):
+        entry = (start, end, appointment_id)
+        index = bisect_left(self.entries, entry)
+        self.starts.insert(index, start)
+        self.entries.insert(index, entry)
+        previous = self.max_ends[index - 1] if index else float('-inf')
+        self.max_ends.insert(index, max(previous, end))
+        for position in range(index + 1, len(self.max_ends)):
+            if self.max_ends[position] >= self.max_ends[position - 1]:
+                break
+            self.max_ends[position] = self.max_ends[position - 1]
+
+    @classmethod
+    def from_entries(cls, entries):
+        """Construire la structure d'un coup à partir d'entrées ``(début, fin, rendez-vous)``"""
+        intervals = cls()
+        intervals.entries = sorted(entries)
+        intervals.starts = [entry[0] for entry in intervals.entries]
+        latest = float('-inf')
+        for entry in intervals.entries:
+            latest = max(latest, entry[1])
+            intervals.max_ends.append(latest)
+        return intervals
+
+    def overlaps(self, start, end, exclude=None):
+        """Rendez-vous qui chevauchent ``[start, end)``"""
+        index = bisect_left(self.starts, end) - 1
+        if index < 0 or self.max_ends[index] <= start:
+            return []
+        found = []
+        while index >= 0 and self.max_ends[index] > start:
+            entry_start, entry_end, appointment_id = self.entries[index]
+            if entry_end > start and appointment_id != exclude:
+                found.append(appointment_id)
+            index -= 1
+        return found
+
+
+class ResourceSchedule:
+    """
+    Réservations des ressources sur une plage, indexées par ressource et par jour
+
+    Les heures sont conservées en secondes (horodatage) pour des comparaisons rapides.
+    """
+
+    def __init__(self):
+        self.intervals = {}
+        # Fuseau résolu une seule fois : timezone.localtime() coûte cher par appel
+        self.tz = timezone.get_current_timezone()
+
+    @classmethod
+    def load(cls, start, end, resource_ids=None, exclude_appointment_id=None):
+        """Charger les réservations qui chevauchent ``[start, end)`` (une seule requête)"""
+        assignments = Appointment.resources.through.objects.filter(
+            appointment__start_datetime__lt=end,
+            appointment__end_datetime__gt=start,
+            appointment__status__in=BLOCKING_STATUSES,
+        )
+        if resource_ids is not None:
+            assignments = assignments.filter(resource_id__in=resource_ids)
+        if exclude_appointment_id:
+            assignments = assignments.exclude(appointment_id=exclude_appointment_id)
+
+        # Regrouper par ressource et par jour, puis trier chaque groupe une seule fois
+        tz = timezone.get_current_timezone()
+        grouped = {}
+        for resource_id, appointment_id, appointment_start, appointment_end in assignments.values_list(
+            'resource_id', 'appointment_id', 'appointment__start_datetime', 'appointment__end_datetime'
+        ):
+            entry = (appointment_start.timestamp(), appointment_end.timestamp(), appointment_id)
+            for day in _days(appointment_start, appointment_end, tz):
+                grouped.setdefault((resource_id, day), []).append(entry)
+
+        schedule = cls()
+        schedule.intervals = {key: _DayIntervals.from_entries(entries) for key, entries in grouped.items()}
+        return schedule
+
+    def add(self, resource_id, appointment_id, start, end):
+        """Ajouter une réservation (sans contrôle de conflit)"""
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        for day in _days(start, end, self.tz):
+            key = (resource_id, day)
+            if key not in self.intervals:
+                self.intervals[key] = _DayIntervals()
+            self.intervals[key].add(start_ts, end_ts, appointment_id)
+
+    def conflicts(self, resource_id, start, end, exclude=None):
+        """Rendez-vous de la ressource qui chevauchent ``[start, end)``, en O(log n) par jour"""
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        found = set()
+        for day in _days(start, end, self.tz):
+            day_intervals = self.intervals.get((resource_id, day))
+            if day_intervals:
+                found.update(day_intervals.overlaps(start_ts, end_ts, exclude))
+        return sorted(found)
+
+    def book(self, resource_ids, appointment_id, start, end):
+        """
+        Réserver les ressources si elles sont libres
+
+        Returns:
+            dict: ``{ressource: [rendez-vous en conflit]}`` (vide si la réservation est faite)
+        """
+        conflicts = {}
+        for resource_id in resource_ids:
+            overlapping = self.conflicts(resource_id, start, end, exclude=appointment_id)
+            if overlapping:
+                conflicts[resource_id] = overlapping
+        if not conflicts:
+            for resource_id in resource_ids:
+                self.add(resource_id, appointment_id, start, end)
+        return conflicts
+
+
+def check_booking(resource_ids, start, end, exclude_appointment_id=None):
+    """
+    Vérifier qu'un rendez-vous peut réserver des ressources
+
+    Returns:
+        dict: ``{ressource: [rendez-vous en conflit]}`` (vide si aucune collision)
+    """
+    resource_ids = list(resource_ids)
+    if not resource_ids or start >= end:
+        return {}
+    schedule = ResourceSchedule.load(start, end, resource_ids, exclude_appointment_id)
+    return {
+        resource_id: overlapping
+        for resource_id in resource_ids
+        if (overlapping := schedule.conflicts(resource_id, start, end))
+    }
+
+
+def validate_week(week_start, resource_ids=None):
+    """
+    Détecter toutes les collisions d'une semaine en une passe
+
+    Les réservations de la semaine sont chargées en une requête, triées par
+    ressource et par début, puis balayées en gardant la fin la plus tardive
+    rencontrée pour chaque ressource.
+
+    Args:
+        week_start (date): Premier jour de la semaine (heure locale)
+
+    Returns:
+        dict: ``total`` (réservations vérifiées) et ``conflicts`` (liste
+        ``{resource_id, appointment_id, conflicts_with, start, end}``)
+    """
+    start = timezone.make_aware(datetime.combine(week_start, datetime.min.time()))
+    end = start + timedelta(days=7)
+
+    assignments = Appointment.resources.through.objects.filter(
+        appointment__start_datetime__lt=end,
+        appointment__end_datetime__gt=start,
+        appointment__status__in=BLOCKING_STATUSES,
+    )
+    if resource_ids is not None:
+        assignments = assignments.filter(resource_id__in=resource_ids)
+    rows = sorted(assignments.values_list(
+        'resource_id', 'appointment__start_datetime', 'appointment__end_datetime', 'appointment_id'
+    ))
+
+    conflicts = []
+    current_resource = None
+    latest_end = latest_id = None
+    for resource_id, appointment_start, appointment_end, appointment_id in rows:
+        if resource_id != current_resource:
+            current_resource, latest_end, latest_id = resource_id, None, None
+        if latest_end is not None and appointment_start < latest_end:
+            conflicts.append({
+                'resource_id': resource_id,
+                'appointment_id': appointment_id,
+                'conflicts_with': latest_id,
+                'start': appointment_start,
+                'end': appointment_end,
+            })
+        if latest_end is None or appointment_end > latest_end:
+            latest_end, latest_id = appointment_end, appointment_id
+
+    return {'total': len(rows), 'conflicts': conflicts}
+
+
+def invalidate_busy_intervals():
+    """Invalider les périodes occupées en cache (après la validation de la transaction)"""
+    busy_intervals_version.invalidate()
+
+
+def load_busy_intervals(start_date, end_date):
+    """
+    Périodes occupées par ressource entre deux dates locales (incluses)
+
+    Une seule requête par plage; le résultat est gardé dans le cache sous la
+    version courante, qui change à chaque écriture d'un rendez-vous.
+
+    Returns:
+        dict: ``{ressource: [(début, fin), ...]}`` en horodatages, triés
+    """
+    key = f'scheduling:busy:{busy_intervals_version.current_version()}:{start_date:%Y%m%d}:{end_date:%Y%m%d}'
+    busy = cache.get(key)
+    if busy is not None:
+        return busy
+
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(start_date, time.min), tz)
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min), tz)
+    busy = {}
+    for resource_id, appointment_start, appointment_end in Appointment.resources.through.objects.filter(
+        appointment__start_datetime__lt=end,
+        appointment__end_datetime__gt=start,
+        appointment__status__in=BLOCKING_STATUSES,
+    ).values_list('resource_id', 'appointment__start_datetime', 'appointment__end_datetime'):
+        busy.setdefault(resource_id, []).append((appointment_start.timestamp(), appointment_end.timestamp()))
+    for intervals in busy.values():
+        intervals.sort()
+
+    cache.set(key, busy, BUSY_CACHE_TIMEOUT)
+    return busy
+
+
+def merge_intervals(*sorted_lists):
+    """Union d'intervalles déjà triés, fusionnés en périodes disjointes"""
+    merged = []
+    for start, end in heapq.merge(*sorted_lists):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _working_windows(start_date, end_date, not_before, tz):
+    """Heures d'ouverture de chaque jour ouvrable, en horodatages"""
+    day = start_date
+    while day <= end_date:
+        if day.weekday() in WORKING_WEEKDAYS:
+            opening = timezone.make_aware(datetime.combine(day, OPENING_TIME), tz).timestamp()
+            closing = timezone.make_aware(datetime.combine(day, CLOSING_TIME), tz).timestamp()
+            opening = max(opening, not_before)
+            if opening < closing:
+                yield opening, closing
+        day += timedelta(days=1)
+
+
+def _free_slots(busy, windows, duration, limit):
+    """Balayer les périodes occupées fusionnées et garder le premier départ de chaque trou assez long"""
+    step = SLOT_STEP_MINUTES * 60
+    slots = []
+    index = 0
+    for opening, closing in windows:
+        cursor = opening
+        while index < len(busy) and busy[index][1] <= opening:
+            index += 1
+        position = index
+        while cursor < closing:
+            gap_end = min(busy[position][0], closing) if position < len(busy) else closing
+            # Aligner le début sur le pas de réservation (ex: quart d'heure)
+            slot_start = math.ceil(cursor / step) * step
+            if gap_end - slot_start >= duration:
+                slots.append(slot_start)
+                if len(slots) >= limit:
+                    return slots
+            if position >= len(busy) or busy[position][0] >= closing:
+                break
+            cursor = max(cursor, busy[position][1])
+            position += 1
+    return slots
+
+
+def find_free_slots(duration, start_date, end_date, resource_ids=(), resource_type=None, limit=5, now=None):
+    """
+    Premières plages libres d'une durée donnée
+
+    Les ressources de ``resource_ids`` doivent toutes être libres; si
+    ``resource_type`` est donné, une ressource active de ce type (n'importe
+    laquelle) doit l'être aussi.
+
+    Args:
+        duration (timedelta): Durée du rendez-vous
+        start_date (date): Premier jour de recherche (heure locale)
+        end_date (date): Dernier jour de recherche (inclus)
+
+    Returns:
+        list: ``{start, end, resource_ids}`` triées par début
+
+    Raises:
+        ValueError: Si la durée ou la plage de dates est invalide
+    """
+    if duration <= timedelta(0):
+        raise ValueError('La durée doit être positive')
+    if end_date < start_date:
+        raise ValueError('La date de fin précède la date de début')
+    if (end_date - start_date).days >= MAX_SLOT_SEARCH_DAYS:
+        raise ValueError(f'Plage de recherche trop longue (maximum {MAX_SLOT_SEARCH_DAYS} jours)')
+
+    required = sorted(set(resource_ids))
+    if resource_type:
+        alternatives = [
+            resource_id for resource_id in Resource.objects.filter(
+                resource_type=resource_type, is_active=True
+            ).order_by('name').values_list('id', flat=True)
+            if resource_id not in required
+        ]
+        combinations = [required + [resource_id] for resource_id in alternatives]
+    else:
+        combinations = [required] if required else []
+
+    tz = timezone.get_current_timezone()
+    not_before = (now or timezone.now()).timestamp()
+    busy = load_busy_intervals(start_date, end_date)
+    seconds = duration.total_seconds()
+
+    found = {}
+    for combination in combinations:
+        merged = merge_intervals(*(busy.get(resource_id, []) for resource_id in combination))
+        windows = _working_windows(start_date, end_date, not_before, tz)
+        for slot_start in _free_slots(merged, windows, seconds, limit):
+            # À heure égale, garder la première ressource (ordre alphabétique)
+            found.setdefault(slot_start, combination)
+
+    return [
+        {
+            'start': datetime.fromtimestamp(slot_start, tz),
+            'end': datetime.fromtimestamp(slot_start + seconds, tz),
+            'resource_ids': found[slot_start],
+        }
+        for slot_start in sorted(found)[:limit]
+    ]
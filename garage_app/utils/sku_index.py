@@ -0,0 +1,83 @@
+"""
+Index en mémoire des codes d'articles (SKU et codes-barres) pour la recherche
+rapide au comptoir et les comptes d'inventaire
+
+Chaque processus garde son propre dictionnaire ``code -> article``, reconstruit
+en une requête quand le compteur de version du cache change (voir
+``local_cache.VersionedSnapshot``). Une recherche coûte ensuite une lecture de
+cache par requête et une consultation de dictionnaire par code.
+"""
+from ..models import InventoryItem
+from .local_cache import VersionedSnapshot
+
+
+SKU_INDEX_VERSION_KEY = 'garage_app:sku_index_version'
+
+
+def normalize_code(code):
+    """Normaliser un code lu ou saisi (casse et espaces)"""
+    return str(code or '').strip().upper()
+
+
+def _item_record(row):
+    return {
+        'id': row['id'],
+        'sku': row['sku'],
+        'barcode': row['barcode'],
+        'name': row['name'],
+        'quantity_in_stock': float(row['quantity_in_stock']),
+        'unit_price': float(row['unit_price']),
+        'location': row['location'],
+        'is_active': row['is_active'],
+    }
+
+
+def build_sku_index():
+    """Construire le dictionnaire ``code normalisé -> article`` en une requête"""
+    codes = {}
+    rows = InventoryItem.objects.values(
+        'id', 'sku', 'barcode', 'name', 'quantity_in_stock', 'unit_price', 'location', 'is_active'
+    )
+    for row in rows:
+        record = _item_record(row)
+        codes[normalize_code(row['sku'])] = record
+        if row['barcode']:
+            codes.setdefault(normalize_code(row['barcode']), record)
+    return codes
+
+
+sku_index = VersionedSnapshot(SKU_INDEX_VERSION_KEY, build_sku_index)
+
+
+def get_sku_index():
+    """Index local à jour (reconstruit seulement si la version du cache a changé)"""
+    return sku_index.get()
+
+
+def invalidate_sku_index():
+    """Signaler un changement d'inventaire (après la validation de la transaction)"""
+    sku_index.invalidate()
+
+
+def lookup_code(code):
+    """Rechercher un article par SKU ou code-barres (None si inconnu)"""
+    return get_sku_index().get(normalize_code(code))
+
+
+def lookup_codes(codes):
+    """
+    Rechercher plusieurs codes avec une seule vérification de version
+
+    Returns:
+        dict: ``found`` ({code lu: article}) et ``not_found`` (codes inconnus)
+    """
+    index = get_sku_index()
+    found = {}
+    not_found = []
+    for code in codes:
+        record = index.get(normalize_code(code))
+        if record is None:
+            not_found.append(code)
+        else:
+            found[code] = record
+    return {'found': found, 'not_found': not_found}
@@ -0,0 +1,122 @@
+"""
+Saisie en lot des quantités d'un inventaire physique
+
+Les quantités arrivent d'un fichier CSV (SKU, quantité comptée) ou d'un lot de
+lectures du lecteur de codes-barres (un code par ligne, éventuellement suivi
+d'une quantité). Les codes sont résolus avec l'index en mémoire et les lignes
+du compte sont écrites avec ``bulk_create``/``bulk_update``.
+"""
+import re
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import StockCountLine
+from .sku_index import lookup_codes
+from .supplier_import import iter_csv_rows, parse_decimal
+
+
+COUNT_ENTRY_MODE_CHOICES = [
+    ('add', 'Ajouter aux quantités déjà comptées'),
+    ('replace', 'Remplacer les quantités comptées'),
+]
+
+_SCAN_SEPARATOR = re.compile(r'[,;\t ]+')
+
+
+def parse_scanner_batch(text):
+    """
+    Lire un lot de lectures du lecteur de codes-barres
+
+    Chaque ligne contient un code (une unité) ou un code suivi d'une quantité
+    (``CODE,3``, ``CODE;2.5`` ou ``CODE<tab>4``). Les lectures répétées d'un
+    même code s'additionnent.
+
+    Returns:
+        tuple: (``{code: quantité}``, liste des lignes invalides)
+    """
+    counts = {}
+    invalid = []
+    for line_number, line in enumerate((text or '').splitlines(), start=1):
+        parts = [part for part in _SCAN_SEPARATOR.split(line.strip()) if part]
+        if not parts:
+            continue
+        quantity = Decimal('1')
+        if len(parts) > 1:
+            quantity = parse_decimal(parts[1])
+            if quantity is None or quantity < 0:
+                invalid.append((line_number, f'Quantité invalide: {line.strip()}'))
+                continue
+        counts[parts[0]] = counts.get(parts[0], Decimal('0')) + quantity
+    return counts, invalid
+
+
+def parse_count_csv(stream):
+    """
+    Lire un fichier CSV de compte (colonnes SKU/code et quantité)
+
+    Returns:
+        tuple: (``{code: quantité}``, liste des lignes invalides)
+    """
+    counts = {}
+    invalid = []
+    for line_number, row, columns in iter_csv_rows(stream):
+        code = (row.get(columns.get('sku', ''), '') or '').strip()
+        quantity = parse_decimal(row.get(columns.get('quantity', ''), ''))
+        if not code or quantity is None or quantity < 0:
+            invalid.append((line_number, 'Code ou quantité invalide'))
+            continue
+        counts[code] = counts.get(code, Decimal('0')) + quantity
+    return counts, invalid
+
+
+def record_counts(stock_count, counts, mode='add'):
+    """
+    Enregistrer en lot des quantités comptées dans une session ouverte
+
+    Args:
+        stock_count (StockCount): Session d'inventaire (statut « open »)
+        counts (dict): ``{code: quantité}`` (SKU ou code-barres)
+        mode (str): ``'add'`` (cumuler) ou ``'replace'`` (remplacer)
+
+    Returns:
+        dict: ``lines_created``, ``lines_updated`` et ``not_found`` (codes inconnus)
+    """
+    resolved = lookup_codes(counts.keys())
+    quantities = {}
+    for code, record in resolved['found'].items():
+        quantities[record['id']] = quantities.get(record['id'], Decimal('0')) + counts[code]
+
+    stats = {'lines_created': 0, 'lines_updated': 0, 'not_found': resolved['not_found']}
+    if not quantities:
+        return stats
+
+    with transaction.atomic():
+        existing = {
+            line.inventory_item_id: line
+            for line in stock_count.count_lines.select_for_update().filter(inventory_item_id__in=quantities.keys())
+        }
+
+        now = timezone.now()
+        to_update = []
+        to_create = []
+        for item_id, quantity in quantities.items():
+            line = existing.get(item_id)
+            if line is None:
+                to_create.append(StockCountLine(
+                    stock_count=stock_count,
+                    inventory_item_id=item_id,
+                    counted_quantity=quantity,
+                ))
+            else:
+                line.counted_quantity = quantity if mode == 'replace' else line.counted_quantity + quantity
+                line.updated_at = now
+                to_update.append(line)
+
+        StockCountLine.objects.bulk_update(to_update, ['counted_quantity', 'updated_at'])
+        StockCountLine.objects.bulk_create(to_create)
+
+    stats['lines_created'] = len(to_create)
+    stats['lines_updated'] = len(to_update)
+    return stats
@@ -6,6 +6,96 @@ from django.utils import timezone
 from ..models import InventoryItem, StockAlert
 
 
+# Messages utilisés lors de la résolution automatique des alertes
+AUTO_RESOLVE_MESSAGES = {
+    'reorder': "Stock réapprovisionné automatiquement",
+    'low_stock': "Stock reconstitué automatiquement",
+    'out_of_stock': "Stock reconstitué automatiquement",
+}
+
+
+def _required_alerts(item):
+    """Alertes requises pour un article : {type d'alerte: seuil}"""
+    required = {}
+    if item.needs_reorder:
+        required['reorder'] = item.reorder_level
+    if item.is_low_stock:
+        required['low_stock'] = item.minimum_stock_level
+    if item.quantity_in_stock == 0:
+        required['out_of_stock'] = 0
+    return required
+
+
+def evaluate_stock_alerts(items):
+    """
+    Évaluer en lot les alertes de stock d'une liste d'articles
+
+    Équivalent groupé de ``resolve_alerts_if_stock_sufficient`` suivi de
+    ``check_stock_alerts`` : le nombre de requêtes est constant, quel que soit
+    le nombre d'articles. Les articles doivent refléter les quantités à jour.
+
+    Args:
+        items (iterable): Instances d'InventoryItem
+
+    Returns:
+        dict: ``alerts_created`` et ``alerts_resolved``
+    """
+    items = {item.pk: item for item in items}
+    stats = {'alerts_created': 0, 'alerts_resolved': 0}
+    if not items:
+        return stats
+
+    now = timezone.now()
+    active = {
+        (alert.inventory_item_id, alert.alert_type): alert
+        for alert in StockAlert.objects.filter(inventory_item_id__in=items.keys(), status='active')
+    }
+
+    to_update = []
+    to_create = []
+
+    for item_id, item in items.items():
+        required = _required_alerts(item)
+
+        for alert_type in ('reorder', 'low_stock', 'out_of_stock'):
+            key = (item_id, alert_type)
+            alert = active.get(key)
+
+            if alert_type in required:
+                threshold = int(required[alert_type])
+                if alert:
+                    alert.quantity_at_alert = int(item.quantity_in_stock)
+                    alert.threshold_level = threshold
+                    alert.updated_at = now
+                    to_update.append(alert)
+                else:
+                    to_create.append(StockAlert(
+                        inventory_item_id=item_id,
+                        alert_type=alert_type,
+                        quantity_at_alert=int(item.quantity_in_stock),
+                        threshold_level=threshold,
+                    ))
+            elif alert:
+                alert.status = 'resolved'
+                alert.resolved_date = now
+                alert.action_taken = AUTO_RESOLVE_MESSAGES[alert_type]
+                alert.updated_at = now
+                to_update.append(alert)
+                stats['alerts_resolved'] += 1
+
+    with transaction.atomic():
+        if to_update:
+            StockAlert.objects.bulk_update(
+                to_update,
+                ['status', 'resolved_date', 'action_taken', 'quantity_at_alert', 'threshold_level', 'updated_at']
+            )
+        if to_create:
+            StockAlert.objects.bulk_create(to_create)
+            stats['alerts_created'] = len(to_create)
+
+    return stats
+
+
 def check_all_inventory_stock_alerts():
     """
     Vérifier tous les articles d'inventaire et créer les alertes nécessaires
@@ -23,27 +113,23 @@ def check_all_inventory_stock_alerts():
     }
     
     # Obtenir tous les articles actifs
-    inventory_items = InventoryItem.objects.filter(is_active=True)
+    inventory_items = list(InventoryItem.objects.filter(is_active=True))
     
-    with transaction.atomic():
-        for item in inventory_items:
-            stats['items_checked'] += 1
-            
-            # Résoudre les alertes si le stock est suffisant
-            resolved_alerts = item.resolve_alerts_if_stock_sufficient()
-            stats['alerts_resolved'] += len(resolved_alerts)
-            
-            # Vérifier et créer de nouvelles alertes
-            new_alerts = item.check_stock_alerts()
-            stats['alerts_created'] += len(new_alerts)
-            
-            # Compter les différents types de problèmes de stock
-            if item.needs_reorder:
-                stats['items_needing_reorder'] += 1
-            if item.is_low_stock:
-                stats['items_low_stock'] += 1
-            if item.quantity_in_stock == 0:
-                stats['items_out_of_stock'] += 1
+    for item in inventory_items:
+        stats['items_checked'] += 1
+
+        # Compter les différents types de problèmes de stock
+        if item.needs_reorder:
+            stats['items_needing_reorder'] += 1
+        if item.is_low_stock:
+            stats['items_low_stock'] += 1
+        if item.quantity_in_stock == 0:
+            stats['items_out_of_stock'] += 1
+
+    # Résoudre et créer les alertes en lot
+    alert_stats = evaluate_stock_alerts(inventory_items)
+    stats['alerts_created'] = alert_stats['alerts_created']
+    stats['alerts_resolved'] = alert_stats['alerts_resolved']
     
     return stats
 
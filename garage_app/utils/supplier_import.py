@@ -0,0 +1,286 @@
+"""
+Importation en continu des fichiers CSV fournisseurs (bordereaux de livraison
+et listes de prix)
+
+Le fichier est lu ligne par ligne et validé par blocs : la mémoire utilisée
+dépend du catalogue d'articles (index des codes partagé de ``sku_index``) et
+non de la taille du fichier. Les lignes d'un bordereau sont agrégées par article puis insérées avec
+``bulk_create`` dans un seul bon de réception.
+
+Les prix lus sont enregistrés dans ``InventoryItem.supplier_price`` : le coût
+unitaire des articles reste le coût moyen du stock, tenu par
+``inventory_valuation.post_stock_movements`` à la réception.
+"""
+import csv
+import io
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import InventoryItem, StockReceipt, StockReceiptItem
+from .sku_index import get_sku_index, normalize_code
+
+
+IMPORT_MODE_CHOICES = [
+    ('delivery', 'Bordereau de livraison (crée un bon de réception)'),
+    ('price_list', 'Liste de prix (met à jour les prix fournisseur)'),
+]
+
+DEFAULT_CHUNK_SIZE = 1000
+# Nombre maximal d'exemples conservés dans le rapport (SKU inconnus, lignes invalides)
+MAX_REPORTED_SAMPLES = 50
+
+# Noms de colonnes acceptés (en minuscules, sans accents ni espaces superflus)
+COLUMN_ALIASES = {
+    'sku': ['sku', 'code', 'code sku', 'item', 'article', 'no article', 'part number', 'part_number', 'reference'],
+    'quantity': ['quantity', 'qty', 'quantite', 'qte', 'qté', 'quantité'],
+    'price': ['price', 'unit price', 'unit_price', 'cost', 'unit cost', 'unit_cost', 'prix', 'prix unitaire', 'cout', 'coût'],
+}
+
+
+def parse_decimal(value):
+    """Convertir une valeur CSV en Decimal (accepte la virgule décimale et le symbole $)"""
+    cleaned = (value or '').strip().replace('$', '').replace('\xa0', '').replace(' ', '')
+    if ',' in cleaned and '.' not in cleaned:
+        cleaned = cleaned.replace(',', '.')
+    else:
+        cleaned = cleaned.replace(',', '')
+    if not cleaned:
+        return None
+    try:
+        return Decimal(cleaned)
+    except InvalidOperation:
+        return None
+
+
+def _resolve_columns(fieldnames):
+    """Associer les colonnes du fichier aux champs attendus"""
+    normalized = {name.strip().lower(): name for name in fieldnames or [] if name}
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                columns[field] = normalized[alias]
+                break
+    return columns
+
+
+def iter_csv_rows(stream):
+    """
+    Parcourir un fichier CSV texte en continu
+
+    Le séparateur (virgule, point-virgule ou tabulation) est détecté sur la
+    première ligne, comme dans les exports Excel français.
+
+    Yields:
+        tuple: (numéro de ligne, dict de la ligne, colonnes résolues)
+    """
+    header = stream.readline()
+    if not header:
+        return
+    try:
+        dialect = csv.Sniffer().sniff(header, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+
+    fieldnames = next(csv.reader([header], dialect))
+    columns = _resolve_columns(fieldnames)
+    reader = csv.DictReader(stream, fieldnames=fieldnames, dialect=dialect)
+    for line_number, row in enumerate(reader, start=2):
+        yield line_number, row, columns
+
+
+def _chunks(iterable, size):
+    """Découper un itérable en listes de ``size`` éléments"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _new_report(mode):
+    return {
+        'mode': mode,
+        'rows': 0,
+        'matched': 0,
+        'unmatched_count': 0,
+        'unmatched_skus': [],
+        'invalid_count': 0,
+        'invalid_rows': [],
+        'prices_updated': 0,
+        'receipt': None,
+        'receipt_lines': 0,
+    }
+
+
+def _record(report, key, sample):
+    report[f'{key}_count'] += 1
+    samples = report['unmatched_skus' if key == 'unmatched' else 'invalid_rows']
+    if len(samples) < MAX_REPORTED_SAMPLES:
+        samples.append(sample)
+
+
+def _validate_chunk(chunk, mode, sku_index, report):
+    """
+    Valider un bloc de lignes
+
+    Les SKU sont recherchés dans l'index partagé (SKU ou code-barres, même
+    normalisation que la recherche au comptoir).
+
+    Returns:
+        list: Lignes valides ``(id article, quantité, prix)``
+    """
+    valid = []
+    for line_number, row, columns in chunk:
+        report['rows'] += 1
+        sku = normalize_code(row.get(columns.get('sku', ''), ''))
+        if not sku:
+            _record(report, 'invalid', (line_number, 'SKU manquant'))
+            continue
+
+        record = sku_index.get(sku)
+        if record is None:
+            _record(report, 'unmatched', sku)
+            continue
+
+        price = parse_decimal(row.get(columns.get('price', ''), ''))
+        if price is not None and price < Decimal('0.01'):
+            _record(report, 'invalid', (line_number, f'Prix invalide pour {sku}'))
+            continue
+
+        quantity = None
+        if mode == 'delivery':
+            quantity = parse_decimal(row.get(columns.get('quantity', ''), ''))
+            if quantity is None or quantity < 1 or quantity != quantity.to_integral_value():
+                _record(report, 'invalid', (line_number, f'Quantité invalide pour {sku} (entier positif attendu)'))
+                continue
+            quantity = int(quantity)
+        elif price is None:
+            _record(report, 'invalid', (line_number, f'Prix manquant pour {sku}'))
+            continue
+
+        report['matched'] += 1
+        valid.append((record['id'], quantity, price))
+    return valid
+
+
+def _current_prices(item_ids):
+    """Prix fournisseur actuels d'un ensemble d'articles, en une requête"""
+    return dict(InventoryItem.objects.filter(pk__in=item_ids).values_list('id', 'supplier_price'))
+
+
+def _default_purchase_prices(item_ids):
+    """Prix d'achat des lignes sans prix : prix fournisseur, sinon coût moyen du stock"""
+    return {
+        item_id: max(supplier_price or unit_cost, Decimal('0.01'))
+        for item_id, supplier_price, unit_cost in InventoryItem.objects.filter(pk__in=item_ids).values_list(
+            'id', 'supplier_price', 'unit_cost'
+        )
+    }
+
+
+def _weighted_price(quantity, priced_quantity, priced_cost, default_price):
+    """Prix unitaire pondéré par les quantités d'un article livré sur plusieurs lignes"""
+    cost = priced_cost + (quantity - priced_quantity) * (default_price or Decimal('0'))
+    return max((cost / quantity).quantize(Decimal('0.01')), Decimal('0.01'))
+
+
+def _flush_price_updates(valid, now, report):
+    """Mettre à jour en une requête groupée les prix fournisseur modifiés d'un bloc"""
+    priced = {item_id: price for item_id, _, price in valid if price is not None}
+    if not priced:
+        return
+    current = _current_prices(priced)
+    changed = {item_id: price for item_id, price in priced.items() if current.get(item_id) != price}
+
+    if changed:
+        InventoryItem.objects.bulk_update(
+            [InventoryItem(pk=item_id, supplier_price=price, updated_at=now) for item_id, price in changed.items()],
+            ['supplier_price', 'updated_at']
+        )
+        report['prices_updated'] += len(changed)
+
+
+def import_supplier_csv(stream, supplier, mode='delivery', update_prices=None, receipt_date=None,
+                        supplier_invoice_number=None, status='draft', chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Importer un fichier CSV fournisseur en continu
+
+    Args:
+        stream: Flux texte du fichier CSV (lu ligne par ligne)
+        supplier (Supplier): Fournisseur du bordereau ou de la liste de prix
+        mode (str): ``'delivery'`` ou ``'price_list'``
+        update_prices (bool, optional): Mettre à jour ``supplier_price`` des articles
+            (défaut: seulement en mode liste de prix)
+        receipt_date (date, optional): Date du bon de réception (défaut: aujourd'hui)
+        supplier_invoice_number (str, optional): Numéro de facture fournisseur
+        status (str): Statut du bon de réception créé
+        chunk_size (int): Nombre de lignes validées par bloc
+
+    Returns:
+        dict: Rapport d'importation (lignes lues, correspondances, SKU inconnus,
+        lignes invalides, prix mis à jour, bon de réception créé)
+    """
+    if update_prices is None:
+        update_prices = mode == 'price_list'
+
+    report = _new_report(mode)
+    sku_index = get_sku_index()
+    now = timezone.now()
+    # Agrégation par article : bornée par la taille du catalogue, pas par celle du fichier
+    received = {}
+
+    with transaction.atomic():
+        for chunk in _chunks(iter_csv_rows(stream), chunk_size):
+            valid = _validate_chunk(chunk, mode, sku_index, report)
+
+            if update_prices:
+                _flush_price_updates(valid, now, report)
+
+            if mode == 'delivery':
+                # Quantité totale, puis quantité et coût des lignes avec un prix
+                for item_id, quantity, price in valid:
+                    line = received.setdefault(item_id, [0, 0, Decimal('0')])
+                    line[0] += quantity
+                    if price is not None:
+                        line[1] += quantity
+                        line[2] += quantity * price
+
+        if mode == 'delivery' and received:
+            receipt = StockReceipt.objects.create(
+                supplier=supplier,
+                receipt_date=receipt_date or date.today(),
+                supplier_invoice_number=supplier_invoice_number,
+                status=status,
+                notes='Bon de réception importé depuis un fichier CSV fournisseur',
+            )
+            default_prices = _default_purchase_prices(
+                [item_id for item_id, (quantity, priced, _) in received.items() if priced < quantity]
+            )
+            receipt_items = (
+                StockReceiptItem(
+                    stock_receipt=receipt,
+                    inventory_item_id=item_id,
+                    quantity=quantity,
+                    purchase_price=_weighted_price(quantity, priced, cost, default_prices.get(item_id)),
+                )
+                for item_id, (quantity, priced, cost) in received.items()
+            )
+            for batch in _chunks(receipt_items, chunk_size):
+                StockReceiptItem.objects.bulk_create(batch)
+
+            receipt.calculate_totals()
+            report['receipt'] = receipt
+            report['receipt_lines'] = len(received)
+
+    return report
+
+
+def open_uploaded_csv(uploaded_file, encoding='utf-8-sig'):
+    """Ouvrir un fichier téléversé comme flux texte sans le charger en mémoire"""
+    return io.TextIOWrapper(uploaded_file.file, encoding=encoding, errors='replace', newline='')
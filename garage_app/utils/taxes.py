@@ -0,0 +1,8 @@
+"""
+Taux des taxes de vente du Québec, partagés par les calculs de prix et d'achats
+"""
+from decimal import Decimal
+
+
+GST_RATE = Decimal('0.05')  # TPS 5%
+QST_RATE = Decimal('0.09975')  # TVQ 9.975%
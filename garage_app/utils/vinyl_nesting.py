@@ -0,0 +1,199 @@
+"""
+Imbrication des pièces de lettrage sur un rouleau de vinyle
+
+Les pièces rectangulaires d'un travail (panneaux, logos, bandes) sont placées
+sur un rouleau de largeur fixe avec une heuristique de « skyline » : chaque
+pièce est posée à l'endroit qui garde le profil supérieur le plus bas, en
+essayant les deux orientations. Le résultat donne la longueur réelle de
+rouleau consommée et la perte effective, qui remplacent le taux de perte fixe
+dans le calcul du prix.
+"""
+from decimal import Decimal
+
+
+DEFAULT_ROLL_WIDTH = Decimal('1.37')  # Rouleau de 54 po
+DEFAULT_SPACING = Decimal('0.01')  # 1 cm entre les pièces
+MAX_PIECES = 5000
+
+
+def _to_float(value, name):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Valeur invalide pour {name}')
+    if value <= 0:
+        raise ValueError(f'{name} doit être positif')
+    return value
+
+
+def expand_pieces(pieces):
+    """
+    Déplier la liste des pièces (``width``, ``height``, ``quantity``, ``label``, ``rotate``)
+
+    Returns:
+        list: Une entrée ``(largeur, hauteur, libellé, rotation permise)`` par pièce
+
+    Raises:
+        ValueError: Si une dimension ou une quantité est invalide
+    """
+    expanded = []
+    for index, piece in enumerate(pieces, start=1):
+        width = _to_float(piece.get('width'), f'la largeur de la pièce {index}')
+        height = _to_float(piece.get('height'), f'la hauteur de la pièce {index}')
+        try:
+            quantity = int(piece.get('quantity', 1))
+        except (TypeError, ValueError):
+            raise ValueError(f'Quantité invalide pour la pièce {index}')
+        if quantity < 1:
+            raise ValueError(f'Quantité invalide pour la pièce {index}')
+        label = piece.get('label') or f'Pièce {index}'
+        rotate = bool(piece.get('rotate', True))
+        expanded.extend([(width, height, label, rotate)] * quantity)
+
+    if not expanded:
+        raise ValueError('Aucune pièce à imbriquer')
+    if len(expanded) > MAX_PIECES:
+        raise ValueError(f'Trop de pièces (maximum {MAX_PIECES})')
+    return expanded
+
+
+class _Skyline:
+    """Profil supérieur du rouleau : segments ``[x, y, largeur]`` triés par x"""
+
+    def __init__(self, width):
+        self.width = width
+        self.segments = [[0.0, 0.0, width]]
+
+    def fit(self, index, width):
+        """Hauteur de pose d'une pièce de largeur ``width`` à partir du segment ``index``"""
+        x = self.segments[index][0]
+        if x + width > self.width + 1e-9:
+            return None
+        y = 0.0
+        remaining = width
+        while remaining > 1e-9 and index < len(self.segments):
+            segment = self.segments[index]
+            y = max(y, segment[1])
+            remaining -= segment[2]
+            index += 1
+        return y
+
+    def place(self, index, width, top):
+        """Poser une pièce sur le segment ``index`` et mettre le profil à jour"""
+        x = self.segments[index][0]
+        end = x + width
+        self.segments.insert(index, [x, top, width])
+
+        # Raccourcir ou retirer les segments recouverts par la pièce
+        next_index = index + 1
+        while next_index < len(self.segments):
+            segment = self.segments[next_index]
+            if segment[0] >= end - 1e-9:
+                break
+            overlap = end - segment[0]
+            if segment[2] <= overlap + 1e-9:
+                del self.segments[next_index]
+            else:
+                segment[0] += overlap
+                segment[2] -= overlap
+                break
+
+        # Fusionner les segments voisins de même hauteur
+        merged = [self.segments[0]]
+        for segment in self.segments[1:]:
+            if abs(segment[1] - merged[-1][1]) < 1e-9:
+                merged[-1][2] += segment[2]
+            else:
+                merged.append(segment)
+        self.segments = merged
+
+
+def nest_pieces(pieces, roll_width=DEFAULT_ROLL_WIDTH, spacing=DEFAULT_SPACING):
+    """
+    Imbriquer des pièces rectangulaires sur un rouleau
+
+    Args:
+        pieces (list): Pièces ``{"width", "height", "quantity", "label", "rotate"}`` en mètres
+        roll_width (Decimal): Largeur utile du rouleau (m)
+        spacing (Decimal): Espace de coupe entre les pièces (m)
+
+    Returns:
+        dict: ``length_used`` (m linéaires), ``roll_area``, ``pieces_area``,
+        ``waste_area``, ``waste_percentage`` (perte par rapport à la surface
+        des pièces, comme ``LetteringQuote.waste_percentage``), ``pieces_count``
+        et ``placements`` (position de chaque pièce)
+
+    Raises:
+        ValueError: Si une pièce est plus large que le rouleau dans les deux sens
+    """
+    roll = _to_float(roll_width, 'la largeur du rouleau')
+    gap = float(spacing or 0)
+    expanded = expand_pieces(pieces)
+
+    too_wide = sorted({label for width, height, label, rotate in expanded
+                       if min(width, height) > roll + 1e-9 or (not rotate and width > roll + 1e-9)})
+    if too_wide:
+        raise ValueError(f'Pièces plus larges que le rouleau ({roll} m): {", ".join(too_wide)}')
+
+    # Les plus grandes pièces d'abord : les petites comblent ensuite les creux
+    order = sorted(expanded, key=lambda piece: (max(piece[0], piece[1]), piece[0] * piece[1]), reverse=True)
+
+    # L'espace de coupe est ajouté à chaque pièce; la dernière colonne peut le perdre au bord
+    skyline = _Skyline(roll + gap)
+    placements = []
+    length = 0.0
+    pieces_area = 0.0
+    for width, height, label, rotate in order:
+        orientations = [(width, height, False)]
+        if rotate and abs(width - height) > 1e-9:
+            orientations.append((height, width, True))
+
+        best = None
+        for piece_width, piece_height, rotated in orientations:
+            footprint_width = piece_width + gap
+            for index in range(len(skyline.segments)):
+                y = skyline.fit(index, footprint_width)
+                if y is None:
+                    break
+                key = (y + piece_height + gap, skyline.segments[index][0])
+                if best is None or key < best[0]:
+                    best = (key, index, y, piece_width, piece_height, rotated)
+
+        (top, x), index, y, piece_width, piece_height, rotated = best
+        skyline.place(index, piece_width + gap, top)
+        placements.append({
+            'label': label,
+            'x': round(x, 4),
+            'y': round(y, 4),
+            'width': piece_width,
+            'height': piece_height,
+            'rotated': rotated,
+        })
+        length = max(length, y + piece_height)
+        pieces_area += width * height
+
+    roll_area = length * roll
+    waste_area = roll_area - pieces_area
+    return {
+        'roll_width': roll,
+        'length_used': round(length, 4),
+        'roll_area': round(roll_area, 4),
+        'pieces_area': round(pieces_area, 4),
+        'waste_area': round(waste_area, 4),
+        'waste_percentage': round(waste_area / pieces_area * 100, 2),
+        'pieces_count': len(placements),
+        'placements': placements,
+    }
+
+
+def nesting_pricing_inputs(nesting):
+    """
+    Surface et taux de perte à transmettre au noyau de prix
+
+    La surface facturée avec perte (``surface × (1 + perte)``) correspond alors
+    à la surface de rouleau consommée, aux arrondis des champs du calcul près.
+    """
+    return {
+        'surface_area': Decimal(str(nesting['pieces_area'])).quantize(Decimal('0.01')),
+        'waste_percentage': Decimal(str(nesting['waste_percentage'])).quantize(Decimal('0.01')),
+    }
@@ -1,7 +1,9 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
 from django.db.models import Sum, Count, Q, F
 from django.http import HttpResponse, JsonResponse
 from django.core.paginator import Paginator
@@ -9,12 +11,14 @@ from datetime import date, timedelta
 from .models import (
     Invoice, Expense, Payment, Client, Service, CompanyProfile, Vehicle, InvoiceItem,
     Supplier, RecurringExpense, Appointment, InventoryItem, StockAlert, StockReceipt, StockReceiptItem,
-    Quote, QuoteItem, FiscalYearArchive
+    StockCount, Quote, QuoteItem, FiscalYearArchive, LetteringQuote
 )
+from .utils.idempotency import idempotent
 from .forms import (
     CompanyProfileForm, ClientForm, VehicleForm, ServiceForm, InvoiceForm,
     InvoiceItemFormSet, ExpenseForm, SupplierForm, RecurringExpenseForm, AppointmentForm,
-    StockReceiptForm, StockReceiptItemFormSet, QuoteForm, QuoteItemFormSet
+    StockReceiptForm, StockReceiptItemFormSet, SupplierCsvImportForm, StockCountForm, StockCountEntryForm,
+    QuoteForm, QuoteItemFormSet
 )
 from django.core.paginator import Paginator
 from django.db.models import Q
@@ -1168,14 +1172,15 @@ def lettering_calculate_ajax(request):
     if request.method == 'POST':
         import json
         from decimal import Decimal
-        from .models import Vehicle, Material, OverheadConfiguration, LaborRate
+        from .utils.labor_estimation import suggest_hours
+        from .utils.lettering_pricing import nesting_summary, quote_lettering, resolve_job_surface
 
         try:
             data = json.loads(request.body)
 
             # Récupérer les données du formulaire
             vehicle_id = data.get('vehicle_id')
-            surface_area = Decimal(str(data.get('surface_area', 0)))
+            surface_area = Decimal(str(data.get('surface_area') or 0))
             waste_percentage = Decimal(str(data.get('waste_percentage', 15)))
             vinyl_material_id = data.get('vinyl_material_id')
             lamination_material_id = data.get('lamination_material_id')
@@ -1184,6 +1189,15 @@ def lettering_calculate_ajax(request):
             overhead_config_id = data.get('overhead_config_id')
             profit_margin = Decimal(str(data.get('profit_margin', 30)))
 
+            # Surface selon les pièces imbriquées sur le rouleau, les panneaux cochés ou la saisie
+            nesting = None
+            if vehicle_id and vinyl_material_id:
+                job = resolve_job_surface(
+                    vehicle_id, vinyl_material_id, surface_area, waste_percentage,
+                    panels=data.get('panels'), pieces=data.get('pieces'), roll_width=data.get('roll_width')
+                )
+                surface_area, waste_percentage, nesting = job['surface_area'], job['waste_percentage'], job['nesting']
+
             # Validation des données requises
             if not all([vehicle_id, surface_area, vinyl_material_id, installation_hours, overhead_config_id]):
                 return JsonResponse({
@@ -1191,88 +1205,32 @@ def lettering_calculate_ajax(request):
                     'message': 'Données manquantes pour le calcul'
                 })
 
-            # Récupérer les objets
-            vehicle = Vehicle.objects.get(id=vehicle_id)
-            vinyl_material = Material.objects.get(id=vinyl_material_id)
-            lamination_material = None
-            if lamination_material_id:
-                lamination_material = Material.objects.get(id=lamination_material_id)
-            overhead_config = OverheadConfiguration.objects.get(id=overhead_config_id)
-
-            # Calculs
-            surface_with_waste = surface_area * (1 + waste_percentage / 100)
-
-            # 1. Coût des matériaux
-            vinyl_cost = surface_with_waste * vinyl_material.cost_per_sqm
-            lamination_cost = Decimal('0')
-            if lamination_material:
-                lamination_cost = surface_with_waste * lamination_material.cost_per_sqm
-            material_cost = vinyl_cost + lamination_cost
-
-            # 2. Coût de la main-d'œuvre
-            design_rate = LaborRate.objects.filter(task_type='conception', is_active=True).first()
-            installation_rate = LaborRate.objects.filter(task_type='installation', is_active=True).first()
-
-            design_cost = Decimal('0')
-            if design_rate and design_hours:
-                design_cost = design_hours * design_rate.hourly_rate
-
-            installation_cost = Decimal('0')
-            if installation_rate and installation_hours:
-                complexity_multiplier = vehicle.vehicle_type.complexity_multiplier if vehicle.vehicle_type else Decimal('1.0')
-                installation_cost = installation_hours * installation_rate.hourly_rate * complexity_multiplier
-
-            labor_cost = design_cost + installation_cost
-
-            # 3. Frais généraux
-            total_hours = design_hours + installation_hours
-            hourly_overhead = total_hours * overhead_config.hourly_overhead_cost
-            fixed_overhead = overhead_config.fixed_overhead_cost
-            base_cost = material_cost + labor_cost
-            percentage_overhead = base_cost * (overhead_config.percentage_overhead / 100)
-            overhead_cost = hourly_overhead + fixed_overhead + percentage_overhead
-
-            # 4. Totaux
-            total_cost = material_cost + labor_cost + overhead_cost
-            subtotal_with_margin = total_cost * (1 + profit_margin / 100)
-
-            # 5. Calcul des taxes (Québec)
-            gst_rate = Decimal('0.05')  # TPS 5%
-            qst_rate = Decimal('0.09975')  # TVQ 9.975%
-
-            gst_amount = subtotal_with_margin * gst_rate
-            qst_amount = subtotal_with_margin * qst_rate
-            final_price_with_taxes = subtotal_with_margin + gst_amount + qst_amount
+            # Calcul par le noyau de prix (données de référence en mémoire)
+            breakdown = quote_lettering(
+                vehicle_id=vehicle_id,
+                vinyl_material_id=vinyl_material_id,
+                overhead_config_id=overhead_config_id,
+                surface_area=surface_area,
+                waste_percentage=waste_percentage,
+                lamination_material_id=lamination_material_id,
+                design_hours=design_hours,
+                installation_hours=installation_hours,
+                profit_margin=profit_margin,
+            )
 
             # Détail pour l'affichage
-            breakdown = {
-                'surface_with_waste': float(surface_with_waste),
-                'vinyl_cost': float(vinyl_cost),
-                'lamination_cost': float(lamination_cost),
-                'material_cost': float(material_cost),
-                'design_cost': float(design_cost),
-                'installation_cost': float(installation_cost),
-                'labor_cost': float(labor_cost),
-                'hourly_overhead': float(hourly_overhead),
-                'fixed_overhead': float(fixed_overhead),
-                'percentage_overhead': float(percentage_overhead),
-                'overhead_cost': float(overhead_cost),
-                'total_cost': float(total_cost),
-                'subtotal_with_margin': float(subtotal_with_margin),
-                'gst_amount': float(gst_amount),
-                'qst_amount': float(qst_amount),
-                'final_price_with_taxes': float(final_price_with_taxes),
-                'complexity_multiplier': float(vehicle.vehicle_type.complexity_multiplier if vehicle.vehicle_type else 1),
-                'design_rate': float(design_rate.hourly_rate if design_rate else 0),
-                'installation_rate': float(installation_rate.hourly_rate if installation_rate else 0),
-                'gst_rate': float(gst_rate * 100),
-                'qst_rate': float(qst_rate * 100),
-            }
+            breakdown = {key: float(value) for key, value in breakdown.items()}
 
-            return JsonResponse({
+            response = {
                 'success': True,
-                'breakdown': breakdown
-            })
+                'breakdown': breakdown,
+                'suggested_hours': suggest_hours(
+                    vehicle_id, vinyl_material_id, surface_area, lamination_material_id=lamination_material_id
+                ),
+            }
+            if nesting:
+                response['nesting'] = nesting_summary(nesting) | {'placements': nesting['placements']}
+            return JsonResponse(response)
 
         except Exception as e:
             return JsonResponse({
@@ -1284,22 +1242,76 @@ def lettering_calculate_ajax(request):
 
 
 @login_required
+def lettering_matrix_api(request):
+    """
+    Grille de prix « et si » du lettrage (vinyles × laminations × marges × pertes)
+
+    Corps JSON : ``vehicle_id``, ``surface_area``, ``overhead_config_id``,
+    ``design_hours``, ``installation_hours``, ``vinyl_material_ids``,
+    ``lamination_material_ids`` (``null`` = sans lamination), ``profit_margins``
+    et ``waste_percentages`` (liste ou plage ``{"start", "stop", "step"}``).
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Méthode non autorisée'}, status=405)
+
+    import json
+    from django.core.exceptions import ObjectDoesNotExist
+    from .utils.lettering_pricing import expand_axis, panel_surface, price_matrix
+
+    try:
+        data = json.loads(request.body)
+        vehicle_id = data.get('vehicle_id')
+        overhead_config_id = data.get('overhead_config_id')
+        vinyl_material_ids = data.get('vinyl_material_ids') or []
+        surface_area = float(data.get('surface_area') or 0)
+        if vehicle_id and data.get('panels'):
+            surface_area = float(panel_surface(vehicle_id, data['panels']))
+        if not all([vehicle_id, overhead_config_id, vinyl_material_ids, surface_area]):
+            return JsonResponse({'success': False, 'message': 'Données manquantes pour le calcul'}, status=400)
+
+        matrix = price_matrix(
+            vehicle_id=vehicle_id,
+            overhead_config_id=overhead_config_id,
+            surface_area=surface_area,
+            vinyl_material_ids=vinyl_material_ids,
+            lamination_material_ids=data.get('lamination_material_ids') or [None],
+            profit_margins=expand_axis(data.get('profit_margins', 30), 'profit_margins'),
+            waste_percentages=expand_axis(data.get('waste_percentages', 15), 'waste_percentages'),
+            design_hours=data.get('design_hours', 0),
+            installation_hours=data.get('installation_hours', 0),
+        )
+    except (ValueError, TypeError, ObjectDoesNotExist) as e:
+        return JsonResponse({'success': False, 'message': f'Erreur lors du calcul: {str(e)}'}, status=400)
+
+    return JsonResponse({'success': True, **matrix})
+
+
+@login_required
+@idempotent('lettering_save_quote')
 def lettering_save_quote(request):
     """Sauvegarder un calcul de lettrage et créer une soumission"""
     if request.method == 'POST':
         import json
         from decimal import Decimal
         from .models import LetteringQuote, Quote, QuoteItem
+        from .utils.lettering_pricing import nesting_summary, resolve_job_surface
 
         try:
             data = json.loads(request.body)
 
+            # Surface selon les pièces imbriquées sur le rouleau, les panneaux cochés ou la saisie
+            job = resolve_job_surface(
+                data['vehicle_id'], data['vinyl_material_id'], data.get('surface_area'), data.get('waste_percentage'),
+                panels=data.get('panels'), pieces=data.get('pieces'), roll_width=data.get('roll_width')
+            )
+            nesting = job['nesting']
+
             # Créer le calcul de lettrage
             lettering_quote = LetteringQuote(
                 client_id=data['client_id'],
                 vehicle_id=data['vehicle_id'],
-                surface_area=Decimal(str(data['surface_area'])),
-                waste_percentage=Decimal(str(data.get('waste_percentage', 15))),
+                surface_area=job['surface_area'],
+                waste_percentage=job['waste_percentage'],
                 vinyl_material_id=data['vinyl_material_id'],
                 lamination_material_id=data.get('lamination_material_id'),
                 design_hours=Decimal(str(data.get('design_hours', 0))),
@@ -1308,45 +1320,49 @@ def lettering_save_quote(request):
                 profit_margin=Decimal(str(data.get('profit_margin', 30))),
                 notes=data.get('notes', '')
             )
-            lettering_quote.save()  # Les coûts sont calculés automatiquement
-
-            # Créer une soumission officielle
-            quote = Quote.objects.create(
-                client=lettering_quote.client,
-                vehicle=lettering_quote.vehicle,
-                notes=f"Lettrage - {lettering_quote.notes}".strip()
-            )
-
-            # Créer l'élément de soumission
-            description = f"Lettrage {lettering_quote.vehicle.make} {lettering_quote.vehicle.model}"
-            if lettering_quote.vehicle.year:
-                description += f" {lettering_quote.vehicle.year}"
-            description += f" - Surface: {lettering_quote.surface_area}m²"
-
-            QuoteItem.objects.create(
-                quote=quote,
-                description=description,
-                price=lettering_quote.final_price_with_taxes,
-                lettering_details=json.dumps({
-                    'lettering_quote_id': lettering_quote.id,
-                    'surface_area': float(lettering_quote.surface_area),
-                    'vinyl_material': lettering_quote.vinyl_material.name,
-                    'lamination_material': lettering_quote.lamination_material.name if lettering_quote.lamination_material else None,
-                    'design_hours': float(lettering_quote.design_hours),
-                    'installation_hours': float(lettering_quote.installation_hours),
-                    'profit_margin': float(lettering_quote.profit_margin),
-                    'price_before_taxes': float(lettering_quote.final_price),
-                    'gst_amount': float(lettering_quote.gst_amount),
-                    'qst_amount': float(lettering_quote.qst_amount),
-                    'final_price_with_taxes': float(lettering_quote.final_price_with_taxes),
-                    'breakdown': lettering_quote.get_cost_breakdown()
-                })
-            )
-
-            # Lier la soumission au calcul
-            lettering_quote.is_converted_to_quote = True
-            lettering_quote.related_quote = quote
-            lettering_quote.save()
+            lettering_quote.calculate_costs()
+            if nesting:
+                lettering_quote.cost_breakdown['nesting'] = nesting_summary(nesting)
+
+            with transaction.atomic():
+                # Créer une soumission officielle
+                quote = Quote.objects.create(
+                    client=lettering_quote.client,
+                    vehicle=lettering_quote.vehicle,
+                    notes=f"Lettrage - {lettering_quote.notes}".strip()
+                )
+
+                # Lier la soumission au calcul et l'enregistrer une seule fois
+                lettering_quote.is_converted_to_quote = True
+                lettering_quote.related_quote = quote
+                lettering_quote.save()
+
+                # Créer l'élément de soumission
+                description = f"Lettrage {lettering_quote.vehicle.make} {lettering_quote.vehicle.model}"
+                if lettering_quote.vehicle.year:
+                    description += f" {lettering_quote.vehicle.year}"
+                description += f" - Surface: {lettering_quote.surface_area}m²"
+
+                snapshot = lettering_quote.cost_breakdown
+                QuoteItem.objects.create(
+                    quote=quote,
+                    description=description,
+                    price=lettering_quote.final_price_with_taxes,
+                    lettering_details={
+                        'lettering_quote_id': lettering_quote.id,
+                        'surface_area': float(lettering_quote.surface_area),
+                        'vinyl_material': snapshot['vinyl_material']['name'],
+                        'lamination_material': snapshot['lamination_material']['name'] if snapshot['lamination_material'] else None,
+                        'design_hours': float(lettering_quote.design_hours),
+                        'installation_hours': float(lettering_quote.installation_hours),
+                        'profit_margin': float(lettering_quote.profit_margin),
+                        'price_before_taxes': float(lettering_quote.final_price),
+                        'gst_amount': float(lettering_quote.gst_amount),
+                        'qst_amount': float(lettering_quote.qst_amount),
+                        'final_price_with_taxes': float(lettering_quote.final_price_with_taxes),
+                        'breakdown': snapshot,
+                    }
+                )
 
             return JsonResponse({
                 'success': True,
@@ -1364,6 +1380,86 @@ def lettering_save_quote(request):
     return JsonResponse({'success': False, 'message': 'Méthode non autorisée'})
 
 
+@login_required
+def lettering_quote_detail_api(request, lettering_quote_id):
+    """Détail JSON d'un calcul de lettrage, servi depuis son instantané enregistré"""
+    lettering_quote = get_object_or_404(LetteringQuote, id=lettering_quote_id)
+    breakdown = lettering_quote.get_cost_breakdown()
+    snapshot = lettering_quote.cost_breakdown
+
+    return JsonResponse({
+        'success': True,
+        'id': lettering_quote.id,
+        'client_id': lettering_quote.client_id,
+        'vehicle_id': lettering_quote.vehicle_id,
+        'related_quote_id': lettering_quote.related_quote_id,
+        'surface_area': float(lettering_quote.surface_area),
+        'waste_percentage': float(lettering_quote.waste_percentage),
+        'design_hours': float(lettering_quote.design_hours),
+        'installation_hours': float(lettering_quote.installation_hours),
+        'profit_margin': float(lettering_quote.profit_margin),
+        'priced_at': snapshot.get('priced_at'),
+        'vinyl_material': snapshot.get('vinyl_material'),
+        'lamination_material': snapshot.get('lamination_material'),
+        'overhead_config': snapshot.get('overhead_config'),
+        'breakdown': {key: float(value) for key, value in breakdown.items()},
+    })
+
+
+@login_required
+def lettering_suggest_hours_api(request):
+    """Heures de conception et d'installation suggérées, avec leur bande de confiance"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Méthode non autorisée'}, status=405)
+
+    import json
+    from django.core.exceptions import ObjectDoesNotExist
+    from .utils.labor_estimation import suggest_hours
+    from .utils.lettering_pricing import resolve_job_surface
+
+    try:
+        data = json.loads(request.body)
+        vehicle_id = data.get('vehicle_id')
+        vinyl_material_id = data.get('vinyl_material_id')
+        if not vehicle_id or not vinyl_material_id:
+            return JsonResponse({'success': False, 'message': 'Données manquantes pour le calcul'}, status=400)
+
+        job = resolve_job_surface(
+            vehicle_id, vinyl_material_id, data.get('surface_area'),
+            panels=data.get('panels'), pieces=data.get('pieces'), roll_width=data.get('roll_width')
+        )
+        suggestions = suggest_hours(
+            vehicle_id, vinyl_material_id, job['surface_area'],
+            lamination_material_id=data.get('lamination_material_id')
+        )
+    except (ValueError, TypeError, ObjectDoesNotExist) as e:
+        return JsonResponse({'success': False, 'message': f'Erreur lors du calcul: {str(e)}'}, status=400)
+
+    return JsonResponse({'success': True, 'suggested_hours': suggestions})
+
+
+@login_required
+def lettering_vehicle_panels_api(request, vehicle_id):
+    """Panneaux du véhicule et leur surface, lus dans la bibliothèque en mémoire"""
+    from django.core.exceptions import ObjectDoesNotExist
+    from .models import VehiclePanelArea
+    from .utils.lettering_pricing import vehicle_panel_areas
+
+    try:
+        areas = vehicle_panel_areas(vehicle_id)
+    except ObjectDoesNotExist:
+        return JsonResponse({'success': False, 'message': 'Véhicule introuvable'}, status=404)
+
+    return JsonResponse({
+        'success': True,
+        'panels': [
+            {'panel': panel, 'label': label, 'area': float(areas[panel])}
+            for panel, label in VehiclePanelArea.PANEL_CHOICES
+            if panel in areas
+        ],
+    })
+
+
 @login_required
 def client_vehicles_ajax(request, client_id):
     """Récupérer les véhicules d'un client en AJAX"""
@@ -1512,18 +1608,41 @@ def expense_list(request):
     # Catégories pour le filtre
     categories = Expense.EXPENSE_CATEGORY_CHOICES
 
-    # Statistiques
-    total_amount = expenses.aggregate(total=Sum('amount'))['total'] or 0
-    total_with_taxes = sum(expense.total_with_taxes for expense in expenses)
+    # Statistiques calculées par la base : une agrégation pour les totaux,
+    # une requête groupée pour les sous-totaux par catégorie
+    totals_with_taxes = F('amount') + F('gst_amount') + F('qst_amount')
+    totals = expenses.aggregate(
+        total_expenses=Count('id'),
+        total_amount=Sum('amount'),
+        total_gst=Sum('gst_amount'),
+        total_qst=Sum('qst_amount'),
+        total_with_taxes=Sum(totals_with_taxes),
+    )
+    category_labels = dict(categories)
+    category_totals = [
+        {
+            'category': row['category'],
+            'label': category_labels.get(row['category'], row['category']),
+            'count': row['expense_count'],
+            'amount': row['subtotal'],
+            'with_taxes': row['subtotal_with_taxes'],
+        }
+        for row in expenses.order_by().values('category').annotate(
+            expense_count=Count('id'), subtotal=Sum('amount'), subtotal_with_taxes=Sum(totals_with_taxes)
+        ).order_by('-subtotal_with_taxes')
+    ]
 
     context = {
         'page_obj': page_obj,
         'search_query': search_query,
         'category_filter': category_filter,
         'categories': categories,
-        'total_expenses': expenses.count(),
-        'total_amount': total_amount,
-        'total_with_taxes': total_with_taxes,
+        'total_expenses': totals['total_expenses'],
+        'total_amount': totals['total_amount'] or 0,
+        'total_gst': totals['total_gst'] or 0,
+        'total_qst': totals['total_qst'] or 0,
+        'total_with_taxes': totals['total_with_taxes'] or 0,
+        'category_totals': category_totals,
     }
 
     return render(request, 'garage_app/expenses/expense_list.html', context)
@@ -1760,6 +1879,50 @@ def financial_reports(request):
     return render(request, 'garage_app/reports/financial_reports.html', context)
 
 
+CASHFLOW_HORIZON_CHOICES = [30, 90, 180, 365]
+
+
+def _cashflow_horizon(request):
+    """Horizon demandé en jours (``days``), borné à l'horizon maximal"""
+    from .utils.cashflow import DEFAULT_HORIZON_DAYS, MAX_HORIZON_DAYS
+
+    try:
+        days = int(request.GET.get('days', DEFAULT_HORIZON_DAYS))
+    except ValueError:
+        days = DEFAULT_HORIZON_DAYS
+    return min(max(days, 1), MAX_HORIZON_DAYS)
+
+
+@login_required
+def cashflow_forecast(request):
+    """Vue de la prévision de trésorerie (entrées et sorties à venir, par semaine)"""
+    from .utils.cashflow import DEFAULT_PAYMENT_TERM_DAYS, compute_cashflow_forecast, summarize_by_week
+
+    days = _cashflow_horizon(request)
+    forecast = compute_cashflow_forecast(days)
+    weeks = summarize_by_week(forecast)
+
+    context = {
+        'days': days,
+        'horizon_choices': CASHFLOW_HORIZON_CHOICES,
+        'totals': forecast['totals'],
+        'weeks': weeks,
+        'negative_weeks': sum(1 for week in weeks if week['cumulative'] < 0),
+        'payment_term_days': DEFAULT_PAYMENT_TERM_DAYS,
+    }
+
+    return render(request, 'garage_app/reports/cashflow_forecast.html', context)
+
+
+@login_required
+def cashflow_forecast_api(request):
+    """Prévision de trésorerie jour par jour en JSON (paramètre GET ``days``)"""
+    from .utils.cashflow import compute_cashflow_forecast
+
+    forecast = compute_cashflow_forecast(_cashflow_horizon(request))
+    return JsonResponse({'success': True, **forecast})
+
+
 # ==================== VUES AJAX ====================
 
 @login_required
@@ -2346,52 +2509,279 @@ def appointment_calendar(request):
     return render(request, 'garage_app/appointments/appointment_calendar.html', context)
 
 
+# Couleurs et libellés des statuts, calculés une seule fois pour toutes les requêtes
+APPOINTMENT_STATUS_COLORS = {
+    'scheduled': '#6c757d',  # Gris
+    'confirmed': '#0d6efd',  # Bleu
+    'in_progress': '#fd7e14', # Orange
+    'completed': '#198754',  # Vert
+    'cancelled': '#dc3545',  # Rouge
+    'no_show': '#6f42c1',    # Violet
+}
+APPOINTMENT_STATUS_STYLES = {
+    status: (APPOINTMENT_STATUS_COLORS.get(status, '#6c757d'), label)
+    for status, label in Appointment.STATUS_CHOICES
+}
+APPOINTMENT_CALENDAR_FIELDS = (
+    'id', 'title', 'start_datetime', 'end_datetime', 'status', 'description', 'estimated_price',
+    'client__first_name', 'client__last_name', 'vehicle__year', 'vehicle__make', 'vehicle__model',
+)
+
+
+def _parse_calendar_datetime(value):
+    """Date ISO envoyée par le calendrier (``2025-01-01``, ``...T00:00:00Z`` ou avec décalage)"""
+    from datetime import datetime
+    from django.utils import timezone
+
+    parsed = datetime.fromisoformat(value.strip().replace(' ', '+').replace('Z', '+00:00'))
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
 @login_required
 def appointment_calendar_api(request):
-    """API pour récupérer les rendez-vous au format JSON pour le calendrier"""
-    start_date = request.GET.get('start')
-    end_date = request.GET.get('end')
+    """
+    API pour récupérer les rendez-vous au format JSON pour le calendrier
+
+    Les rendez-vous qui chevauchent la plage ``start``/``end`` sont retournés
+    (``début < end`` et ``fin > start``, sur l'index des dates). Les en-têtes
+    ``ETag``/``Last-Modified`` permettent au calendrier de recevoir un 304
+    quand la plage n'a pas changé depuis le dernier chargement.
+    """
+    import hashlib
+    from django.db.models import Max
+    from django.utils.cache import get_conditional_response
+    from django.utils.http import http_date, quote_etag
 
     appointments = Appointment.objects.all()
 
+    start_date = request.GET.get('start')
+    end_date = request.GET.get('end')
     if start_date and end_date:
-        from datetime import datetime
-        start = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-        end = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-        appointments = appointments.filter(
-            start_datetime__gte=start,
-            end_datetime__lte=end
-        )
+        try:
+            start = _parse_calendar_datetime(start_date)
+            end = _parse_calendar_datetime(end_date)
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'Plage de dates invalide'}, status=400)
+        appointments = appointments.filter(start_datetime__lt=end, end_datetime__gt=start)
+
+    # Une requête d'agrégat suffit pour répondre 304 sans charger les rendez-vous;
+    # les titres affichent aussi le client et le véhicule : leurs modifications comptent
+    state = appointments.aggregate(
+        count=Count('id'),
+        last_id=Max('id'),
+        appointment_modified=Max('updated_at'),
+        client_modified=Max('client__updated_at'),
+        vehicle_modified=Max('vehicle__updated_at'),
+    )
+    last_modified = max(
+        (state[key] for key in ('appointment_modified', 'client_modified', 'vehicle_modified') if state[key]),
+        default=None,
+    )
+    etag = hashlib.md5(
+        f"{start_date}|{end_date}|{state['count']}|{state['last_id']}|{state['appointment_modified']}|"
+        f"{state['client_modified']}|{state['vehicle_modified']}".encode()
+    ).hexdigest()
+    last_modified_timestamp = int(last_modified.timestamp()) if last_modified else None
 
-    events = []
-    for appointment in appointments:
-        # Couleurs selon le statut
-        color_map = {
-            'scheduled': '#6c757d',  # Gris
-            'confirmed': '#0d6efd',  # Bleu
-            'in_progress': '#fd7e14', # Orange
-            'completed': '#198754',  # Vert
-            'cancelled': '#dc3545',  # Rouge
-            'no_show': '#6f42c1',    # Violet
-        }
+    not_modified = get_conditional_response(request, etag=quote_etag(etag), last_modified=last_modified_timestamp)
+    if not_modified is not None:
+        return not_modified
 
+    events = []
+    for row in appointments.values(*APPOINTMENT_CALENDAR_FIELDS).order_by('start_datetime'):
+        color, status_display = APPOINTMENT_STATUS_STYLES.get(row['status'], ('#6c757d', row['status']))
+        client_name = f"{row['client__first_name']} {row['client__last_name']}"
+        vehicle = (
+            f"{row['vehicle__year']} {row['vehicle__make']} {row['vehicle__model']}"
+            if row['vehicle__make'] is not None else ''
+        )
         events.append({
-            'id': appointment.id,
-            'title': f"{appointment.title} - {appointment.client.full_name}",
-            'start': appointment.start_datetime.isoformat(),
-            'end': appointment.end_datetime.isoformat(),
-            'backgroundColor': color_map.get(appointment.status, '#6c757d'),
-            'borderColor': color_map.get(appointment.status, '#6c757d'),
+            'id': row['id'],
+            'title': f"{row['title']} - {client_name}",
+            'start': row['start_datetime'].isoformat(),
+            'end': row['end_datetime'].isoformat(),
+            'backgroundColor': color,
+            'borderColor': color,
             'extendedProps': {
-                'client': appointment.client.full_name,
-                'vehicle': f"{appointment.vehicle.year} {appointment.vehicle.make} {appointment.vehicle.model}" if appointment.vehicle else '',
-                'status': appointment.get_status_display(),
-                'description': appointment.description or '',
-                'estimated_price': str(appointment.estimated_price) if appointment.estimated_price else '',
+                'client': client_name,
+                'vehicle': vehicle,
+                'status': status_display,
+                'status_key': row['status'],
+                'description': row['description'] or '',
+                'estimated_price': str(row['estimated_price']) if row['estimated_price'] else '',
             }
         })
 
-    return JsonResponse(events, safe=False)
+    response = JsonResponse(events, safe=False, json_dumps_params={'separators': (',', ':')})
+    response['ETag'] = quote_etag(etag)
+    if last_modified_timestamp is not None:
+        response['Last-Modified'] = http_date(last_modified_timestamp)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required
+def appointment_slots_api(request):
+    """
+    Premières plages libres pour un rendez-vous
+
+    Paramètres GET : ``duration`` (minutes) ou ``services`` (identifiants,
+    durées standard additionnées), ``start``/``end`` (dates AAAA-MM-JJ,
+    défaut : 14 prochains jours), ``resources`` (identifiants qui doivent tous
+    être libres), ``resource_type`` (``bay`` par défaut si aucune ressource
+    n'est donnée : une baie quelconque doit être libre) et ``limit``.
+    """
+    from datetime import date as date_type
+    from django.utils import timezone
+    from .models import Resource
+    from .utils.scheduling import find_free_slots
+
+    def id_list(name):
+        values = []
+        for raw in request.GET.getlist(name):
+            values.extend(int(value) for value in raw.split(',') if value.strip())
+        return values
+
+    try:
+        service_ids = id_list('services')
+        resource_ids = id_list('resources')
+        if request.GET.get('duration'):
+            minutes = int(request.GET['duration'])
+        elif service_ids:
+            durations = dict(Service.objects.filter(id__in=service_ids).values_list('id', 'standard_duration'))
+            missing = [service_id for service_id in service_ids if not durations.get(service_id)]
+            if missing:
+                return JsonResponse({
+                    'success': False,
+                    'message': f"Durée standard manquante pour le(s) service(s): {', '.join(map(str, missing))}"
+                }, status=400)
+            minutes = sum(durations[service_id] for service_id in service_ids)
+        else:
+            return JsonResponse({'success': False, 'message': 'Durée ou services requis'}, status=400)
+
+        start_date = date_type.fromisoformat(request.GET['start']) if request.GET.get('start') else timezone.localdate()
+        end_date = (
+            date_type.fromisoformat(request.GET['end']) if request.GET.get('end')
+            else start_date + timedelta(days=13)
+        )
+        resource_type = request.GET.get('resource_type') or (None if resource_ids else 'bay')
+        if resource_type and resource_type not in dict(Resource.RESOURCE_TYPES):
+            return JsonResponse({'success': False, 'message': 'Type de ressource invalide'}, status=400)
+        limit = min(max(int(request.GET.get('limit', 5)), 1), 50)
+
+        slots = find_free_slots(
+            timedelta(minutes=minutes), start_date, end_date,
+            resource_ids=resource_ids, resource_type=resource_type, limit=limit,
+        )
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': f'Paramètres invalides: {str(e)}'}, status=400)
+
+    names = dict(Resource.objects.filter(
+        id__in={resource_id for slot in slots for resource_id in slot['resource_ids']}
+    ).values_list('id', 'name'))
+    return JsonResponse({
+        'success': True,
+        'duration_minutes': minutes,
+        'slots': [
+            {
+                'start': slot['start'].isoformat(),
+                'end': slot['end'].isoformat(),
+                'resources': [
+                    {'id': resource_id, 'name': names.get(resource_id, '')} for resource_id in slot['resource_ids']
+                ],
+            }
+            for slot in slots
+        ],
+    })
+
+
+def appointment_ics_feed(request, token):
+    """
+    Abonnement iCalendar personnel aux rendez-vous (adresse secrète par utilisateur)
+
+    Un technicien lié à une ressource ne reçoit que ses rendez-vous; les autres
+    utilisateurs reçoivent tout le calendrier. ``Last-Modified`` (et un ETag)
+    suivent la dernière modification : les applications qui interrogent le
+    flux régulièrement reçoivent surtout des 304.
+    """
+    import hashlib
+    from django.db.models import Max
+    from django.http import Http404, StreamingHttpResponse
+    from django.utils import timezone
+    from django.utils.cache import get_conditional_response
+    from django.utils.http import http_date, quote_etag
+    from .models import CalendarFeedToken, Resource
+    from .utils.ical import ical_stream
+
+    feed = CalendarFeedToken.objects.select_related('user').filter(token=token, user__is_active=True).first()
+    if feed is None:
+        raise Http404('Calendrier introuvable')
+
+    now = timezone.now()
+    appointments = Appointment.objects.filter(
+        start_datetime__gte=now - timedelta(days=30),
+        start_datetime__lt=now + timedelta(days=365),
+    )
+    if Resource.objects.filter(user=feed.user).exists():
+        appointments = appointments.filter(resources__user=feed.user).distinct()
+
+    # Le flux affiche aussi le client et le véhicule : leurs modifications comptent
+    state = appointments.aggregate(
+        count=Count('id', distinct=True),
+        appointment_modified=Max('updated_at'),
+        client_modified=Max('client__updated_at'),
+        vehicle_modified=Max('vehicle__updated_at'),
+    )
+    last_modified = max(
+        (state[key] for key in ('appointment_modified', 'client_modified', 'vehicle_modified') if state[key]),
+        default=None,
+    )
+    last_modified_timestamp = int(last_modified.timestamp()) if last_modified else None
+    etag = quote_etag(hashlib.md5(
+        f"{feed.token}|{state['count']}|{state['appointment_modified']}|"
+        f"{state['client_modified']}|{state['vehicle_modified']}".encode()
+    ).hexdigest())
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified_timestamp)
+    if not_modified is not None:
+        return not_modified
+
+    response = StreamingHttpResponse(
+        ical_stream(
+            appointments.select_related('client', 'vehicle').order_by('start_datetime'),
+            'Rendez-vous MarKev',
+        ),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['Content-Disposition'] = 'inline; filename="rendez-vous.ics"'
+    response['ETag'] = etag
+    if last_modified_timestamp is not None:
+        response['Last-Modified'] = http_date(last_modified_timestamp)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required
+def appointment_feed_link_api(request):
+    """Adresse d'abonnement .ics de l'utilisateur (POST ``regenerate`` pour la remplacer)"""
+    import json
+    from .models import CalendarFeedToken
+
+    feed, created = CalendarFeedToken.objects.get_or_create(user=request.user)
+    if request.method == 'POST' and not created:
+        try:
+            data = json.loads(request.body or '{}')
+        except ValueError:
+            data = {}
+        if data.get('regenerate'):
+            feed.regenerate()
+
+    return JsonResponse({
+        'success': True,
+        'url': request.build_absolute_uri(reverse('garage_app:appointment_ics_feed', args=[feed.token])),
+    })
 
 
 # ==================== VUES POUR L'INVENTAIRE ====================
@@ -2410,6 +2800,7 @@ def inventory_list(request):
         inventory_items = inventory_items.filter(
             Q(name__icontains=search_query) |
             Q(sku__icontains=search_query) |
+            Q(barcode__icontains=search_query) |
             Q(description__icontains=search_query)
         )
 
@@ -2436,6 +2827,16 @@ def inventory_list(request):
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
 
+    # Prévision de consommation (jours de couverture) pour les articles de la page
+    from django.utils import timezone
+    from .utils.inventory_forecast import compute_inventory_forecast
+    forecast = compute_inventory_forecast(
+        items=InventoryItem.objects.filter(id__in=[item.id for item in page_obj]),
+        today=timezone.localdate(),
+    )
+    for item in page_obj:
+        item.forecast = forecast.get(item.id)
+
     # Données pour les filtres
     categories = InventoryItem.INVENTORY_CATEGORY_CHOICES
     suppliers = Supplier.objects.filter(is_active=True).order_by('name')
@@ -2475,6 +2876,103 @@ def inventory_list(request):
     return render(request, 'garage_app/inventory/inventory_list.html', context)
 
 
+@login_required
+def inventory_lookup_api(request):
+    """
+    API de recherche d'articles par SKU ou code-barres (lecteur au comptoir)
+
+    GET ``?code=...`` pour un code, ``?codes=a,b,c`` ou POST JSON ``{"codes": [...]}``
+    pour un lot de codes (compte d'inventaire).
+    """
+    from .utils.sku_index import lookup_code, lookup_codes
+
+    if request.method == 'POST':
+        import json
+
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'JSON invalide'}, status=400)
+        if not isinstance(payload, dict):
+            return JsonResponse({'success': False, 'message': 'Le corps JSON doit être un objet'}, status=400)
+        codes = payload.get('codes', [])
+        if not isinstance(codes, list) or not all(isinstance(code, str) for code in codes):
+            return JsonResponse(
+                {'success': False, 'message': 'Le champ "codes" doit être une liste de chaînes'}, status=400
+            )
+    elif request.GET.get('codes'):
+        codes = [code for code in request.GET['codes'].split(',') if code.strip()]
+    else:
+        code = request.GET.get('code', '')
+        if not code.strip():
+            return JsonResponse({'success': False, 'message': 'Code manquant'}, status=400)
+
+        item = lookup_code(code)
+        if item is None:
+            return JsonResponse({'success': False, 'message': f'Aucun article pour le code {code}'}, status=404)
+        return JsonResponse({'success': True, 'item': item})
+
+    result = lookup_codes(codes)
+    return JsonResponse({'success': True, 'items': result['found'], 'not_found': result['not_found']})
+
+
+@login_required
+def inventory_valuation(request):
+    """Vue pour l'évaluation du stock à une date donnée (coût moyen pondéré ou PEPS)"""
+    from datetime import datetime
+    from .utils.inventory_valuation import inventory_valuation_as_of
+
+    as_of = date.today()
+    date_param = request.GET.get('date', '')
+    if date_param:
+        try:
+            as_of = datetime.strptime(date_param, '%Y-%m-%d').date()
+        except ValueError:
+            messages.error(request, 'Date invalide, évaluation à la date du jour.')
+
+    category_filter = request.GET.get('category', '')
+    items = InventoryItem.objects.all()
+    if category_filter:
+        items = items.filter(category=category_filter)
+
+    valuation = inventory_valuation_as_of(as_of, items=items)
+    category_labels = dict(InventoryItem.INVENTORY_CATEGORY_CHOICES)
+
+    context = {
+        'valuation': valuation,
+        'as_of': as_of,
+        'is_current': as_of >= date.today(),
+        'category_filter': category_filter,
+        'categories': InventoryItem.INVENTORY_CATEGORY_CHOICES,
+        'category_totals': [
+            (category_labels.get(category, category), value)
+            for category, value in sorted(valuation['by_category'].items())
+        ],
+    }
+
+    return render(request, 'garage_app/inventory/inventory_valuation.html', context)
+
+
+@login_required
+def inventory_valuation_sync(request):
+    """Vue pour rapprocher les soldes évalués avec les quantités en stock saisies"""
+    from urllib.parse import urlencode
+    from .utils.inventory_valuation import post_stock_movements
+
+    category_filter = request.POST.get('category', '')
+    if request.method == 'POST':
+        items = InventoryItem.objects.all()
+        if category_filter:
+            items = items.filter(category=category_filter)
+        updated = post_stock_movements(items=items)
+        messages.success(request, f'Soldes rapprochés pour {len(updated)} article(s).')
+
+    url = reverse('garage_app:inventory_valuation')
+    if category_filter:
+        url = f"{url}?{urlencode({'category': category_filter})}"
+    return redirect(url)
+
+
 # ==================== VUES POUR LES ALERTES DE STOCK ====================
 
 @login_required
@@ -2565,6 +3063,39 @@ def run_stock_check(request):
     return redirect('garage_app:stock_alerts_dashboard')
 
 
+@login_required
+def create_purchase_suggestions(request):
+    """Vue pour générer les bons de commande brouillons groupés par fournisseur"""
+    if request.method == 'POST':
+        from .utils.purchase_suggestions import build_purchase_suggestions, create_draft_purchase_orders
+
+        try:
+            suggestions = build_purchase_suggestions(method=request.POST.get('method', 'fill'))
+            receipts = create_draft_purchase_orders(suggestions)
+
+            if receipts:
+                messages.success(
+                    request,
+                    f'{len(receipts)} bon(s) de commande brouillon(s) créé(s): '
+                    f'{", ".join(receipt.receipt_number for receipt in receipts)}.'
+                )
+            else:
+                messages.info(request, 'Aucun article avec fournisseur sous son point de réapprovisionnement.')
+
+            if suggestions['unassigned']:
+                messages.warning(
+                    request,
+                    f'{len(suggestions["unassigned"])} article(s) à commander sans fournisseur défini.'
+                )
+
+            if receipts:
+                return redirect(f"{reverse('garage_app:stock_receipt_list')}?status=draft")
+        except Exception as e:
+            messages.error(request, f'Erreur lors de la génération des commandes: {str(e)}')
+
+    return redirect('garage_app:stock_alerts_dashboard')
+
+
 # ==================== VUES POUR LES BONS DE RÉCEPTION ====================
 
 @login_required
@@ -2633,10 +3164,10 @@ def stock_receipt_create(request):
         if form.is_valid() and formset.is_valid():
             stock_receipt = form.save()
             formset.instance = stock_receipt
-            formset.save()
+            formset.save(commit=False)
 
-            # Calculer les totaux
-            stock_receipt.calculate_totals()
+            # Écrire les lignes en lot avec un seul calcul des totaux
+            stock_receipt.save_items(new_items=formset.new_objects)
 
             messages.success(request, f'Bon de réception {stock_receipt.receipt_number} créé avec succès.')
             return redirect('garage_app:stock_receipt_detail', stock_receipt_id=stock_receipt.id)
@@ -2664,10 +3195,14 @@ def stock_receipt_edit(request, stock_receipt_id):
 
         if form.is_valid() and formset.is_valid():
             stock_receipt = form.save()
-            formset.save()
+            formset.save(commit=False)
 
-            # Calculer les totaux
-            stock_receipt.calculate_totals()
+            # Écrire les lignes en lot avec un seul calcul des totaux
+            stock_receipt.save_items(
+                new_items=formset.new_objects,
+                changed_items=[item for item, _ in formset.changed_objects],
+                deleted_items=formset.deleted_objects,
+            )
 
             messages.success(request, f'Bon de réception {stock_receipt.receipt_number} modifié avec succès.')
             return redirect('garage_app:stock_receipt_detail', stock_receipt_id=stock_receipt.id)
@@ -2685,6 +3220,59 @@ def stock_receipt_edit(request, stock_receipt_id):
     return render(request, 'garage_app/stock_receipts/stock_receipt_form.html', context)
 
 
+@login_required
+def stock_receipt_import(request):
+    """Vue pour importer un fichier CSV fournisseur (bordereau de livraison ou liste de prix)"""
+    report = None
+
+    if request.method == 'POST':
+        form = SupplierCsvImportForm(request.POST, request.FILES)
+
+        if form.is_valid():
+            from .utils.supplier_import import import_supplier_csv, open_uploaded_csv
+
+            mode = form.cleaned_data['mode']
+            try:
+                report = import_supplier_csv(
+                    open_uploaded_csv(form.cleaned_data['csv_file']),
+                    supplier=form.cleaned_data['supplier'],
+                    mode=mode,
+                    update_prices=form.cleaned_data['update_prices'] or mode == 'price_list',
+                    supplier_invoice_number=form.cleaned_data['supplier_invoice_number'] or None,
+                )
+            except Exception as e:
+                messages.error(request, f'Erreur lors de l\'importation: {str(e)}')
+            else:
+                if report['receipt']:
+                    messages.success(
+                        request,
+                        f'Bon de réception {report["receipt"].receipt_number} créé avec '
+                        f'{report["receipt_lines"]} ligne(s) à partir de {report["rows"]} ligne(s) du fichier.'
+                    )
+                elif mode == 'price_list':
+                    messages.success(request, f'{report["prices_updated"]} prix fournisseur mis à jour.')
+                else:
+                    messages.warning(request, 'Aucune ligne du fichier ne correspond à un article d\'inventaire.')
+
+                if report['unmatched_count'] or report['invalid_count']:
+                    messages.warning(
+                        request,
+                        f'{report["unmatched_count"]} ligne(s) avec SKU inconnu et '
+                        f'{report["invalid_count"]} ligne(s) invalide(s) ignorée(s).'
+                    )
+                elif report['receipt']:
+                    return redirect('garage_app:stock_receipt_detail', stock_receipt_id=report['receipt'].id)
+    else:
+        form = SupplierCsvImportForm()
+
+    context = {
+        'form': form,
+        'report': report,
+    }
+
+    return render(request, 'garage_app/stock_receipts/stock_receipt_import.html', context)
+
+
 @login_required
 def stock_receipt_delete(request, stock_receipt_id):
     """Vue pour supprimer un bon de réception"""
@@ -2726,6 +3314,120 @@ def stock_receipt_process(request, stock_receipt_id):
     return render(request, 'garage_app/stock_receipts/stock_receipt_process.html', context)
 
 
+# ==================== VUES POUR LES INVENTAIRES PHYSIQUES ====================
+
+@login_required
+def stock_count_list(request):
+    """Vue pour lister les sessions d'inventaire physique"""
+    from django.db.models import Count
+
+    stock_counts = StockCount.objects.annotate(line_count=Count('count_lines')).order_by('-count_date', '-created_at')
+
+    paginator = Paginator(stock_counts, 20)
+    page_obj = paginator.get_page(request.GET.get('page'))
+
+    context = {
+        'page_obj': page_obj,
+        'form': StockCountForm(initial={'count_date': date.today()}),
+    }
+
+    return render(request, 'garage_app/stock_counts/stock_count_list.html', context)
+
+
+@login_required
+def stock_count_create(request):
+    """Vue pour ouvrir une session d'inventaire physique"""
+    if request.method == 'POST':
+        form = StockCountForm(request.POST)
+        if form.is_valid():
+            stock_count = form.save()
+            messages.success(request, f'Inventaire physique {stock_count.reference} ouvert.')
+            return redirect('garage_app:stock_count_detail', stock_count_id=stock_count.id)
+        messages.error(request, 'Impossible d\'ouvrir l\'inventaire physique: données invalides.')
+
+    return redirect('garage_app:stock_count_list')
+
+
+@login_required
+def stock_count_detail(request, stock_count_id):
+    """Vue pour saisir les quantités comptées en lot et consulter les écarts"""
+    from .utils.stock_count import parse_count_csv, parse_scanner_batch, record_counts
+    from .utils.supplier_import import open_uploaded_csv
+
+    stock_count = get_object_or_404(StockCount, id=stock_count_id)
+
+    if request.method == 'POST' and stock_count.status == 'open':
+        form = StockCountEntryForm(request.POST, request.FILES)
+        if form.is_valid():
+            counts, invalid = parse_scanner_batch(form.cleaned_data['scans'])
+            if form.cleaned_data['csv_file']:
+                csv_counts, csv_invalid = parse_count_csv(open_uploaded_csv(form.cleaned_data['csv_file']))
+                invalid += csv_invalid
+                for code, quantity in csv_counts.items():
+                    counts[code] = counts.get(code, 0) + quantity
+
+            stats = record_counts(stock_count, counts, mode=form.cleaned_data['mode'])
+            messages.success(
+                request,
+                f'{stats["lines_created"]} ligne(s) ajoutée(s), {stats["lines_updated"]} ligne(s) mise(s) à jour.'
+            )
+            if stats['not_found']:
+                messages.warning(request, f'Codes inconnus: {", ".join(stats["not_found"][:50])}')
+            if invalid:
+                messages.warning(request, f'{len(invalid)} ligne(s) invalide(s) ignorée(s).')
+            return redirect('garage_app:stock_count_detail', stock_count_id=stock_count.id)
+    else:
+        form = StockCountEntryForm()
+
+    # Écarts calculés en une seule requête
+    lines = list(stock_count.lines_with_variance())
+    if stock_count.status == 'posted':
+        for line in lines:
+            line.current_quantity = line.expected_quantity
+            line.current_variance = line.variance
+
+    context = {
+        'stock_count': stock_count,
+        'form': form,
+        'lines': lines,
+        'variance_count': sum(1 for line in lines if line.current_variance),
+    }
+
+    return render(request, 'garage_app/stock_counts/stock_count_detail.html', context)
+
+
+@login_required
+def stock_count_post(request, stock_count_id):
+    """Vue pour comptabiliser les écarts d'un inventaire physique"""
+    stock_count = get_object_or_404(StockCount, id=stock_count_id)
+
+    if request.method == 'POST':
+        adjusted = stock_count.post_adjustments()
+        if adjusted is None:
+            messages.error(request, 'Seuls les inventaires en cours peuvent être comptabilisés.')
+        else:
+            messages.success(
+                request,
+                f'Inventaire {stock_count.reference} comptabilisé: {adjusted} article(s) ajusté(s).'
+            )
+
+    return redirect('garage_app:stock_count_detail', stock_count_id=stock_count.id)
+
+
+@login_required
+def stock_count_cancel(request, stock_count_id):
+    """Vue pour annuler un inventaire physique avant sa comptabilisation"""
+    stock_count = get_object_or_404(StockCount, id=stock_count_id)
+
+    if request.method == 'POST':
+        if stock_count.cancel():
+            messages.success(request, f'Inventaire {stock_count.reference} annulé.')
+        else:
+            messages.error(request, 'Seuls les inventaires en cours peuvent être annulés.')
+
+    return redirect('garage_app:stock_count_detail', stock_count_id=stock_count.id)
+
+
 @login_required
 def get_services_ajax(request):
     """API AJAX pour récupérer les informations des services"""
@@ -2768,17 +3470,27 @@ def quote_list(request):
     search_query = request.GET.get('search', '')
     status_filter = request.GET.get('status', '')
 
-    quotes = Quote.objects.all()
+    # Les soumissions échues depuis le dernier passage de expire_quotes sont
+    # affichées, comptées et filtrées comme expirées, sans écriture
+    quotes = Quote.objects.select_related('client', 'vehicle').annotate(display_status=Quote.displayed_status())
 
     if search_query:
         quotes = quotes.filter(
             Q(quote_number__icontains=search_query) |
-            Q(client__name__icontains=search_query) |
+            Q(client__first_name__icontains=search_query) |
+            Q(client__last_name__icontains=search_query) |
             Q(client__email__icontains=search_query)
         )
 
-    if status_filter:
-        quotes = quotes.filter(status=status_filter)
+    # Nombre de soumissions par statut en une seule requête groupée
+    status_counts = dict(
+        quotes.order_by().values_list('display_status').annotate(count=Count('id'))
+    )
+
+    if status_filter in dict(Quote.QUOTE_STATUS_CHOICES):
+        quotes = quotes.filter(display_status=status_filter)
+    else:
+        status_filter = ''
 
     # Pagination
     paginator = Paginator(quotes, 25)
@@ -2789,7 +3501,10 @@ def quote_list(request):
         'page_obj': page_obj,
         'search_query': search_query,
         'status_filter': status_filter,
-        'status_choices': Quote.QUOTE_STATUS_CHOICES,
+        'status_choices': [
+            (value, label, status_counts.get(value, 0)) for value, label in Quote.QUOTE_STATUS_CHOICES
+        ],
+        'total_count': sum(status_counts.values()),
     }
 
     return render(request, 'garage_app/quotes/quote_list.html', context)
@@ -2951,6 +3666,46 @@ def quote_convert_to_invoice(request, quote_id):
     return render(request, 'garage_app/quotes/quote_convert.html', {'quote': quote})
 
 
+@login_required
+def quote_bulk_convert_api(request):
+    """
+    Convertir plusieurs soumissions en factures en une seule transaction
+
+    Corps JSON : ``{"quote_ids": [...]}``. Les soumissions non convertibles
+    (brouillon, refusée, déjà convertie...) sont listées dans ``skipped``.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Méthode non autorisée'}, status=405)
+
+    import json
+
+    try:
+        data = json.loads(request.body)
+        quote_ids = [int(quote_id) for quote_id in data.get('quote_ids') or []]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'success': False, 'message': 'Liste de soumissions invalide'}, status=400)
+    if not quote_ids:
+        return JsonResponse({'success': False, 'message': 'Aucune soumission sélectionnée'}, status=400)
+
+    converted = Quote.convert_many(Quote.objects.filter(id__in=quote_ids))
+    converted_ids = {quote.id for quote in converted}
+
+    return JsonResponse({
+        'success': True,
+        'converted': [
+            {
+                'quote_id': quote.id,
+                'quote_number': quote.quote_number,
+                'invoice_id': quote.converted_invoice.id,
+                'invoice_number': quote.converted_invoice.invoice_number,
+                'total_amount': float(quote.converted_invoice.total_amount),
+            }
+            for quote in converted
+        ],
+        'skipped': [quote_id for quote_id in dict.fromkeys(quote_ids) if quote_id not in converted_ids],
+    })
+
+
 # ============================================================================
 # VUES POUR LES ARCHIVES FISCALES
 # ============================================================================